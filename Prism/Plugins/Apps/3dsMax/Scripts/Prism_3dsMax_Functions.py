@@ -252,7 +252,7 @@ class Prism_3dsMax_Functions(object):
                 origin.nodes.append(handle)
 
         origin.updateUi()
-        origin.stateManager.saveStatesToScene()
+        origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def getNodeName(self, origin, node):
@@ -1336,6 +1336,9 @@ animationrange = interval tmpanimrange.x tmpanimrange.y
         origin.shotcamFileType = ".fbx"
 
         if not origin.core.smCallbacksRegistered:
+            MaxPlus.NotificationManager.Register(
+                MaxPlus.NotificationCodes.FilePreSave, origin.core.sceneAboutToSave
+            )
             MaxPlus.NotificationManager.Register(
                 MaxPlus.NotificationCodes.FilePostSave, origin.core.scenefileSaved
             )
@@ -39,6 +39,7 @@ class Prism_3dsMax_Variables(object):
         self.appShortName = "Max"
         self.appType = "3d"
         self.hasQtParent = True
+        self.hasPreSaveCallback = True
         self.sceneFormats = [".max"]
         self.appSpecificFormats = self.sceneFormats
         self.outputFormats = [".abc", ".obj", ".fbx", ".max", "ShotCam"]
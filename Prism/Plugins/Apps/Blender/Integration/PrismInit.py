@@ -65,6 +65,11 @@ def sceneUnload(dummy):
     pcore.sceneUnload()
 
 
+@persistent
+def scenePreSave(dummy):
+    pcore.sceneAboutToSave()
+
+
 @persistent
 def sceneSave(dummy):
     pcore.scenefileSaved()
@@ -235,6 +240,7 @@ def register():
         # bpy.utils.register_class(PrismPanel)
 
         bpy.app.handlers.load_pre.append(sceneUnload)
+        bpy.app.handlers.save_pre.append(scenePreSave)
         bpy.app.handlers.save_post.append(sceneSave)
         bpy.app.handlers.load_post.append(sceneOpen)
 
@@ -258,5 +264,6 @@ def unregister():
     # bpy.utils.unregister_class(PrismPanel)
 
     bpy.app.handlers.load_pre.remove(sceneUnload)
+    bpy.app.handlers.save_pre.remove(scenePreSave)
     bpy.app.handlers.save_post.remove(sceneSave)
     bpy.app.handlers.load_post.remove(sceneOpen)
@@ -356,7 +356,7 @@ class Prism_Blender_Functions(object):
             self.getGroups()[taskName].objects.link(i)
 
         origin.updateUi()
-        origin.stateManager.saveStatesToScene()
+        origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def getNodeName(self, origin, node):
@@ -1133,7 +1133,7 @@ class Prism_Blender_Functions(object):
 
             origin.l_pathLast.setText(rSettings["outputName"])
             origin.l_pathLast.setToolTip(rSettings["outputName"])
-            origin.stateManager.saveStatesToScene()
+            origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def sm_render_getDeadlineParams(self, origin, dlParams, homeDir):
@@ -39,6 +39,7 @@ class Prism_Blender_Variables(object):
         self.appShortName = "Bld"
         self.appType = "3d"
         self.hasQtParent = False
+        self.hasPreSaveCallback = True
         self.sceneFormats = [".blend"]
         self.appSpecificFormats = self.sceneFormats
         self.outputFormats = [".abc", ".obj", ".fbx", ".blend", "ShotCam"]
@@ -0,0 +1,8 @@
+# >>>PrismStart
+try:
+    import PrismInit
+
+    PrismInit.pcore.sceneAboutToSave()
+except:
+    pass
+# <<<PrismEnd
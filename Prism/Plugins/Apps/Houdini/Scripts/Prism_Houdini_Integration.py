@@ -218,8 +218,11 @@ class Prism_Houdini_Integration(object):
             prc = os.path.join(installBase, "python2.7libs", "pythonrc.py")
             sceneOpen = os.path.join(installBase, "scripts", "456.py")
             sceneSave = os.path.join(installBase, "scripts", "afterscenesave.py")
+            preSceneSave = os.path.join(installBase, "scripts", "beforescenesave.py")
 
-            result = self.core.integration.removeIntegrationData(filepath=[prc, sceneOpen, sceneSave])
+            result = self.core.integration.removeIntegrationData(
+                filepath=[prc, sceneOpen, sceneSave, preSceneSave]
+            )
             if result is not None:
                 return True
 
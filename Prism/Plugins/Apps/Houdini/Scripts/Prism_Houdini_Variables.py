@@ -39,6 +39,7 @@ class Prism_Houdini_Variables(object):
         self.appShortName = "Hou"
         self.appType = "3d"
         self.hasQtParent = True
+        self.hasPreSaveCallback = True
         self.sceneFormats = [".hip", ".hipnc", ".hiplc"]
         self.outputFormats = [
             ".bgeo",
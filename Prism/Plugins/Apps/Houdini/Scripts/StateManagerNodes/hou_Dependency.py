@@ -132,7 +132,7 @@ class DependencyClass(object):
     @err_catcher(name=__name__)
     def managerChanged(self, text=None):
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -155,7 +155,7 @@ class DependencyClass(object):
         ):
             self.node = hou.selectedNodes()[0]
             self.updateUi()
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def isNodeValid(self, node):
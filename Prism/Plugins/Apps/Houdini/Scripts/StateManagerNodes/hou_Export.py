@@ -458,7 +458,7 @@ class ExportClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -498,14 +498,14 @@ class ExportClass(object):
 
             self.b_changeTask.setStyleSheet("")
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setCam(self, index):
         self.curCam = self.camlist[index]
         self.nameChanged(self.e_name.text())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def updateUi(self):
@@ -545,7 +545,7 @@ class ExportClass(object):
                 self.curCam = self.camlist[0]
             else:
                 self.curCam = None
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         if self.cb_outType.currentText() != ".hda":
             self.updateRange()
@@ -567,7 +567,7 @@ class ExportClass(object):
             self.cb_sCamShot.setCurrentIndex(shotNames.index(curShot))
         else:
             self.cb_sCamShot.setCurrentIndex(0)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         if self.cb_outType.currentText() == ".hda":
             if self.isNodeValid() and (
@@ -834,7 +834,7 @@ class ExportClass(object):
 
         self.rjToggled()
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def goToNode(self):
@@ -936,7 +936,7 @@ class ExportClass(object):
 
             self.nameChanged(self.e_name.text())
             self.updateUi()
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
             return True
 
         return False
@@ -955,25 +955,25 @@ class ExportClass(object):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def useTakeChanged(self, state):
         self.cb_take.setEnabled(state)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def rjToggled(self, checked=None):
         if checked is None:
             checked = self.gb_submit.isChecked()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def managerChanged(self, text=None):
@@ -981,7 +981,7 @@ class ExportClass(object):
             self.core.rfManagers[self.cb_manager.currentText()].sm_houExport_activated(
                 self
             )
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def openSlaves(self):
@@ -1020,7 +1020,7 @@ class ExportClass(object):
                     selSlaves = selSlaves[:-2]
 
             self.e_osSlaves.setText(selSlaves)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def preDelete(self, item, silent=False):
@@ -1060,7 +1060,7 @@ class ExportClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next"):
+    def getOutputName(self, useVersion="next", reserve=False):
         fileName = self.core.getCurrentFileName()
         prefUnit = "meter"
 
@@ -1081,7 +1081,7 @@ class ExportClass(object):
                     useVersion == "next"
 
             if useVersion == "next":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
 
             outputPath = os.path.join(
                 outputPath,
@@ -1154,7 +1154,7 @@ class ExportClass(object):
                     self.l_taskName.text(),
                 )
                 if hVersion == "":
-                    hVersion = self.core.getHighestTaskVersion(outputPath)
+                    hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                     pComment = fnameData["comment"]
 
                 hVersion = (
@@ -1191,7 +1191,7 @@ class ExportClass(object):
                     self.l_taskName.text(),
                 )
                 if hVersion == "":
-                    hVersion = self.core.getHighestTaskVersion(outputPath)
+                    hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                     pComment = fnameData["comment"]
 
                 outputPath = os.path.join(
@@ -1253,7 +1253,7 @@ class ExportClass(object):
 
             fileName = self.core.getCurrentFileName()
 
-            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
             outLength = len(outputName)
             if platform.system() == "Windows" and outLength > 255:
@@ -1378,7 +1378,7 @@ class ExportClass(object):
                 },
             )
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
             if os.path.exists(outputName + ".abc") and os.path.exists(
                 outputName + ".fbx"
@@ -1429,7 +1429,7 @@ class ExportClass(object):
 
             fileName = self.core.getCurrentFileName()
 
-            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
             outLength = len(outputName)
             if platform.system() == "Windows" and outLength > 255:
@@ -1555,7 +1555,7 @@ class ExportClass(object):
             self.b_openLast.setEnabled(True)
             self.b_copyLast.setEnabled(True)
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
             for idx, outputName in enumerate(outputNames):
                 outputName = outputName.replace("\\", "/")
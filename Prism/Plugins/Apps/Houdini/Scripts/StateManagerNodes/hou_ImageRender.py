@@ -95,7 +95,7 @@ class ImageRenderClass(object):
             "640x360",
         ]
 
-        self.resolutionPresets = self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets)
+        self.resolutionPresets = list(self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets))
 
         if "Cam resolution" not in self.resolutionPresets:
             self.resolutionPresets.insert(0, "Cam resolution")
@@ -207,7 +207,7 @@ class ImageRenderClass(object):
             idx = self.cb_renderPreset.findText(data["currentrenderpreset"])
             if idx != -1:
                 self.cb_renderPreset.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "rangeType" in data:
             idx = self.cb_rangeType.findText(data["rangeType"])
             if idx != -1:
@@ -230,7 +230,7 @@ class ImageRenderClass(object):
                 if self.chb_camOverride.isChecked():
                     self.curCam = self.camlist[idx]
                 self.cb_cams.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "resoverride" in data:
             res = eval(data["resoverride"])
             self.chb_resOverride.setChecked(res[0])
@@ -390,21 +390,21 @@ class ImageRenderClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def startChanged(self):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def frameExpressionChanged(self, text=None):
@@ -473,12 +473,12 @@ class ImageRenderClass(object):
     @err_catcher(name=__name__)
     def useTakeChanged(self, state):
         self.cb_take.setEnabled(state)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setCam(self, index):
         self.curCam = self.camlist[index]
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def rendererChanged(self, renderer, create=True):
@@ -496,7 +496,7 @@ class ImageRenderClass(object):
 
         self.nameChanged(self.e_name.text())
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def deleteNode(self):
@@ -561,19 +561,19 @@ class ImageRenderClass(object):
 
             self.b_changeTask.setStyleSheet("")
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def presetOverrideChanged(self, checked):
         self.cb_renderPreset.setEnabled(checked)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def camOverrideChanged(self, checked):
         self.cb_cams.setEnabled(checked)
         self.updateCams()
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def resOverrideChanged(self, checked):
@@ -581,7 +581,7 @@ class ImageRenderClass(object):
         self.sp_resHeight.setEnabled(checked)
         self.b_resPresets.setEnabled(checked)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def showResPresets(self):
@@ -604,7 +604,7 @@ class ImageRenderClass(object):
                 pAct.triggered.connect(
                     lambda x=None, v=pheight: self.sp_resHeight.setValue(v)
                 )
-                pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene())
+                pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene(self))
 
             pmenu.addAction(pAct)
 
@@ -629,7 +629,7 @@ class ImageRenderClass(object):
         self.sp_resWidth.setValue(cam.parm("resx").eval())
         self.sp_resHeight.setValue(cam.parm("resy").eval())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def updateUi(self):
@@ -691,7 +691,7 @@ class ImageRenderClass(object):
                     self.curCam = self.camlist[0]
                 else:
                     self.curCam = None
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         elif self.node is not None:
             self.curCam = self.curRenderer.getCam(self.node)
 
@@ -783,7 +783,7 @@ class ImageRenderClass(object):
                 and self.core.rfManagers[self.cb_manager.currentText()].canOutputLocal
             )
         )
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def managerChanged(self, text=None):
@@ -803,7 +803,7 @@ class ImageRenderClass(object):
         is3dl = self.node and (self.node.type().name() == "3Delight")
         self.w_renderNSIs.setVisible(bool(is3dl and (rfm == "Deadline")))
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def openSlaves(self):
@@ -842,17 +842,17 @@ class ImageRenderClass(object):
                     selSlaves = selSlaves[:-2]
 
             self.e_osSlaves.setText(selSlaves)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def gpuPtChanged(self):
         self.w_dlGPUdevices.setEnabled(self.sp_dlGPUpt.value() == 0)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def gpuDevicesChanged(self):
         self.w_dlGPUpt.setEnabled(self.le_dlGPUdevices.text() == "")
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setPassData(self, item):
@@ -995,7 +995,7 @@ class ImageRenderClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next"):
+    def getOutputName(self, useVersion="next", reserve=False):
         if self.l_taskName.text() == "":
             return
 
@@ -1031,7 +1031,7 @@ class ImageRenderClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -1058,7 +1058,7 @@ class ImageRenderClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -1114,7 +1114,7 @@ class ImageRenderClass(object):
 
         fileName = self.core.getCurrentFileName()
 
-        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
         outLength = len(outputName)
         if platform.system() == "Windows" and outLength > 255:
@@ -1156,7 +1156,7 @@ class ImageRenderClass(object):
         self.l_pathLast.setToolTip(outputName)
         self.b_openLast.setEnabled(True)
         self.b_copyLast.setEnabled(True)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
         if self.chb_resOverride.isChecked():
             result = self.curRenderer.setResolution(self)
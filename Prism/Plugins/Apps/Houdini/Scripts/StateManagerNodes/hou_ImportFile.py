@@ -187,7 +187,7 @@ class ImportFileClass(object):
     def pathChanged(self):
         self.stateManager.saveImports()
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def autoUpdateChanged(self, checked):
@@ -200,7 +200,7 @@ class ImportFileClass(object):
                 if curVersion and latestVersion and curVersion != latestVersion:
                     self.importLatest()
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def browse(self):
@@ -254,7 +254,7 @@ class ImportFileClass(object):
         if not self.stateManager.standalone:
             if checked:
                 self.removeNameSpaces()
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def getImportPath(self):
@@ -422,7 +422,7 @@ class ImportFileClass(object):
                                     "Import failed",
                                 )
                             self.updateUi()
-                            self.stateManager.saveStatesToScene()
+                            self.stateManager.saveStatesToScene(self)
                             return
 
                         setGobalFrangeExpr = "tset `(%d-1)/$FPS` `%d/$FPS`" % (
@@ -570,7 +570,7 @@ class ImportFileClass(object):
 
         self.stateManager.saveImports()
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
         return True
 
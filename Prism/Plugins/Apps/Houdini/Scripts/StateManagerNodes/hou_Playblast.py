@@ -80,7 +80,7 @@ class PlayblastClass(object):
             "640x360",
         ]
 
-        self.resolutionPresets = self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets)
+        self.resolutionPresets = list(self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets))
 
         if "Cam resolution" not in self.resolutionPresets:
             self.resolutionPresets.insert(0, "Cam resolution")
@@ -138,7 +138,7 @@ class PlayblastClass(object):
             if idx > 0:
                 self.curCam = self.camlist[idx - 1]
                 self.cb_cams.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "resoverride" in data:
             res = eval(data["resoverride"])
             self.chb_resOverride.setChecked(res[0])
@@ -197,21 +197,21 @@ class PlayblastClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def startChanged(self):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setCam(self, index):
@@ -220,7 +220,7 @@ class PlayblastClass(object):
         else:
             self.curCam = self.camlist[index - 1]
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -257,7 +257,7 @@ class PlayblastClass(object):
 
             self.b_changeTask.setStyleSheet("")
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def resOverrideChanged(self, checked):
@@ -265,7 +265,7 @@ class PlayblastClass(object):
         self.sp_resHeight.setEnabled(checked)
         self.b_resPresets.setEnabled(checked)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def showResPresets(self):
@@ -289,7 +289,7 @@ class PlayblastClass(object):
                 pAct.triggered.connect(
                     lambda x=None, v=pheight: self.sp_resHeight.setValue(v)
                 )
-                pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene())
+                pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene(self))
 
             pmenu.addAction(pAct)
 
@@ -317,7 +317,7 @@ class PlayblastClass(object):
         self.sp_resWidth.setValue(pbCam.parm("resx").eval())
         self.sp_resHeight.setValue(pbCam.parm("resy").eval())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def updateUi(self):
@@ -340,7 +340,7 @@ class PlayblastClass(object):
         else:
             self.cb_cams.setCurrentIndex(0)
             self.curCam = None
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         self.updateRange()
         self.nameChanged(self.e_name.text())
@@ -434,7 +434,7 @@ class PlayblastClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next"):
+    def getOutputName(self, useVersion="next", reserve=False):
         if self.l_taskName.text() == "":
             return
 
@@ -459,7 +459,7 @@ class PlayblastClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -483,7 +483,7 @@ class PlayblastClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -593,7 +593,7 @@ class PlayblastClass(object):
 
         fileName = self.core.getCurrentFileName()
 
-        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
         outLength = len(outputName)
         if platform.system() == "Windows" and outLength > 255:
@@ -617,7 +617,7 @@ class PlayblastClass(object):
         self.b_openLast.setEnabled(True)
         self.b_copyLast.setEnabled(True)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
         hou.hipFile.save()
 
@@ -649,7 +649,15 @@ class PlayblastClass(object):
             if "panel" in locals():
                 panel.close()
 
-            if self.cb_formats.currentText() == "mp4":
+            convertToMp4 = self.cb_formats.currentText() == "mp4"
+
+            # the conversion doesn't access the scene, so the publish can
+            # continue with the next state in the meantime. Returns an error
+            # message or None
+            def convert():
+                if not convertToMp4:
+                    return
+
                 mediaBaseName = os.path.splitext(outputName)[0][:-3]
                 videoOutput = mediaBaseName + "mp4"
                 inputpath = (
@@ -660,13 +668,10 @@ class PlayblastClass(object):
                 result = self.core.media.convertMedia(inputpath, jobFrames[0], videoOutput)
 
                 if not os.path.exists(videoOutput):
-                    return [
-                        self.state.text(0)
-                        + (
-                            " - error occurred during conversion of jpg files to mp4\n\n%s"
-                            % str(result)
-                        )
-                    ]
+                    return (
+                        " - error occurred during conversion of jpg files to mp4\n\n%s"
+                        % str(result)
+                    )
 
                 delFiles = []
                 for i in os.listdir(os.path.dirname(outputName)):
@@ -681,21 +686,27 @@ class PlayblastClass(object):
                     except:
                         pass
 
-            self.core.callHook(
-                "postPlayblast",
-                args={
-                    "prismCore": self.core,
-                    "scenefile": fileName,
-                    "startFrame": jobFrames[0],
-                    "endFrame": jobFrames[1],
-                    "outputName": outputName,
-                },
-            )
+            def finish(error):
+                if error:
+                    return [self.state.text(0) + error]
+
+                self.core.callHook(
+                    "postPlayblast",
+                    args={
+                        "prismCore": self.core,
+                        "scenefile": fileName,
+                        "startFrame": jobFrames[0],
+                        "endFrame": jobFrames[1],
+                        "outputName": outputName,
+                    },
+                )
 
-            if len(os.listdir(outputPath)) > 0:
-                return [self.state.text(0) + " - success"]
-            else:
-                return [self.state.text(0) + " - unknown error (files do not exist)"]
+                if len(os.listdir(outputPath)) > 0:
+                    return [self.state.text(0) + " - success"]
+                else:
+                    return [self.state.text(0) + " - unknown error (files do not exist)"]
+
+            return self.stateManager.runOutOfProcess(convert, finish=finish)
         except Exception as e:
             exc_type, exc_obj, exc_tb = sys.exc_info()
             erStr = "%s ERROR - houPlayblast %s:\n%s" % (
@@ -63,6 +63,23 @@ class Prism_Maya_Functions(object):
     def __init__(self, core, plugin):
         self.core = core
         self.plugin = plugin
+        # ids of the MSceneMessage callbacks
+        self.sceneCallbacks = []
+
+    @err_catcher(name=__name__)
+    def unregister(self):
+        self.unregisterCallbacks()
+
+    @err_catcher(name=__name__)
+    def unregisterCallbacks(self):
+        for cb in self.sceneCallbacks:
+            try:
+                api.MMessage.removeCallback(cb)
+            except:
+                pass
+
+        self.sceneCallbacks = []
+        self.core.smCallbacksRegistered = False
 
     @err_catcher(name=__name__)
     def startup(self, origin):
@@ -111,7 +128,9 @@ class Prism_Maya_Functions(object):
         cmds.loadPlugin("AbcImport.mll", quiet=True)
         cmds.loadPlugin("fbxmaya.mll", quiet=True)
 
-        api.MSceneMessage.addCallback(api.MSceneMessage.kAfterOpen, origin.sceneOpen)
+        self.sceneCallbacks.append(
+            api.MSceneMessage.addCallback(api.MSceneMessage.kAfterOpen, origin.sceneOpen)
+        )
 
     @err_catcher(name=__name__)
     def autosaveEnabled(self, origin):
@@ -438,7 +457,7 @@ class Prism_Maya_Functions(object):
                     origin.nodes.append(i)
 
         origin.updateUi()
-        origin.stateManager.saveStatesToScene()
+        origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def getNodeName(self, origin, node):
@@ -2492,6 +2511,10 @@ Show only polygon objects in viewport.
         if not self.core.smCallbacksRegistered:
             import maya.OpenMaya as api
 
+            preSaveCallback = api.MSceneMessage.addCallback(
+                api.MSceneMessage.kBeforeSave, self.core.sceneAboutToSave
+            )
+
             saveCallback = api.MSceneMessage.addCallback(
                 api.MSceneMessage.kAfterSave, self.core.scenefileSaved
             )
@@ -2504,6 +2527,13 @@ Show only polygon objects in viewport.
                 api.MSceneMessage.kBeforeOpen, self.core.sceneUnload
             )
 
+            self.sceneCallbacks += [
+                preSaveCallback,
+                saveCallback,
+                newCallback,
+                loadCallback,
+            ]
+
     @err_catcher(name=__name__)
     def sm_saveStates(self, origin, buf):
         cmds.fileInfo("PrismStates", buf)
@@ -39,6 +39,7 @@ class Prism_Maya_Variables(object):
         self.appShortName = "Maya"
         self.appType = "3d"
         self.hasQtParent = True
+        self.hasPreSaveCallback = True
         self.sceneFormats = [".ma", ".mb"]
         self.appSpecificFormats = self.sceneFormats
         self.outputFormats = [".abc", ".obj", ".fbx", ".ma", ".mb", "ShotCam"]
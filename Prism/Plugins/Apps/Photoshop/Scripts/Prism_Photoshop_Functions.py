@@ -48,6 +48,7 @@ if platform.system() == "Windows":
     import win32com.client
 
 from PrismUtils.Decorators import err_catcher as err_catcher
+from PrismUtils import FrameSequences
 
 
 class Prism_Photoshop_Functions(object):
@@ -431,7 +432,7 @@ class Prism_Photoshop_Functions(object):
         sources = origin.getImgSources(sourceFolder)
         for curSourcePath in sources:
 
-            if "@@@@" in curSourcePath:
+            if "@" in os.path.basename(curSourcePath):
                 if (
                     "pstart" not in mpb
                     or "pend" not in mpb
@@ -444,9 +445,8 @@ class Prism_Photoshop_Functions(object):
                     firstFrame = mpb["pstart"]
                     lastFrame = mpb["pend"]
 
-                filePath = curSourcePath.replace("@"*self.core.framePadding, "%04d".replace("4", str(self.core.framePadding)) % firstFrame).replace(
-                    "\\", "/"
-                )
+                sequence = FrameSequences.parsePattern(curSourcePath)
+                filePath = sequence.getPath(firstFrame).replace("\\", "/")
             else:
                 filePath = curSourcePath.replace("\\", "/")
                 firstFrame = 0
@@ -717,7 +717,7 @@ class Prism_Photoshop_Functions(object):
         self.cb_versions.addItems(existingVersions)
 
     @err_catcher(name=__name__)
-    def exportGetOutputName(self, useVersion="next"):
+    def exportGetOutputName(self, useVersion="next", reserve=False):
         if self.le_task.text() == "":
             return
 
@@ -751,7 +751,7 @@ class Prism_Photoshop_Functions(object):
                 )
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
 
             outputFile = os.path.join(
                 "shot"
@@ -774,7 +774,7 @@ class Prism_Photoshop_Functions(object):
                 )
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
 
             outputFile = os.path.join(
                 fnameData["entityName"]
@@ -832,7 +832,7 @@ class Prism_Photoshop_Functions(object):
                 )
                 return
 
-            outputPath, outputDir, hVersion = self.exportGetOutputName(oversion)
+            outputPath, outputDir, hVersion = self.exportGetOutputName(oversion, reserve=True)
 
             outLength = len(outputPath)
             if platform.system() == "Windows" and outLength > 255:
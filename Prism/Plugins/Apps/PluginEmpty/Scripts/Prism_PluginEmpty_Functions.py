@@ -204,7 +204,7 @@ class Prism_PluginEmpty_Functions(object):
                 origin.nodes.append(i)
 
         origin.updateUi()
-        origin.stateManager.saveStatesToScene()
+        origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def getNodeName(self, origin, node):
@@ -507,6 +507,12 @@ class Prism_PluginEmpty_Functions(object):
         extFiles = []
         return [extFiles, []]
 
+    @err_catcher(name=__name__)
+    def sm_isStateThreadSafe(self, origin, state):
+        # states, which don't access the scene or the UI during their execution
+        # can be executed in parallel with other states during a publish
+        return False
+
     @err_catcher(name=__name__)
     def sm_createRenderPressed(self, origin):
         origin.createPressed("Render")
@@ -33,6 +33,21 @@
 
 import os
 import sys
+import time
+import socket
+import logging
+import threading
+import traceback
+
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    import http.client as httplib
+    from urllib.parse import urljoin, urlsplit
+except ImportError:
+    import httplib
+    from urlparse import urljoin, urlsplit
 
 try:
     from PySide2.QtCore import *
@@ -50,14 +65,190 @@ else:
 from PrismUtils.Decorators import err_catcher_plugin as err_catcher
 
 
+logger = logging.getLogger(__name__)
+
 modulePath = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "external_modules")
 sys.path.append(modulePath)
 
 
+class SgSyncProgress(object):
+    def __init__(self, core, text, maximum):
+        self.core = core
+        self.value = 0
+        self.maximum = maximum
+        self.dlg = None
+        if getattr(self.core, "uiAvailable", False):
+            self.dlg = QProgressDialog(text, "Cancel", 0, maximum, self.core.messageParent)
+            self.dlg.setWindowTitle("Shotgun Sync")
+            self.dlg.setMinimumDuration(1000)
+            self.dlg.setValue(0)
+
+    def setStage(self, text, maximum):
+        self.value = 0
+        self.maximum = maximum
+        logger.debug("%s (%s)" % (text, maximum))
+        if self.dlg:
+            self.dlg.setLabelText(text)
+            self.dlg.setMaximum(maximum)
+            self.dlg.setValue(0)
+            QCoreApplication.processEvents()
+
+    def advance(self, num=1):
+        self.value = min(self.value + num, self.maximum)
+        if self.dlg:
+            self.dlg.setValue(self.value)
+            QCoreApplication.processEvents()
+
+    def wasCanceled(self):
+        return bool(self.dlg and self.dlg.wasCanceled())
+
+    def close(self):
+        if self.dlg:
+            self.dlg.close()
+
+
+class SgThumbnailDownloader(object):
+    # downloads thumbnails with a pool of threads. Every thread keeps its
+    # connections to the image hosts open, so that only the first image of a
+    # host pays for the TCP and TLS handshake
+    def __init__(self, threads=4, timeout=30):
+        self.threads = threads
+        self.timeout = timeout
+        self.maxRedirects = 5
+        self.threadData = threading.local()
+        # the connections of all threads, so that close() can close them
+        self.lock = threading.Lock()
+        self.connections = []
+
+    def getConnection(self, scheme, netloc):
+        if not hasattr(self.threadData, "connections"):
+            self.threadData.connections = {}
+
+        key = (scheme, netloc)
+        conn = self.threadData.connections.get(key)
+        if conn is None:
+            if scheme == "https":
+                conn = httplib.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = httplib.HTTPConnection(netloc, timeout=self.timeout)
+
+            self.threadData.connections[key] = conn
+            with self.lock:
+                self.connections.append(conn)
+
+        return conn
+
+    def closeConnection(self, scheme, netloc):
+        conn = getattr(self.threadData, "connections", {}).pop((scheme, netloc), None)
+        if conn:
+            conn.close()
+
+    def close(self):
+        # closes the keep-alive connections of all threads
+        with self.lock:
+            connections = self.connections
+            self.connections = []
+
+        for conn in connections:
+            conn.close()
+
+    def request(self, url):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        # the server can close an idle keep-alive connection at any time, so
+        # a failed request on a reused connection gets retried once
+        for attempt in range(2):
+            conn = self.getConnection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", path, headers={"Connection": "keep-alive"})
+                response = conn.getresponse()
+                # the response has to be read completely before the
+                # connection can be reused
+                data = response.read()
+            except (httplib.HTTPException, socket.error):
+                self.closeConnection(parts.scheme, parts.netloc)
+                if attempt:
+                    raise
+
+                continue
+
+            if response.getheader("connection", "").lower() == "close":
+                self.closeConnection(parts.scheme, parts.netloc)
+
+            return response.status, response.getheader("location"), data
+
+    def fetch(self, url):
+        for redirect in range(self.maxRedirects + 1):
+            status, location, data = self.request(url)
+            if status in [301, 302, 303, 307, 308] and location:
+                url = urljoin(url, location)
+                continue
+
+            if status != 200:
+                raise IOError("HTTP %s: %s" % (status, url))
+
+            return data
+
+        raise IOError("too many redirects: %s" % url)
+
+    def downloadFile(self, job):
+        name, url, path = job
+        try:
+            data = self.fetch(url)
+            tmpPath = "%s.%s.tmp" % (path, threading.current_thread().ident)
+            with open(tmpPath, "wb") as f:
+                f.write(data)
+
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmpPath, path)
+        except Exception:
+            return job, traceback.format_exc()
+
+        return job, None
+
+    def download(self, jobs, progress=None):
+        # jobs are [name, url, path] lists. Returns the names of the
+        # downloaded and failed images
+        downloaded = []
+        failed = []
+        if not jobs:
+            return downloaded, failed
+
+        if progress:
+            progress.setStage("Downloading thumbnails...", len(jobs))
+
+        pool = ThreadPool(min(self.threads, len(jobs)))
+        try:
+            for job, error in pool.imap_unordered(self.downloadFile, jobs):
+                if error:
+                    logger.warning("failed to download thumbnail %s: %s" % (job[1], error))
+                    failed.append(job[0])
+                else:
+                    downloaded.append(job[0])
+
+                if progress:
+                    progress.advance()
+                    if progress.wasCanceled():
+                        break
+        finally:
+            pool.terminate()
+
+        return downloaded, failed
+
+
 class Prism_Shotgun_Functions(object):
     def __init__(self, core, plugin):
         self.core = core
         self.plugin = plugin
+        # number of create/update requests per sg.batch call. Every batch is
+        # one transaction, so a failed batch doesn't leave partial changes
+        self.sgBatchSize = 100
+        self.sgBatchRetries = 2
+        self.sgThumbnailThreads = 4
 
         self.callbacks = []
         self.registerCallbacks()
@@ -351,6 +542,9 @@ class Prism_Shotgun_Functions(object):
                         self.sg = shotgun_api3.Shotgun(
                             sgSite, login=sgUsername, password=sgPw
                         )
+                        self.sgConnectionArgs = [
+                            sgSite, {"login": sgUsername, "password": sgPw}
+                        ]
                         authentificated = True
                     except:
                         pass
@@ -360,6 +554,9 @@ class Prism_Shotgun_Functions(object):
                     self.sg = shotgun_api3.Shotgun(
                         sgSite, script_name=sgScriptName, api_key=sgApiKey
                     )
+                    self.sgConnectionArgs = [
+                        sgSite, {"script_name": sgScriptName, "api_key": sgApiKey}
+                    ]
                 except Exception as e:
                     QMessageBox.warning(
                         self.core.messageParent,
@@ -419,7 +616,135 @@ class Prism_Shotgun_Functions(object):
             return [self.sg, self.sgPrjId, None]
 
     @err_catcher(name=__name__)
-    def createSgAssets(self, assets=[]):
+    def sgBatch(self, sg, requests, progress=None):
+        # returns the results of all successful requests and an error message
+        # if a chunk failed. The results always belong to the first requests,
+        # because the chunks are sent in order and every chunk is a transaction
+        results = []
+        for idx in range(0, len(requests), self.sgBatchSize):
+            chunk = requests[idx:idx + self.sgBatchSize]
+            for attempt in range(self.sgBatchRetries + 1):
+                try:
+                    results += sg.batch(chunk)
+                    break
+                except Exception as e:
+                    logger.warning("Shotgun batch request failed: %s" % e)
+                    if attempt == self.sgBatchRetries:
+                        return results, str(e)
+
+                    time.sleep(2 ** attempt)
+
+            if progress:
+                progress.advance(len(chunk))
+                if progress.wasCanceled():
+                    return results, "Canceled by user"
+
+        return results, None
+
+    @err_catcher(name=__name__)
+    def getSgThumbnailStatePath(self):
+        return self.core.configs.generateConfigPath(
+            name="shotgunThumbnails", location="project"
+        )
+
+    @err_catcher(name=__name__)
+    def getSgThumbnailState(self, entityType):
+        state = self.core.getConfig(
+            entityType, configPath=self.getSgThumbnailStatePath()
+        )
+        return dict(state or {})
+
+    @err_catcher(name=__name__)
+    def getSgImageKey(self, url):
+        # the query of a Shotgun image url contains a signature, which
+        # changes with every request, the path only changes with the image
+        return urlsplit(url).path
+
+    @err_catcher(name=__name__)
+    def needsSgThumbnail(self, sgEntity, path, state):
+        if not os.path.exists(path):
+            return False
+
+        if not sgEntity or not sgEntity.get("image"):
+            return True
+
+        return state.get(str(sgEntity["id"])) != os.path.getmtime(path)
+
+    @err_catcher(name=__name__)
+    def uploadSgThumbnails(self, sg, entityType, jobs, progress=None):
+        # jobs are [entityId, path] pairs. The mtime of every uploaded image is
+        # saved in the project, so that an aborted sync continues with the
+        # remaining thumbnails and unchanged images aren't uploaded again
+        if not jobs:
+            return [], []
+
+        statePath = self.getSgThumbnailStatePath()
+        if progress:
+            progress.setStage("Uploading thumbnails...", len(jobs))
+
+        threadData = threading.local()
+        sharedLock = threading.Lock()
+
+        def upload(job):
+            entityId, path = job
+            try:
+                if not hasattr(threadData, "sg"):
+                    threadData.sg, threadData.lock = self.getSgWorkerConnection(
+                        sg, sharedLock
+                    )
+
+                mtime = os.path.getmtime(path)
+                with threadData.lock:
+                    threadData.sg.upload_thumbnail(entityType, entityId, path)
+            except Exception:
+                return job, None, traceback.format_exc()
+
+            return job, mtime, None
+
+        uploaded = []
+        failed = []
+        newState = {}
+        pool = ThreadPool(min(self.sgThumbnailThreads, len(jobs)))
+        try:
+            for job, mtime, error in pool.imap_unordered(upload, jobs):
+                if error:
+                    logger.warning("failed to upload thumbnail %s: %s" % (job[1], error))
+                    failed.append(job[0])
+                else:
+                    uploaded.append(job[0])
+                    newState[str(job[0])] = mtime
+
+                if len(newState) >= self.sgBatchSize:
+                    self.core.setConfig(data={entityType: newState}, configPath=statePath)
+                    newState = {}
+
+                if progress:
+                    progress.advance()
+                    if progress.wasCanceled():
+                        break
+        finally:
+            pool.terminate()
+            if newState:
+                self.core.setConfig(data={entityType: newState}, configPath=statePath)
+
+        return uploaded, failed
+
+    @err_catcher(name=__name__)
+    def getSgWorkerConnection(self, sg, sharedLock):
+        # Shotgun connections aren't thread safe, so every worker opens its
+        # own connection. Connections which can't be recreated (like mockgun)
+        # are shared between the workers
+        if sg is getattr(self, "sg", None) and getattr(self, "sgConnectionArgs", None):
+            import shotgun_api3
+
+            site, kwargs = self.sgConnectionArgs
+            return shotgun_api3.Shotgun(site, **kwargs), threading.Lock()
+
+        return sg, sharedLock
+
+    @err_catcher(name=__name__)
+    def createSgAssets(self, assets=[], progress=None):
+        result = {"created": [], "updated": [], "failed": [], "errors": []}
         sg, sgPrjId, sgUserId = self.connectToShotgun(user=False)
 
         if sg is None or sgPrjId is None or sgUserId:
@@ -436,39 +761,43 @@ class Prism_Shotgun_Functions(object):
                 )
                 return
 
-        fields = ["id", "code", "tasks"]
+        fields = ["id", "code"]
         filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
-        sgAssets = {}
-        for x in sg.find("Asset", filters, fields):
-            assetName = x["code"]
-            sgAssets[assetName] = x
-
-        fields = ["code", "short_name", "entity_type"]
-        sgSteps = {
-            x["code"]: x
-            for x in sg.find("Step", [], fields)
-            if x["entity_type"] == "Asset"
-        }
+        sgAssets = set(x["code"] for x in sg.find("Asset", filters, fields))
 
         aBasePath = self.core.getAssetPath()
-        assets = [[os.path.basename(x), x.replace(aBasePath, "")[1:]] for x in assets]
-
-        createdAssets = []
-        updatedAssets = []
+        requests = []
         for asset in assets:
-            if asset[0] not in sgAssets.keys():
-                data = {
-                    "project": {"type": "Project", "id": sgPrjId},
-                    "code": asset[0],
-                    "sg_status_list": "ip",
-                    "sg_localhierarchy": asset[1],
-                }
+            assetName = os.path.basename(asset)
+            if assetName in sgAssets:
+                continue
+
+            # the same assetname can exist in multiple asset folders
+            sgAssets.add(assetName)
+            data = {
+                "project": {"type": "Project", "id": sgPrjId},
+                "code": assetName,
+                "sg_status_list": "ip",
+                "sg_localhierarchy": asset.replace(aBasePath, "")[1:],
+            }
+            requests.append(
+                {"request_type": "create", "entity_type": "Asset", "data": data}
+            )
 
-                result = sg.create("Asset", data)
-                createdAssets.append(result)
+        if progress:
+            progress.setStage("Creating assets...", len(requests))
+
+        results, error = self.sgBatch(sg, requests, progress=progress)
+        result["created"] = [x["data"]["code"] for x in requests[:len(results)]]
+        result["failed"] = [x["data"]["code"] for x in requests[len(results):]]
+        if error:
+            result["errors"].append(error)
+
+        return result
 
     @err_catcher(name=__name__)
-    def createSgShots(self, shots=[]):
+    def createSgShots(self, shots=[], progress=None):
+        result = {"created": [], "updated": [], "failed": [], "errors": []}
         sg, sgPrjId, sgUserId = self.connectToShotgun(user=False)
 
         if sg is None or sgPrjId is None or sgUserId:
@@ -477,7 +806,6 @@ class Prism_Shotgun_Functions(object):
         fields = [
             "id",
             "code",
-            "tasks",
             "image",
             "sg_cut_in",
             "sg_cut_out",
@@ -496,105 +824,148 @@ class Prism_Shotgun_Functions(object):
                 )
             sgShots[shotName] = x
 
-        fields = ["code", "short_name", "entity_type"]
-        sgSteps = {
-            x["code"]: x
-            for x in sg.find("Step", [], fields)
-            if x["entity_type"] == "Shot"
-        }
-
         fields = ["id", "code"]
         filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
         sgSequences = {x["code"]: x for x in sg.find("Sequence", filters, fields)}
 
-        createdShots = []
-        updatedShots = []
+        shotRanges = self.core.getConfig("shotRanges", config="shotinfo") or {}
+        shotInfoPath = os.path.join(os.path.dirname(self.core.prismIni), "Shotinfo")
+        thumbnailState = self.getSgThumbnailState("Shot")
+
+        # compare the local shots with the Shotgun shots first, so that only
+        # the changes get sent to Shotgun
+        localShots = []
+        seqRequests = []
         for shot in shots:
             shotName, seqName = self.core.entities.splitShotname(shot)
             if seqName == "no sequence":
                 seqName = ""
 
-            shotImgPath = os.path.join(
-                os.path.dirname(self.core.prismIni), "Shotinfo", "%s_preview.jpg" % shot
-            )
-            if os.path.exists(shotImgPath):
-                shotImg = shotImgPath
-            else:
-                shotImg = ""
-
-            shotRange = self.core.getConfig("shotRanges", shot, config="shotinfo")
+            localShots.append([shot, seqName, shotName])
+            if (
+                seqName
+                and shot not in sgShots
+                and seqName not in sgSequences
+                and seqName not in [x["data"]["code"] for x in seqRequests]
+            ):
+                data = {
+                    "project": {"type": "Project", "id": sgPrjId},
+                    "code": seqName,
+                    "sg_status_list": "ip",
+                }
+                seqRequests.append(
+                    {"request_type": "create", "entity_type": "Sequence", "data": data}
+                )
 
+        if progress:
+            progress.setStage("Creating sequences...", len(seqRequests))
+
+        results, error = self.sgBatch(sg, seqRequests, progress=progress)
+        for seqResult in results:
+            sgSequences[seqResult["code"]] = {
+                "type": "Sequence",
+                "id": seqResult["id"],
+                "code": seqResult["code"],
+            }
+
+        if error:
+            result["errors"].append(error)
+
+        requests = []
+        requestShots = []
+        thumbnails = []
+        for shot, seqName, shotName in localShots:
+            shotImgPath = os.path.join(shotInfoPath, "%s_preview.jpg" % shot)
+            shotRange = shotRanges.get(shot)
+            cutIn = None
+            cutOut = None
             if type(shotRange) == list and len(shotRange) == 2:
-                startFrame = shotRange[0]
-                endFrame = shotRange[1]
-            else:
-                startFrame = ""
-                endFrame = ""
-
-            shotSeq = {"code": ""}
-            if seqName != "" and shot not in sgShots.keys():
-                if seqName in sgSequences.keys():
-                    shotSeq = sgSequences[seqName]
-                else:
-                    data = {
-                        "project": {"type": "Project", "id": sgPrjId},
-                        "code": seqName,
-                        "sg_status_list": "ip",
-                    }
+                try:
+                    cutIn = int(shotRange[0])
+                    cutOut = int(shotRange[1])
+                except:
+                    pass
 
-                    shotSeq = sg.create("Sequence", data)
-                    sgSequences[shotSeq["code"]] = shotSeq
+            sgShot = sgShots.get(shot)
+            if sgShot is None:
+                if seqName and seqName not in sgSequences:
+                    result["failed"].append(shot)
+                    continue
 
-            if shot not in sgShots.keys():
                 data = {
                     "project": {"type": "Project", "id": sgPrjId},
                     "code": shotName,
                     "sg_status_list": "ip",
-                    "image": shotImg,
                 }
 
-                if shotSeq["code"] != "":
-                    data["sg_sequence"] = shotSeq
-
-                try:
-                    int(startFrame)
-                    data["sg_cut_in"] = int(startFrame)
-                except:
-                    pass
+                if seqName:
+                    data["sg_sequence"] = {
+                        "type": "Sequence",
+                        "id": sgSequences[seqName]["id"],
+                    }
 
-                try:
-                    int(startFrame)
-                    data["sg_cut_out"] = int(endFrame)
-                except:
-                    pass
+                if cutIn is not None:
+                    data["sg_cut_in"] = cutIn
+                    data["sg_cut_out"] = cutOut
 
-                result = sg.create("Shot", data)
-                result["sg_sequence"] = shotSeq["code"]
-                createdShots.append(result)
+                requests.append(
+                    {"request_type": "create", "entity_type": "Shot", "data": data}
+                )
+                requestShots.append(shot)
             else:
-                data = {"image": shotImg}
+                data = {}
+                if cutIn is not None and sgShot["sg_cut_in"] != cutIn:
+                    data["sg_cut_in"] = cutIn
+
+                if cutOut is not None and sgShot["sg_cut_out"] != cutOut:
+                    data["sg_cut_out"] = cutOut
+
+                if data:
+                    requests.append({
+                        "request_type": "update",
+                        "entity_type": "Shot",
+                        "entity_id": sgShot["id"],
+                        "data": data,
+                    })
+                    requestShots.append(shot)
+                    result["updated"].append(shot)
+
+                if self.needsSgThumbnail(sgShot, shotImgPath, thumbnailState):
+                    thumbnails.append([sgShot["id"], shotImgPath])
+                    if not sgShot["image"] and shot not in result["updated"]:
+                        result["updated"].append(shot)
+
+        if progress:
+            progress.setStage("Syncing shots...", len(requests))
+
+        results, error = self.sgBatch(sg, requests, progress=progress)
+        if error:
+            result["errors"].append(error)
+
+        for request, shot, shotResult in zip(requests, requestShots, results):
+            if request["request_type"] != "create":
+                continue
+
+            result["created"].append(shot)
+            shotImgPath = os.path.join(shotInfoPath, "%s_preview.jpg" % shot)
+            if os.path.exists(shotImgPath):
+                thumbnails.append([shotResult["id"], shotImgPath])
 
-                try:
-                    if sgShots[shot]["sg_cut_in"] != int(startFrame):
-                        data["sg_cut_in"] = int(startFrame)
-                except:
-                    pass
+        for shot in requestShots[len(results):]:
+            result["failed"].append(shot)
+            if shot in result["updated"]:
+                result["updated"].remove(shot)
 
-                try:
-                    if sgShots[shot]["sg_cut_out"] != int(endFrame):
-                        data["sg_cut_out"] = int(endFrame)
-                except:
-                    pass
+        if progress and progress.wasCanceled():
+            return result
+
+        uploaded, failed = self.uploadSgThumbnails(
+            sg, "Shot", thumbnails, progress=progress
+        )
+        if failed:
+            result["errors"].append("%s thumbnails couldn't be uploaded." % len(failed))
 
-                if len(data.keys()) > 1 or shotImg != "":
-                    result = sg.update("Shot", sgShots[shot]["id"], data)
-                    if (
-                        [seqName, shotName]
-                        not in [[x["code"], x["sg_sequence"]] for x in createdShots]
-                        and shot not in updatedShots
-                        and (len(data.keys()) > 1 or sgShots[shot]["image"] is None)
-                    ):
-                        updatedShots.append(shot)
+        return result
 
     @err_catcher(name=__name__)
     def sgPublish(self, origin):
@@ -788,94 +1159,85 @@ class Prism_Shotgun_Functions(object):
 
     @err_catcher(name=__name__)
     def sgAssetsToSG(self, origin):
-        sg, sgPrjId, sgUserId = self.connectToShotgun(user=False)
-
-        if sg is None or sgPrjId is None or sgUserId:
-            return
-
-        if "sg_localhierarchy" not in sg.schema_field_read("Asset"):
-            try:
-                sg.schema_field_create("Asset", "text", "localHierarchy", "")
-            except Exception as e:
-                QMessageBox.critical(
-                    self.core.messageParent,
-                    "Create field",
-                    'Could not create field "sg_localhierarchy":\n\n%s' % e,
-                )
-                return
-
-        fields = ["id", "code", "tasks"]
-        filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
-        sgAssets = {}
-        for x in sg.find("Asset", filters, fields):
-            assetName = x["code"]
-            sgAssets[assetName] = x
-
-        fields = ["code", "short_name", "entity_type"]
-        sgSteps = {
-            x["code"]: x
-            for x in sg.find("Step", [], fields)
-            if x["entity_type"] == "Asset"
-        }
-
         assets = self.core.entities.getAssetPaths()
         localAssets = [
-            [os.path.basename(x), x.replace(origin.aBasePath, "")[1:]]
+            x
             for x in assets
             if x.replace(os.path.join(self.core.fixPath(origin.aBasePath), ""), "")
             not in self.core.entities.omittedEntities["asset"]
         ]
 
-        createdAssets = []
-        updatedAssets = []
-        for asset in localAssets:
-            if asset[0] not in sgAssets.keys():
-                data = {
-                    "project": {"type": "Project", "id": sgPrjId},
-                    "code": asset[0],
-                    "sg_status_list": "ip",
-                    "sg_localhierarchy": asset[1],
-                }
+        progress = SgSyncProgress(self.core, "Syncing assets...", len(localAssets))
+        try:
+            result = self.createSgAssets(localAssets, progress=progress)
+        finally:
+            progress.close()
 
-                result = sg.create("Asset", data)
-                createdAssets.append(result)
+        if not result:
+            return
 
-        if len(createdAssets) > 0 or len(updatedAssets) > 0:
-            msgString = ""
+        self.showSgSyncResult(result, "assets")
 
-            createdAssetNames = []
-            for i in createdAssets:
-                createdAssetNames.append(i["code"])
+    @err_catcher(name=__name__)
+    def showSgSyncResult(self, result, entityName):
+        created = sorted(result["created"])
+        updated = sorted(result["updated"])
+        failed = sorted(result["failed"])
 
-            createdAssetNames.sort()
-            updatedAssets.sort()
+        if created or updated:
+            msgString = ""
 
-            if len(createdAssetNames) > 0:
-                msgString += "The following assets were created:\n\n"
+            if created:
+                msgString += "The following %s were created:\n\n" % entityName
 
-                for i in createdAssetNames:
+                for i in created:
                     msgString += i + "\n"
 
-            if len(createdAssetNames) > 0 and len(updatedAssets) > 0:
+            if created and updated:
                 msgString += "\n\n"
 
-            if len(updatedAssets) > 0:
-                msgString += "The following assets were updated:\n\n"
+            if updated:
+                msgString += "The following %s were updated:\n\n" % entityName
 
-                for i in updatedAssets:
+                for i in updated:
                     msgString += i + "\n"
         else:
-            msgString = "No assets were created or updated."
+            msgString = "No %s were created or updated." % entityName
+
+        if failed:
+            msgString += "\n\nThe following %s couldn't be synced:\n\n" % entityName
+
+            for i in failed:
+                msgString += i + "\n"
+
+        if result["errors"]:
+            msgString += (
+                "\n\n%s\n\nRun the sync again to continue with the remaining changes."
+                % "\n".join(result["errors"])
+            )
 
         QMessageBox.information(self.core.messageParent, "Shotgun Sync", msgString)
 
     @err_catcher(name=__name__)
-    def sgShotsToLocal(self, origin):
+    def createLocalShots(self, sBasePath, progress=None):
+        # creates the Shotgun shots in the project and updates their frame
+        # ranges and thumbnails. The ranges of all shots are written to the
+        # shotinfo in a single write and the thumbnails are downloaded in
+        # parallel
+        result = {
+            "created": [],
+            "updated": [],
+            "failed": [],
+            "errors": [],
+            "sgShots": {},
+            "timings": OrderedDict(),
+        }
         sg, sgPrjId, sgUserId = self.connectToShotgun(user=False)
 
         if sg is None or sgPrjId is None:
             return
 
+        startTime = time.time()
         fields = [
             "id",
             "code",
@@ -886,7 +1248,7 @@ class Prism_Shotgun_Functions(object):
             "sg_sequence",
         ]
         filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
-        sgShots = {}
+        sgShots = result["sgShots"]
         for x in sg.find("Shot", filters, fields):
             if self.core.filenameSeparator not in x["code"]:
                 if x["sg_sequence"] is None:
@@ -899,68 +1261,125 @@ class Prism_Shotgun_Functions(object):
                     )
                 sgShots[shotName] = x
 
-        fields = ["code", "short_name", "entity_type"]
-        sgSteps = {
-            x["code"]: x["short_name"]
-            for x in sg.find("Step", [], fields)
-            if x["entity_type"] is not None
-        }
-
-        createdShots = []
-        updatedShots = []
-        for shotName, shotData in sgShots.items():
-            if not os.path.exists(os.path.join(origin.sBasePath, shotName)):
-                self.core.entities.createEntity("shot", shotName)
-
-                createdShots.append(shotName)
-
-            startFrame = shotData["sg_cut_in"]
-            endFrame = shotData["sg_cut_out"]
-
-            if startFrame is not None and endFrame is not None:
-                shotRange = self.core.getConfig("shotRanges", shotName, config="shotinfo")
-
-                if type(shotRange) == list and len(shotRange) == 2:
-                    prvStartFrame = shotRange[0]
-                    prvEndFrame = shotRange[1]
-                else:
-                    prvStartFrame = ""
-                    prvEndFrame = ""
-
-                self.core.setConfig("shotRanges", shotName, [startFrame, endFrame], config="shotinfo")
-
-                if (
-                    shotName not in createdShots
-                    and shotName not in updatedShots
-                    and (startFrame != prvStartFrame or endFrame != prvEndFrame)
-                ):
-                    updatedShots.append(shotName)
-
-            if shotData["image"] is not None:
-                import urllib2
+        result["timings"]["query"] = time.time() - startTime
+
+        startTime = time.time()
+        catalog = self.core.entities.getShotCatalog(basepaths=[sBasePath])
+        localNames = catalog.names
+        newShots = sorted(x for x in sgShots if x not in localNames)
+        if progress:
+            progress.setStage("Creating shots...", len(newShots))
+
+        for shotName in newShots:
+            self.core.entities.createEntity("shot", shotName)
+            result["created"].append(shotName)
+            if progress:
+                progress.advance()
+
+        result["timings"]["shots"] = time.time() - startTime
+
+        startTime = time.time()
+        updated = set()
+        with self.core.configs.batch(config="shotinfo"):
+            shotRanges = self.core.getConfig("shotRanges", config="shotinfo") or {}
+            newRanges = {}
+            for shotName, shotData in sgShots.items():
+                startFrame = shotData["sg_cut_in"]
+                endFrame = shotData["sg_cut_out"]
+                if startFrame is None or endFrame is None:
+                    continue
+
+                shotRange = shotRanges.get(shotName)
+                if shotRange != [startFrame, endFrame]:
+                    newRanges[shotName] = [startFrame, endFrame]
+                    updated.add(shotName)
+
+            if newRanges:
+                self.core.setConfig(data={"shotRanges": newRanges}, config="shotinfo")
+
+        result["timings"]["ranges"] = time.time() - startTime
+
+        startTime = time.time()
+        shotInfoPath = os.path.join(os.path.dirname(self.core.prismIni), "Shotinfo")
+        if not os.path.exists(shotInfoPath):
+            os.makedirs(shotInfoPath)
+
+        # the thumbnail state contains the mtime of every synced thumbnail
+        # and the image, which was downloaded. Thumbnails are only
+        # downloaded again if one of them changed
+        thumbnailState = self.getSgThumbnailState("Shot")
+        imageState = self.getSgThumbnailState("ShotImages")
+        jobs = []
+        jobData = {}
+        newThumbnails = set()
+        for shotName, shotData in sorted(sgShots.items()):
+            if shotData["image"] is None:
+                continue
+
+            sgId = str(shotData["id"])
+            imageKey = self.getSgImageKey(shotData["image"])
+            shotImgPath = os.path.join(shotInfoPath, "%s_preview.jpg" % shotName)
+            if not os.path.exists(shotImgPath):
+                newThumbnails.add(shotName)
+            elif (
+                imageState.get(sgId) == imageKey
+                and thumbnailState.get(sgId) == os.path.getmtime(shotImgPath)
+            ):
+                continue
 
-                shotImgPath = os.path.join(
-                    os.path.dirname(self.core.prismIni),
-                    "Shotinfo",
-                    "%s_preview.jpg" % shotName,
-                )
+            jobs.append([shotName, shotData["image"], shotImgPath])
+            jobData[shotName] = [sgId, imageKey, shotImgPath]
 
-                if not os.path.exists(os.path.dirname(shotImgPath)):
-                    os.makedirs(os.path.dirname(shotImgPath))
+        downloader = SgThumbnailDownloader(threads=self.sgThumbnailThreads)
+        try:
+            downloaded, failed = downloader.download(jobs, progress=progress)
+        finally:
+            downloader.close()
+
+        if downloaded:
+            # the downloaded thumbnails don't get uploaded again either
+            newState = {"Shot": {}, "ShotImages": {}}
+            for shotName in downloaded:
+                sgId, imageKey, shotImgPath = jobData[shotName]
+                newState["Shot"][sgId] = os.path.getmtime(shotImgPath)
+                newState["ShotImages"][sgId] = imageKey
+
+            self.core.setConfig(data=newState, configPath=self.getSgThumbnailStatePath())
+
+        # shots, which only got a new thumbnail, are only updated if the
+        # download succeeded
+        updated.update(newThumbnails.intersection(downloaded))
+        if failed:
+            result["failed"] = sorted(failed)
+            result["errors"].append("%s thumbnails couldn't be downloaded." % len(failed))
+
+        result["timings"]["thumbnails"] = time.time() - startTime
+        result["updated"] = sorted(updated - set(result["created"]))
+        logger.info(
+            "imported %s Shotgun shots: %s"
+            % (
+                len(sgShots),
+                ", ".join(
+                    "%s %.2fs" % (k, v) for k, v in result["timings"].items()
+                ),
+            )
+        )
+        return result
 
-                prvExist = os.path.exists(shotImgPath)
+    @err_catcher(name=__name__)
+    def sgShotsToLocal(self, origin):
+        progress = SgSyncProgress(self.core, "Importing shots...", 0)
+        try:
+            result = self.createLocalShots(origin.sBasePath, progress=progress)
+        finally:
+            progress.close()
 
-                response = urllib2.urlopen(shotData["image"])
+        if not result:
+            return
 
-                with open(shotImgPath, "wb") as prvImg:
-                    prvImg.write(response.read())
-
-                if (
-                    shotName not in createdShots
-                    and shotName not in updatedShots
-                    and not prvExist
-                ):
-                    updatedShots.append(shotName)
+        sgShots = result["sgShots"]
+        createdShots = result["created"]
+        updatedShots = result["updated"]
 
         if len(createdShots) > 0 or len(updatedShots) > 0:
             msgString = ""
@@ -984,6 +1403,12 @@ class Prism_Shotgun_Functions(object):
         else:
             msgString = "No shots were created or updated."
 
+        if result["failed"]:
+            msgString += "\n\nThe thumbnails of the following shots couldn't be downloaded:\n\n"
+
+            for i in result["failed"]:
+                msgString += i + "\n"
+
         msgString += (
             '\n\nNote that shots with "%s" in their name are getting ignored by Prism.'
             % self.core.filenameSeparator
@@ -991,15 +1416,8 @@ class Prism_Shotgun_Functions(object):
 
         QMessageBox.information(self.core.messageParent, "Shotgun Sync", msgString)
 
-        for i in os.walk(origin.sBasePath):
-            foldercont = i
-            break
-
-        shotnames = [x for x in foldercont[1] if not x.startswith("_")]
-        localShots = []
-        for i in shotnames:
-            if i not in sgShots.keys():
-                localShots.append(i)
+        catalog = self.core.entities.getShotCatalog(basepaths=[origin.sBasePath])
+        localShots = [x for x in catalog.getNames(includeOmitted=True) if x not in sgShots]
 
         if len(localShots) > 0:
             msg = QMessageBox(
@@ -1022,6 +1440,8 @@ class Prism_Shotgun_Functions(object):
                         except:
                             noAccess.append(i)
 
+                self.core.entities.index.invalidate(origin.sBasePath)
+
                 if len(noAccess) > 0:
                     msgString = "Acces denied for:\n\n"
 
@@ -1036,190 +1456,17 @@ class Prism_Shotgun_Functions(object):
 
     @err_catcher(name=__name__)
     def sgShotsToSG(self, origin):
-        sg, sgPrjId, sgUserId = self.connectToShotgun(user=False)
-
-        if sg is None or sgPrjId is None or sgUserId:
-            return
-
-        fields = [
-            "id",
-            "code",
-            "tasks",
-            "image",
-            "sg_cut_in",
-            "sg_cut_out",
-            "sg_sequence",
-        ]
-        filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
-        sgShots = {}
-        for x in sg.find("Shot", filters, fields):
-            if x["sg_sequence"] is None:
-                shotName = x["code"]
-            else:
-                shotName = "%s%s%s" % (
-                    x["sg_sequence"]["name"],
-                    self.core.sequenceSeparator,
-                    x["code"],
-                )
-            sgShots[shotName] = x
-
-        fields = ["code", "short_name", "entity_type"]
-        sgSteps = {
-            x["code"]: x
-            for x in sg.find("Step", [], fields)
-            if x["entity_type"] == "Shot"
-        }
-
-        fields = ["id", "code"]
-        filters = [["project", "is", {"type": "Project", "id": sgPrjId}]]
-        sgSequences = {x["code"]: x for x in sg.find("Sequence", filters, fields)}
-
-        for i in os.walk(origin.sBasePath):
-            foldercont = i
-            break
-
         self.core.entities.refreshOmittedEntities()
+        catalog = self.core.entities.getShotCatalog(basepaths=[origin.sBasePath])
+        localShots = catalog.getNames()
 
-        localShots = []
-        for x in foldercont[1]:
-            if not x.startswith("_") and x not in self.core.entities.omittedEntities["shot"]:
-                shotName, seqName = self.core.entities.splitShotname(x)
-                if seqName == "no sequence":
-                    seqName = ""
-
-                localShots.append([x, seqName, shotName])
-
-        createdShots = []
-        updatedShots = []
-        for shot in localShots:
-            shotImgPath = os.path.join(
-                os.path.dirname(self.core.prismIni),
-                "Shotinfo",
-                "%s_preview.jpg" % shot[0],
-            )
-            if os.path.exists(shotImgPath):
-                shotImg = shotImgPath
-            else:
-                shotImg = ""
-
-            shotRange = self.core.getConfig("shotRanges", shot[0], config="shotinfo")
-
-            if type(shotRange) == list and len(shotRange) == 2:
-                startFrame = shotRange[0]
-                endFrame = shotRange[1]
-            else:
-                startFrame = ""
-                endFrame = ""
-
-            shotSeq = {"code": ""}
-            if shot[1] != "" and shot[0] not in sgShots.keys():
-                if shot[1] in sgSequences.keys():
-                    shotSeq = sgSequences[shot[1]]
-                else:
-                    data = {
-                        "project": {"type": "Project", "id": sgPrjId},
-                        "code": shot[1],
-                        "sg_status_list": "ip",
-                    }
-
-                    shotSeq = sg.create("Sequence", data)
-                    sgSequences[shotSeq["code"]] = shotSeq
-
-            if shot[0] not in sgShots.keys():
-                data = {
-                    "project": {"type": "Project", "id": sgPrjId},
-                    "code": shot[2],
-                    "sg_status_list": "ip",
-                    "image": shotImg,
-                }
-
-                if shotSeq["code"] != "":
-                    data["sg_sequence"] = shotSeq
-
-                try:
-                    int(startFrame)
-                    data["sg_cut_in"] = int(startFrame)
-                except:
-                    pass
-
-                try:
-                    int(startFrame)
-                    data["sg_cut_out"] = int(endFrame)
-                except:
-                    pass
-
-                result = sg.create("Shot", data)
-                result["sg_sequence"] = shotSeq["code"]
-                createdShots.append(result)
-            else:
-                data = {"image": shotImg}
-
-                try:
-                    if sgShots[shot[0]]["sg_cut_in"] != int(startFrame):
-                        data["sg_cut_in"] = int(startFrame)
-                except:
-                    pass
-
-                try:
-                    if sgShots[shot[0]]["sg_cut_out"] != int(endFrame):
-                        data["sg_cut_out"] = int(endFrame)
-                except:
-                    pass
-
-                if len(data.keys()) > 1 or shotImg != "":
-                    result = sg.update("Shot", sgShots[shot[0]]["id"], data)
-                    if (
-                        [shot[1], shot[2]]
-                        not in [[x["code"], x["sg_sequence"]] for x in createdShots]
-                        and shot[0] not in updatedShots
-                        and (len(data.keys()) > 1 or sgShots[shot[0]]["image"] is None)
-                    ):
-                        updatedShots.append(shot[0])
-
-            shotSteps = []
-            stepsPath = self.core.getEntityPath(entity="step", shot=shot[0])
-            for k in os.walk(stepsPath):
-                shotSteps = k[1]
-                break
-
-            shotTasks = {}
-            for k in shotSteps:
-                stepPath = self.core.getEntityPath(shot=shot[0], step=k)
-                for m in os.walk(stepPath):
-                    shotTasks[k] = m[1]
-                    break
-
-        if len(createdShots) > 0 or len(updatedShots) > 0:
-            msgString = ""
-
-            createdShotNames = []
-            for i in createdShots:
-                if i["sg_sequence"] == "":
-                    createdShotNames.append(i["code"])
-                else:
-                    createdShotNames.append(
-                        "%s%s%s"
-                        % (i["sg_sequence"], self.core.sequenceSeparator, i["code"])
-                    )
-
-            createdShotNames.sort()
-            updatedShots.sort()
-
-            if len(createdShotNames) > 0:
-                msgString += "The following shots were created:\n\n"
-
-                for i in createdShotNames:
-                    msgString += i + "\n"
-
-            if len(createdShotNames) > 0 and len(updatedShots) > 0:
-                msgString += "\n\n"
-
-            if len(updatedShots) > 0:
-                msgString += "The following shots were updated:\n\n"
+        progress = SgSyncProgress(self.core, "Syncing shots...", len(localShots))
+        try:
+            result = self.createSgShots(localShots, progress=progress)
+        finally:
+            progress.close()
 
-                for i in updatedShots:
-                    msgString += i + "\n"
-        else:
-            msgString = "No shots were created or updated."
+        if not result:
+            return
 
-        QMessageBox.information(self.core.messageParent, "Shotgun Sync", msgString)
+        self.showSgSyncResult(result, "shots")
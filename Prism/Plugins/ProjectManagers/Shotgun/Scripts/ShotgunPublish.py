@@ -479,34 +479,10 @@ class sgPublish(QDialog, ShotgunPublish_ui.Ui_dlg_sgPublish):
                         except:
                             pass
 
-                    if os.path.splitext(inputpath)[1] in [
-                        ".jpg",
-                        ".jpeg",
-                        ".JPG",
-                        ".png",
-                        ".tif",
-                        ".tiff",
-                    ]:
-                        size = QImage(inputpath).size()
-                        pwidth = size.width()
-                        pheight = size.height()
-                    elif os.path.splitext(inputpath)[1] in [".exr"]:
-                        oiio = self.core.media.getOIIO()
-
-                        if oiio:
-                            imgSpecs = oiio.ImageBuf(str(inputpath)).spec()
-                            pwidth = imgSpecs.full_width
-                            pheight = imgSpecs.full_height
-
-                    elif os.path.splitext(inputpath)[1] in [".mp4", ".mov"]:
-                        try:
-                            import imageio
-                        except:
-                            pass
-                        vidReader = imageio.get_reader(inputpath, "ffmpeg")
-
-                        pwidth = vidReader._meta["size"][0]
-                        pheight = vidReader._meta["size"][1]
+                    # reads only the header of the file
+                    resolution = self.core.media.getMediaResolution(inputpath)
+                    pwidth = resolution["width"] or 0
+                    pheight = resolution["height"] or 0
 
                     if int(pwidth) % 2 == 1 or int(pheight) % 2 == 1:
                         QMessageBox.warning(
@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import json
+import time
+import shutil
+import logging
+import platform
+import threading
+import subprocess
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineError(Exception):
+    pass
+
+
+# A job which gets submitted by the submission queue. The info files and
+# temporary aux files get written to a separate folder for every job, because
+# the submitters reuse the same filenames for every submission.
+class SubmissionTicket(object):
+    def __init__(self, ticketId, jobInfos, pluginInfos, auxFiles, origin=None):
+        self.id = ticketId
+        self.jobInfos = jobInfos
+        self.pluginInfos = pluginInfos
+        self.auxFiles = auxFiles
+        self.origin = origin
+        self.jobDir = None
+        self.jobInfoFile = None
+        self.pluginInfoFile = None
+        self.result = None
+        self.attempts = 0
+        self.reported = False
+        self.event = threading.Event()
+
+    @property
+    def done(self):
+        return self.event.is_set()
+
+    @property
+    def success(self):
+        return bool(self.result) and "Result=Success" in self.result
+
+    def finish(self, result):
+        self.result = result
+        self.event.set()
+
+    def wait(self, timeout=None):
+        self.event.wait(timeout)
+        return self.result
+
+
+# runs deadlinecommand. Queries and submissions of a batch share a single
+# process launch.
+class CommandBackend(object):
+    name = "deadlinecommand"
+
+    def __init__(self, executable):
+        self.executable = executable
+
+    def run(self, arguments):
+        args = [self.executable] + list(arguments)
+        kwargs = {}
+        if platform.system() == "Windows":
+            # don't show a console window
+            kwargs["creationflags"] = 0x08000000
+
+        try:
+            # Specifying PIPE for all handles to workaround a Python bug on Windows.
+            proc = subprocess.Popen(
+                args,
+                cwd=os.path.dirname(self.executable),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                **kwargs
+            )
+            stdout, stderr = proc.communicate()
+        except OSError as e:
+            raise DeadlineError("failed to run %s: %s" % (self.executable, e))
+
+        output = stdout.decode("utf-8", "replace")
+        if proc.returncode != 0 and not output.strip():
+            raise DeadlineError(
+                "deadlinecommand exited with code %s: %s"
+                % (proc.returncode, stderr.decode("utf-8", "replace").strip())
+            )
+
+        return output
+
+    def query(self, arguments):
+        output = self.run(arguments)
+        if "Error" in output:
+            raise DeadlineError(output.strip())
+
+        return [line.strip() for line in output.splitlines() if line.strip()]
+
+    def getHomeDirectory(self):
+        return self.run(["-GetCurrentUserHomeDirectory"]).strip()
+
+    def getGroups(self):
+        return self.query(["-groups"])
+
+    def getPools(self):
+        return self.query(["-pools"])
+
+    def getLimits(self):
+        return self.query(["-GetLimitGroupNames"])
+
+    def submitJobs(self, tickets):
+        if len(tickets) == 1:
+            ticket = tickets[0]
+            args = [ticket.jobInfoFile, ticket.pluginInfoFile] + ticket.auxFiles
+            return [self.run(args)]
+
+        args = ["-SubmitMultipleJobs"]
+        for ticket in tickets:
+            args += ["-job", ticket.jobInfoFile, ticket.pluginInfoFile] + ticket.auxFiles
+
+        output = self.run(args)
+        return self.splitResults(output, len(tickets))
+
+    def splitResults(self, output, count):
+        # every job of a batch submission prints its own "Result=" block
+        results = []
+        for line in output.splitlines():
+            if line.startswith("Result="):
+                results.append(line)
+            elif results:
+                results[-1] += "\n" + line
+
+        if len(results) == count:
+            return results
+
+        return [output] * count
+
+
+# talks to the Deadline Web Service through a single keep-alive connection.
+# Aux files have to be accessible from the machine running the web service.
+class WebServiceBackend(object):
+    name = "webservice"
+
+    def __init__(self, url, timeout=30):
+        parsed = urlparse(url if "://" in url else "http://" + url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 8082
+        self.https = parsed.scheme == "https"
+        self.timeout = timeout
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def getConnection(self):
+        if self.connection is None:
+            cls = httplib.HTTPSConnection if self.https else httplib.HTTPConnection
+            self.connection = cls(self.host, self.port, timeout=self.timeout)
+
+        return self.connection
+
+    def request(self, method, path, data=None):
+        body = json.dumps(data) if data is not None else None
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        with self.lock:
+            # reconnect once if the server closed the idle connection
+            for attempt in range(2):
+                try:
+                    connection = self.getConnection()
+                    connection.request(method, path, body, headers)
+                    response = connection.getresponse()
+                    content = response.read().decode("utf-8", "replace")
+                    break
+                except (httplib.HTTPException, IOError, OSError) as e:
+                    self.close()
+                    if attempt:
+                        raise DeadlineError(
+                            "failed to connect to the Deadline Web Service at %s:%s: %s"
+                            % (self.host, self.port, e)
+                        )
+
+        if response.status >= 400:
+            raise DeadlineError(
+                "Deadline Web Service returned %s: %s" % (response.status, content)
+            )
+
+        try:
+            return json.loads(content)
+        except ValueError:
+            return content
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def getHomeDirectory(self):
+        return
+
+    def getGroups(self):
+        return list(self.request("GET", "/api/groups") or [])
+
+    def getPools(self):
+        return list(self.request("GET", "/api/pools") or [])
+
+    def getLimits(self):
+        return list(self.request("GET", "/api/limitgroups?NamesOnly=true") or [])
+
+    def submitJobs(self, tickets):
+        results = []
+        for ticket in tickets:
+            data = {
+                "JobInfo": ticket.jobInfos,
+                "PluginInfo": ticket.pluginInfos,
+                "AuxFiles": ticket.auxFiles,
+                "IdOnly": True,
+            }
+            try:
+                job = self.request("POST", "/api/jobs", data)
+            except DeadlineError as e:
+                if not results:
+                    raise
+
+                # jobs of this batch were already submitted and must not be
+                # submitted a second time by a retry
+                results.append("Result=Failed\n%s" % e)
+                continue
+
+            jobId = job.get("_id", "") if isinstance(job, dict) else job
+            results.append("Result=Success\nJobID=%s" % jobId)
+
+        return results
+
+
+# Client for all communication with Deadline. Query results are cached for
+# "cacheTtl" seconds. Jobs are submitted from a background thread, which
+# collects the jobs of a publish into batches and retries failed batches.
+class DeadlineClient(object):
+    def __init__(
+        self,
+        executable=None,
+        webserviceUrl=None,
+        cacheTtl=300,
+        batchSize=20,
+        batchDelay=0.2,
+        maxAttempts=3,
+        retryDelay=1,
+    ):
+        if webserviceUrl:
+            self.backend = WebServiceBackend(webserviceUrl)
+        elif executable:
+            self.backend = CommandBackend(executable)
+        else:
+            self.backend = None
+
+        self.cacheTtl = cacheTtl
+        self.batchSize = batchSize
+        self.batchDelay = batchDelay
+        self.maxAttempts = maxAttempts
+        self.retryDelay = retryDelay
+        self.cache = {}
+        self.cacheLock = threading.Lock()
+        self.queue = queue.Queue()
+        self.pending = []
+        self.pendingLock = threading.Lock()
+        self.ticketNum = 0
+        self.worker = None
+        self.submitDir = None
+
+    @staticmethod
+    def getExecutable(deadlineBin=None):
+        deadlineBin = deadlineBin or os.getenv("DEADLINE_PATH")
+        if not deadlineBin:
+            return
+
+        name = "deadlinecommand.exe" if platform.system() == "Windows" else "deadlinecommand"
+        executable = os.path.join(deadlineBin, name)
+        if not os.path.exists(executable):
+            return
+
+        return executable
+
+    def isAvailable(self):
+        return self.backend is not None
+
+    def getCached(self, key, func):
+        now = time.time()
+        with self.cacheLock:
+            entry = self.cache.get(key)
+            if entry and now - entry[0] < self.cacheTtl:
+                return entry[1]
+
+        if not self.backend:
+            return
+
+        value = func()
+        with self.cacheLock:
+            self.cache[key] = [now, value]
+
+        return value
+
+    def invalidateCache(self):
+        with self.cacheLock:
+            self.cache = {}
+
+    def getHomeDirectory(self):
+        # doesn't change during a session
+        with self.cacheLock:
+            if "homeDir" in self.cache:
+                return self.cache["homeDir"][1]
+
+        if not isinstance(self.backend, CommandBackend):
+            executable = self.getExecutable()
+            if not executable:
+                return
+
+            homeDir = CommandBackend(executable).getHomeDirectory()
+        else:
+            homeDir = self.backend.getHomeDirectory()
+
+        with self.cacheLock:
+            self.cache["homeDir"] = [time.time(), homeDir]
+
+        return homeDir
+
+    def getGroups(self):
+        return self.getCached("groups", self.backend.getGroups if self.backend else None)
+
+    def getPools(self):
+        return self.getCached("pools", self.backend.getPools if self.backend else None)
+
+    def getLimits(self):
+        return self.getCached("limits", self.backend.getLimits if self.backend else None)
+
+    def getSubmitDir(self):
+        if not self.submitDir:
+            homeDir = self.getHomeDirectory()
+            if homeDir:
+                self.submitDir = os.path.join(homeDir, "temp", "prism_submissions")
+            else:
+                import tempfile
+
+                self.submitDir = os.path.join(tempfile.gettempdir(), "prism_submissions")
+
+        return self.submitDir
+
+    def createTicket(self, jobInfos, pluginInfos, auxFiles, origin=None):
+        with self.pendingLock:
+            self.ticketNum += 1
+            ticketId = "%s_%s_%s" % (os.getpid(), int(time.time()), self.ticketNum)
+
+        ticket = SubmissionTicket(ticketId, dict(jobInfos), dict(pluginInfos), [], origin)
+        ticket.jobDir = os.path.join(self.getSubmitDir(), ticketId)
+        os.makedirs(ticket.jobDir)
+        ticket.jobInfoFile = os.path.join(ticket.jobDir, "job_info.job")
+        ticket.pluginInfoFile = os.path.join(ticket.jobDir, "plugin_info.job")
+
+        with open(ticket.jobInfoFile, "w") as fileHandle:
+            for i in jobInfos:
+                fileHandle.write("%s=%s\n" % (i, jobInfos[i]))
+
+        with open(ticket.pluginInfoFile, "w") as fileHandle:
+            for i in pluginInfos:
+                fileHandle.write("%s=%s\n" % (i, pluginInfos[i]))
+
+        # temporary aux files like the dependencies.txt get overwritten by the
+        # next submission. Scenefiles are referenced directly
+        tempDir = os.path.dirname(self.getSubmitDir())
+        for auxFile in auxFiles:
+            if os.path.normpath(os.path.dirname(auxFile)) == os.path.normpath(tempDir):
+                dst = os.path.join(ticket.jobDir, os.path.basename(auxFile))
+                shutil.copy2(auxFile, dst)
+                auxFile = dst
+
+            ticket.auxFiles.append(auxFile)
+
+        return ticket
+
+    def submitJob(self, jobInfos, pluginInfos, auxFiles, origin=None, wait=True):
+        ticket = self.createTicket(jobInfos, pluginInfos, auxFiles, origin=origin)
+        if wait:
+            self.submitBatch([ticket])
+            return ticket
+
+        with self.pendingLock:
+            self.pending.append(ticket)
+
+        self.startWorker()
+        self.queue.put(ticket)
+        return ticket
+
+    def startWorker(self):
+        if self.worker and self.worker.is_alive():
+            return
+
+        self.worker = threading.Thread(target=self.processQueue, name="DeadlineSubmission")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def processQueue(self):
+        while True:
+            ticket = self.queue.get()
+            if ticket is None:
+                return
+
+            batch = [ticket]
+            stop = False
+            endTime = time.time() + self.batchDelay
+            while len(batch) < self.batchSize:
+                remaining = endTime - time.time()
+                if remaining <= 0:
+                    break
+
+                try:
+                    ticket = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if ticket is None:
+                    stop = True
+                    break
+
+                batch.append(ticket)
+
+            self.submitBatch(batch)
+            if stop:
+                return
+
+    def submitBatch(self, batch):
+        error = None
+        for attempt in range(self.maxAttempts):
+            for ticket in batch:
+                ticket.attempts += 1
+
+            try:
+                results = self.backend.submitJobs(batch)
+            except Exception as e:
+                # nothing of the batch was submitted, so it is safe to retry
+                error = e
+                logger.warning(
+                    "Deadline submission failed (attempt %s/%s): %s"
+                    % (attempt + 1, self.maxAttempts, e)
+                )
+                if attempt < self.maxAttempts - 1:
+                    time.sleep(self.retryDelay * (2 ** attempt))
+                continue
+
+            for ticket, result in zip(batch, results):
+                self.finishTicket(ticket, result)
+            return
+
+        for ticket in batch:
+            self.finishTicket(
+                ticket,
+                "Deadline submission failed after %s attempts: %s"
+                % (self.maxAttempts, error),
+            )
+
+    def finishTicket(self, ticket, result):
+        if "Result=Success" in result:
+            shutil.rmtree(ticket.jobDir, ignore_errors=True)
+
+        with self.pendingLock:
+            if ticket in self.pending:
+                self.pending.remove(ticket)
+
+        ticket.finish(result)
+
+    def getPendingCount(self):
+        with self.pendingLock:
+            return len(self.pending)
+
+    def waitForSubmissions(self, tickets, timeout=None, onWait=None):
+        # onWait gets called while waiting to keep the UI responsive. The
+        # result of a ticket can be empty, so only its event tells if it's done
+        endTime = time.time() + timeout if timeout else None
+        for ticket in tickets:
+            while not ticket.done:
+                if onWait:
+                    interval = 0.05
+                elif endTime:
+                    interval = max(0, endTime - time.time())
+                else:
+                    interval = None
+
+                ticket.event.wait(interval)
+                if ticket.done:
+                    break
+
+                if onWait:
+                    onWait()
+                if endTime and time.time() > endTime:
+                    return False
+
+        return True
+
+    def stop(self, timeout=None):
+        if self.worker and self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join(timeout)
+
+        if isinstance(self.backend, WebServiceBackend):
+            self.backend.close()
@@ -31,8 +31,23 @@
 # along with Prism.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import os
+import sys
+
 from Deadline.Scripting import *
 
+# Deadline executes this script from the Prism installation, so the frame
+# sequence and directory cache modules of the Prism core can be imported from
+# there
+prismScripts = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "Scripts")
+)
+if prismScripts not in sys.path:
+    sys.path.append(prismScripts)
+
+from PrismUtils import DirScanner
+from PrismUtils import FrameSequences
+
 # def log(text):
 # 	logPath = "P:\\00_Pipeline\\Scripts\\dlDependencyLog.txt"
 # 	open(logPath, "a").close()
@@ -43,83 +58,111 @@ from Deadline.Scripting import *
 # perform: "Tools->Perform pending job scan" in super user mode to the log in Deadline console
 
 
+# directory listings of previous scans. The module stays loaded between
+# pending job scans, so a listing only gets refreshed when the mtime of the
+# directory changed.
+dirCache = DirScanner.DirCache(statFiles=False, maxDirs=4096)
+
+
+def getDependencies(depfile):
+    with open(depfile, "r") as dependFile:
+        depData = dependFile.readlines()
+        depData = [x.replace("\n", "") for x in depData]
+
+    dependencies = []
+    for i in range(len(depData) // 2):
+        dependencies.append(
+            parseDependency(depData[1 + (i * 2)], int(depData[i * 2]))
+        )
+
+    return dependencies
+
+
+def parseDependency(path, offset):
+    # the frame number is the last number of the filename before the
+    # extension. "#" and printf style placeholders are supported as well
+    sequence = FrameSequences.parsePattern(path)
+    if not sequence:
+        # no frame number, the dependency is a single file
+        dirPath, filename = os.path.split(path)
+        sequence = FrameSequences.FrameSequence(dirPath, filename, "", None, name=filename)
+
+    dep = {
+        "path": path,
+        "dir": sequence.directory,
+        "offset": offset,
+        "sequence": sequence,
+    }
+    return dep
+
+
+def getDirContent(dirPath, listings):
+    if dirPath in listings:
+        return listings[dirPath]
+
+    entry = dirCache.getEntry(dirPath)
+    content = set(entry["files"]) if entry else set()
+    listings[dirPath] = content
+    return content
+
+
+def getMissingFiles(dep, frames, listings):
+    content = getDirContent(dep["dir"], listings)
+    frames = [frame + dep["offset"] for frame in frames]
+    return dep["sequence"].getMissingFiles(frames, content)
+
+
 def __main__(jobId, taskIds=None):
     job = RepositoryUtils.GetJob(jobId, True)
     jobTasks = RepositoryUtils.GetJobTasks(job, True)
 
-    import os
-
     depfile = os.path.join(RepositoryUtils.GetJobAuxiliaryPath(job), "dependencies.txt")
     ClientUtils.LogText("\n start dep -----------%s" % depfile)
 
-    if not taskIds:
+    if not os.path.exists(depfile):
+        ClientUtils.LogText("\n" + str(jobId) + "- No Dependency File")
+        # log("\n" + str(jobId) + "- No Dependency File")
+        if taskIds:
+            return []
+        return False
 
-        if os.path.exists(depfile):
-            with open(depfile, "r") as dependFile:
-                depData = dependFile.readlines()
-                depData = [x.replace("\n", "") for x in depData]
-
-            curFrames = job.JobFramesList
-            releaseJob = True
-
-            for i in range(len(depData) / 2):
-                offset = depData[i * 2]
-                depPath = os.path.splitext(depData[1 + (i * 2)])[0]
-                depExt = os.path.splitext(depData[1 + (i * 2)])[1]
-                for k in curFrames:
-                    if not os.path.exists(
-                        depPath[:-4] + format(k + int(offset), "04") + depExt
-                    ):
-                        ClientUtils.LogText("\n" + str(jobId) + " not released")
-                        return False
-
-            ClientUtils.LogText("\n" + str(jobId) + " released")
-            return True
-        else:
-            ClientUtils.LogText("\n" + str(jobId) + "- No Dependency File")
+    dependencies = getDependencies(depfile)
+    # every directory gets listed at most once per scan
+    listings = {}
 
-        return False
+    if not taskIds:
+        curFrames = job.JobFramesList
+        for dep in dependencies:
+            missing = getMissingFiles(dep, curFrames, listings)
+            if missing:
+                ClientUtils.LogText(
+                    "\n%s not released - %s missing files in %s (%s)"
+                    % (jobId, len(missing), dep["dir"], missing[0])
+                )
+                return False
+
+        ClientUtils.LogText("\n" + str(jobId) + " released")
+        return True
     else:
-
         tasksToRelease = []
-
-        if os.path.exists(depfile):
-            with open(depfile, "r") as dependFile:
-                depData = dependFile.readlines()
-                depData = [x.replace("\n", "") for x in depData]
-
-            for taskID in taskIds:
-                task = jobTasks.Tasks[int(taskID)]
-
-                curFrames = task.TaskFrameList
-
-                release = True
-                for i in range(len(depData) / 2):
-                    offset = depData[i * 2]
-                    depPath = os.path.splitext(depData[1 + (i * 2)])[0]
-                    depExt = os.path.splitext(depData[1 + (i * 2)])[1]
-                    for k in curFrames:
-                        ClientUtils.LogText(
-                            depPath[:-4] + format(k + int(offset), "04") + depExt
-                        )
-                        if not os.path.exists(
-                            depPath[:-4] + format(k + int(offset), "04") + depExt
-                        ):
-                            release = False
-                            break
-                    else:
-                        continue
+        for taskID in taskIds:
+            task = jobTasks.Tasks[int(taskID)]
+            curFrames = task.TaskFrameList
+
+            for dep in dependencies:
+                missing = getMissingFiles(dep, curFrames, listings)
+                if missing:
+                    ClientUtils.LogText(
+                        "\ntask %s - %s missing files in %s (%s)"
+                        % (taskID, len(missing), dep["dir"], missing[0])
+                    )
                     break
+            else:
+                tasksToRelease.append(taskID)
 
-                if release:
-                    tasksToRelease.append(taskID)
-
-            ClientUtils.LogText(
-                "\n" + str(jobId) + "\n" + str(taskIds) + "-" + str(tasksToRelease)
-            )
-            # log("\n" + str(jobId) + "\n" + str(taskIds) + "-" + str(tasksToRelease))
-        else:
-            ClientUtils.LogText("\n" + str(jobId) + "- No Dependency File")
-            # log("\n" + str(jobId) + "- No Dependency File")
+        ClientUtils.LogText(
+            "\n" + str(jobId) + "\n" + str(taskIds) + "-" + str(tasksToRelease)
+        )
+        # log("\n" + str(jobId) + "\n" + str(taskIds) + "-" + str(tasksToRelease))
 
         return tasksToRelease
@@ -32,9 +32,10 @@
 
 
 import os
-import sys
-import subprocess
 import time
+import logging
+import platform
+import subprocess
 
 try:
     import hou
@@ -51,11 +52,20 @@ except:
 
 from PrismUtils.Decorators import err_catcher as err_catcher
 
+import DeadlineClient
+
+
+logger = logging.getLogger(__name__)
+
 
 class Prism_Deadline_Functions(object):
     def __init__(self, core, plugin):
         self.core = core
         self.plugin = plugin
+        self.client = None
+        self.clientKey = None
+        self.submissionTickets = []
+        self.core.registerCallback("postPublish", self.onPostPublish, priority=90)
 
     @err_catcher(name=__name__)
     def isActive(self):
@@ -64,25 +74,47 @@ class Prism_Deadline_Functions(object):
         except:
             return False
 
+    @err_catcher(name=__name__)
+    def getClient(self):
+        webserviceUrl = os.getenv("DEADLINE_WEBSERVICE_URL")
+        if not webserviceUrl and self.core.prismIni:
+            webserviceUrl = self.core.getConfig(
+                "deadline", "webserviceUrl", configPath=self.core.prismIni
+            )
+
+        executable = DeadlineClient.DeadlineClient.getExecutable()
+        key = (webserviceUrl, executable)
+        if not self.client or self.clientKey != key:
+            if self.client:
+                self.client.stop(timeout=0)
+
+            self.client = DeadlineClient.DeadlineClient(
+                executable=executable, webserviceUrl=webserviceUrl
+            )
+            self.clientKey = key
+
+        return self.client
+
     @err_catcher(name=__name__)
     def deadlineCommand(self, arguments, background=True, readStdout=True):
         deadlineBin = os.getenv("DEADLINE_PATH")
         if deadlineBin is None:
             return False
 
-        deadlineCommand = os.path.join(deadlineBin, "deadlinecommand.exe")
-        if not os.path.exists(deadlineCommand):
+        deadlineCommand = DeadlineClient.DeadlineClient.getExecutable(deadlineBin)
+        if not deadlineCommand:
             return False
 
         startupinfo = None
         creationflags = 0
-        if background:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess._subprocess.STARTF_USESHOWWINDOW
-        else:
-            # still show top-level windows, but don't show a console window
-            CREATE_NO_WINDOW = 0x08000000  # MSDN process creation flag
-            creationflags = CREATE_NO_WINDOW
+        if platform.system() == "Windows":
+            if background:
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            else:
+                # still show top-level windows, but don't show a console window
+                CREATE_NO_WINDOW = 0x08000000  # MSDN process creation flag
+                creationflags = CREATE_NO_WINDOW
 
         arguments.insert(0, deadlineCommand)
 
@@ -110,62 +142,51 @@ class Prism_Deadline_Functions(object):
 
     @err_catcher(name=__name__)
     def blenderDeadlineCommand(self):
-        deadlineBin = ""
-        try:
-            deadlineBin = os.environ["DEADLINE_PATH"]
-        except KeyError:
-            pass
+        return DeadlineClient.DeadlineClient.getExecutable()
 
-        if deadlineBin == "":
-            return
+    @err_catcher(name=__name__)
+    def getDeadlineHomeDir(self):
+        try:
+            homeDir = self.getClient().getHomeDirectory()
+        except DeadlineClient.DeadlineError as e:
+            logger.warning(str(e))
+            return False
 
-        deadlineCommand = os.path.join(deadlineBin, "deadlinecommand.exe")
+        return homeDir or False
 
-        if not os.path.exists(deadlineCommand):
-            return
+    @err_catcher(name=__name__)
+    def getDeadlineQuery(self, name):
+        # groups, pools and limits are cached by the client for a few minutes
+        client = self.getClient()
+        try:
+            result = getattr(client, name)()
+        except DeadlineClient.DeadlineError as e:
+            logger.warning(str(e))
+            return []
 
-        return deadlineCommand
+        return list(result or [])
 
     @err_catcher(name=__name__)
     def getDeadlineGroups(self, subdir=None):
-        if not hasattr(self, "deadlineGroups"):
-            if sys.version[0] == "3":
-                deadlineCommand = self.blenderDeadlineCommand()
-
-                if deadlineCommand is None:
-                    return []
-
-                startupinfo = None
-
-                args = [deadlineCommand, "-groups"]
-                if subdir != None and subdir != "":
-                    args.append(subdir)
-
-                # Specifying PIPE for all handles to workaround a Python bug on Windows. The unused handles are then closed immediatley afterwards.
-                proc = subprocess.Popen(
-                    args,
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    startupinfo=startupinfo,
-                )
+        if subdir:
+            executable = self.blenderDeadlineCommand()
+            if not executable:
+                return []
 
-                proc.stdin.close()
-                proc.stderr.close()
+            try:
+                return DeadlineClient.CommandBackend(executable).query(["-groups", subdir])
+            except DeadlineClient.DeadlineError:
+                return []
 
-                output = proc.stdout.read()
+        return self.getDeadlineQuery("getGroups")
 
-                output = output.decode("utf_8")
-
-            else:
-                output = self.deadlineCommand(["-groups"])
-
-            if output != False and not "Error" in output:
-                self.deadlineGroups = output.splitlines()
-            else:
-                self.deadlineGroups = []
+    @err_catcher(name=__name__)
+    def getDeadlinePools(self):
+        return self.getDeadlineQuery("getPools")
 
-        return self.deadlineGroups
+    @err_catcher(name=__name__)
+    def getDeadlineLimits(self):
+        return self.getDeadlineQuery("getLimits")
 
     @err_catcher(name=__name__)
     def sm_dep_startup(self, origin):
@@ -193,7 +214,7 @@ class Prism_Deadline_Functions(object):
 
         origin.nameChanged(origin.e_name.text())
 
-        origin.stateManager.saveStatesToScene()
+        origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def sm_dlGoToNode(self, item, column):
@@ -431,15 +452,10 @@ class Prism_Deadline_Functions(object):
         if self.core.appPlugin.pluginName == "Houdini":
             jobOutputFile = jobOutputFile.replace("$F4", "####")
 
-        homeDir = (
-            self.deadlineCommand(["-GetCurrentUserHomeDirectory"], background=False)
-        ).decode("utf-8")
-
+        homeDir = self.getDeadlineHomeDir()
         if homeDir is False:
             return "Execute Canceled: Deadline is not installed"
 
-        homeDir = homeDir.replace("\r", "").replace("\n", "")
-
         dependencies = parent.dependencies
 
         if hasattr(origin, "w_renderNSIs") and not origin.w_renderNSIs.isHidden():
@@ -550,7 +566,7 @@ class Prism_Deadline_Functions(object):
         if "dependencyFile" in locals():
             arguments.append(dependencyFile)
 
-        result = self.deadlineSubmitJob(jobInfos, pluginInfos, arguments)
+        result = self.deadlineSubmitJob(jobInfos, pluginInfos, arguments, origin=origin)
         if renderNSIs:
             code = origin.curRenderer.getNsiRenderScript()
             nsiDep = [[0, jobOutputFile]]
@@ -598,15 +614,10 @@ class Prism_Deadline_Functions(object):
             environment=None,
             args=None,
     ):
-        homeDir = (
-            self.deadlineCommand(["-GetCurrentUserHomeDirectory"], background=False)
-        ).decode("utf-8")
-
+        homeDir = self.getDeadlineHomeDir()
         if homeDir is False:
             return "Execute Canceled: Deadline is not installed"
 
-        homeDir = homeDir.replace("\r", "").replace("\n", "")
-
         if not jobName:
             jobName = os.path.splitext(self.core.getCurrentFileName(path=False))[0].strip("_")
 
@@ -690,25 +701,74 @@ class Prism_Deadline_Functions(object):
         return result
 
     @err_catcher(name=__name__)
-    def deadlineSubmitJob(self, jobInfos, pluginInfos, arguments):
+    def isPublishing(self, origin):
+        sm = getattr(origin, "stateManager", None)
+        scheduler = getattr(sm, "publishScheduler", None)
+        return bool(scheduler and scheduler.running)
+
+    @err_catcher(name=__name__)
+    def deadlineSubmitJob(self, jobInfos, pluginInfos, arguments, origin=None):
         self.core.callback(
             name="preSubmit_Deadline",
             types=["custom"],
             args=[self, jobInfos, pluginInfos, arguments],
         )
 
-        with open(arguments[0], "w") as fileHandle:
-            for i in jobInfos:
-                fileHandle.write("%s=%s\n" % (i, jobInfos[i]))
+        client = self.getClient()
+        if not client.isAvailable():
+            return "Execute Canceled: Deadline is not installed"
 
-        with open(arguments[1], "w") as fileHandle:
-            for i in pluginInfos:
-                fileHandle.write("%s=%s\n" % (i, pluginInfos[i]))
+        # jobs of a publish get submitted in the background. Failed
+        # submissions get reported in the publish result by onPostPublish
+        asyncSubmit = origin is not None and self.isPublishing(origin)
+        if asyncSubmit and self.core.prismIni:
+            asyncSubmit = self.core.getConfig(
+                "deadline", "asyncSubmission", dft=True, configPath=self.core.prismIni
+            )
 
-        jobResult = self.deadlineCommand(arguments, background=False).decode("utf-8")
+        ticket = client.submitJob(
+            jobInfos, pluginInfos, arguments[2:], origin=origin, wait=not asyncSubmit
+        )
+        if asyncSubmit:
+            self.submissionTickets.append(ticket)
+            return "Result=Success\nSubmission queued (%s)" % ticket.id
 
+        jobResult = ticket.result
+        ticket.reported = True
         self.core.callback(
             name="postSubmit_Deadline", types=["custom"], args=[self, jobResult]
         )
 
         return jobResult
+
+    @err_catcher(name=__name__)
+    def onPostPublish(self, sm, pubType, result=None):
+        tickets = [t for t in self.submissionTickets if not t.reported]
+        self.submissionTickets = []
+        if not tickets:
+            return
+
+        if not all(t.done for t in tickets):
+            text = "Submitting %s jobs to Deadline - please wait.." % len(tickets)
+            with self.core.waitPopup(self.core, text):
+                self.client.waitForSubmissions(tickets, onWait=self.processEvents)
+
+        for ticket in tickets:
+            ticket.reported = True
+            self.core.callback(
+                name="postSubmit_Deadline", types=["custom"], args=[self, ticket.result]
+            )
+
+            if ticket.success:
+                continue
+
+            for entry in result or []:
+                if entry["state"] is ticket.origin:
+                    entry["result"] = [
+                        "%s - error - %s" % (ticket.origin.state.text(0), ticket.result)
+                    ]
+
+    @err_catcher(name=__name__)
+    def processEvents(self):
+        if QCoreApplication.instance():
+            QCoreApplication.processEvents()
@@ -106,7 +106,7 @@ class Prism_Pandora_Functions(object):
             elif item.toolTip().startswith("Job:"):
                 origin.dependencies["Pandora"] = [[item.text(), "Job"]]
             origin.updateUi()
-            origin.stateManager.saveStatesToScene()
+            origin.stateManager.saveStatesToScene(origin)
         elif item.checkState() == Qt.Unchecked:
             if (
                 len(origin.dependencies["Pandora"]) > 0
@@ -114,7 +114,7 @@ class Prism_Pandora_Functions(object):
             ):
                 origin.dependencies["Pandora"] = []
                 origin.updateUi()
-                origin.stateManager.saveStatesToScene()
+                origin.stateManager.saveStatesToScene(origin)
 
     @err_catcher(name=__name__)
     def sm_pandoraGoToNode(self, origin):
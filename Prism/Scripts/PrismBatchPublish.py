@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+# Publishes scenefiles without UI. Every scenefile gets published in its own
+# process of the batch interpreter of its app (hython, mayapy, ...).
+#
+# Examples:
+#   python PrismBatchPublish.py shot01.hip shot02.hip --report report.json
+#   python PrismBatchPublish.py --recent --states "abc,playblast"
+#   python PrismBatchPublish.py --shots "sq01-*" --step anm --processes 8
+#
+# The same script runs inside the batch interpreters. In that case the
+# environment variable PRISM_BATCH_JOB points to the job of the scenefile.
+
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+prismScripts = os.path.dirname(os.path.abspath(__file__))
+if prismScripts not in sys.path:
+    sys.path.insert(0, prismScripts)
+
+from PrismUtils import BatchPublisher
+
+
+def parseArgs(args):
+    parser = argparse.ArgumentParser(description="Publish Prism scenefiles without UI.")
+    parser.add_argument("scenefiles", nargs="*", help="scenefiles to publish")
+    parser.add_argument("--project", help="path of the project (default: current project)")
+    parser.add_argument("--recent", action="store_true", help="publish the recent scenefiles of the project")
+    parser.add_argument("--shots", help="publish the latest scenefiles of all shots matching this pattern")
+    parser.add_argument("--assets", help="publish the latest scenefiles of all assets matching this pattern")
+    parser.add_argument("--step", help="only use scenefiles of this step")
+    parser.add_argument("--category", help="only use scenefiles of this category")
+    parser.add_argument("--states", help="comma separated names of the states to execute (default: all checked states)")
+    parser.add_argument("--processes", type=int, help="number of parallel processes (default: number of cores)")
+    parser.add_argument("--report", help="path of the json report")
+    parser.add_argument("--dry-run", action="store_true", help="only print the scenefiles")
+    return parser.parse_args(args)
+
+
+def main(args):
+    options = parseArgs(args)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        from PySide2.QtWidgets import QApplication
+    except ImportError:
+        from PySide.QtGui import QApplication
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # PySide keeps a reference to the application
+    QApplication.instance() or QApplication(sys.argv)
+
+    import PrismCore
+
+    core = PrismCore.PrismCore(prismArgs=["noUI", "loadProject"])
+    if options.project:
+        core.changeProject(configPath=options.project)
+
+    if not getattr(core, "prismIni", None):
+        logging.error("no project is set")
+        return 1
+
+    publisher = BatchPublisher.BatchPublisher(core)
+    scenefiles = [os.path.abspath(x) for x in options.scenefiles]
+    if options.recent:
+        scenefiles += publisher.getRecentScenefiles()
+
+    if options.shots:
+        scenefiles += publisher.getLatestScenefiles(
+            "shot", options.shots, step=options.step, category=options.category
+        )
+
+    if options.assets:
+        scenefiles += publisher.getLatestScenefiles(
+            "asset", options.assets, step=options.step, category=options.category
+        )
+
+    uniqueFiles = []
+    for scenefile in scenefiles:
+        if scenefile not in uniqueFiles:
+            uniqueFiles.append(scenefile)
+
+    if not uniqueFiles:
+        logging.error("no scenefiles to publish")
+        return 1
+
+    if options.dry_run:
+        for scenefile in uniqueFiles:
+            print(scenefile)
+
+        return 0
+
+    states = [x.strip() for x in options.states.split(",")] if options.states else None
+    report = publisher.publish(
+        uniqueFiles,
+        states=states,
+        processes=options.processes,
+        reportPath=options.report,
+    )
+    if not report:
+        return 1
+
+    logging.info(
+        "published %s of %s scenefiles in %.1fs"
+        % (report["succeeded"], len(report["jobs"]), report["duration"])
+    )
+    if not options.report:
+        print(json.dumps(report, indent=4))
+
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    if os.getenv("PRISM_BATCH_JOB"):
+        code = BatchPublisher.runWorker(os.environ["PRISM_BATCH_JOB"])
+    else:
+        code = main(sys.argv[1:])
+
+    sys.exit(code)
@@ -128,8 +128,10 @@ from PrismUtils import (
     PathManager,
     PluginManager,
     ProjectEntities,
+    ProjectPaths,
     Projects,
     SanityChecks,
+    ThreadUtils,
     Users,
 )
 
@@ -1255,13 +1257,10 @@ License: GNU GPL-3.0-or-later<br>
             fileNameData = self.getScenefileData(filepath)
             validName = fileNameData["entity"] != "invalid"
 
+        projectPaths = self.getProjectPaths()
+        location = projectPaths.getSceneLocation(filepath) if projectPaths else None
         if (
-            self.fixPath(self.scenePath) in filepath
-            or (
-                self.useLocalFiles
-                and self.fixPath(self.core.getScenePath(location="local"))
-                in filepath
-            )
+            location == "global" or (self.useLocalFiles and location == "local")
         ) and (validName or not validateFilename):
             return True
         else:
@@ -1301,20 +1300,22 @@ License: GNU GPL-3.0-or-later<br>
 
     @err_catcher(name=__name__)
     def getExportPaths(self):
-        export_paths = OrderedDict([("global", self.projectPath)])
-        if self.useLocalFiles:
-            export_paths["local"] = self.localProjectPath
+        projectPaths = self.getProjectPaths()
+        if not projectPaths:
+            return OrderedDict()
 
-        customPaths = self.getConfig(
-            "export_paths", configPath=self.prismIni, dft=[]
-        )
-        for cp in customPaths:
-            export_paths[cp] = customPaths[cp]
+        return OrderedDict(projectPaths.exportPaths)
+
+    @err_catcher(name=__name__)
+    def getProjectPaths(self):
+        if not getattr(self, "projectPath", None):
+            return
 
-        for path in export_paths:
-            export_paths[path] = os.path.normpath(export_paths[path])
+        projectPaths = getattr(self, "projectPaths", None)
+        if not projectPaths or not projectPaths.isValid():
+            projectPaths = self.projectPaths = ProjectPaths.ProjectPaths(self)
 
-        return export_paths
+        return projectPaths
 
     @err_catcher(name=__name__)
     def resolve(self, uri, uriType="exportProduct"):
@@ -1335,110 +1336,60 @@ License: GNU GPL-3.0-or-later<br>
         if not getattr(self, "projectPath", None):
             return ""
 
-        sceneName = None
-        self._sceneName = None
-        self._scenePath = None
-
-        if cached:
-            sceneName = getattr(self, "_sceneName", "")
+        if not cached:
+            self.projectPaths = None
 
-        if not sceneName:
-            sceneName = self.getConfig("paths", "scenes", configPath=self.prismIni)
-            if not sceneName:
-                self.core.popup("Required setting \"paths - scenes\" is missing in the project config.\n\nSet this setting to the scenefoldername in this config to solve this issue:\n\n%s" % self.prismIni)
-                return ""
-
-        self._sceneName = sceneName
+        projectPaths = self.getProjectPaths()
+        if not projectPaths.sceneName:
+            self.core.popup("Required setting \"paths - scenes\" is missing in the project config.\n\nSet this setting to the scenefoldername in this config to solve this issue:\n\n%s" % self.prismIni)
+            return ""
 
-        if location == "global":
-            prjPath = self.projectPath
-        elif location == "local":
-            prjPath = self.localProjectPath
-        else:
-            prjPath = self.getExportPaths().get(location, "")
-        scenePath = os.path.normpath(os.path.join(prjPath, self._sceneName))
-        self._scenePath = scenePath
-        return scenePath
+        return projectPaths.getScenePath(location)
 
     @property
     def scenePath(self):
-        if not hasattr(self, "_scenePath"):
-            self._scenePath = self.getScenePath()
-
-        return self._scenePath
+        return self.getScenePath()
 
     @err_catcher(name=__name__)
     def getAssetPath(self, location="global"):
-        path = ""
-        sceneFolder = self.getScenePath(location=location)
-        if sceneFolder:
-            path = os.path.join(sceneFolder, "Assets")
-            path = os.path.normpath(path)
+        if not self.getScenePath(location=location):
+            return ""
 
-        self._assetPath = path
-        return path
+        return self.getProjectPaths().getAssetPath(location)
 
     @property
     def assetPath(self):
-        if not hasattr(self, "_assetPath"):
-            self._assetPath = self.getAssetPath()
-
-        return self._assetPath
+        return self.getAssetPath()
 
     @err_catcher(name=__name__)
     def getShotPath(self, location="global"):
-        path = ""
-        sceneFolder = self.getScenePath(location=location)
-        if sceneFolder:
-            path = os.path.join(sceneFolder, "Shots")
-            path = os.path.normpath(path)
+        if not self.getScenePath(location=location):
+            return ""
 
-        self._shotPath = path
-        return path
+        return self.getProjectPaths().getShotPath(location)
 
     @property
     def shotPath(self):
-        if not hasattr(self, "_shotPath"):
-            self._shotPath = self.getShotPath()
-
-        return self._shotPath
+        return self.getShotPath()
 
     @err_catcher(name=__name__)
     def convertPath(self, path, target="global"):
-        path = os.path.normpath(path)
-        if self.useLocalFiles:
-            if target == "global":
-                scenePath = self.getScenePath("local")
-                if path.startswith(scenePath):
-                    path = path.replace(
-                        self.core.localProjectPath, self.core.projectPath
-                    )
-            elif target == "local":
-                scenePath = self.getScenePath("global")
-                if path.startswith(scenePath):
-                    path = path.replace(
-                        self.core.projectPath, self.core.localProjectPath
-                    )
+        projectPaths = self.getProjectPaths()
+        if not projectPaths:
+            return os.path.normpath(path)
 
-        return path
+        return projectPaths.convertPath(path, target=target)
 
     @err_catcher(name=__name__)
     def getTexturePath(self, location="global"):
-        path = ""
-        assetFolder = self.getScenePath(location=location)
-        if assetFolder:
-            path = os.path.join(assetFolder, "Textures")
-            path = os.path.normpath(path)
+        if not self.getScenePath(location=location):
+            return ""
 
-        self._texturePath = path
-        return path
+        return self.getProjectPaths().getTexturePath(location)
 
     @property
     def texturePath(self):
-        if not hasattr(self, "_texturePath"):
-            self._texturePath = self.getTexturePath()
-
-        return self._texturePath
+        return self.getTexturePath()
 
     @err_catcher(name=__name__)
     def saveScene(
@@ -1498,27 +1449,27 @@ License: GNU GPL-3.0-or-later<br>
                 dstname = os.path.dirname(filepath)
 
                 if fnameData["entity"] == "asset":
-                    fVersion = self.getHighestVersion(dstname, "asset")
+                    fVersion = self.getHighestVersion(dstname, "asset", reserve=True)
                     filepath = self.generateScenePath(
                         entity="asset",
                         entityName=fnameData["entityName"],
                         step=fnameData["step"],
                         category=fnameData["category"],
                         comment=comment,
-                        # version=fVersion,
+                        version=fVersion,
                         basePath=dstname,
                         extension=self.appPlugin.getSceneExtension(self),
                     )
 
                 elif fnameData["entity"] == "shot":
-                    fVersion = self.getHighestVersion(dstname, "shot")
+                    fVersion = self.getHighestVersion(dstname, "shot", reserve=True)
                     filepath = self.generateScenePath(
                         entity="shot",
                         entityName=fnameData["entityName"],
                         step=fnameData["step"],
                         category=fnameData["category"],
                         comment=comment,
-                        # version=fVersion,
+                        version=fVersion,
                         basePath=dstname,
                         extension=self.appPlugin.getSceneExtension(self),
                     )
@@ -1530,6 +1481,9 @@ License: GNU GPL-3.0-or-later<br>
             self.popup(msg)
             return False
 
+        if getattr(self, "sm", None):
+            self.sm.flushStates(full=True)
+
         self.callback(
             name="onAboutToSaveFile",
             types=["custom"],
@@ -1537,6 +1491,7 @@ License: GNU GPL-3.0-or-later<br>
         )
 
         result = self.appPlugin.saveScene(self, filepath, details)
+        self.entities.index.invalidate(os.path.dirname(filepath))
         if prismReq:
             self.saveSceneInfo(filepath, details, preview=preview)
 
@@ -1663,6 +1618,9 @@ License: GNU GPL-3.0-or-later<br>
         elif mode == "move":
             shutil.move(origFile, targetFile)
 
+        self.entities.index.invalidate(os.path.dirname(origFile))
+        self.entities.index.invalidate(os.path.dirname(targetFile))
+
         infoPath = os.path.splitext(origFile)[0] + "versioninfo.yml"
         prvPath = os.path.splitext(origFile)[0] + "preview.jpg"
         infoPatht = os.path.splitext(targetFile)[0] + "versioninfo.yml"
@@ -1830,6 +1788,11 @@ License: GNU GPL-3.0-or-later<br>
         sortedList = sorted(alist, key=self.naturalKeys)
         return sortedList
 
+    @err_catcher(name=__name__)
+    def sceneAboutToSave(self, arg=None):  # callback function
+        if getattr(self, "sm", None):
+            self.sm.flushStates(full=True)
+
     @err_catcher(name=__name__)
     def scenefileSaved(self, arg=None):  # callback function
         if getattr(self, "sm", None):
@@ -1844,6 +1807,7 @@ License: GNU GPL-3.0-or-later<br>
     @err_catcher(name=__name__)
     def sceneUnload(self, arg=None):  # callback function
         if getattr(self, "sm", None):
+            self.sm.flushStates()
             self.sm.close()
             del self.sm
 
@@ -1937,7 +1901,9 @@ License: GNU GPL-3.0-or-later<br>
         for i in data:
             cData["information"][i] = data[i]
 
-        self.setConfig(data=cData, configPath=infoFilePath)
+        # reads and writes the info file under a single lock
+        with self.configs.batch(configPath=infoFilePath):
+            self.setConfig(data=cData, configPath=infoFilePath)
 
     @err_catcher(name=__name__)
     def getPythonPath(self, executable=None):
@@ -2218,11 +2184,17 @@ License: GNU GPL-3.0-or-later<br>
             raiseError = False
             text += "\n\n"
 
-            if hasattr(self, "messageParent") and self.uiAvailable:
+            # popups can only be shown from the main thread. Without a UI the
+            # error gets raised in the main thread, so that headless runs
+            # don't continue with broken data. Errors in worker threads only
+            # get logged, unless the thread called ThreadUtils.setRaiseErrors
+            # (see Decorators.err_handler)
+            isMainThread = ThreadUtils.isMainThread()
+            if hasattr(self, "messageParent") and self.uiAvailable and isMainThread:
                 self.showErrorPopup(text=text)
             else:
                 logger.warning(text)
-                raiseError = True
+                raiseError = isMainThread
 
             if getattr(self, "prismIni", None) and getattr(self, "user", None):
                 prjErPath = os.path.join(
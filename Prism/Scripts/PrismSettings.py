@@ -352,19 +352,22 @@ class PrismSettings(QDialog, PrismSettings_ui.Ui_dlg_PrismSettings):
             cData["dccoverrides"]["%s_override" % i] = c
             cData["dccoverrides"]["%s_path" % i] = ct
 
-        self.core.callback(name="prismSettings_saveSettings", types=["curApp", "unloadedApps", "custom", "prjManagers"], args=[self, cData])
-
-        if self.core.appPlugin.appType == "3d":
-            if self.chb_autosave.isChecked():
-                if (
-                    not hasattr(self.core, "asThread")
-                    or not self.core.asThread.isRunning()
-                ):
-                    self.core.startasThread()
-            else:
-                self.core.startasThread(quit=True)
+        # plugins can write to the user config in their callbacks as well.
+        # All changes are written at once at the end of the batch
+        with self.core.configs.batch():
+            self.core.callback(name="prismSettings_saveSettings", types=["curApp", "unloadedApps", "custom", "prjManagers"], args=[self, cData])
+
+            if self.core.appPlugin.appType == "3d":
+                if self.chb_autosave.isChecked():
+                    if (
+                        not hasattr(self.core, "asThread")
+                        or not self.core.asThread.isRunning()
+                    ):
+                        self.core.startasThread()
+                else:
+                    self.core.startasThread(quit=True)
 
-        self.core.setConfig(data=cData)
+            self.core.setConfig(data=cData)
 
         self.core.setDebugMode(self.chb_debug.isChecked())
 
@@ -383,9 +386,10 @@ class PrismSettings(QDialog, PrismSettings_ui.Ui_dlg_PrismSettings):
             for i in self.forceVersionPlugins:
                 cData["globals"]["%s_version" % i] = self.forceVersionPlugins[i]["le"].text()
 
-            self.core.callback(name="prismSettings_savePrjSettings", types=["curApp", "unloadedApps", "custom", "prjManagers"], args=[self, cData])
+            with self.core.configs.batch(configPath=self.core.prismIni):
+                self.core.callback(name="prismSettings_savePrjSettings", types=["curApp", "unloadedApps", "custom", "prjManagers"], args=[self, cData])
 
-            self.core.setConfig(data=cData, configPath=self.core.prismIni)
+                self.core.setConfig(data=cData, configPath=self.core.prismIni)
             self.core.useLocalFiles = self.chb_curPuseLocal.isChecked()
             if changeProject:
                 self.core.changeProject(self.core.prismIni)
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import logging
+import platform
+import tempfile
+import traceback
+import subprocess
+import multiprocessing
+
+from multiprocessing.pool import ThreadPool
+
+from PrismUtils.Decorators import err_catcher
+
+
+logger = logging.getLogger(__name__)
+
+
+# Publishes scenefiles without an artist session. Every scenefile gets opened
+# in its own process of the batch interpreter of its app (hython, mayapy,
+# ...), which loads the states stored in the scenefile and executes them
+# with the StateManager. The processes of multiple scenefiles run in
+# parallel and every process writes its results to a json file, which gets
+# combined to the report of the whole batch.
+class BatchPublisher(object):
+    reportVersion = 1
+
+    def __init__(self, core):
+        self.core = core
+        # interpreters, which can execute python scripts without UI. Can be
+        # overridden per app in the user config ("batchPublish" > "interpreters")
+        # or by the app plugin (getBatchPublishCommand). Only 3d apps have a
+        # StateManager, so 2d apps like Nuke can't be batch published
+        self.defaultInterpreters = {
+            "Houdini": ["hython"],
+            "Maya": ["mayapy"],
+            "Blender": ["blender", "-b", "--python"],
+        }
+        self.jobTimeout = 4 * 60 * 60
+
+    @err_catcher(name=__name__)
+    def getScriptPath(self):
+        return os.path.join(self.core.prismRoot, "Scripts", "PrismBatchPublish.py")
+
+    @err_catcher(name=__name__)
+    def getAppForScenefile(self, scenefile):
+        ext = os.path.splitext(scenefile)[1]
+        plugins = [self.core.appPlugin] + list(self.core.unloadedAppPlugins.values())
+        for plugin in plugins:
+            if plugin and ext in getattr(plugin, "sceneFormats", []):
+                return plugin.pluginName
+
+    @err_catcher(name=__name__)
+    def getInterpreter(self, appName):
+        interpreters = self.core.getConfig("batchPublish", "interpreters", dft={}) or {}
+        cmd = interpreters.get(appName)
+        if cmd:
+            if self.core.isStr(cmd):
+                cmd = [cmd]
+
+            return list(cmd)
+
+        plugin = self.core.getPlugin(appName)
+        func = getattr(plugin, "getBatchPublishCommand", None)
+        if func:
+            cmd = func()
+            if cmd:
+                return list(cmd)
+
+        if appName in self.defaultInterpreters:
+            return list(self.defaultInterpreters[appName])
+
+    @err_catcher(name=__name__)
+    def hasStateManager(self, appName):
+        plugin = self.core.getPlugin(appName)
+        if not plugin:
+            return appName in self.defaultInterpreters
+
+        return getattr(plugin, "appType", "3d") == "3d"
+
+    @err_catcher(name=__name__)
+    def getRecentScenefiles(self):
+        rSection = "recent_files_" + self.core.projectName
+        return [x for x in self.core.getConfig(rSection, dft=[]) or [] if os.path.exists(x)]
+
+    @err_catcher(name=__name__)
+    def getLatestScenefiles(self, entityType="shot", nameFilter="*", step=None, category=None):
+        # returns the highest version of the scenefiles of every
+        # step/category of all entities, which match the filter
+        entities = []
+        if entityType == "shot":
+            for shot in self.core.entities.getShots()[1]:
+                if fnmatch.fnmatch(shot[2], nameFilter):
+                    entities.append({"shot": shot[2]})
+        else:
+            for assetPath in self.core.entities.getAssetPaths():
+                assetName = self.core.entities.getAssetNameFromPath(assetPath)
+                if fnmatch.fnmatch(assetName, nameFilter):
+                    entities.append({"asset": assetPath})
+
+        parser = self.core.entities.getScenefileParser()
+        scenefiles = []
+        for entity in entities:
+            steps = [step] if step else self.core.entities.getSteps(**entity)
+            for curStep in steps:
+                if category:
+                    cats = [category]
+                else:
+                    cats = self.core.entities.getCategories(step=curStep, **entity)
+
+                for cat in cats:
+                    files = self.core.entities.getScenefiles(
+                        step=curStep,
+                        category=cat,
+                        extensions=self.core.getPluginSceneFormats(),
+                        **entity
+                    )
+                    latest = None
+                    for filepath in files:
+                        data = self.core.getScenefileData(filepath)
+                        # versions are compared as numbers, because their
+                        # padding can differ (v999, v1000)
+                        versionNumber = parser.getVersionNumber(data.get("version") or "")
+                        if versionNumber is None:
+                            continue
+
+                        if latest is None or versionNumber > latest[0]:
+                            latest = [versionNumber, filepath]
+
+                    if latest:
+                        scenefiles.append(latest[1])
+
+        return sorted(scenefiles)
+
+    @err_catcher(name=__name__)
+    def createJob(self, scenefile, jobDir, index, states=None):
+        appName = self.getAppForScenefile(scenefile)
+        cmd = None
+        error = None
+        if not appName:
+            error = "no app plugin supports the scenefile format"
+        elif not self.hasStateManager(appName):
+            error = "the app %s doesn't have a StateManager" % appName
+        else:
+            cmd = self.getInterpreter(appName)
+            if cmd:
+                cmd.append(self.getScriptPath())
+            else:
+                error = "no batch interpreter available for app: %s" % appName
+
+        name = "%04d_%s" % (index, os.path.splitext(os.path.basename(scenefile))[0])
+        job = {
+            "scenefile": scenefile,
+            "app": appName,
+            "command": cmd,
+            "project": self.core.prismIni,
+            "states": states,
+            "error": error,
+            "prismRoot": self.core.prismRoot,
+            "jobPath": os.path.join(jobDir, name + "_job.json"),
+            "resultPath": os.path.join(jobDir, name + "_result.json"),
+            "logPath": os.path.join(jobDir, name + ".log"),
+        }
+        with open(job["jobPath"], "w") as f:
+            json.dump(job, f, indent=4)
+
+        return job
+
+    def runJob(self, job):
+        # gets called from the threads of the pool, so it can't use the
+        # err_catcher, which shows popups
+        startTime = time.time()
+        result = {
+            "scenefile": job["scenefile"],
+            "app": job["app"],
+            "log": job["logPath"],
+            "states": [],
+        }
+
+        cmd = job["command"]
+        if not cmd:
+            result["status"] = "error"
+            result["error"] = job.get("error") or "no batch interpreter available for app: %s" % job["app"]
+            result["duration"] = 0
+            return result
+
+        env = os.environ.copy()
+        env["PRISM_BATCH_JOB"] = job["jobPath"]
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+        logger.debug("starting batch publish: %s" % " ".join(cmd))
+        try:
+            with open(job["logPath"], "w") as logFile:
+                kwargs = {}
+                if platform.system() == "Windows":
+                    kwargs["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
+
+                proc = subprocess.Popen(
+                    cmd, stdout=logFile, stderr=subprocess.STDOUT, env=env, **kwargs
+                )
+                while proc.poll() is None:
+                    if time.time() - startTime > self.jobTimeout:
+                        proc.kill()
+                        proc.wait()
+                        result["status"] = "timeout"
+                        break
+
+                    time.sleep(0.2)
+
+            result["returncode"] = proc.returncode
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = "failed to start %s: %s" % (cmd[0], e)
+            result["duration"] = time.time() - startTime
+            return result
+
+        if os.path.exists(job["resultPath"]):
+            try:
+                with open(job["resultPath"], "r") as f:
+                    result.update(json.load(f))
+            except Exception as e:
+                result["error"] = "failed to read the results: %s" % e
+
+        if "status" not in result:
+            result["status"] = "error"
+            result.setdefault("error", "the worker process exited without results (see log)")
+
+        result["duration"] = time.time() - startTime
+        return result
+
+    @err_catcher(name=__name__)
+    def publish(self, scenefiles, states=None, processes=None, reportPath=None):
+        if processes is None:
+            try:
+                processes = multiprocessing.cpu_count()
+            except NotImplementedError:
+                processes = 2
+
+        processes = max(1, min(processes, len(scenefiles) or 1))
+        if reportPath:
+            jobDir = os.path.splitext(reportPath)[0] + "_jobs"
+            if not os.path.exists(jobDir):
+                os.makedirs(jobDir)
+        else:
+            jobDir = tempfile.mkdtemp(prefix="PrismBatchPublish_")
+
+        jobs = [
+            self.createJob(scenefile, jobDir, idx, states=states)
+            for idx, scenefile in enumerate(scenefiles)
+        ]
+        startTime = time.time()
+        logger.info(
+            "publishing %s scenefiles in %s processes" % (len(jobs), processes)
+        )
+
+        pool = ThreadPool(processes)
+        try:
+            results = []
+            for result in pool.imap(self.runJob, jobs):
+                logger.info(
+                    "%s: %s (%.1fs)"
+                    % (result["status"], result["scenefile"], result["duration"])
+                )
+                results.append(result)
+        finally:
+            pool.close()
+            pool.join()
+
+        report = {
+            "version": self.reportVersion,
+            "project": self.core.prismIni,
+            "started": startTime,
+            "duration": time.time() - startTime,
+            "processes": processes,
+            "succeeded": len([x for x in results if x["status"] == "success"]),
+            "failed": len([x for x in results if x["status"] != "success"]),
+            "jobs": results,
+        }
+
+        if reportPath:
+            with open(reportPath, "w") as f:
+                json.dump(report, f, indent=4)
+
+        return report
+
+
+def getStatesToExecute(sm, stateNames=None):
+    # returns the states with the given names including their parent folders
+    # and child states. All states are returned if no names are given
+    if not stateNames:
+        return list(sm.states)
+
+    execStates = []
+    for state in sm.states:
+        if state.text(0) not in stateNames:
+            continue
+
+        for child in sm.getChildStates(state):
+            if child not in execStates:
+                execStates.append(child)
+
+        parent = state.parent()
+        while parent is not None:
+            if parent not in execStates:
+                execStates.append(parent)
+
+            parent = parent.parent()
+
+    return execStates
+
+
+def initializeApp(appName):
+    # the batch interpreters of some apps have to initialize the app before
+    # scenes can be opened
+    if appName == "Maya":
+        import maya.standalone
+
+        maya.standalone.initialize(name="python")
+
+
+def writeWorkerResult(job, result):
+    with open(job["resultPath"], "w") as f:
+        json.dump(result, f, indent=4)
+
+
+def runWorker(jobPath):
+    # executed by the batch interpreter of the app
+    with open(jobPath, "r") as f:
+        job = json.load(f)
+
+    result = {"status": "error", "states": []}
+    try:
+        try:
+            from PySide2.QtWidgets import QApplication
+        except ImportError:
+            from PySide.QtGui import QApplication
+
+        # PySide keeps a reference to the application
+        QApplication.instance() or QApplication(sys.argv)
+        initializeApp(job["app"])
+
+        import PrismCore
+
+        core = PrismCore.PrismCore(app=job["app"], prismArgs=["noUI"])
+        core.changeProject(configPath=job["project"])
+        if not core.appPlugin.openScene(core, job["scenefile"], force=True):
+            result["error"] = "failed to open scenefile"
+            writeWorkerResult(job, result)
+            return 1
+
+        sm = core.stateManager(openUi=False)
+        if not sm:
+            result["error"] = "failed to load the StateManager"
+            writeWorkerResult(job, result)
+            return 1
+
+        sm.loadStates()
+        execStates = getStatesToExecute(sm, job.get("states"))
+        if not execStates:
+            result["error"] = "no states to execute"
+            writeWorkerResult(job, result)
+            return 1
+
+        sm.publishResult = []
+        sm.publish(states=execStates)
+        for stateResult in sm.publishResult:
+            result["states"].append({
+                "state": stateResult["state"].state.text(0),
+                "class": stateResult["state"].className,
+                "result": stateResult["result"],
+            })
+
+        if not result["states"]:
+            result["error"] = "the publish didn't execute any states"
+        elif sm.publishPaused:
+            result["status"] = "paused"
+        elif [
+            x for x in result["states"]
+            if not x["result"] or "error" in x["result"][0]
+        ]:
+            result["status"] = "failed"
+        else:
+            result["status"] = "success"
+
+        result["publishedScenefile"] = core.getCurrentFileName()
+    except Exception:
+        result["error"] = traceback.format_exc()
+
+    writeWorkerResult(job, result)
+    return 0 if result["status"] == "success" else 1
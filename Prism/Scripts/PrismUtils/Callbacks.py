@@ -33,6 +33,7 @@
 
 import os
 import sys
+import time
 import logging
 import traceback
 
@@ -45,6 +46,7 @@ except:
     from PySide.QtGui import *
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import PluginManager
 
 
 logger = logging.getLogger(__name__)
@@ -56,6 +58,12 @@ class Callbacks(object):
         self.currentCallback = {"plugin": "", "function": ""}
         self.registeredCallbacks = {}
         self.callbackNum = 0
+        # handlers per callbackname and plugin types. The table gets cleared
+        # whenever plugins or callbacks get added or removed
+        self.dispatchTable = {}
+        self.dispatchAppPlugin = None
+        self.profiling = os.getenv("PRISM_CALLBACK_PROFILING") == "1"
+        self.profile = {}
 
     @err_catcher(name=__name__)
     def registerCallback(self, callbackName, function, priority=50):
@@ -71,6 +79,7 @@ class Callbacks(object):
         }
         self.registeredCallbacks[callbackName].append(cbDict)
         self.registeredCallbacks[callbackName] = sorted(self.registeredCallbacks[callbackName], key=lambda x: int(x["priority"]), reverse=True)
+        self.invalidateDispatchTable()
         logger.debug("registered callback: %s" % str(cbDict))
         return cbDict
 
@@ -80,12 +89,82 @@ class Callbacks(object):
             for cb in self.registeredCallbacks[cbName]:
                 if cb["id"] == callbackId:
                     self.registeredCallbacks[cbName].remove(cb)
+                    self.invalidateDispatchTable()
                     logger.debug("unregistered callback: %s" % str(cb))
                     return True
 
         logger.debug("couldn't unregister callback with id %s" % callbackId)
         return False
 
+    @err_catcher(name=__name__)
+    def invalidateDispatchTable(self):
+        self.dispatchTable = {}
+
+    @err_catcher(name=__name__)
+    def hasPluginHandler(self, plugin, name):
+        # plugins which weren't imported yet know their functions from the
+        # plugin manifest
+        if isinstance(plugin, PluginManager.LazyPlugin) and not plugin.isLoaded():
+            entry = plugin._entry
+            return name in entry["methods"] or name in entry["instanceAttributes"]
+
+        return getattr(plugin, name, None) is not None
+
+    @err_catcher(name=__name__)
+    def getHandlers(self, name, types):
+        if self.dispatchAppPlugin is not self.core.appPlugin:
+            self.dispatchTable = {}
+            self.dispatchAppPlugin = self.core.appPlugin
+
+        key = (name, tuple(types))
+        handlers = self.dispatchTable.get(key)
+        if handlers is not None:
+            return handlers
+
+        pluginGroups = [
+            ["curApp", None],
+            ["unloadedApps", "unloadedAppPlugins"],
+            ["custom", "customPlugins"],
+            ["prjManagers", "prjManagers"],
+            ["rfManagers", "rfManagers"],
+        ]
+
+        # plugin functions have the default priority and are called before
+        # registered callbacks of the same priority
+        handlers = []
+        for pluginType, pluginDict in pluginGroups:
+            if pluginType not in types:
+                continue
+
+            if pluginDict:
+                plugins = getattr(self.core, pluginDict).values()
+            else:
+                plugins = [self.core.appPlugin]
+
+            for plugin in plugins:
+                if not self.hasPluginHandler(plugin, name):
+                    continue
+
+                handlers.append({
+                    "plugin": plugin,
+                    "name": "%s.%s" % (plugin.pluginName, name),
+                    "priority": 50,
+                    "catchErrors": pluginType == "custom",
+                })
+
+        for cb in self.registeredCallbacks.get(name, []):
+            function = cb["function"]
+            handlers.append({
+                "function": function,
+                "name": "%s.%s" % (getattr(function, "__module__", ""), getattr(function, "__name__", str(function))),
+                "priority": int(cb["priority"]),
+                "catchErrors": False,
+            })
+
+        handlers = sorted(handlers, key=lambda x: x["priority"], reverse=True)
+        self.dispatchTable[key] = handlers
+        return handlers
+
     @err_catcher(name=__name__)
     def callback(self, name="", types=["custom"], *args, **kwargs):
         if "args" in kwargs:
@@ -93,51 +172,73 @@ class Callbacks(object):
             args += kwargs["args"]
             del kwargs["args"]
 
+        if name in self.core.plugins.lazyCallbacks:
+            self.core.plugins.loadCallbackPlugins(name)
+
+        handlers = self.getHandlers(name, types)
+        if not handlers:
+            return []
+
         result = []
         self.core.catchTypeErrors = True
         self.currentCallback["function"] = name
 
-        if "curApp" in types:
-            self.currentCallback["plugin"] = self.core.appPlugin.pluginName
-            res = getattr(self.core.appPlugin, name, lambda *args, **kwargs: None)(*args, **kwargs)
-            result.append(res)
+        for handler in handlers:
+            if "plugin" in handler:
+                plugin = handler["plugin"]
+                self.currentCallback["plugin"] = plugin.pluginName
+                function = getattr(plugin, name, None)
+                if function is None:
+                    continue
+            else:
+                function = handler["function"]
 
-        if "unloadedApps" in types:
-            for i in self.core.unloadedAppPlugins.values():
-                self.currentCallback["plugin"] = i.pluginName
-                res = getattr(i, name, lambda *args, **kwargs: None)(*args, **kwargs)
-                result.append(res)
+            if self.profiling:
+                startTime = time.time()
 
-        if "custom" in types:
-            for i in self.core.customPlugins.values():
+            if handler["catchErrors"]:
                 try:
-                    self.currentCallback["plugin"] = i.pluginName
-                    res = getattr(i, name, lambda *args, **kwargs: None)(*args, **kwargs)
-                    result.append(res)
+                    res = function(*args, **kwargs)
                 except:
                     logger.warning("error: %s" % traceback.format_exc())
+                    continue
+            else:
+                res = function(*args, **kwargs)
 
-        if "prjManagers" in types:
-            for i in self.core.prjManagers.values():
-                self.currentCallback["plugin"] = i.pluginName
-                res = getattr(i, name, lambda *args, **kwargs: None)(*args, **kwargs)
-                result.append(res)
-
-        if "rfManagers" in types:
-            for i in self.core.rfManagers.values():
-                self.currentCallback["plugin"] = i.pluginName
-                res = getattr(i, name, lambda *args, **kwargs: None)(*args, **kwargs)
-                result.append(res)
+            if self.profiling:
+                self.recordProfile(name, handler["name"], time.time() - startTime)
 
-        if name in self.registeredCallbacks:
-            for cb in self.registeredCallbacks[name]:
-                res = cb["function"](*args, **kwargs)
-                result.append(res)
+            result.append(res)
 
         self.core.catchTypeErrors = False
 
         return result
 
+    @err_catcher(name=__name__)
+    def setProfiling(self, enabled):
+        self.profiling = enabled
+
+    @err_catcher(name=__name__)
+    def recordProfile(self, callbackName, handlerName, duration):
+        key = (callbackName, handlerName)
+        if key not in self.profile:
+            self.profile[key] = {"calls": 0, "time": 0.0}
+
+        self.profile[key]["calls"] += 1
+        self.profile[key]["time"] += duration
+
+    @err_catcher(name=__name__)
+    def getProfile(self):
+        profile = [
+            {"callback": key[0], "handler": key[1], "calls": data["calls"], "time": data["time"]}
+            for key, data in self.profile.items()
+        ]
+        return sorted(profile, key=lambda x: x["time"], reverse=True)
+
+    @err_catcher(name=__name__)
+    def resetProfile(self):
+        self.profile = {}
+
     @err_catcher(name=__name__)
     def callHook(self, hookName, args=None):
         args = args or {}
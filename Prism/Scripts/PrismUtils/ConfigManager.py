@@ -33,8 +33,12 @@
 
 import os
 import sys
+import copy
+import hashlib
+import time
 import platform
 import logging
+import threading
 
 from collections import OrderedDict
 
@@ -42,10 +46,12 @@ if sys.version[0] == "3":
     import collections.abc as collections
     from configparser import ConfigParser
     from io import StringIO
+    import pickle
 else:
     import collections
     from ConfigParser import ConfigParser
     from StringIO import StringIO
+    import cPickle as pickle
 
 from PrismUtils.Decorators import err_catcher
 from PrismUtils import Lockfile
@@ -54,10 +60,35 @@ from PrismUtils import Lockfile
 logger = logging.getLogger(__name__)
 
 
+class ConfigBatch(object):
+    def __init__(self, manager, configPath):
+        self.manager = manager
+        self.configPath = configPath
+
+    def __enter__(self):
+        self.manager.beginBatch(self.configPath)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.manager.endBatch(self.configPath)
+
+
 class ConfigManager(object):
     def __init__(self, core):
         self.core = core
+        # guards the cache and the batches, which are used by the publish
+        # worker threads too
+        self.lock = threading.RLock()
         self.cachedConfigs = {}
+        self.cachedStats = {}
+        self.batches = {}
+        self.cYaml = None
+        self.yamlRepresenter = None
+        # yaml files larger than this get a binary sidecar in the user cache
+        # folder, which is loaded instead of the yaml while the file is unchanged
+        self.useSidecars = True
+        self.sidecarMinSize = 64 * 1024
+        self.sidecarVersion = 1
 
         dprConfig = os.path.splitext(self.core.userini)[0] + ".ini"
         if not os.path.exists(self.core.userini) and os.path.exists(dprConfig):
@@ -82,8 +113,157 @@ class ConfigManager(object):
             return self.generateConfigPath(name=config, location=location)
 
     @err_catcher(name=__name__)
-    def clearCache(self):
-        self.cachedConfigs = {}
+    def clearCache(self, path=None):
+        with self.lock:
+            if path:
+                path = os.path.normpath(path)
+                self.cachedConfigs.pop(path, None)
+                self.cachedStats.pop(path, None)
+            else:
+                self.cachedConfigs = {}
+                self.cachedStats = {}
+
+    @err_catcher(name=__name__)
+    def getFileStat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+
+        return (st.st_mtime, st.st_size, st.st_ino)
+
+    @err_catcher(name=__name__)
+    def isCacheValid(self, path):
+        with self.lock:
+            if path not in self.cachedConfigs:
+                return False
+
+            # while a batch is active the cache holds the not yet written changes
+            if path in self.batches:
+                return True
+
+            if self.cachedStats.get(path) != self.getFileStat(path):
+                logger.debug("config changed on disk: %s" % path)
+                self.clearCache(path)
+                return False
+
+            return True
+
+    @err_catcher(name=__name__)
+    def getCachedConfig(self, path):
+        # returns [isValid, data]
+        with self.lock:
+            if not self.isCacheValid(path):
+                return [False, None]
+
+            return [True, self.cachedConfigs[path]]
+
+    @err_catcher(name=__name__)
+    def cacheConfig(self, path, data):
+        with self.lock:
+            self.cachedConfigs[path] = data
+            self.cachedStats[path] = self.getFileStat(path)
+
+    @err_catcher(name=__name__)
+    def batch(self, configPath=None, config=None, location=None):
+        if not configPath and config:
+            configPath = self.getConfigPath(config, location=location)
+        elif configPath is None:
+            configPath = self.core.userini
+
+        return ConfigBatch(self, configPath)
+
+    @err_catcher(name=__name__)
+    def beginBatch(self, configPath):
+        with self.lock:
+            if not configPath:
+                return
+
+            configPath = os.path.normpath(configPath)
+            if configPath in self.batches:
+                self.batches[configPath]["depth"] += 1
+                return
+
+            if not os.path.exists(os.path.dirname(configPath)):
+                os.makedirs(os.path.dirname(configPath))
+
+            self.isCacheValid(configPath)
+            lf = Lockfile.Lockfile(self.core, configPath)
+            try:
+                lf.acquire()
+            except Lockfile.LockfileException:
+                lf = None
+
+            self.batches[configPath] = {"depth": 1, "lock": lf, "dirty": False}
+
+    @err_catcher(name=__name__)
+    def endBatch(self, configPath):
+        with self.lock:
+            if not configPath:
+                return
+
+            configPath = os.path.normpath(configPath)
+            batch = self.batches.get(configPath)
+            if not batch:
+                return
+
+            batch["depth"] -= 1
+            if batch["depth"] > 0:
+                return
+
+            lf = batch["lock"]
+            try:
+                if batch["dirty"]:
+                    self.writeConfig(configPath, self.cachedConfigs.get(configPath), lockfile=lf)
+            finally:
+                del self.batches[configPath]
+                if lf:
+                    lf.release()
+
+    @err_catcher(name=__name__)
+    def readConfig(self, configPath):
+        # a process with an active batch already holds the exclusive lock
+        if configPath in self.batches:
+            return self.readYaml(configPath)
+
+        lf = Lockfile.Lockfile(self.core, configPath, mode="shared")
+        try:
+            lf.acquire()
+        except Lockfile.LockfileException:
+            # reading a config, which is being written, is still better than
+            # not reading it at all
+            logger.warning("reading config without lock: %s" % configPath)
+            lf = None
+
+        try:
+            return self.readYaml(configPath)
+        finally:
+            if lf:
+                lf.release()
+
+    @err_catcher(name=__name__)
+    def getLockStats(self):
+        return Lockfile.getStats()
+
+    @err_catcher(name=__name__)
+    def writeConfig(self, configPath, configData, lockfile=None):
+        if not os.path.exists(os.path.dirname(configPath)):
+            os.makedirs(os.path.dirname(configPath))
+
+        try:
+            if lockfile and lockfile.isLocked:
+                self.writeYaml(path=configPath, data=configData)
+                self.cacheConfig(configPath, configData)
+            else:
+                lf = Lockfile.Lockfile(self.core, configPath)
+                with lf:
+                    self.writeYaml(path=configPath, data=configData)
+                    self.cacheConfig(configPath, configData)
+        except Lockfile.LockfileException:
+            self.clearCache(configPath)
+            return False
+
+        return True
 
     @err_catcher(name=__name__)
     def createUserPrefs(self):
@@ -183,10 +363,15 @@ class ConfigManager(object):
         isUserConfig = configPath == self.core.userini
         configPath = os.path.normpath(configPath)
 
-        if isUserConfig and not os.path.exists(configPath):
-            self.createUserPrefs()
+        if self.isCacheValid(configPath):
+            configExists = True
+        else:
+            if isUserConfig and not os.path.exists(configPath):
+                self.createUserPrefs()
 
-        if not os.path.exists(configPath) and not self.findDeprecatedConfig(configPath):
+            configExists = os.path.exists(configPath)
+
+        if not configExists and not self.findDeprecatedConfig(configPath):
             if dft is not None:
                 self.setConfig(cat=cat, param=param, val=dft, configPath=configPath, config=config)
             return dft
@@ -194,10 +379,9 @@ class ConfigManager(object):
         if os.path.splitext(configPath)[1] == ".ini":
             configPath = self.convertDeprecatedConfig(configPath)
 
-        if configPath in self.cachedConfigs:
-            configData = self.cachedConfigs[configPath]
-        else:
-            configData = self.readYaml(configPath)
+        isCached, configData = self.getCachedConfig(configPath)
+        if not isCached:
+            configData = self.readConfig(configPath)
             if not configData and isUserConfig:
                 warnStr = """The Prism preferences file seems to be corrupt.
 
@@ -206,9 +390,9 @@ You will need to set your last project again, but no project files (like scenefi
 
                 self.core.popup(warnStr)
                 self.createUserPrefs()
-                configData = self.readYaml(configPath)
+                configData = self.readConfig(configPath)
 
-            self.cachedConfigs[configPath] = configData
+            self.cacheConfig(configPath, configData)
 
         if configData is None:
             configData = OrderedDict([])
@@ -217,6 +401,9 @@ You will need to set your last project again, but no project files (like scenefi
             cat = param
             param = None
 
+        # the returned data is shared with the cache and must not be
+        # modified. setConfig never modifies the cached data, so previous
+        # results don't change either
         if not cat:
             return configData
         elif not param:
@@ -243,19 +430,41 @@ You will need to set your last project again, but no project files (like scenefi
             return
 
         isUserConfig = configPath == self.core.userini
+        configPath = os.path.normpath(configPath)
+
+        # the whole read-modify-write happens under the lock, so that
+        # concurrent changes of the same config don't get lost
+        with self.lock:
+            self.updateConfig(
+                configPath,
+                isUserConfig,
+                cat=cat,
+                param=param,
+                val=self.copyValue(val),
+                data=self.copyValue(data),
+                delete=delete,
+            )
+
+    @err_catcher(name=__name__)
+    def updateConfig(self, configPath, isUserConfig, cat, param, val, data, delete):
+        # the cached data is only used when the file didn't change on disk
+        # since it was cached. It is shared with the results of getConfig,
+        # so the dicts, which get modified, are copied first
+        isCached, configData = self.getCachedConfig(configPath)
+        if not isCached:
+            configData = self.readConfig(configPath)
 
-        configData = self.readYaml(configPath)
         if configData is None:
             configData = OrderedDict([])
 
         if isUserConfig and not data and not configData:
             self.createUserPrefs()
-            configData = self.readYaml(configPath)
+            configData = self.readConfig(configPath)
             if configData is None:
                 return
 
         if data:
-            self.updateNestedDicts(configData, data)
+            configData = self.updateNestedDicts(configData, data)
         else:
             if param and not cat:
                 cat = param
@@ -263,9 +472,13 @@ You will need to set your last project again, but no project files (like scenefi
 
             if param is None and delete:
                 if cat in configData:
+                    configData = copy.copy(configData)
                     del configData[cat]
             else:
-                if cat and cat not in configData and param:
+                configData = copy.copy(configData)
+                if cat in configData and param is not None:
+                    configData[cat] = copy.copy(configData[cat])
+                elif cat and param:
                     configData[cat] = OrderedDict([])
 
                 if delete:
@@ -283,20 +496,25 @@ You will need to set your last project again, but no project files (like scenefi
                     else:
                         configData = val
 
-        if not os.path.exists(os.path.dirname(configPath)):
-            os.makedirs(os.path.dirname(configPath))
+        if configPath in self.batches:
+            self.cachedConfigs[configPath] = configData
+            self.batches[configPath]["dirty"] = True
+            return
 
-        lf = Lockfile.Lockfile(self.core, configPath)
-        try:
-            with lf:
-                self.writeYaml(path=configPath, data=configData)
-        except Lockfile.LockfileException:
-            pass
-        else:
-            self.cachedConfigs[os.path.normpath(configPath)] = configData
+        self.writeConfig(configPath, configData)
+
+    @err_catcher(name=__name__)
+    def copyValue(self, val):
+        if isinstance(val, (dict, list)):
+            return copy.deepcopy(val)
+
+        return val
 
     @err_catcher(name=__name__)
     def updateNestedDicts(self, d, u):
+        # returns an updated copy of "d", which shares the unchanged values
+        # with "d"
+        d = copy.copy(d)
         for k, v in u.items():
             if isinstance(v, collections.Mapping):
                 d[k] = self.updateNestedDicts(d.get(k, OrderedDict([])), v)
@@ -305,27 +523,153 @@ You will need to set your last project again, but no project files (like scenefi
         return d
 
     @err_catcher(name=__name__)
-    def readYaml(self, path=None, data=None, stream=None):
-        logger.debug("read from config: %s" % path)
+    def hasCYaml(self):
+        if self.cYaml is None:
+            try:
+                from ruamel.yaml import main
+
+                self.cYaml = bool(main.CParser and main.CEmitter)
+            except Exception:
+                self.cYaml = False
+
+            logger.debug("libyaml available: %s" % self.cYaml)
+
+        return self.cYaml
+
+    @err_catcher(name=__name__)
+    def getYamlRepresenter(self):
+        if self.yamlRepresenter:
+            return self.yamlRepresenter
+
+        from ruamel.yaml.representer import SafeRepresenter
+
+        # keeps the key order of the configs and writes OrderedDicts and
+        # roundtrip containers as plain mappings and sequences
+        class PrismRepresenter(SafeRepresenter):
+            sort_base_mapping_type_on_output = False
 
+        PrismRepresenter.add_representer(OrderedDict, SafeRepresenter.represent_dict)
+        PrismRepresenter.add_multi_representer(OrderedDict, SafeRepresenter.represent_dict)
+        PrismRepresenter.add_multi_representer(dict, SafeRepresenter.represent_dict)
+        PrismRepresenter.add_multi_representer(list, SafeRepresenter.represent_list)
+        self.yamlRepresenter = PrismRepresenter
+        return self.yamlRepresenter
+
+    @err_catcher(name=__name__)
+    def getYaml(self, fast=True):
         try:
             from ruamel.yaml import YAML
         except:
             self.core.missingModule("ruamel.yaml")
             return
 
-        yaml = YAML()
+        # the libyaml loader returns plain dicts, which keep their order only
+        # in Python 3
+        if fast and sys.version[0] == "3" and self.hasCYaml():
+            yaml = YAML(typ="safe", pure=False)
+            yaml.Representer = self.getYamlRepresenter()
+            yaml.default_flow_style = False
+            yaml.allow_unicode = True
+            yaml.sort_base_mapping_type_on_output = False
+        else:
+            yaml = YAML()
+
+        return yaml
+
+    @err_catcher(name=__name__)
+    def getSidecarPath(self, path):
+        key = "%s_py%s" % (os.path.normcase(os.path.abspath(path)), sys.version[0])
+        name = hashlib.md5(key.encode("utf-8")).hexdigest() + ".pickle"
+        return os.path.join(self.getUserConfigDir(), "Cache", "configs", name)
+
+    @err_catcher(name=__name__)
+    def shouldUseSidecar(self, path, stat):
+        if not self.useSidecars or not stat:
+            return False
+
+        return stat[1] >= self.sidecarMinSize
+
+    @err_catcher(name=__name__)
+    def readSidecar(self, path, stat):
+        sidecarPath = self.getSidecarPath(path)
+        if not os.path.exists(sidecarPath):
+            return
+
+        try:
+            with open(sidecarPath, "rb") as f:
+                header = pickle.load(f)
+                if header != {
+                    "version": self.sidecarVersion,
+                    "path": path,
+                    "stat": stat,
+                }:
+                    return
+
+                data = pickle.load(f)
+        except Exception as e:
+            logger.debug("failed to read config sidecar %s: %s" % (sidecarPath, e))
+            return
+
+        logger.debug("read from config sidecar: %s" % path)
+        return data
+
+    @err_catcher(name=__name__)
+    def writeSidecar(self, path, stat, data):
+        sidecarPath = self.getSidecarPath(path)
+        tmpPath = "%s.%s_%s.tmp" % (sidecarPath, os.getpid(), threading.current_thread().ident)
+        header = {"version": self.sidecarVersion, "path": path, "stat": stat}
+        try:
+            if not os.path.exists(os.path.dirname(sidecarPath)):
+                os.makedirs(os.path.dirname(sidecarPath))
+
+            # protocol 2 can be read by Python 2 and 3
+            with open(tmpPath, "wb") as f:
+                pickle.dump(header, f, 2)
+                pickle.dump(data, f, 2)
+
+            if hasattr(os, "replace"):
+                os.replace(tmpPath, sidecarPath)
+            else:
+                if os.path.exists(sidecarPath):
+                    os.remove(sidecarPath)
+                os.rename(tmpPath, sidecarPath)
+        except Exception as e:
+            logger.debug("failed to write config sidecar %s: %s" % (sidecarPath, e))
+            if os.path.exists(tmpPath):
+                try:
+                    os.remove(tmpPath)
+                except Exception:
+                    pass
+
+    @err_catcher(name=__name__)
+    def readYaml(self, path=None, data=None, stream=None):
+        logger.debug("read from config: %s" % path)
+
+        yaml = self.getYaml()
+        if not yaml:
+            return
+
         yamlData = OrderedDict([])
         if path:
             if not os.path.exists(path):
                 return yamlData
 
+            stat = self.getFileStat(path)
+            useSidecar = self.shouldUseSidecar(path, stat)
+            if useSidecar:
+                sidecarData = self.readSidecar(path, stat)
+                if sidecarData is not None:
+                    return sidecarData
+
             with open(path, "r") as config:
                 try:
                     yamlData = yaml.load(config)
                 except Exception:
                     self.core.popup("Failed to open file: %s" % path)
                     return yamlData
+
+            if useSidecar and yamlData is not None:
+                self.writeSidecar(path, stat, yamlData)
         else:
             if not stream:
                 if not data:
@@ -340,27 +684,56 @@ You will need to set your last project again, but no project files (like scenefi
         return yamlData
 
     @err_catcher(name=__name__)
-    def writeYaml(self, path=None, data=None, stream=None):
-        logger.debug("write to config: %s" % path)
-        if not data:
+    def dumpCYaml(self, data):
+        if sys.version[0] != "3" or not self.hasCYaml():
             return
 
+        stream = StringIO()
         try:
-            from ruamel.yaml import YAML
-        except:
-            self.core.missingModule("ruamel.yaml")
+            self.getYaml().dump(data, stream)
+        except Exception as e:
+            # the libyaml dumper only handles the basic types
+            logger.debug("falling back to the roundtrip yaml dumper: %s" % e)
+            return
+
+        return stream.getvalue()
+
+    @err_catcher(name=__name__)
+    def writeYaml(self, path=None, data=None, stream=None):
+        logger.debug("write to config: %s" % path)
+        if not data:
             return
 
-        yaml = YAML()
+        # the data is dumped before the file gets opened, so that a failed
+        # dump doesn't leave a truncated config behind
+        yamlStr = self.dumpCYaml(data)
+        if yamlStr is None:
+            yaml = self.getYaml(fast=False)
+            if not yaml:
+                return
 
         if path:
             if not os.path.exists(os.path.dirname(path)):
                 os.makedirs(os.path.dirname(path))
 
+            # the file gets replaced atomically, so that readers, which don't
+            # lock the file, never see a partially written config
+            tmpPath = "%s.%s_%s.tmp" % (path, os.getpid(), threading.current_thread().ident)
             try:
-                with open(path, "w") as config:
-                    yaml.dump(data, config)
+                with open(tmpPath, "w") as config:
+                    if yamlStr is None:
+                        yaml.dump(data, config)
+                    else:
+                        config.write(yamlStr)
+
+                self.replaceFile(tmpPath, path)
             except Exception as e:
+                if os.path.exists(tmpPath):
+                    try:
+                        os.remove(tmpPath)
+                    except OSError:
+                        pass
+
                 if getattr(e, "errno", None) == 28:
                     self.core.popup("Not enough diskspace to save config:\n\n%s" % path)
                 else:
@@ -369,9 +742,34 @@ You will need to set your last project again, but no project files (like scenefi
             if not stream:
                 stream = StringIO()
 
-            yaml.dump(data, stream)
+            if yamlStr is None:
+                yaml.dump(data, stream)
+            else:
+                stream.write(yamlStr)
+
             return stream.getvalue()
 
+    @err_catcher(name=__name__)
+    def replaceFile(self, src, dst):
+        if not hasattr(os, "replace"):
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.rename(src, dst)
+            return
+
+        # on Windows a file can't be replaced while another process has it
+        # open for reading
+        startTime = time.time()
+        while True:
+            try:
+                os.replace(src, dst)
+                return
+            except OSError:
+                if platform.system() != "Windows" or time.time() - startTime > 2:
+                    raise
+
+            time.sleep(0.02)
+
     @err_catcher(name=__name__)
     def readJson(self, path=None, stream=None, data=None):
         logger.debug("read from config: %s" % path)
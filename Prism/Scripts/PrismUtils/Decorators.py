@@ -46,10 +46,17 @@ except:
     from PySide.QtCore import *
     from PySide.QtGui import *
 
+from PrismUtils import ThreadUtils
+
 
 logger = logging.getLogger(__name__)
 
 
+# Errors get written to the error logs. In the main thread they are shown in
+# a popup or, without a UI, raised as RuntimeError by core.writeErrorLog. In
+# worker threads they are only logged and the function returns None. Worker
+# threads, which called ThreadUtils.setRaiseErrors(True), get the exception
+# re-raised, so that it reaches the thread, which waits for them.
 def err_handler(func, name="", plugin=False):
     @wraps(func)
     def func_wrapper(*args, **kwargs):
@@ -73,6 +80,8 @@ def err_handler(func, name="", plugin=False):
                 traceback.format_exc(),
             )
             args[0].core.writeErrorLog(erStr)
+            if ThreadUtils.raisesErrors() and not ThreadUtils.isMainThread():
+                raise e
 
     return func_wrapper
 
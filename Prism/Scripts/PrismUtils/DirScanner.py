@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import stat
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+from PrismUtils import ThreadUtils
+
+logger = logging.getLogger(__name__)
+
+poolLock = threading.Lock()
+pool = None
+threadData = threading.local()
+
+
+# Directory entry with the type and (optionally) the mtime and size of a
+# file, which are collected while the directory gets scanned. os.scandir gets
+# the type from the directory listing itself on most platforms, so only the
+# mtime and size of files require an additional stat call.
+class ScanEntry(object):
+    __slots__ = ["name", "path", "isDir", "mtime", "size"]
+
+    def __init__(self, name, path, isDir, mtime=None, size=None):
+        self.name = name
+        self.path = path
+        self.isDir = isDir
+        self.mtime = mtime
+        self.size = size
+
+    def __repr__(self):
+        return "<ScanEntry %s%s>" % (self.path, os.sep if self.isDir else "")
+
+
+def getPool():
+    global pool
+    with poolLock:
+        if pool is None:
+            try:
+                threads = min(4, multiprocessing.cpu_count())
+            except NotImplementedError:
+                threads = 2
+
+            pool = ThreadPool(max(2, threads), initializer=initWorker)
+            atexit.register(closePool)
+
+        return pool
+
+
+def closePool():
+    global pool
+    with poolLock:
+        if pool is not None:
+            pool.terminate()
+            pool = None
+
+
+def initWorker():
+    threadData.isWorker = True
+    # errors are raised in the thread, which called mapPaths
+    ThreadUtils.setRaiseErrors(True)
+
+
+def scanDir(path, statFiles=False):
+    # returns the entries of a directory or None if it doesn't exist
+    entries = []
+    try:
+        if scandir:
+            for entry in scandir(path):
+                try:
+                    isDir = entry.is_dir()
+                    if statFiles and not isDir:
+                        st = entry.stat()
+                        entries.append(
+                            ScanEntry(entry.name, entry.path, isDir, st.st_mtime, st.st_size)
+                        )
+                    else:
+                        entries.append(ScanEntry(entry.name, entry.path, isDir))
+                except OSError:
+                    # the file got removed while scanning
+                    continue
+        else:
+            for name in os.listdir(path):
+                entryPath = os.path.join(path, name)
+                try:
+                    st = os.stat(entryPath)
+                except OSError:
+                    continue
+
+                entries.append(
+                    ScanEntry(name, entryPath, stat.S_ISDIR(st.st_mode), st.st_mtime, st.st_size)
+                )
+    except OSError:
+        return
+
+    return entries
+
+
+def mapPaths(func, paths):
+    # calls func for every path on the scanner threads. Single paths and
+    # calls from inside a scanner thread are processed directly, because
+    # waiting for the pool from inside the pool could deadlock
+    paths = list(paths)
+    if len(paths) < 2 or getattr(threadData, "isWorker", False):
+        return [func(path) for path in paths]
+
+    # the first path gets processed in the calling thread while the pool
+    # processes the other paths
+    result = getPool().map_async(func, paths[1:])
+    first = func(paths[0])
+    return [first] + result.get()
+
+
+def scanDirs(paths, statFiles=False):
+    # scans multiple directories (for example the global and the local
+    # version of a folder) concurrently. Returns a list of entries per path
+    return mapPaths(lambda x: scanDir(x, statFiles=statFiles), paths)
+
+
+def getDirNames(paths):
+    # returns a list of foldernames for every path. Missing paths return an
+    # empty list like os.walk would
+    result = []
+    for entries in scanDirs(paths):
+        result.append([x.name for x in entries or [] if x.isDir])
+
+    return result
+
+
+# Caches directory listings. A directory's mtime changes whenever a direct
+# child gets added, removed or renamed, so an entry gets validated with a
+# single stat of the directory and only rescanned when the mtime differs.
+# Directories modified more recently than "mtimeResolution" are always
+# rescanned, because some filesystems only store mtimes with a 1-2 sec
+# resolution. Entries are dicts with the keys "mtime", "volatile", "dirs"
+# and "files" ({filename: [mtime, size]} or {filename: None} if statFiles is
+# False). Subclasses can override getKey and scanDir and can add keys to the
+# entries in scanDir.
+class DirCache(object):
+    def __init__(self, statFiles=True, maxDirs=None, validationInterval=0):
+        self.statFiles = statFiles
+        self.maxDirs = maxDirs
+        # seconds in which a validated entry is trusted without another stat
+        self.validationInterval = validationInterval
+        self.mtimeResolution = 2
+        self.lock = threading.RLock()
+        self.entries = {}
+        # time of the last validation of every entry
+        self.checked = {}
+
+    def getKey(self, path):
+        return path
+
+    def getEntry(self, path, recheck=False):
+        # returns the entry of a directory or None if it doesn't exist.
+        # "recheck" validates the entry even if it was validated within the
+        # validationInterval
+        key = self.getKey(path)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if (
+                entry
+                and not recheck
+                and now - self.checked.get(key, 0) < self.validationInterval
+            ):
+                return entry
+
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            with self.lock:
+                self.checked.pop(key, None)
+                if self.entries.pop(key, None) is not None:
+                    self.entryChanged(key, None)
+            return
+
+        if entry and entry["mtime"] == mtime and not entry.get("volatile"):
+            with self.lock:
+                self.checked[key] = now
+            return entry
+
+        newEntry = self.scanDir(path, mtime, entry)
+        newEntry["volatile"] = (now - mtime) < self.mtimeResolution
+        with self.lock:
+            self.entries[key] = newEntry
+            self.checked[key] = now
+            self.entryChanged(key, newEntry)
+            self.trim()
+
+        return newEntry
+
+    def scanDir(self, path, mtime, previous=None):
+        # "previous" is the outdated entry of the directory or None
+        dirs = []
+        files = {}
+        for scanEntry in scanDir(path, statFiles=self.statFiles) or []:
+            if scanEntry.isDir:
+                dirs.append(scanEntry.name)
+            elif self.statFiles:
+                files[scanEntry.name] = [scanEntry.mtime, scanEntry.size]
+            else:
+                files[scanEntry.name] = None
+
+        return {
+            "mtime": mtime,
+            "dirs": sorted(dirs),
+            "files": files,
+        }
+
+    def entryChanged(self, key, entry):
+        # called with the lock held after an entry got rescanned or removed
+        pass
+
+    def trim(self):
+        # removes the least recently used entries if there are more than
+        # maxDirs entries
+        if not self.maxDirs or len(self.entries) <= self.maxDirs:
+            return
+
+        keys = sorted(self.entries, key=lambda x: self.checked.get(x, 0))
+        for key in keys[:len(self.entries) - self.maxDirs]:
+            del self.entries[key]
+            self.checked.pop(key, None)
+
+    def validateFile(self, path, entry=None):
+        # the mtime of a directory doesn't change when a file inside of it
+        # gets modified in place, so the cached mtime and size of a single
+        # file get validated with a stat of the file itself.
+        # Returns [mtime, size] or None if the file doesn't exist. "entry" is
+        # the already validated entry of the directory
+        dirPath, name = os.path.split(path)
+        entry = entry or self.getEntry(dirPath)
+        if not entry or name not in entry["files"]:
+            return
+
+        try:
+            stats = os.stat(path)
+        except OSError:
+            self.invalidate(dirPath)
+            return
+
+        fileInfo = [stats.st_mtime, stats.st_size]
+        if not self.statFiles:
+            return fileInfo
+
+        with self.lock:
+            if entry["files"].get(name) != fileInfo:
+                entry["files"][name] = fileInfo
+                self.entryChanged(self.getKey(dirPath), entry)
+
+        return fileInfo
+
+    def getEntries(self, paths, recheck=False):
+        # validates the entries of multiple directories concurrently
+        return mapPaths(lambda x: self.getEntry(x, recheck=recheck), paths)
+
+    def invalidate(self, path=None):
+        # the entry gets rescanned the next time it's used
+        with self.lock:
+            if path is None:
+                self.entries = {}
+                self.checked = {}
+                return
+
+            key = self.getKey(path)
+            self.checked.pop(key, None)
+            entry = self.entries.get(key)
+            if entry:
+                entry["volatile"] = True
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import json
+import logging
+import threading
+
+from PrismUtils.Decorators import err_catcher
+from PrismUtils import DirScanner
+
+
+logger = logging.getLogger(__name__)
+
+
+# The index caches the directory listings of the entity hierarchy (asset
+# folders, assets, shots, steps, categories and scenefiles) in a
+# DirScanner.DirCache. Entries inside the project are persisted to
+# "00_Pipeline/Cache" so that a new session starts with a warm index.
+class EntityIndex(DirScanner.DirCache):
+    indexVersion = 3
+
+    def __init__(self, core):
+        # validated entries are trusted for 0.5 sec without another stat.
+        # This only dedupes the repeated lookups of a single refresh
+        super(EntityIndex, self).__init__(statFiles=True, validationInterval=0.5)
+        self.core = core
+        self.clear()
+
+    @err_catcher(name=__name__)
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.checked = {}
+            self.projectPath = None
+            self.indexPath = None
+            self.dirty = False
+
+    @err_catcher(name=__name__)
+    def getIndexPath(self):
+        if not self.core.prismIni:
+            return
+
+        return os.path.join(
+            os.path.dirname(self.core.prismIni), "Cache", "entityIndex.json"
+        )
+
+    @err_catcher(name=__name__)
+    def ensureLoaded(self):
+        projectPath = getattr(self.core, "projectPath", None)
+        if projectPath == self.projectPath:
+            return
+
+        with self.lock:
+            self.clear()
+            self.projectPath = projectPath
+            self.indexPath = self.getIndexPath()
+            if not self.indexPath or not os.path.exists(self.indexPath):
+                return
+
+            try:
+                with open(self.indexPath, "r") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.debug("failed to load entity index %s: %s" % (self.indexPath, e))
+                return
+
+            if data.get("version") != self.indexVersion:
+                return
+
+            entries = data.get("entries", {})
+            self.entries = entries
+            logger.debug("loaded entity index: %s (%s entries)" % (self.indexPath, len(entries)))
+
+    @err_catcher(name=__name__)
+    def save(self):
+        with self.lock:
+            if not self.dirty or not self.indexPath:
+                return
+
+            entries = dict(
+                (k, v) for k, v in self.entries.items() if not v.get("local")
+            )
+            data = {
+                "version": self.indexVersion,
+                "entries": entries,
+            }
+            self.dirty = False
+
+        indexDir = os.path.dirname(self.indexPath)
+        tmpPath = "%s.%s_%s.tmp" % (self.indexPath, os.getpid(), threading.current_thread().ident)
+        try:
+            if not os.path.exists(indexDir):
+                os.makedirs(indexDir)
+
+            with open(tmpPath, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+
+            self.replaceFile(tmpPath, self.indexPath)
+        except Exception as e:
+            # the index is only an optimization. A read-only project share
+            # still works, the index just won't be persisted
+            logger.debug("failed to save entity index %s: %s" % (self.indexPath, e))
+            if os.path.exists(tmpPath):
+                try:
+                    os.remove(tmpPath)
+                except Exception:
+                    pass
+
+    @err_catcher(name=__name__)
+    def replaceFile(self, src, dst):
+        if hasattr(os, "replace"):
+            os.replace(src, dst)
+        else:
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.rename(src, dst)
+
+    @err_catcher(name=__name__)
+    def getKey(self, path):
+        # entries inside the project use relative keys, so that the
+        # persisted index works with other project roots too
+        path = os.path.normpath(path)
+        if not self.projectPath:
+            return path
+
+        prjPath = os.path.normpath(self.projectPath)
+        if path == prjPath or path.startswith(prjPath.rstrip(os.sep) + os.sep):
+            return path[len(prjPath):].replace("\\", "/").strip("/")
+
+        return path
+
+    @err_catcher(name=__name__)
+    def isPersistent(self, key):
+        return not os.path.isabs(key)
+
+    @err_catcher(name=__name__)
+    def getEntry(self, path, recheck=False):
+        self.ensureLoaded()
+        return super(EntityIndex, self).getEntry(path, recheck=recheck)
+
+    @err_catcher(name=__name__)
+    def entryChanged(self, key, entry):
+        if self.isPersistent(key):
+            self.dirty = True
+        elif entry:
+            # local files are user specific and don't get persisted
+            entry["local"] = True
+
+    @err_catcher(name=__name__)
+    def getEntries(self, paths, recheck=False):
+        # validates the entries of multiple roots (like the global and local
+        # folder of an entity) concurrently
+        self.ensureLoaded()
+        return super(EntityIndex, self).getEntries(paths, recheck=recheck)
+
+    @err_catcher(name=__name__)
+    def getMergedDirs(self, paths):
+        dirs = set()
+        for entry in self.getEntries(paths):
+            if entry:
+                dirs.update(entry["dirs"])
+
+        return sorted(dirs)
+
+    @err_catcher(name=__name__)
+    def invalidate(self, path):
+        self.ensureLoaded()
+        super(EntityIndex, self).invalidate(path)
+
+    @err_catcher(name=__name__)
+    def exists(self, path):
+        return self.getEntry(path) is not None
+
+    @err_catcher(name=__name__)
+    def getDirs(self, path):
+        entry = self.getEntry(path)
+        if not entry:
+            return []
+
+        return list(entry["dirs"])
+
+    @err_catcher(name=__name__)
+    def getFiles(self, path):
+        entry = self.getEntry(path)
+        if not entry:
+            return []
+
+        return sorted(entry["files"])
+
+    @err_catcher(name=__name__)
+    def getContent(self, path, recheck=False):
+        entry = self.getEntry(path, recheck=recheck)
+        if not entry:
+            return []
+
+        return entry["dirs"] + sorted(entry["files"])
+
+    @err_catcher(name=__name__)
+    def setEntryData(self, path, entry, section, key, value):
+        # stores derived data (like the highest version of a folder) in the
+        # entry. It gets dropped when the entry gets rescanned
+        with self.lock:
+            entry.setdefault(section, {})[key] = value
+            self.entryChanged(self.getKey(path), entry)
+
+    @err_catcher(name=__name__)
+    def getFileMtime(self, path):
+        self.ensureLoaded()
+        fileInfo = self.validateFile(path)
+        if fileInfo:
+            return fileInfo[0]
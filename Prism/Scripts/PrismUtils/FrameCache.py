@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import logging
+import threading
+import traceback
+import multiprocessing
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+# Memory bounded LRU cache for decoded media frames. The cache holds QImages
+# (not QPixmaps), because they can be created in worker threads. Entries are
+# keyed by (filepath, frame, width, height) and store the mtime of the file
+# they were decoded from, so that a rerendered frame doesn't show the old
+# image.
+class FrameCache(object):
+    def __init__(self, maxBytes=512 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.frames = OrderedDict()
+            self.curBytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def getImageSize(self, image):
+        if hasattr(image, "sizeInBytes"):
+            return image.sizeInBytes()
+
+        return image.byteCount()
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.frames
+
+    def get(self, key, mtime=None):
+        with self.lock:
+            entry = self.frames.pop(key, None)
+            if entry is None or (mtime is not None and entry[0] != mtime):
+                if entry is not None:
+                    self.curBytes -= entry[2]
+
+                self.misses += 1
+                return
+
+            self.frames[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def insert(self, key, image, mtime=None):
+        size = self.getImageSize(image)
+        if size > self.maxBytes:
+            return
+
+        with self.lock:
+            oldEntry = self.frames.pop(key, None)
+            if oldEntry is not None:
+                self.curBytes -= oldEntry[2]
+
+            self.frames[key] = (mtime, image, size)
+            self.curBytes += size
+            while self.curBytes > self.maxBytes and self.frames:
+                oldKey, oldEntry = self.frames.popitem(last=False)
+                self.curBytes -= oldEntry[2]
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "frames": len(self.frames),
+                "bytes": self.curBytes,
+                "maxBytes": self.maxBytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Decodes frames ahead of the playhead on a small pool of worker threads.
+# Every media playback ("owner") has its own list of pending frames, which
+# gets replaced with every new request, so frames which are no longer needed
+# after a jump of the playhead are never decoded.
+class FramePrefetcher(object):
+    def __init__(self, media, cache, threads=None):
+        self.media = media
+        self.cache = cache
+        if threads is None:
+            try:
+                threads = min(4, max(1, multiprocessing.cpu_count() - 1))
+            except NotImplementedError:
+                threads = 2
+
+        self.numThreads = threads
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.inProgress = set()
+        self.workers = []
+        self.active = True
+
+    def startWorkers(self):
+        self.workers = [x for x in self.workers if x.is_alive()]
+        while len(self.workers) < self.numThreads:
+            worker = threading.Thread(target=self.work, name="PrismFramePrefetch")
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def request(self, owner, jobs):
+        with self.condition:
+            for key in list(self.pending):
+                if self.pending[key]["owner"] == owner:
+                    del self.pending[key]
+
+            for job in jobs:
+                key = job["key"]
+                if key in self.inProgress or key in self.pending:
+                    continue
+
+                if self.cache.contains(key):
+                    continue
+
+                job["owner"] = owner
+                self.pending[key] = job
+
+            if self.pending:
+                self.active = True
+                self.startWorkers()
+                self.condition.notify_all()
+
+    def cancel(self, owner=None):
+        with self.condition:
+            for key in list(self.pending):
+                if owner is None or self.pending[key]["owner"] == owner:
+                    del self.pending[key]
+
+    def shutdown(self):
+        with self.condition:
+            self.active = False
+            self.pending.clear()
+            self.condition.notify_all()
+
+        self.closeReaders()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.active and not self.pending:
+                    self.condition.wait()
+
+                if not self.active:
+                    return
+
+                key, job = self.pending.popitem(last=False)
+                self.inProgress.add(key)
+
+            try:
+                self.decodeJob(job)
+            except Exception:
+                logger.debug("failed to prefetch frame: %s" % traceback.format_exc())
+            finally:
+                with self.condition:
+                    self.inProgress.discard(key)
+
+    def decodeJob(self, job):
+        path = job["path"]
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+
+        image = self.decodeFrame(path, job["frame"], job["width"], job["height"])
+        if image is not None and not image.isNull():
+            self.cache.insert(job["key"], image, mtime=mtime)
+
+    def decodeFrame(self, path, frame, width, height):
+        # videos are read through the shared reader pool of the MediaManager
+        return self.media.getFrameImage(path, frame=frame, width=width, height=height)
+
+    def closeReaders(self, path=None):
+        self.media.videoReaders.close(path)
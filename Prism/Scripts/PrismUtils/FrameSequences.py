@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+# Detection of frame sequences in directory listings. This module only uses
+# the standard library, so that it can be used outside of the Prism UI, for
+# example in the Deadline dependency script.
+
+import os
+import re
+
+
+imageExtensions = [".jpg", ".jpeg", ".png", ".tif", ".tiff", ".exr", ".dpx"]
+videoExtensions = [".mp4", ".mov", ".avi"]
+mediaExtensions = imageExtensions + videoExtensions
+
+# placeholders of the frame number in sequence paths like "shot.####.exr",
+# "shot.@@@@.exr" or "shot.%04d.exr"
+patternExpr = re.compile(r"^(.*?)(#+|@+|%0?(\d*)d|\d+)$")
+digitsExpr = re.compile(r"^(.*?)(\d+)$")
+
+
+def splitExtension(filename):
+    # extensions like ".bgeo.sc" have two parts, if the first part of the
+    # name doesn't end with a frame number or placeholder
+    base, ext = os.path.splitext(filename)
+    if not patternExpr.match(base):
+        base2, ext2 = os.path.splitext(base)
+        if ext2 and patternExpr.match(base2) and not ext2[1:].isdigit():
+            return base2, ext2 + ext
+
+    return base, ext
+
+
+def splitFrame(filename, padding=None):
+    # returns (prefix, frame, suffix) of a filename or None, if the name
+    # doesn't contain a frame number. The frame number are the last digits
+    # before the extension. If "padding" is set, the frame number has at
+    # least that many digits. Digits in front of them only belong to the
+    # frame number if they are separated from the prefix
+    base, ext = splitExtension(filename)
+    match = digitsExpr.match(base)
+    if not match:
+        return
+
+    prefix, digits = match.group(1), match.group(2)
+    if padding:
+        if len(digits) < padding:
+            return
+
+        if len(digits) > padding and prefix and prefix[-1].isalpha():
+            prefix += digits[:-padding]
+            digits = digits[-padding:]
+
+    return prefix, digits, ext
+
+
+def parsePattern(path, padding=None):
+    # parses a sequence path like "shot.####.exr", "shot.%04d.exr" or
+    # "shot.1001.exr". Returns a FrameSequence without frames or None, if
+    # the path doesn't contain a frame placeholder or number
+    directory, filename = os.path.split(path)
+    base, ext = splitExtension(filename)
+    match = patternExpr.match(base)
+    if not match:
+        return
+
+    frame = match.group(2)
+    if frame.isdigit():
+        result = splitFrame(filename, padding=padding)
+        if not result:
+            return
+
+        return FrameSequence(directory, result[0], result[2], len(result[1]))
+
+    if frame.startswith("%"):
+        padding = int(match.group(3) or 1)
+    else:
+        padding = len(frame)
+
+    return FrameSequence(directory, match.group(1), ext, padding)
+
+
+def getFrameRange(frames, separator=","):
+    # compact string of a sorted list of frames like "1001-1010,1015,1020-1030"
+    ranges = []
+    start = prev = None
+    for frame in frames:
+        if start is None:
+            start = prev = frame
+        elif frame == prev + 1:
+            prev = frame
+        else:
+            ranges.append((start, prev))
+            start = prev = frame
+
+    if start is not None:
+        ranges.append((start, prev))
+
+    return separator.join(
+        str(x[0]) if x[0] == x[1] else "%s-%s" % x for x in ranges
+    )
+
+
+def groupFiles(filenames, directory="", padding=None, extensions=None):
+    # groups the files of a directory listing into sequences in a single
+    # pass. Files without a frame number become sequences without frames.
+    # Returns a list of FrameSequences sorted by their first filename
+    groups = {}
+    singles = []
+    for filename in filenames:
+        if extensions is not None:
+            ext = os.path.splitext(filename)[1]
+            if ext not in extensions and ext.lower() not in extensions:
+                continue
+
+        result = splitFrame(filename, padding=padding)
+        if not result:
+            singles.append(FrameSequence(directory, filename, "", None, name=filename))
+            continue
+
+        prefix, digits, suffix = result
+        key = (prefix, suffix)
+        if key not in groups:
+            groups[key] = [[], []]
+
+        groups[key][0].append(int(digits))
+        groups[key][1].append(digits)
+
+    sequences = singles
+    for key, data in groups.items():
+        frames, digits = data
+        # the padding is the width of zero padded frame numbers
+        seqPadding = min(len(x) for x in digits)
+        sequences.append(FrameSequence(directory, key[0], key[1], seqPadding, frames=frames))
+
+    sequences.sort(key=lambda x: x.getFirstFile())
+    return sequences
+
+
+def getSequence(path, filenames, padding=None):
+    # the sequence of "path" in a directory listing
+    directory, filename = os.path.split(path)
+    result = splitFrame(filename, padding=padding)
+    if not result:
+        if filename in filenames:
+            return FrameSequence(directory, filename, "", None, name=filename)
+
+        return
+
+    prefix, digits, suffix = result
+    frames = []
+    for name in filenames:
+        if not name.startswith(prefix) or not name.endswith(suffix):
+            continue
+
+        other = splitFrame(name, padding=padding)
+        if other and other[0] == prefix and other[2] == suffix:
+            frames.append(int(other[1]))
+
+    return FrameSequence(directory, prefix, suffix, len(digits), frames=frames)
+
+
+class FrameSequence(object):
+    def __init__(self, directory, prefix, suffix, padding, frames=None, name=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.padding = padding
+        self.frames = sorted(set(frames or []))
+        self.frameSet = set(self.frames)
+        # the filename of files without a frame number
+        self.name = name
+
+    def __repr__(self):
+        return "FrameSequence(%s, %s)" % (self.getPattern(), self.getFrameRange())
+
+    def __len__(self):
+        return len(self.frames) or (1 if self.name else 0)
+
+    def __contains__(self, frame):
+        return frame in self.frameSet
+
+    @property
+    def isSequence(self):
+        return len(self.frames) > 1
+
+    @property
+    def isVideo(self):
+        ext = self.suffix if self.padding else os.path.splitext(self.name or "")[1]
+        return ext.lower() in videoExtensions
+
+    @property
+    def first(self):
+        return self.frames[0] if self.frames else None
+
+    @property
+    def last(self):
+        return self.frames[-1] if self.frames else None
+
+    @property
+    def gaps(self):
+        # missing frames between the first and the last frame
+        if not self.frames or len(self.frames) == self.last - self.first + 1:
+            return []
+
+        return [x for x in range(self.first, self.last + 1) if x not in self.frameSet]
+
+    def getFrameRange(self, separator=","):
+        return getFrameRange(self.frames, separator=separator)
+
+    def getFilename(self, frame):
+        if self.padding is None:
+            return self.name
+
+        return "%s%0*d%s" % (self.prefix, self.padding, frame, self.suffix)
+
+    def getPath(self, frame):
+        return os.path.join(self.directory, self.getFilename(frame))
+
+    def getFiles(self):
+        if self.padding is None:
+            return [self.name]
+
+        return [self.getFilename(x) for x in self.frames]
+
+    def getPaths(self):
+        return [os.path.join(self.directory, x) for x in self.getFiles()]
+
+    def getFirstFile(self):
+        if self.padding is None or not self.frames:
+            return self.name or self.getPattern()
+
+        return self.getFilename(self.first)
+
+    def getPattern(self, token="#"):
+        # the sequence path with a placeholder like "shot.####.exr". "%d"
+        # creates a printf style placeholder like "shot.%04d.exr"
+        if self.padding is None:
+            return self.name
+
+        if token == "%d":
+            placeholder = "%%0%sd" % self.padding
+        else:
+            placeholder = token * self.padding
+
+        return self.prefix + placeholder + self.suffix
+
+    def getMissingFiles(self, frames, content):
+        # filenames of the frames, which don't exist in a directory listing
+        if self.padding is None:
+            return [] if self.name in content else [self.name]
+
+        return [
+            x for x in (self.getFilename(frame) for frame in frames) if x not in content
+        ]
@@ -31,61 +31,366 @@
 # along with Prism.  If not, see <https://www.gnu.org/licenses/>.
 
 
+
 import os
 import time
+import json
+import uuid
 import errno
+import random
+import socket
+import logging
+import platform
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from PrismUtils import ThreadUtils
+
+
+logger = logging.getLogger(__name__)
+
+lockStats = {}
+statsLock = threading.Lock()
+
+# lockfiles of other hosts, which were seen by this process:
+# {lockPath: [owner signature, local time when it was seen first]}
+lockObservations = {}
 
 
 class LockfileException(Exception):
     pass
 
 
+def recordStats(fileName, key, value=1):
+    with statsLock:
+        if fileName not in lockStats:
+            lockStats[fileName] = {
+                "acquired": 0,
+                "retries": 0,
+                "waitTime": 0.0,
+                "maxWaitTime": 0.0,
+                "staleLocksBroken": 0,
+                "timeouts": 0,
+            }
+
+        stats = lockStats[fileName]
+        if key == "maxWaitTime":
+            stats[key] = max(stats[key], value)
+        else:
+            stats[key] += value
+
+
+def getStats(sortKey="waitTime"):
+    # returns a list of (filename, stats) pairs with the most contended files
+    # first
+    with statsLock:
+        stats = [(name, dict(data)) for name, data in lockStats.items()]
+
+    return sorted(stats, key=lambda x: x[1][sortKey], reverse=True)
+
+
+def resetStats():
+    with statsLock:
+        lockStats.clear()
+
+
+# Locks a file across processes and hosts by creating "<file>.lock" with
+# O_EXCL. The lockfile contains the host, pid and a token of its owner,
+# which is used to detect and break locks of crashed processes. Exclusive
+# locks (writers) own the ".lock" file. Shared locks (readers) don't create
+# any files, they only wait while an exclusive lock exists. Writers replace
+# the file atomically, so readers never see a partially written file.
+# Locks of other hosts are considered stale when the same owner holds them
+# for longer than "staleTimeout" seconds, measured by the clock of this
+# host, so the clocks of the hosts don't have to be in sync.
 class Lockfile(object):
-    def __init__(self, core, fileName, timeout=10, delay=0.05):
+    def __init__(
+        self,
+        core,
+        fileName,
+        timeout=10,
+        delay=0.005,
+        maxDelay=0.5,
+        mode="exclusive",
+        staleTimeout=120,
+    ):
         self.core = core
         self.isLocked = False
-        self.lockPath = fileName + ".lock"
         self.fileName = fileName
+        self.mode = mode
+        self.lockPath = fileName + ".lock"
+        self.token = uuid.uuid4().hex
+
         self.timeout = timeout
         self.delay = delay
+        self.maxDelay = maxDelay
+        # locks of other hosts can't be checked for a running process and
+        # are considered stale after this many seconds
+        self.staleTimeout = staleTimeout
+        self.lockFile = None
+        self.hostname = socket.gethostname()
+
+    def getOwnerInfo(self):
+        return {
+            "host": self.hostname,
+            "pid": os.getpid(),
+            "time": time.time(),
+            "mode": self.mode,
+            "token": self.token,
+        }
+
+    def readOwnerInfo(self, path):
+        try:
+            with open(path, "r") as f:
+                data = f.read()
+        except (IOError, OSError):
+            return
+
+        if not data:
+            # lockfiles of older Prism versions are empty
+            return {}
+
+        try:
+            return json.loads(data)
+        except ValueError:
+            return {}
+
+    def createLockfile(self, path):
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+        if fcntl:
+            # the flock is held as long as the lock exists. If the process
+            # crashes, the OS releases it, which marks the lockfile as stale
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                pass
+
+        os.write(fd, json.dumps(self.getOwnerInfo()).encode("utf-8"))
+        os.fsync(fd)
+
+        return fd
+
+    def isProcessRunning(self, pid):
+        if platform.system() == "Windows":
+            return None
+
+        try:
+            os.kill(pid, 0)
+        except OSError as e:
+            return e.errno == errno.EPERM
+
+        return True
+
+    def isFlocked(self, path):
+        if not fcntl:
+            return None
+
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError) as e:
+            if e.errno in [errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK]:
+                return True
+            return None
+        finally:
+            os.close(fd)
+
+        return False
+
+    def isHeldTooLong(self, path, info):
+        # the lock is stale if it didn't change since this process saw it
+        # for the first time "staleTimeout" seconds ago
+        if info:
+            signature = [info.get("host"), info.get("pid"), info.get("token")]
+        else:
+            # lockfiles of older Prism versions are empty
+            try:
+                signature = [os.path.getmtime(path)]
+            except OSError:
+                return False
+
+        now = time.time()
+        with statsLock:
+            observation = lockObservations.get(path)
+            if not observation or observation[0] != signature:
+                lockObservations[path] = [signature, now]
+                return False
+
+        return now - observation[1] > self.staleTimeout
+
+    def isStale(self, path):
+        info = self.readOwnerInfo(path)
+        if info is None:
+            return False
+
+        if not info:
+            return self.isHeldTooLong(path, info)
+
+        if info.get("host") == self.hostname:
+            running = self.isProcessRunning(info.get("pid"))
+            if running is False:
+                return True
+
+            # protects against reused pids
+            if running and self.isFlocked(path) is False:
+                return True
+
+            if running is None:
+                # Windows doesn't allow to delete files, which are opened by
+                # another process, so removing the lockfile fails as long as
+                # the owner is running
+                return True
+
+            return False
+
+        return self.isHeldTooLong(path, info)
+
+    def breakStaleLock(self, path):
+        info = self.readOwnerInfo(path)
+        if info is None:
+            return False
+
+        # another process could have broken the lock and created a new one
+        # in the meantime, so the lock is only removed if its owner didn't
+        # change
+        if not self.isStale(path) or self.readOwnerInfo(path) != info:
+            return False
+
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+
+        logger.warning(
+            "removed stale lockfile: %s (owner: %s)" % (path, info or "unknown")
+        )
+        recordStats(self.fileName, "staleLocksBroken")
+        return True
+
+    def tryAcquire(self):
+        if self.mode == "shared":
+            # readers only wait for active writers. This is a single stat
+            # and works on read-only shares as well
+            if os.path.exists(self.lockPath):
+                return self.breakStaleLock(self.lockPath)
+
+            return True
+
+        try:
+            self.lockFile = self.createLockfile(self.lockPath)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+            self.breakStaleLock(self.lockPath)
+            return False
+
+        return True
 
     def acquire(self):
         startTime = time.time()
+        delay = self.delay
+        retries = 0
         while True:
-            try:
-                self.lockFile = os.open(self.lockPath, os.O_CREAT|os.O_EXCL|os.O_RDWR)
+            locked = self.tryAcquire()
+
+            if locked:
                 self.isLocked = True
-                break
-            except OSError as e:
-                if e.errno != errno.EEXIST:
-                    raise
-                elif time.time() - startTime >= self.timeout:
-                    msg = "This config seems to be in use by another process:\n\n%s\n\nForcing to write to this file while another process is writing to it could result in data loss.\n\nDo you want to force writing to this file?" % self.fileName
-                    result = self.core.popupQuestion(msg)
-                    if result == "Yes":
-                        if os.path.exists(self.lockPath):
-                            os.remove(self.lockPath)
-                    else:
-                        raise LockfileException("Timeout occurred while writing to file: %s" % self.fileName)
-
-                time.sleep(self.delay)
+                waitTime = time.time() - startTime
+                recordStats(self.fileName, "acquired")
+                recordStats(self.fileName, "retries", retries)
+                recordStats(self.fileName, "waitTime", waitTime)
+                recordStats(self.fileName, "maxWaitTime", waitTime)
+                if retries:
+                    logger.debug(
+                        "acquired %s lock after %.3fs (%s retries): %s"
+                        % (self.mode, waitTime, retries, self.fileName)
+                    )
+                return
 
-    def release(self):
-        if self.isLocked:
+            if time.time() - startTime >= self.timeout:
+                recordStats(self.fileName, "timeouts")
+                if self.mode == "shared" or not self.askForceWrite():
+                    self.abort()
+                    raise LockfileException("Timeout occurred while writing to file: %s" % self.fileName)
+
+                if self.lockFile is None and os.path.exists(self.lockPath):
+                    os.remove(self.lockPath)
+
+                startTime = time.time()
+
+            retries += 1
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.maxDelay)
+
+    def askForceWrite(self):
+        # popups can only be shown from the main thread
+        if not ThreadUtils.isMainThread():
+            return False
+
+        info = self.readOwnerInfo(self.lockPath)
+        owner = ""
+        if info:
+            owner = "\n\nLocked by: %s (process %s) since %s" % (
+                info.get("host"),
+                info.get("pid"),
+                time.strftime("%X", time.localtime(info.get("time", 0))),
+            )
+
+        msg = "This config seems to be in use by another process:\n\n%s%s\n\nForcing to write to this file while another process is writing to it could result in data loss.\n\nDo you want to force writing to this file?" % (self.fileName, owner)
+        result = self.core.popupQuestion(msg)
+        return result == "Yes"
+
+    def closeLockfile(self, remove=True):
+        if self.lockFile is None:
+            return
+
+        isWindows = platform.system() == "Windows"
+        if isWindows:
             os.close(self.lockFile)
-            startTime = time.time()
-            while True:
-                try:
-                    if os.path.exists(self.lockPath):
-                        os.remove(self.lockPath)
+
+        if remove:
+            self.removeLockfile()
+
+        if not isWindows:
+            os.close(self.lockFile)
+
+        self.lockFile = None
+
+    def removeLockfile(self):
+        info = self.readOwnerInfo(self.lockPath)
+        if info and info.get("token") != self.token:
+            # the lock was broken by another process
+            logger.warning("lockfile was taken over by another process: %s" % self.lockPath)
+            return
+
+        startTime = time.time()
+        while True:
+            try:
+                if os.path.exists(self.lockPath):
+                    os.remove(self.lockPath)
+                break
+            except:
+                if time.time() - startTime >= self.timeout:
+                    self.core.popup("Couldn't remove lockfile:\n\n%s\n\nIt might be used by another process. Prism won't be able to write to this file as long as it's lockfile exists." % self.lockPath)
                     break
-                except:
-                    if time.time() - startTime >= self.timeout:
-                        self.core.popup("Couldn't remove lockfile:\n\n%s\n\nIt might be used by another process. Prism won't be able to write to this file as long as it's lockfile exists." % self.lockPath)
-                        break
 
-                time.sleep(self.delay)
+            time.sleep(0.05)
+
+    def abort(self):
+        self.closeLockfile()
 
+    def release(self):
+        if self.isLocked:
+            self.closeLockfile()
             self.isLocked = False
 
     def __enter__(self):
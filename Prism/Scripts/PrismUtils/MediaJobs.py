@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import platform
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from PrismUtils import FrameSequences
+
+
+logger = logging.getLogger(__name__)
+
+
+# A single ffmpeg process. "args" doesn't contain the ffmpeg executable.
+# If "cacheKey" is set, the output gets stored in the media cache and the
+# next job with the same key copies the cached file instead of running
+# ffmpeg again. The cache is local to the user and keyed by the content of
+# the source files. "cacheKey" can be a function, which returns the key.
+# It gets called on the worker thread, because hashing the source files
+# takes a while.
+class MediaJob(object):
+    def __init__(self, args, outputpath, totalFrames=None, cacheKey=None, label=None):
+        self.args = args
+        self.outputpath = outputpath
+        self.totalFrames = totalFrames
+        self.cacheKey = cacheKey
+        self.label = label or os.path.basename(outputpath)
+        self.progress = 0.0
+        self.returncode = None
+        self.stdout = ""
+        self.stderr = ""
+        self.cached = False
+        self.duration = None
+        self.event = threading.Event()
+
+    @property
+    def done(self):
+        return self.event.is_set()
+
+    @property
+    def success(self):
+        return (
+            self.returncode == 0
+            and os.path.exists(self.outputpath)
+            and os.stat(self.outputpath).st_size > 0
+        )
+
+    def getResult(self):
+        # the same format as the result of Popen.communicate
+        return (self.stdout, self.stderr)
+
+
+# Runs ffmpeg jobs on a pool of worker threads, which is sized to the
+# number of cores. ffmpeg reports its progress through "-progress pipe:1",
+# which gets parsed while the job is running.
+class MediaJobEngine(object):
+    def __init__(self, media, threads=None, cacheMaxBytes=10 * 1024 ** 3, cacheScanInterval=600):
+        self.media = media
+        if threads is None:
+            try:
+                threads = multiprocessing.cpu_count()
+            except NotImplementedError:
+                threads = 2
+
+        self.numThreads = max(1, threads)
+        self.cacheMaxBytes = cacheMaxBytes
+        # the size of the cache is tracked while storing files. Other
+        # processes can add files too, so the cache gets scanned again after
+        # "cacheScanInterval" seconds
+        self.cacheScanInterval = cacheScanInterval
+        self.cacheSize = None
+        self.cacheScanTime = 0
+        self.queue = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        # content hashes of source files: {path: [mtime, size, hash]}
+        self.fileHashes = {}
+
+    def getFFmpegPath(self):
+        return self.media.videoReaders.getFFmpeg() or None
+
+    def getCacheDir(self):
+        # the cache is local, because converted media of all projects would
+        # fill up the project share otherwise
+        configs = getattr(self.media.core, "configs", None)
+        if configs:
+            userDir = configs.getUserConfigDir()
+            if userDir:
+                return os.path.join(userDir, "Cache", "media")
+
+        return os.path.join(tempfile.gettempdir(), "PrismMediaCache")
+
+    def getSourceFiles(self, inputpath):
+        # the files of a video or an image sequence like "shot.%04d.exr"
+        inputpath = os.path.normpath(inputpath)
+        sequence = None
+        if "%" in os.path.basename(inputpath):
+            sequence = FrameSequences.parsePattern(inputpath)
+
+        if not sequence:
+            return [inputpath] if os.path.exists(inputpath) else []
+
+        entry = self.media.metadata.getEntry(sequence.directory)
+        if not entry:
+            return []
+
+        for match in FrameSequences.groupFiles(entry["files"], sequence.directory):
+            if match.prefix == sequence.prefix and match.suffix == sequence.suffix:
+                return match.getPaths()
+
+        return []
+
+    def getFileHash(self, path):
+        # the hash gets reused as long as the mtime and size of the file
+        # don't change
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+
+        with self.lock:
+            cached = self.fileHashes.get(path)
+
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+        md5 = hashlib.md5()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    md5.update(chunk)
+        except (IOError, OSError):
+            return
+
+        fileHash = md5.hexdigest()
+        with self.lock:
+            self.fileHashes[path] = [stat.st_mtime, stat.st_size, fileHash]
+
+        return fileHash
+
+    def getFilesKey(self, paths):
+        # conversion results are keyed by the names and the content of all
+        # source files, so that copies of the same media share the result
+        data = []
+        for path in sorted(paths):
+            fileHash = self.getFileHash(path)
+            if fileHash:
+                data.append("%s|%s" % (os.path.basename(path), fileHash))
+
+        return data
+
+    def getCacheKey(self, sourceFiles, args):
+        data = self.getFilesKey(sourceFiles) + [str(x) for x in args]
+        return hashlib.md5("\n".join(data).encode("utf-8")).hexdigest()
+
+    def getCachePath(self, job):
+        ext = os.path.splitext(job.outputpath)[1]
+        return os.path.join(self.getCacheDir(), job.cacheKey[:2], job.cacheKey + ext)
+
+    def startWorkers(self):
+        with self.lock:
+            self.workers = [x for x in self.workers if x.is_alive()]
+            while len(self.workers) < self.numThreads:
+                worker = threading.Thread(target=self.work, name="PrismMediaJob")
+                worker.daemon = True
+                worker.start()
+                self.workers.append(worker)
+
+    def submit(self, job):
+        self.startWorkers()
+        self.queue.put(job)
+        return job
+
+    def run(self, jobs, onProgress=None, interval=0.1):
+        # runs the jobs concurrently and waits for them. onProgress gets
+        # called with the list of jobs while waiting, so that the UI stays
+        # responsive and can display the progress
+        for job in jobs:
+            self.submit(job)
+
+        for job in jobs:
+            while not job.event.wait(interval if onProgress else None):
+                onProgress(jobs)
+
+        if onProgress:
+            onProgress(jobs)
+
+        return jobs
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            try:
+                self.runJob(job)
+            except Exception as e:
+                logger.warning("media job %s failed: %s" % (job.label, e))
+                job.returncode = -1
+                job.stderr += str(e)
+            finally:
+                job.event.set()
+
+    def runJob(self, job):
+        startTime = time.time()
+        if callable(job.cacheKey):
+            job.cacheKey = job.cacheKey()
+
+        if job.cacheKey and self.copyFromCache(job):
+            job.cached = True
+            job.returncode = 0
+            job.progress = 1.0
+            job.duration = time.time() - startTime
+            return
+
+        ffmpegPath = self.getFFmpegPath()
+        if not ffmpegPath:
+            job.returncode = -1
+            job.stderr = "Could not find ffmpeg"
+            return
+
+        if not os.path.exists(os.path.dirname(job.outputpath)):
+            try:
+                os.makedirs(os.path.dirname(job.outputpath))
+            except OSError:
+                pass
+
+        argList = [ffmpegPath, "-nostdin", "-progress", "pipe:1", "-nostats"]
+        argList += [str(x) for x in job.args]
+        logger.debug("Run ffmpeg with this settings: " + str(argList))
+
+        kwargs = {}
+        if platform.system() == "Windows":
+            kwargs["creationflags"] = 0x08000000
+
+        stderrFile = tempfile.TemporaryFile()
+        try:
+            proc = subprocess.Popen(
+                argList, stdout=subprocess.PIPE, stderr=stderrFile, **kwargs
+            )
+            output = []
+            for line in iter(proc.stdout.readline, b""):
+                line = line.decode("utf-8", "replace").strip()
+                output.append(line)
+                if line.startswith("frame=") and job.totalFrames:
+                    try:
+                        frame = int(line.split("=", 1)[1])
+                    except ValueError:
+                        continue
+
+                    job.progress = min(1.0, frame / float(job.totalFrames))
+                elif line == "progress=end":
+                    job.progress = 1.0
+
+            proc.stdout.close()
+            job.returncode = proc.wait()
+            stderrFile.seek(0)
+            job.stderr = stderrFile.read().decode("utf-8", "replace")
+            job.stdout = "\n".join(output)
+        finally:
+            stderrFile.close()
+
+        job.duration = time.time() - startTime
+        if job.cacheKey and job.success:
+            self.storeInCache(job)
+
+    def copyFromCache(self, job):
+        cachePath = self.getCachePath(job)
+        if not os.path.exists(cachePath) or os.stat(cachePath).st_size == 0:
+            return False
+
+        if os.path.normpath(cachePath) == os.path.normpath(job.outputpath):
+            return True
+
+        try:
+            if not os.path.exists(os.path.dirname(job.outputpath)):
+                os.makedirs(os.path.dirname(job.outputpath))
+
+            shutil.copy2(cachePath, job.outputpath)
+            # keeps recently used files in the cache
+            os.utime(cachePath, None)
+        except (IOError, OSError) as e:
+            logger.debug("failed to copy cached media %s: %s" % (cachePath, e))
+            return False
+
+        logger.debug("using cached media for %s: %s" % (job.outputpath, cachePath))
+        return True
+
+    def storeInCache(self, job):
+        cachePath = self.getCachePath(job)
+        if os.path.normpath(cachePath) == os.path.normpath(job.outputpath):
+            self.addToCache(os.path.getsize(cachePath))
+            return
+
+        tmpPath = "%s.%s_%s.tmp" % (cachePath, os.getpid(), threading.current_thread().ident)
+        try:
+            if not os.path.exists(os.path.dirname(cachePath)):
+                os.makedirs(os.path.dirname(cachePath))
+
+            shutil.copy2(job.outputpath, tmpPath)
+            if os.path.exists(cachePath):
+                os.remove(cachePath)
+            os.rename(tmpPath, cachePath)
+        except (IOError, OSError) as e:
+            logger.debug("failed to cache media %s: %s" % (job.outputpath, e))
+            if os.path.exists(tmpPath):
+                try:
+                    os.remove(tmpPath)
+                except OSError:
+                    pass
+            return
+
+        self.addToCache(os.path.getsize(cachePath))
+
+    def addToCache(self, size):
+        # the cache only gets scanned, when it could be too big
+        with self.lock:
+            if self.cacheSize is not None:
+                self.cacheSize += size
+
+            needsTrim = (
+                self.cacheSize is None
+                or self.cacheSize > self.cacheMaxBytes
+                or time.time() - self.cacheScanTime > self.cacheScanInterval
+            )
+
+        if needsTrim:
+            self.trimCache()
+
+    def trimCache(self):
+        # removes the least recently used files if the cache is too big. It
+        # gets trimmed to 90% of the limit, so that the next jobs don't
+        # trigger another scan right away
+        cacheDir = self.getCacheDir()
+        files = []
+        total = 0
+        for root, dirs, fileNames in os.walk(cacheDir):
+            for name in fileNames:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.cacheMaxBytes:
+            files = []
+
+        for mtime, size, path in sorted(files):
+            if total <= self.cacheMaxBytes * 0.9:
+                break
+
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+        with self.lock:
+            self.cacheSize = total
+            self.cacheScanTime = time.time()
@@ -35,9 +35,10 @@ import os
 import sys
 import logging
 import platform
-import subprocess
 import traceback
 import glob
+import tempfile
+import functools
 
 from collections import OrderedDict
 
@@ -63,6 +64,11 @@ except:
     psVersion = 1
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import FrameCache
+from PrismUtils import VideoReaders
+from PrismUtils import MediaMetadata
+from PrismUtils import MediaJobs
+from PrismUtils import ThreadUtils
 
 
 logger = logging.getLogger(__name__)
@@ -114,6 +120,16 @@ class MediaManager(object):
 
         return imageio
 
+    @err_catcher(name=__name__)
+    def getNumpy(self):
+        np = None
+        try:
+            import numpy as np
+        except:
+            logger.debug("failed to load numpy: %s" % traceback.format_exc())
+
+        return np
+
     @err_catcher(name=__name__)
     def getFFmpeg(self):
         ffmpegPath = os.path.join(
@@ -122,35 +138,15 @@ class MediaManager(object):
         return ffmpegPath
 
     @err_catcher(name=__name__)
-    def convertMedia(self, inputpath, startNum, outputpath, settings=None):
+    def convertMedia(self, inputpath, startNum, outputpath, settings=None, useCache=False, progressText=None):
         inputpath = inputpath.replace("\\", "/")
         inputExt = os.path.splitext(inputpath)[1]
         videoInput = inputExt in [".mp4", ".mov"]
         startNum = str(startNum) if startNum is not None else None
 
-        ffmpegIsInstalled = False
-        if platform.system() == "Windows":
-            ffmpegPath = self.getFFmpeg()
-            if os.path.exists(ffmpegPath):
-                ffmpegIsInstalled = True
-        elif platform.system() == "Linux":
-            ffmpegPath = "ffmpeg"
-            try:
-                subprocess.Popen([ffmpegPath])
-                ffmpegIsInstalled = True
-            except:
-                pass
-
-        elif platform.system() == "Darwin":
-            ffmpegPath = "ffmpeg"
-            try:
-                subprocess.Popen([ffmpegPath])
-                ffmpegIsInstalled = True
-            except:
-                pass
-
-        if not ffmpegIsInstalled:
-            msg = "Could not find %s" % ffmpegPath
+        ffmpegPath = self.mediaJobs.getFFmpegPath()
+        if not ffmpegPath:
+            msg = "Could not find ffmpeg"
             if platform.system() == "Darwin":
                 msg += "\n\nYou can install it with this command:\n\"brew install ffmpeg\""
 
@@ -189,7 +185,7 @@ class MediaManager(object):
         if settings:
             args.update(settings)
 
-        argList = [ffmpegPath]
+        argList = ["-y"]
 
         for k in args.keys():
             if not args[k]:
@@ -206,12 +202,56 @@ class MediaManager(object):
 
             argList += al
 
-        argList += [outputpath, "-y"]
-        logger.debug("Run ffmpeg with this settings: " + str(argList))
-        nProc = subprocess.Popen(argList, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        result = nProc.communicate()
+        sourceFiles = self.mediaJobs.getSourceFiles(inputpath)
+        if videoInput:
+            meta = self.getVideoMetadata(inputpath) or {}
+            totalFrames = meta.get("nframes")
+        else:
+            totalFrames = len(sourceFiles)
+
+        # image sequence outputs consist of multiple files and can't be cached
+        cacheKey = None
+        if useCache and "%" not in os.path.basename(outputpath):
+            cacheKey = functools.partial(self.mediaJobs.getCacheKey, sourceFiles, argList)
+
+        job = MediaJobs.MediaJob(
+            argList + [outputpath],
+            outputpath,
+            totalFrames=totalFrames,
+            cacheKey=cacheKey,
+        )
+        self.runMediaJobs([job], text=progressText)
+        return job.getResult()
 
-        return result
+    @err_catcher(name=__name__)
+    def runMediaJobs(self, jobs, text=None):
+        # runs ffmpeg jobs in parallel. In the UI the progress gets displayed
+        # in a popup, which stays responsive while the jobs are running
+        if not getattr(self.core, "uiAvailable", False) or not ThreadUtils.isMainThread():
+            return self.mediaJobs.run(jobs)
+
+        text = text or "Converting media - please wait.."
+        popup = self.core.waitPopup(self.core, text)
+        with popup:
+            self.mediaJobs.run(
+                jobs, onProgress=lambda x: self.updateJobProgress(popup, text, x)
+            )
+
+        return jobs
+
+    @err_catcher(name=__name__)
+    def updateJobProgress(self, popup, text, jobs):
+        if getattr(popup, "msg", None):
+            progress = sum(x.progress for x in jobs) / float(len(jobs) or 1)
+            numDone = len([x for x in jobs if x.done])
+            msg = "%s\n\n%s%% (%s/%s)" % (text, int(progress * 100), numDone, len(jobs))
+            try:
+                popup.msg.setText(msg)
+            except Exception:
+                pass
+
+        if QCoreApplication.instance():
+            QCoreApplication.processEvents()
 
     @err_catcher(name=__name__)
     def getPixmapFromPath(self, path):
@@ -231,6 +271,205 @@ class MediaManager(object):
             except:
                 return QPixmap(path)
 
+    @err_catcher(name=__name__)
+    def getImageFromPath(self, path):
+        if platform.system() == "Windows":
+            return QImage(path)
+        else:
+            try:
+                im = Image.open(path)
+                im = im.convert("RGBA")
+                r, g, b, a = im.split()
+                im = Image.merge("RGBA", (b, g, r, a))
+                data = im.tobytes("raw", "RGBA")
+
+                qimg = QImage(data, im.size[0], im.size[1], QImage.Format_ARGB32)
+
+                return qimg.copy()
+            except:
+                return QImage(path)
+
+    @err_catcher(name=__name__)
+    def getVideoReader(self, path):
+        if not os.path.exists(path) or os.stat(path).st_size == 0:
+            return
+
+        imageio = self.getImageIO()
+        if not imageio:
+            return
+
+        try:
+            reader = imageio.get_reader(path, "ffmpeg")
+        except:
+            logger.debug("failed to read videofile: %s" % traceback.format_exc())
+            return
+
+        return reader
+
+    @err_catcher(name=__name__)
+    def getFrameImage(self, path, frame=0, width=None, height=None, vidReader=None):
+        # returns a QImage instead of a QPixmap, so that it can be called
+        # from the prefetch threads
+        ext = os.path.splitext(path)[1].lower()
+        if ext in [".jpg", ".jpeg", ".png", ".tif", ".tiff"]:
+            image = self.getImageFromPath(path)
+        elif ext in [".exr", ".dpx"]:
+            return self.getImageFromExrPath(path, width=width, height=height)
+        elif ext in [".mp4", ".mov", ".avi"]:
+            try:
+                if vidReader is None:
+                    result = self.videoReaders.readFrame(path, frame)
+                    if not result:
+                        return
+
+                    buf, size = result
+                else:
+                    data = vidReader.get_data(frame)
+                    size = vidReader._meta["size"]
+                    if psVersion == 1:
+                        buf = data.tostring()
+                    else:
+                        buf = data.data
+            except:
+                # the framecount of videos is often only estimated by ffmpeg
+                logger.debug("failed to read videoframe %s: %s" % (frame, traceback.format_exc()))
+                return
+
+            image = QImage(buf, size[0], size[1], size[0] * 3, QImage.Format_RGB888)
+            image = image.copy()
+        else:
+            return
+
+        if image.isNull() or not width or not height:
+            return image
+
+        newWidth, newHeight = self.getFittedSize(image.width(), image.height(), width, height)
+        return image.scaled(newWidth, newHeight, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+    @err_catcher(name=__name__)
+    def getVideoMetadata(self, path):
+        # size, fps, nframes and duration of a video. Cached until the file
+        # changes
+        return self.videoReaders.getMetadata(path)
+
+    @property
+    def metadata(self):
+        if not getattr(self, "_metadata", None):
+            self._metadata = MediaMetadata.MediaMetadata(self)
+
+        return self._metadata
+
+    @property
+    def mediaJobs(self):
+        if not getattr(self, "_mediaJobs", None):
+            self._mediaJobs = MediaJobs.MediaJobEngine(self)
+
+        return self._mediaJobs
+
+    @property
+    def videoReaders(self):
+        if not getattr(self, "_videoReaders", None):
+            self._videoReaders = VideoReaders.VideoReaderPool(self)
+
+        return self._videoReaders
+
+    @property
+    def frameCache(self):
+        if not getattr(self, "_frameCache", None):
+            self._frameCache = FrameCache.FrameCache()
+
+        return self._frameCache
+
+    @property
+    def framePrefetcher(self):
+        if not getattr(self, "_framePrefetcher", None):
+            self._framePrefetcher = FrameCache.FramePrefetcher(self, self.frameCache)
+
+        return self._framePrefetcher
+
+    @err_catcher(name=__name__)
+    def getFittedSize(self, imgWidth, imgHeight, width, height):
+        if (imgWidth / float(imgHeight)) > (width / float(height)):
+            newWidth = width
+            newHeight = width / float(imgWidth) * imgHeight
+        else:
+            newHeight = height
+            newWidth = height / float(imgHeight) * imgWidth
+
+        return max(int(newWidth), 1), max(int(newHeight), 1)
+
+    @err_catcher(name=__name__)
+    def getPixmapFromExrPath(self, path, width=None, height=None, gamma=2.2):
+        image = self.getImageFromExrPath(path, width=width, height=height, gamma=gamma)
+        if not image or image.isNull():
+            return
+
+        return QPixmap.fromImage(image)
+
+    @err_catcher(name=__name__)
+    def getImageFromExrPath(self, path, width=None, height=None, gamma=2.2):
+        oiio = self.getOIIO()
+        if not oiio:
+            return
+
+        imgSrc = oiio.ImageBuf(str(path))
+        rgbImgSrc = oiio.ImageBuf()
+        oiio.ImageBufAlgo.channels(rgbImgSrc, imgSrc, (0, 1, 2))
+        imgWidth = rgbImgSrc.spec().full_width
+        imgHeight = rgbImgSrc.spec().full_height
+        if not imgWidth or not imgHeight:
+            return
+
+        if width and height:
+            newWidth, newHeight = self.getFittedSize(imgWidth, imgHeight, width, height)
+        else:
+            newWidth, newHeight = imgWidth, imgHeight
+
+        imgDst = oiio.ImageBuf(oiio.ImageSpec(newWidth, newHeight, 3, oiio.FLOAT))
+        oiio.ImageBufAlgo.resample(imgDst, rgbImgSrc)
+
+        np = self.getNumpy()
+        if np is None:
+            return self.getImageFromImageBuf(imgDst, gamma=gamma)
+
+        pixels = np.asarray(imgDst.get_pixels(oiio.FLOAT), dtype=np.float32)
+        pixels = pixels.reshape(newHeight, newWidth, 3)
+        np.clip(pixels, 0.0, 1.0, out=pixels)
+        np.power(pixels, 1.0 / gamma, out=pixels)
+        np.multiply(pixels, 255.0, out=pixels)
+        data = np.ascontiguousarray(pixels, dtype=np.uint8)
+
+        if psVersion == 1:
+            buf = data.tostring()
+        else:
+            buf = data.data
+
+        # the QImage only wraps the array buffer. The copy detaches it from
+        # "data", so that the image can be used after this function returns
+        qimg = QImage(buf, newWidth, newHeight, newWidth * 3, QImage.Format_RGB888)
+        return qimg.copy()
+
+    @err_catcher(name=__name__)
+    def getImageFromImageBuf(self, imgBuf, gamma=2.2):
+        # fallback when numpy isn't available: let OIIO do the conversion and
+        # load the result through an 8bit temp file
+        oiio = self.getOIIO()
+        sRGBimg = oiio.ImageBuf()
+        oiio.ImageBufAlgo.pow(sRGBimg, imgBuf, (1.0 / gamma, 1.0 / gamma, 1.0 / gamma))
+        fd, tmpPath = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            sRGBimg.set_write_format(oiio.UINT8)
+            sRGBimg.write(tmpPath)
+            image = QImage(tmpPath)
+        finally:
+            try:
+                os.remove(tmpPath)
+            except:
+                pass
+
+        return image
+
     @err_catcher(name=__name__)
     def savePixmap(self, pmap, path):
         if not os.path.exists(os.path.dirname(path)):
@@ -291,32 +530,45 @@ class MediaManager(object):
 
     @err_catcher(name=__name__)
     def getMediaInformation(self, path):
-        resolution = self.getMediaResolution(path)
-        width = resolution["width"]
-        height = resolution["height"]
         seqInfo = self.getMediaSequence(path)
-        isSequence = seqInfo["isSequence"]
-        start = seqInfo["start"]
-        end = seqInfo["end"]
         files = seqInfo["files"]
+        firstFile = files[0] if files else path
+        info = self.metadata.getFileInfo(firstFile) or {}
+        if info.get("width"):
+            resolution = info
+        else:
+            resolution = self.getMediaResolution(firstFile)
 
         result = {
-            "width": width,
-            "height": height,
-            "isSequence": isSequence,
-            "start": start,
-            "end": end,
+            "width": resolution["width"],
+            "height": resolution["height"],
+            "channels": info.get("channels"),
+            "pixelType": info.get("pixelType"),
+            "fps": info.get("fps"),
+            "isSequence": seqInfo["isSequence"],
+            "start": seqInfo["start"],
+            "end": seqInfo["end"],
             "files": files
         }
 
         return result
 
+    @err_catcher(name=__name__)
+    def getVersionMediaInformation(self, path):
+        # media information of all sequences and videos in a render version
+        return self.metadata.getVersionInfo(path, padding=self.core.framePadding)
+
     @err_catcher(name=__name__)
     def getMediaResolution(self, path):
         pwidth = None
         pheight = None
         base, ext = os.path.splitext(path)
 
+        # read only the header if the format is supported
+        info = self.metadata.getFileInfo(path)
+        if info and info.get("width"):
+            return {"width": info["width"], "height": info["height"]}
+
         if ext in [
             ".jpg",
             ".jpeg",
@@ -330,57 +582,23 @@ class MediaManager(object):
             pheight = size.height()
         elif ext in [".exr", ".dpx"]:
             oiio = self.getOIIO()
-            imgSpecs = oiio.ImageBuf(path).spec()
-            pwidth = imgSpecs.full_width
-            pheight = imgSpecs.full_height
+            if oiio:
+                imgSpecs = oiio.ImageBuf(path).spec()
+                pwidth = imgSpecs.full_width
+                pheight = imgSpecs.full_height
         elif ext in [".mp4", ".mov"]:
-            if os.stat(path).st_size == 0:
-                vidReader = "Error"
-            else:
-                imageio = self.getImageIO()
-                try:
-                    vidReader = imageio.get_reader(path, "ffmpeg")
-                except:
-                    vidReader = "Error"
-                    logger.debug("failed to read videofile: %s" % traceback.format_exc())
-
-            if vidReader != "Error":
-                pwidth = vidReader._meta["size"][0]
-                pheight = vidReader._meta["size"][1]
+            meta = self.getVideoMetadata(path)
+            if meta:
+                pwidth, pheight = meta["size"]
 
         return {"width": pwidth, "height": pheight}
 
     @err_catcher(name=__name__)
     def getMediaSequence(self, path):
-        start = None
-        end = None
-        isSequence = None
-
-        matchingFiles = glob.glob(path)
-        isSequence = len(matchingFiles) > 1
-
-        frames = []
-        for file in matchingFiles:
-            base, ext = os.path.splitext(file)
-            if len(base) < self.core.framePadding:
-                continue
-
-            try:
-                frame = int(base[-self.core.framePadding:])
-            except:
-                continue
-
-            frames.append(frame)
-
-        if frames:
-            start = min(frames)
-            end = max(frames)
-
-        result = {
-            "start": start,
-            "end": end,
-            "isSequence": isSequence,
-            "files": sorted(matchingFiles),
-        }
+        # the directory listing is cached by the metadata cache
+        if any(x in os.path.dirname(path) for x in "*?["):
+            matchingFiles = glob.glob(path)
+        else:
+            matchingFiles = self.metadata.getMatchingFiles(path)
 
-        return result
+        return self.metadata.getSequenceInfo(matchingFiles, self.core.framePadding)
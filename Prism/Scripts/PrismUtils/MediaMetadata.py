@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import struct
+import fnmatch
+import logging
+import traceback
+
+from PrismUtils import DirScanner
+from PrismUtils import FrameSequences
+
+
+logger = logging.getLogger(__name__)
+
+
+imageExtensions = FrameSequences.imageExtensions
+videoExtensions = FrameSequences.videoExtensions
+
+
+# The header readers only read the first bytes of a file and return a dict
+# with width, height, channels and pixelType (and fps if the format stores
+# it) or None if the header couldn't be parsed.
+def readPngHeader(f):
+    data = f.read(33)
+    if data[:8] != b"\x89PNG\r\n\x1a\n" or data[12:16] != b"IHDR":
+        return
+
+    width, height, depth, colorType = struct.unpack(">IIBB", data[16:26])
+    channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(colorType, 3)
+    return {
+        "width": width,
+        "height": height,
+        "channels": channels,
+        "pixelType": "uint16" if depth == 16 else "uint8",
+    }
+
+
+def readJpgHeader(f):
+    if f.read(2) != b"\xff\xd8":
+        return
+
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0:1] != b"\xff":
+            return
+
+        code = struct.unpack(">B", marker[1:2])[0]
+        if code == 0xFF:
+            f.seek(-1, 1)
+            continue
+
+        length = struct.unpack(">H", f.read(2))[0]
+        # SOF markers except DHT, JPG and DAC
+        if 0xC0 <= code <= 0xCF and code not in [0xC4, 0xC8, 0xCC]:
+            depth, height, width, channels = struct.unpack(">BHHB", f.read(6))
+            return {
+                "width": width,
+                "height": height,
+                "channels": channels,
+                "pixelType": "uint8" if depth <= 8 else "uint16",
+            }
+
+        f.seek(length - 2, 1)
+
+
+def readTifHeader(f):
+    order = f.read(2)
+    if order == b"II":
+        endian = "<"
+    elif order == b"MM":
+        endian = ">"
+    else:
+        return
+
+    magic, offset = struct.unpack(endian + "HI", f.read(6))
+    if magic != 42:
+        return
+
+    f.seek(offset)
+    count = struct.unpack(endian + "H", f.read(2))[0]
+    # only the first value of SHORT and LONG tags is needed
+    typeFormats = {3: "H", 4: "I"}
+    tags = {}
+    for idx in range(count):
+        tag, fieldType, valueCount, value = struct.unpack(endian + "HHI4s", f.read(12))
+        if fieldType not in typeFormats:
+            continue
+
+        valueFormat = endian + typeFormats[fieldType]
+        size = struct.calcsize(valueFormat)
+        if valueCount * size > 4:
+            # the values don't fit into the field, which stores their offset
+            # instead. This is the case for the BitsPerSample of 3+ channels
+            if tag != 258:
+                continue
+
+            pos = f.tell()
+            f.seek(struct.unpack(endian + "I", value)[0])
+            value = f.read(size)
+            f.seek(pos)
+
+        tags[tag] = struct.unpack(valueFormat, value[:size])[0]
+
+    if 256 not in tags or 257 not in tags:
+        return
+
+    depth = tags.get(258, 8)
+    if tags.get(339) == 3:
+        pixelType = "half" if depth == 16 else "float"
+    else:
+        pixelType = "uint%s" % depth if depth in [8, 16, 32] else "uint8"
+
+    return {
+        "width": tags[256],
+        "height": tags[257],
+        "channels": tags.get(277, 1),
+        "pixelType": pixelType,
+    }
+
+
+def readExrHeader(f):
+    magic, version = struct.unpack("<ii", f.read(8))
+    if magic != 20000630:
+        return
+
+    result = {}
+    data = f.read(65536)
+    pos = 0
+    while pos < len(data):
+        end = data.find(b"\0", pos)
+        if end == -1 or end == pos:
+            # end of the header
+            break
+
+        name = data[pos:end]
+        typeEnd = data.find(b"\0", end + 1)
+        attrType = data[end + 1:typeEnd]
+        size = struct.unpack("<i", data[typeEnd + 1:typeEnd + 5])[0]
+        value = data[typeEnd + 5:typeEnd + 5 + size]
+        pos = typeEnd + 5 + size
+
+        if name == b"displayWindow" and attrType == b"box2i":
+            xMin, yMin, xMax, yMax = struct.unpack("<iiii", value)
+            result["width"] = xMax - xMin + 1
+            result["height"] = yMax - yMin + 1
+        elif name == b"channels" and attrType == b"chlist":
+            channels = []
+            cpos = 0
+            while cpos < len(value) and value[cpos:cpos + 1] != b"\0":
+                cEnd = value.find(b"\0", cpos)
+                pixelType = struct.unpack("<i", value[cEnd + 1:cEnd + 5])[0]
+                channels.append((value[cpos:cEnd].decode("utf-8", "replace"), pixelType))
+                cpos = cEnd + 17
+
+            result["channels"] = len(channels)
+            result["channelNames"] = [x[0] for x in channels]
+            types = set(x[1] for x in channels)
+            result["pixelType"] = {0: "uint32", 1: "half", 2: "float"}.get(max(types) if types else 1)
+        elif name == b"framesPerSecond" and attrType == b"rational":
+            num, denom = struct.unpack("<iI", value)
+            if denom:
+                result["fps"] = num / float(denom)
+
+    if "width" not in result:
+        return
+
+    return result
+
+
+def readDpxHeader(f):
+    data = f.read(2048)
+    if data[:4] == b"SDPX":
+        endian = ">"
+    elif data[:4] == b"XPDS":
+        endian = "<"
+    else:
+        return
+
+    width, height = struct.unpack(endian + "II", data[772:780])
+    descriptor, transfer, colorimetric, depth = struct.unpack("BBBB", data[800:804])
+    result = {
+        "width": width,
+        "height": height,
+        "channels": {6: 1, 50: 3, 51: 4, 52: 4}.get(descriptor, 3),
+        "pixelType": "uint%s" % depth if depth in [8, 16, 32] else "uint%s" % (depth or 10),
+    }
+    if len(data) >= 1728:
+        fps = struct.unpack(endian + "f", data[1724:1728])[0]
+        # undefined values are stored as 0xFFFFFFFF
+        if 0 < fps < 1000:
+            result["fps"] = round(fps, 3)
+
+    return result
+
+
+headerReaders = {
+    ".png": readPngHeader,
+    ".jpg": readJpgHeader,
+    ".jpeg": readJpgHeader,
+    ".tif": readTifHeader,
+    ".tiff": readTifHeader,
+    ".exr": readExrHeader,
+    ".dpx": readDpxHeader,
+}
+
+
+def readHeader(path):
+    reader = headerReaders.get(os.path.splitext(path)[1].lower())
+    if not reader:
+        return
+
+    try:
+        with open(path, "rb") as f:
+            return reader(f)
+    except (IOError, OSError, struct.error, ValueError):
+        logger.debug("failed to read header of %s: %s" % (path, traceback.format_exc()))
+
+
+# Caches the listing and the media headers of directories. The headers of a
+# file are kept as long as the mtime and size of the file don't change.
+class MediaMetadata(DirScanner.DirCache):
+    def __init__(self, media, maxDirs=512):
+        super(MediaMetadata, self).__init__(statFiles=True, maxDirs=maxDirs)
+        self.media = media
+
+    def scanDir(self, path, mtime, previous=None):
+        entry = super(MediaMetadata, self).scanDir(path, mtime, previous)
+        headers = {}
+        if previous:
+            with self.lock:
+                for name, header in previous["headers"].items():
+                    if entry["files"].get(name) == header[0]:
+                        headers[name] = header
+
+        entry["headers"] = headers
+        return entry
+
+    def getFileInfo(self, path):
+        dirPath, name = os.path.split(path)
+        entry = self.getEntry(dirPath)
+        fileKey = entry and self.validateFile(path, entry)
+        if not fileKey:
+            return
+
+        with self.lock:
+            header = entry["headers"].get(name)
+
+        if header and header[0] == fileKey:
+            return header[1]
+
+        if os.path.splitext(name)[1].lower() in videoExtensions:
+            meta = self.media.getVideoMetadata(path)
+            info = None
+            if meta:
+                info = {
+                    "width": meta["size"][0],
+                    "height": meta["size"][1],
+                    "channels": 3,
+                    "pixelType": "uint8",
+                    "fps": meta.get("fps"),
+                    "nframes": meta.get("nframes"),
+                }
+        else:
+            info = readHeader(path)
+
+        with self.lock:
+            entry["headers"][name] = (fileKey, info)
+
+        return info
+
+    def getMatchingFiles(self, pattern):
+        # glob for a single directory, served from the cache
+        dirPath, namePattern = os.path.split(pattern)
+        entry = self.getEntry(dirPath)
+        if not entry:
+            return []
+
+        if not any(x in namePattern for x in "*?["):
+            return [pattern] if namePattern in entry["files"] else []
+
+        return sorted(
+            os.path.join(dirPath, name)
+            for name in fnmatch.filter(entry["files"], namePattern)
+        )
+
+    def getSequenceInfo(self, files, padding):
+        names = [os.path.basename(x) for x in files]
+        frames = set()
+        for sequence in FrameSequences.groupFiles(names, padding=padding):
+            frames.update(sequence.frames)
+
+        frameSequence = FrameSequences.FrameSequence("", "", "", padding, frames=frames)
+        return {
+            "start": frameSequence.first,
+            "end": frameSequence.last,
+            "isSequence": len(files) > 1,
+            "files": sorted(files),
+            "frameRange": frameSequence.getFrameRange(),
+            "gaps": frameSequence.gaps,
+        }
+
+    def getMediaInfo(self, path, padding=4):
+        files = self.getMatchingFiles(path)
+        result = self.getSequenceInfo(files, padding)
+        info = self.getFileInfo(files[0]) if files else None
+        info = info or {}
+        result["width"] = info.get("width")
+        result["height"] = info.get("height")
+        result["channels"] = info.get("channels")
+        result["pixelType"] = info.get("pixelType")
+        result["fps"] = info.get("fps")
+        return result
+
+    def getVersionInfo(self, path, padding=4):
+        # metadata of all media in a render version. Returns a dict with an
+        # entry per folder (for example per AOV) which contains media files
+        result = {}
+        folders = [path]
+        while folders:
+            folder = folders.pop(0)
+            entry = self.getEntry(folder)
+            if not entry:
+                continue
+
+            folders += [os.path.join(folder, x) for x in entry["dirs"]]
+            groups = {}
+            sequences = FrameSequences.groupFiles(
+                entry["files"],
+                folder,
+                padding=padding,
+                extensions=imageExtensions + videoExtensions,
+            )
+            for sequence in sequences:
+                if sequence.isVideo or not sequence.frames:
+                    for path in sequence.getPaths():
+                        groups[os.path.basename(path)] = [path]
+                else:
+                    groups[sequence.getPattern("#")] = sequence.getPaths()
+
+            for key, files in groups.items():
+                info = self.getSequenceInfo(files, padding)
+                info.update(self.getFileInfo(files[0]) or {})
+                result[os.path.join(folder, key)] = info
+
+        return result
@@ -44,6 +44,7 @@ except:
     psVersion = 1
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import DirScanner
 
 
 class MediaProducts(object):
@@ -67,90 +68,43 @@ class MediaProducts(object):
         mediaTasks = {"3d": [], "2d": [], "playblast": [], "external": []}
         basepath = basepath or self.getMediaProductBase(entityType, entityName, step=step, category=category)
 
-        if basepath:
-            for i in os.walk(
-                os.path.join(basepath, "Rendering", "3dRender")
-            ):
-                for k in sorted(i[1]):
-                    mediaTasks["3d"].append([k, "3d", os.path.join(i[0], k)])
-                break
+        if not basepath:
+            return mediaTasks
 
-            for i in os.walk(
-                os.path.join(basepath, "Rendering", "2dRender")
-            ):
-                for k in sorted(i[1]):
-                    mediaTasks["2d"].append([k + " (2d)", "2d", os.path.join(i[0], k)])
-                break
+        # (type, subfolder, suffix of global tasks, suffix of local tasks)
+        productTypes = [
+            ["3d", os.path.join("Rendering", "3dRender"), "", " (local)"],
+            ["2d", os.path.join("Rendering", "2dRender"), " (2d)", " (2d)"],
+            ["external", os.path.join("Rendering", "external"), " (external)", None],
+            ["playblast", "Playblasts", " (playblast)", " (playblast)"],
+        ]
 
-            for i in os.walk(
-                os.path.join(basepath, "Rendering", "external")
-            ):
-                for k in sorted(i[1]):
-                    mediaTasks["external"].append(
-                        [k + " (external)", "external", os.path.join(i[0], k)]
-                    )
-                break
+        folders = []
+        for productType in productTypes:
+            folders.append([productType, basepath, productType[2]])
 
-            for i in os.walk(os.path.join(basepath, "Playblasts")):
-                for k in sorted(i[1]):
-                    mediaTasks["playblast"].append(
-                        [k + " (playblast)", "playblast", os.path.join(i[0], k)]
-                    )
-                break
+        if self.core.useLocalFiles:
+            localBase = basepath.replace(
+                self.core.projectPath, self.core.localProjectPath
+            )
+            for productType in productTypes:
+                if productType[3] is not None:
+                    folders.append([productType, localBase, productType[3]])
 
-            if self.core.useLocalFiles:
-                for i in os.walk(
-                    os.path.join(
-                        basepath.replace(
-                            self.core.projectPath, self.core.localProjectPath
-                        ),
-                        "Rendering",
-                        "3dRender",
-                    )
-                ):
-                    for k in sorted(i[1]):
-                        tname = k + " (local)"
-                        taskNames = [x[0] for x in mediaTasks["3d"]]
-                        if tname not in taskNames and k not in taskNames:
-                            mediaTasks["3d"].append(
-                                [tname, "3d", os.path.join(i[0], k)]
-                            )
-                    break
-
-                for i in os.walk(
-                    os.path.join(
-                        basepath.replace(
-                            self.core.projectPath, self.core.localProjectPath
-                        ),
-                        "Rendering",
-                        "2dRender",
-                    )
-                ):
-                    for k in sorted(i[1]):
-                        tname = k + " (2d)"
-                        taskNames = [x[0] for x in mediaTasks["2d"]]
-                        if tname not in mediaTasks["2d"]:
-                            mediaTasks["2d"].append(
-                                [tname, "2d", os.path.join(i[0], k)]
-                            )
-                    break
-
-                for i in os.walk(
-                    os.path.join(
-                        basepath.replace(
-                            self.core.projectPath, self.core.localProjectPath
-                        ),
-                        "Playblasts",
-                    )
-                ):
-                    for k in sorted(i[1]):
-                        tname = k + " (playblast)"
-                        taskNames = [x[0] for x in mediaTasks["playblast"]]
-                        if tname not in mediaTasks["playblast"]:
-                            mediaTasks["playblast"].append(
-                                [tname, "playblast", os.path.join(i[0], k)]
-                            )
-                    break
+        # all global and local folders get scanned concurrently
+        paths = [os.path.join(x[1], x[0][1]) for x in folders]
+        results = DirScanner.getDirNames(paths)
+
+        for folder, path, dirNames in zip(folders, paths, results):
+            mType = folder[0][0]
+            suffix = folder[2]
+            taskNames = [x[0] for x in mediaTasks[mType]]
+            for k in sorted(dirNames):
+                tname = k + suffix
+                if tname in taskNames or k in taskNames:
+                    continue
+
+                mediaTasks[mType].append([tname, mType, os.path.join(path, k)])
 
         return mediaTasks
 
@@ -188,17 +142,16 @@ class MediaProducts(object):
                 product.replace(" (local)", ""),
             )
 
-        for i in os.walk(taskPath):
-            foldercont = i[1]
-            break
-
+        paths = [taskPath]
         if self.core.useLocalFiles:
-            for i in os.walk(
+            paths.append(
                 taskPath.replace(self.core.projectPath, self.core.localProjectPath)
-            ):
-                for k in i[1]:
-                    foldercont.append(k + " (local)")
-                break
+            )
+
+        results = DirScanner.getDirNames(paths)
+        foldercont = results[0]
+        if len(results) > 1:
+            foldercont += [k + " (local)" for k in results[1]]
 
         return foldercont
 
@@ -76,6 +76,7 @@ class PathManager(object):
             ignoreEmpty=ignoreEmpty,
             comment=comment,
             localOutput=localOutput,
+            reserve=render,
         )
 
         if render and outputName != "FileNotInPipeline":
@@ -125,6 +126,7 @@ class PathManager(object):
         ignoreEmpty=True,
         comment="",
         localOutput=False,
+        reserve=False,
     ):
         fileType = fileType or "exr"
         singleFileFormats = ["avi", "mp4", "mov"]
@@ -140,7 +142,10 @@ class PathManager(object):
             )
             if not version:
                 version = self.core.getHighestTaskVersion(
-                    outputPath, getExisting=useLastVersion, ignoreEmpty=ignoreEmpty
+                    outputPath,
+                    getExisting=useLastVersion,
+                    ignoreEmpty=ignoreEmpty,
+                    reserve=reserve and not useLastVersion,
                 )
 
             outputFile = (
@@ -162,7 +167,10 @@ class PathManager(object):
             )
             if not version:
                 version = self.core.getHighestTaskVersion(
-                    outputPath, getExisting=useLastVersion, ignoreEmpty=ignoreEmpty
+                    outputPath,
+                    getExisting=useLastVersion,
+                    ignoreEmpty=ignoreEmpty,
+                    reserve=reserve and not useLastVersion,
                 )
             outputFile = (
                 "shot"
@@ -33,9 +33,13 @@
 
 import os
 import sys
+import time
+import json
 import shutil
 import platform
 import logging
+import threading
+import traceback
 
 try:
     from PySide2.QtCore import *
@@ -50,10 +54,56 @@ from PrismUtils.Decorators import err_catcher
 logger = logging.getLogger(__name__)
 
 
+# Placeholder for a plugin, which wasn't imported yet. It provides the
+# attributes of the plugin from the plugin manifest and imports the plugin as
+# soon as anything else is accessed. Names, which the plugin doesn't have
+# according to the manifest, raise an AttributeError without importing it, so
+# that checks like getattr(plugin, callbackName, None) stay cheap.
+class LazyPlugin(object):
+    def __init__(self, manager, path, entry):
+        self.__dict__["_manager"] = manager
+        self.__dict__["_path"] = path
+        self.__dict__["_entry"] = entry
+        self.__dict__["_plugin"] = None
+        self.__dict__["_failed"] = False
+        self.__dict__.update(entry["attributes"])
+
+    def __getattr__(self, name):
+        if name.startswith("__") or self._failed:
+            raise AttributeError(name)
+
+        if self._plugin is None:
+            entry = self._entry
+            if name not in entry["methods"] and name not in entry["instanceAttributes"]:
+                raise AttributeError(name)
+
+            self._manager.loadLazyPlugin(self)
+            if self._plugin is None:
+                raise AttributeError(name)
+
+        return getattr(self._plugin, name)
+
+    def __setattr__(self, name, value):
+        if self._plugin is not None:
+            setattr(self._plugin, name, value)
+        else:
+            self.__dict__[name] = value
+
+    def isLoaded(self):
+        return self._plugin is not None
+
+
 class PluginManager(object):
+    manifestVersion = 1
+
     def __init__(self, core):
         super(PluginManager, self).__init__()
         self.core = core
+        self.manifest = None
+        self.manifestDirty = False
+        self.lazyCallbacks = {}
+        self.loadTimes = []
+        self.loadLock = threading.RLock()
 
     @err_catcher(name=__name__)
     def initializePlugins(self, appPlugin):
@@ -62,6 +112,7 @@ class PluginManager(object):
         self.core.rfManagers = {}
         self.core.prjManagers = {}
         self.core.inactivePlugins = {}
+        self.core.callbacks.invalidateDispatchTable()
 
         appPlug = self.loadAppPlugin(appPlugin, startup=True)
         if not appPlug:
@@ -69,6 +120,8 @@ class PluginManager(object):
 
         pluginDirs = self.getPluginDirs()
         self.loadPlugins(directories=pluginDirs)
+        self.saveManifest()
+        logger.debug(self.getStartupReport())
 
         if self.core.appPlugin.pluginName != "Standalone":
             self.core.maxwait = 20
@@ -175,7 +228,7 @@ class PluginManager(object):
         pluginName = os.path.basename(path)
         inactivePluginNames = self.core.getConfig("plugins", "inactive", dft=[])
         if pluginName in inactivePluginNames:
-            inactives = self.core.getConfig("plugins", "inactive", dft=[])
+            inactives = list(self.core.getConfig("plugins", "inactive", dft=[]))
             if pluginName in inactives:
                 inactives.remove(pluginName)
             self.core.setConfig("plugins", "inactive", inactives)
@@ -240,16 +293,14 @@ class PluginManager(object):
             logger.debug("skipped loading plugin %s - plugin has no init script" % pluginName)
             return
 
-        sys.path.append(os.path.dirname(initPath))
-        if os.path.exists(initPath.replace("_init", "_init_unloaded")):
-            pPlug = getattr(
-                __import__("Prism_%s_init_unloaded" % (pluginName)),
-                "Prism_%s_unloaded" % pluginName,
-            )(self.core)
+        startTime = time.time()
+        pPlug = self.getLazyPlugin(path, pluginPath)
+        if pPlug:
+            loadMode = "manifest"
         else:
-            pPlug = getattr(__import__("Prism_%s_init" % (pluginName)), "Prism_%s" % pluginName)(
-                self.core
-            )
+            loadMode = "import"
+            cbNum = self.core.callbacks.callbackNum
+            pPlug = self.importPlugin(pluginName, pluginPath)
 
         if platform.system() not in pPlug.platforms:
             logger.debug("skipped loading plugin %s - plugin doesn't support this OS" % pPlug.pluginName)
@@ -264,21 +315,282 @@ class PluginManager(object):
 
         pPlug.pluginPath = pluginPath
 
+        # plugins from the manifest were active when they got cached. Their
+        # isActive() can depend on the environment (e.g. available renderfarm
+        # groups), so it gets checked again in loadLazyPlugin
+        isActive = loadMode == "manifest" or pPlug.pluginType in ["App"] or pPlug.isActive()
+        self.core.callbacks.invalidateDispatchTable()
         if pPlug.pluginType in ["App"]:
             self.core.unloadedAppPlugins[pPlug.pluginName] = pPlug
         elif pPlug.pluginType in ["Custom"]:
-            if pPlug.isActive():
+            if isActive:
                 self.core.customPlugins[pPlug.pluginName] = pPlug
         elif pPlug.pluginType in ["RenderfarmManager"]:
-            if pPlug.isActive():
+            if isActive:
                 self.core.rfManagers[pPlug.pluginName] = pPlug
         elif pPlug.pluginType in ["ProjectManager"]:
-            if pPlug.isActive():
+            if isActive:
                 self.core.prjManagers[pPlug.pluginName] = pPlug
 
+        if loadMode == "import":
+            callbacks = [
+                cb["callbackName"]
+                for cbs in self.core.callbacks.registeredCallbacks.values()
+                for cb in cbs
+                if cb["id"] > cbNum
+            ]
+            self.updateManifest(path, pPlug, callbacks, isActive)
+
+        self.addLoadTime(pPlug, startTime, loadMode)
         logger.debug("loaded plugin %s" % pPlug.pluginName)
         return pPlug
 
+    @err_catcher(name=__name__)
+    def importPlugin(self, pluginName, pluginPath):
+        if pluginPath not in sys.path:
+            sys.path.append(pluginPath)
+
+        if os.path.exists(os.path.join(pluginPath, "Prism_%s_init_unloaded.py" % pluginName)):
+            pPlug = getattr(
+                __import__("Prism_%s_init_unloaded" % (pluginName)),
+                "Prism_%s_unloaded" % pluginName,
+            )(self.core)
+        else:
+            pPlug = getattr(__import__("Prism_%s_init" % (pluginName)), "Prism_%s" % pluginName)(
+                self.core
+            )
+
+        return pPlug
+
+    @err_catcher(name=__name__)
+    def isLazyLoadingEnabled(self):
+        return self.core.getConfig("plugins", "lazyLoading") is not False
+
+    @err_catcher(name=__name__)
+    def getManifestPath(self):
+        return os.path.join(
+            self.core.configs.getUserConfigDir(), "Cache", "pluginManifest.json"
+        )
+
+    @err_catcher(name=__name__)
+    def getManifestEntries(self):
+        # the manifest is stored per app, because plugins can behave
+        # differently in each app
+        if self.manifest is None:
+            self.manifest = {}
+            path = self.getManifestPath()
+            if os.path.exists(path):
+                try:
+                    with open(path, "r") as f:
+                        manifest = json.load(f)
+                except Exception as e:
+                    logger.debug("failed to read plugin manifest %s: %s" % (path, e))
+                else:
+                    if (
+                        manifest.get("version") == self.manifestVersion
+                        and manifest.get("prismVersion") == self.core.version
+                        and manifest.get("python") == sys.version[0]
+                    ):
+                        self.manifest = manifest.get("apps", {})
+
+        appName = self.core.appPlugin.pluginName
+        if appName not in self.manifest:
+            self.manifest[appName] = {}
+
+        return self.manifest[appName]
+
+    @err_catcher(name=__name__)
+    def saveManifest(self):
+        if not self.manifestDirty:
+            return
+
+        path = self.getManifestPath()
+        tmpPath = "%s.%s.tmp" % (path, os.getpid())
+        data = {
+            "version": self.manifestVersion,
+            "prismVersion": self.core.version,
+            "python": sys.version[0],
+            "apps": self.manifest,
+        }
+        try:
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            with open(tmpPath, "w") as f:
+                json.dump(data, f, indent=1)
+
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmpPath, path)
+            self.manifestDirty = False
+        except Exception as e:
+            logger.debug("failed to save plugin manifest %s: %s" % (path, e))
+
+    @err_catcher(name=__name__)
+    def getPluginSignature(self, pluginPath):
+        signature = []
+        for name in sorted(os.listdir(pluginPath)):
+            if os.path.splitext(name)[1] == ".py":
+                stat = os.stat(os.path.join(pluginPath, name))
+                signature.append([name, stat.st_mtime, stat.st_size])
+
+        return signature
+
+    @err_catcher(name=__name__)
+    def updateManifest(self, path, plugin, callbacks, isActive):
+        entries = self.getManifestEntries()
+        key = os.path.normpath(path)
+        # inactive plugins are imported on every startup, because they could
+        # become active without changes to the plugin files
+        if not isActive or not getattr(plugin, "lazyLoad", True):
+            if entries.pop(key, None):
+                self.manifestDirty = True
+            return
+
+        attributes = {}
+        for name, value in vars(plugin).items():
+            if name.startswith("_") or name in ["location", "pluginPath"]:
+                continue
+
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+
+            attributes[name] = value
+
+        pluginClass = type(plugin)
+        methods = [
+            x
+            for x in dir(pluginClass)
+            if not x.startswith("_") and callable(getattr(pluginClass, x, None))
+        ]
+
+        entries[key] = {
+            "signature": self.getPluginSignature(plugin.pluginPath),
+            "attributes": attributes,
+            "instanceAttributes": sorted(vars(plugin)),
+            "methods": methods,
+            "callbacks": sorted(set(callbacks)),
+        }
+        self.manifestDirty = True
+
+    @err_catcher(name=__name__)
+    def getLazyPlugin(self, path, pluginPath):
+        if not self.isLazyLoadingEnabled():
+            return
+
+        entries = self.getManifestEntries()
+        key = os.path.normpath(path)
+        entry = entries.get(key)
+        if not entry:
+            return
+
+        if entry["signature"] != self.getPluginSignature(pluginPath):
+            del entries[key]
+            self.manifestDirty = True
+            return
+
+        plugin = LazyPlugin(self, path, entry)
+        for callbackName in entry["callbacks"]:
+            if callbackName not in self.lazyCallbacks:
+                self.lazyCallbacks[callbackName] = []
+
+            self.lazyCallbacks[callbackName].append(plugin)
+
+        return plugin
+
+    @err_catcher(name=__name__)
+    def loadLazyPlugin(self, lazyPlugin):
+        with self.loadLock:
+            if lazyPlugin.isLoaded() or lazyPlugin._failed:
+                return
+
+            startTime = time.time()
+            pluginName = lazyPlugin.pluginName
+            attributes = lazyPlugin._entry["attributes"]
+            try:
+                plugin = self.importPlugin(pluginName, lazyPlugin.pluginPath)
+            except Exception:
+                lazyPlugin.__dict__["_failed"] = True
+                logger.warning("failed to load plugin %s: %s" % (pluginName, traceback.format_exc()))
+                return
+
+            # values, which were set on the placeholder before the plugin
+            # was loaded
+            for name, value in list(lazyPlugin.__dict__.items()):
+                if name.startswith("_"):
+                    continue
+
+                if name not in attributes or attributes[name] != value:
+                    setattr(plugin, name, value)
+
+                del lazyPlugin.__dict__[name]
+
+            lazyPlugin.__dict__["_plugin"] = plugin
+            isActive = plugin.pluginType in ["App"] or plugin.isActive()
+            for pDict in [
+                self.core.unloadedAppPlugins,
+                self.core.customPlugins,
+                self.core.rfManagers,
+                self.core.prjManagers,
+            ]:
+                if pDict.get(pluginName) is lazyPlugin:
+                    if isActive:
+                        pDict[pluginName] = plugin
+                    else:
+                        del pDict[pluginName]
+
+            if not isActive:
+                # the placeholder keeps forwarding to the plugin, so that the
+                # current caller doesn't fail, but the plugin isn't used anymore
+                getattr(plugin, "unregister", lambda: None)()
+                for cbPlugins in self.lazyCallbacks.values():
+                    if lazyPlugin in cbPlugins:
+                        cbPlugins.remove(lazyPlugin)
+
+                self.updateManifest(lazyPlugin._path, plugin, [], isActive)
+                self.saveManifest()
+                logger.debug("plugin %s is inactive" % pluginName)
+
+            self.core.callbacks.invalidateDispatchTable()
+
+            self.addLoadTime(plugin, startTime, "on demand")
+            logger.debug("loaded plugin %s on demand" % pluginName)
+
+    @err_catcher(name=__name__)
+    def loadCallbackPlugins(self, callbackName):
+        # plugins, which register callbacks when they get initialized
+        for lazyPlugin in self.lazyCallbacks.pop(callbackName, []):
+            if self.getPlugin(lazyPlugin.pluginName) is lazyPlugin:
+                self.loadLazyPlugin(lazyPlugin)
+
+    @err_catcher(name=__name__)
+    def addLoadTime(self, plugin, startTime, mode):
+        self.loadTimes.append({
+            "plugin": plugin.pluginName,
+            "type": plugin.pluginType,
+            "time": time.time() - startTime,
+            "mode": mode,
+        })
+
+    @err_catcher(name=__name__)
+    def getStartupReport(self):
+        total = sum(x["time"] for x in self.loadTimes)
+        lines = ["plugin load times (total: %.1fms):" % (total * 1000)]
+        for loadTime in sorted(self.loadTimes, key=lambda x: x["time"], reverse=True):
+            lines.append(
+                "    %-24s %-18s %8.1fms  %s"
+                % (
+                    loadTime["plugin"],
+                    loadTime["type"],
+                    loadTime["time"] * 1000,
+                    loadTime["mode"],
+                )
+            )
+
+        return "\n".join(lines)
+
     @err_catcher(name=__name__)
     def reloadPlugins(self, plugins=None):
         appPlug = self.core.appPlugin.pluginName
@@ -342,6 +654,8 @@ class PluginManager(object):
             cPlug = getattr(__import__("Prism_%s_init" % i), "Prism_%s" % i)(self.core)
             self.core.customPlugins[cPlug.pluginName] = cPlug
 
+        self.core.callbacks.invalidateDispatchTable()
+
     @err_catcher(name=__name__)
     def unloadProjectPlugins(self):
         pluginDicts = [
@@ -363,7 +677,7 @@ class PluginManager(object):
     def deactivatePlugin(self, pluginName):
         plugin = self.getPlugin(pluginName)
         pluginPath = getattr(plugin, "pluginPath", "")
-        inactives = self.core.getConfig("plugins", "inactive", dft=[])
+        inactives = list(self.core.getConfig("plugins", "inactive", dft=[]))
         if pluginName not in inactives:
             inactives.append(pluginName)
         self.core.setConfig("plugins", "inactive", inactives)
@@ -375,7 +689,12 @@ class PluginManager(object):
     def unloadPlugin(self, pluginName):
         plugin = self.getPlugin(pluginName)
         pluginPath = getattr(plugin, "pluginPath", "")
-        getattr(plugin, "unregister", lambda: None)()
+        if isinstance(plugin, LazyPlugin) and not plugin.isLoaded():
+            for cbPlugins in self.lazyCallbacks.values():
+                if plugin in cbPlugins:
+                    cbPlugins.remove(plugin)
+        else:
+            getattr(plugin, "unregister", lambda: None)()
 
         mods = [
             "Prism_%s_init" % pluginName,
@@ -407,6 +726,7 @@ class PluginManager(object):
 
         if pluginCategory is not None:
             del pluginCategory[pluginName]
+            self.core.callbacks.invalidateDispatchTable()
 
         if pluginName == self.core.appPlugin.pluginName:
             self.core.appPlugin = None
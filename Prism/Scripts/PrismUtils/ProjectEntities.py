@@ -47,6 +47,10 @@ except:
     psVersion = 1
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import EntityIndex
+from PrismUtils import VersionAllocator
+from PrismUtils import ScenefileParser
+from PrismUtils import ShotCatalog
 
 
 logger = logging.getLogger(__name__)
@@ -55,6 +59,10 @@ logger = logging.getLogger(__name__)
 class ProjectEntities(object):
     def __init__(self, core):
         self.core = core
+        self.index = EntityIndex.EntityIndex(core)
+        self.versions = VersionAllocator.VersionAllocator(core)
+        self.scenefileParser = None
+        self.shotCatalogs = {}
         self.refreshOmittedEntities()
 
         eDirs = [
@@ -104,7 +112,7 @@ class ProjectEntities(object):
         return self.core.getConfig("shotRanges", shotName, config="shotinfo")
 
     @err_catcher(name=__name__)
-    def getShots(self, searchFilter="", basepaths=None):
+    def getShotCatalog(self, basepaths=None):
         if not basepaths:
             seqDirs = [self.core.shotPath]
             if self.core.useLocalFiles:
@@ -113,51 +121,36 @@ class ProjectEntities(object):
         else:
             seqDirs = basepaths
 
-        sequences = []
-        shots = []
-
-        dirs = []
-        for seqDir in seqDirs:
-            for root, folders, files in os.walk(seqDir):
-                for f in folders:
-                    if f.startswith("_"):
-                        continue
-
-                    sPath = os.path.join(root, f)
-                    if sPath not in dirs:
-                        dirs.append(sPath)
-                break
-
-        for path in sorted(dirs):
-            val = os.path.basename(path)
-
-            if val in self.omittedEntities["shot"]:
+        # the catalog gets reused until one of the shot folders changes. The
+        # index replaces its entries when a folder gets rescanned
+        entries = self.index.getEntries(seqDirs)
+        omitted = list(self.omittedEntities["shot"])
+        cached = self.shotCatalogs.get(tuple(seqDirs))
+        if (
+            cached
+            and cached[1] == omitted
+            and len(cached[0]) == len(entries)
+            and all(x is y for x, y in zip(cached[0], entries))
+        ):
+            return cached[2]
+
+        folders = []
+        for seqDir, entry in zip(seqDirs, entries):
+            if not entry:
                 continue
 
-            shotName, seqName = self.core.entities.splitShotname(val)
-            if searchFilter not in seqName and searchFilter not in shotName:
-                continue
+            for f in entry["dirs"]:
+                folders.append([seqDir, f, os.path.join(seqDir, f)])
 
-            if shotName:
-                for shot in shots:
-                    if seqName == shot[0] and shotName == shot[1]:
-                        break
-                else:
-                    shotData = [seqName, shotName, val, path]
-                    shots.append(shotData)
-
-            if seqName not in sequences:
-                sequences.append(seqName)
-
-        sequences = sorted(sequences)
-        shots = sorted(shots, key=lambda x: self.core.naturalKeys(x[1]))
+        catalog = ShotCatalog.ShotCatalog(self, folders, omitted=omitted)
+        self.shotCatalogs[tuple(seqDirs)] = [entries, omitted, catalog]
+        self.index.save()
+        return catalog
 
-        if "no sequence" in sequences:
-            sequences.insert(
-                len(sequences), sequences.pop(sequences.index("no sequence"))
-            )
-
-        return sequences, shots
+    @err_catcher(name=__name__)
+    def getShots(self, searchFilter="", basepaths=None):
+        catalog = self.getShotCatalog(basepaths=basepaths)
+        return catalog.getShotList(searchFilter)
 
     @err_catcher(name=__name__)
     def getSteps(self, asset=None, shot=None):
@@ -175,20 +168,16 @@ class ProjectEntities(object):
             lpath = self.core.convertPath(path, target="local")
             stepDirs = [path, lpath]
 
-        dirContent = []
-
-        for sDir in stepDirs:
-            if os.path.exists(sDir):
-                dirContent += [os.path.join(sDir, x) for x in os.listdir(sDir)]
+        dirContent = self.index.getMergedDirs(stepDirs)
 
-        for i in sorted(dirContent, key=lambda x: os.path.basename(x)):
-            stepName = os.path.basename(i)
+        for stepName in dirContent:
             if stepName.startswith("_"):
                 continue
 
-            if os.path.isdir(i) and stepName not in steps:
+            if stepName not in steps:
                 steps.append(stepName)
 
+        self.index.save()
         return steps
 
     @err_catcher(name=__name__)
@@ -207,20 +196,16 @@ class ProjectEntities(object):
             lpath = self.core.convertPath(path, target="local")
             catDirs = [path, lpath]
 
-        dirContent = []
+        dirContent = self.index.getMergedDirs(catDirs)
 
-        for cDir in catDirs:
-            if os.path.exists(cDir):
-                dirContent += [os.path.join(cDir, x) for x in os.listdir(cDir)]
-
-        for i in sorted(dirContent, key=lambda x: os.path.basename(x)):
-            catName = os.path.basename(i)
+        for catName in dirContent:
             if catName.startswith("_"):
                 continue
 
-            if os.path.isdir(i) and catName not in cats:
+            if catName not in cats:
                 cats.append(catName)
 
+        self.index.save()
         return cats
 
     @err_catcher(name=__name__)
@@ -251,46 +236,40 @@ class ProjectEntities(object):
             sceneDirs = [path, lpath]
 
         sfiles = {}
-        for sDir in sceneDirs:
-            for root, dirs, files in os.walk(sDir):
-                for f in files:
-                    if f in sfiles:
-                        continue
-
-                    sData = self.core.getScenefileData(f)
-
-                    if sData["entity"] not in ["asset", "shot"]:
-                        continue
-
-                    try:
-                        int(sData["extension"][-5:]) #ignore maya temp files
-                        continue
-                    except:
-                        pass
+        parser = self.getScenefileParser()
+        sceneFormats = self.core.getPluginSceneFormats()
+        for sDir, entry in zip(sceneDirs, self.index.getEntries(sceneDirs)):
+            if not entry:
+                continue
 
-                    if "extension" not in sData:
-                        continue
+            names = [f for f in sorted(entry["files"]) if f not in sfiles]
+            for sPath, record in parser.parseMany(names, basePath=sDir):
+                try:
+                    int(record.extension[-5:]) #ignore maya temp files
+                    continue
+                except:
+                    pass
 
-                    if f.endswith("autosave"):
-                        continue
+                if sPath.endswith("autosave"):
+                    continue
 
-                    uScene = (
-                        sData["extension"] not in self.core.getPluginSceneFormats()
-                        and "info" not in sData["extension"]
-                        and "preview" not in sData["extension"]
-                    )
+                uScene = (
+                    record.extension not in sceneFormats
+                    and "info" not in record.extension
+                    and "preview" not in record.extension
+                )
 
-                    if (
-                        sData["extension"] not in extensions
-                        and not ("*" in extensions and uScene)
-                    ):
-                        continue
+                if (
+                    record.extension not in extensions
+                    and not ("*" in extensions and uScene)
+                ):
+                    continue
 
-                    sfiles[f] = os.path.join(root, f)
-                break
+                sfiles[os.path.basename(sPath)] = sPath
 
         scenefiles = sfiles.values()
 
+        self.index.save()
         return scenefiles
 
     @err_catcher(name=__name__)
@@ -328,6 +307,7 @@ class ProjectEntities(object):
         existed = os.path.exists(folderPath)
         if not os.path.exists(folderPath):
             os.makedirs(folderPath)
+            self.index.invalidate(os.path.dirname(folderPath))
 
         relpath = self.getAssetRelPathFromPath(folderPath)
 
@@ -358,6 +338,9 @@ class ProjectEntities(object):
             if not os.path.exists(aFolder):
                 os.makedirs(aFolder)
 
+        self.index.invalidate(assetPath)
+        self.index.invalidate(os.path.dirname(assetPath))
+
         assetName = self.getAssetNameFromPath(assetPath)
 
         if not existed:
@@ -396,6 +379,8 @@ class ProjectEntities(object):
                     else:
                         raise
 
+        self.index.invalidate(os.path.dirname(sBase))
+
         if frameRange:
             self.core.setConfig("shotRanges", shotName, frameRange, config="shotinfo")
 
@@ -439,6 +424,8 @@ class ProjectEntities(object):
             except:
                 self.core.popup("The directory %s could not be created" % stepName)
                 return False
+
+            self.index.invalidate(os.path.dirname(stepPath))
         else:
             existed = True
             logger.debug("step already exists: %s" % stepPath)
@@ -494,6 +481,7 @@ class ProjectEntities(object):
                 self.core.popup("The directory %s could not be created" % path)
                 return
             else:
+                self.index.invalidate(os.path.dirname(path))
                 self.core.callback(
                     name="onCategoryCreated",
                     types=["custom"],
@@ -512,7 +500,7 @@ class ProjectEntities(object):
             entityType = "asset"
 
         if omit:
-            omits = self.core.getConfig(entityType, config="omit") or []
+            omits = list(self.core.getConfig(entityType, config="omit") or [])
 
             if entityName not in omits:
                 omits.append(entityName)
@@ -560,6 +548,9 @@ class ProjectEntities(object):
                     )
                     if os.path.exists(lShotPath):
                         shutil.rmtree(lShotPath)
+                        self.index.invalidate(os.path.dirname(lShotPath))
+
+                self.index.invalidate(os.path.dirname(shotPath))
                 break
             except Exception as e:
                 msg = QMessageBox(
@@ -596,6 +587,7 @@ class ProjectEntities(object):
                 for k in shotFolders:
                     if os.path.exists(k):
                         os.rename(k, shotFolders[k])
+                        self.index.invalidate(os.path.dirname(k))
 
                     cwd = os.getcwd()
                     for i in os.walk(shotFolders[k]):
@@ -635,10 +627,11 @@ class ProjectEntities(object):
                     self.core.popup("Renaming shot canceled.")
                     return
 
-        curRange = self.core.getConfig("shotRanges", curShotName, config="shotinfo")
-        if curRange:
-            self.core.setConfig("shotRanges", newShotName, curRange, config="shotinfo")
-        self.core.setConfig("shotRanges", curShotName, delete=True, config="shotinfo")
+        with self.core.configs.batch(config="shotinfo"):
+            curRange = self.core.getConfig("shotRanges", curShotName, config="shotinfo")
+            if curRange:
+                self.core.setConfig("shotRanges", newShotName, curRange, config="shotinfo")
+            self.core.setConfig("shotRanges", curShotName, delete=True, config="shotinfo")
 
     @err_catcher(name=__name__)
     def createEntityFromData(self, entity):
@@ -792,10 +785,10 @@ class ProjectEntities(object):
 
     @err_catcher(name=__name__)
     def getTypeFromPath(self, path):
-        if not os.path.exists(path):
+        if not self.index.exists(path):
             return
 
-        dirContent = os.listdir(path)
+        dirContent = self.index.getContent(path)
 
         isAsset = (
             "Export" in dirContent
@@ -812,31 +805,36 @@ class ProjectEntities(object):
     @err_catcher(name=__name__)
     def getAssetPaths(self, path=None, returnFolders=False, depth=0):
         aBasePath = path or self.core.getAssetPath()
+        assets, assetFolders = self.getAssetPathsFromIndex(aBasePath, depth=depth)
+        self.index.save()
+
+        if returnFolders:
+            return assets, assetFolders
+        else:
+            return assets
+
+    @err_catcher(name=__name__)
+    def getAssetPathsFromIndex(self, path, depth=0):
         assets = []
         assetFolders = []
 
-        for root, folders, files in os.walk(aBasePath):
-            for folder in folders:
-                folderPath = os.path.join(root, folder)
-                if self.getTypeFromPath(folderPath) == "asset":
-                    assets.append(folderPath)
+        for folder in self.index.getDirs(path):
+            folderPath = os.path.join(path, folder)
+            if self.getTypeFromPath(folderPath) == "asset":
+                assets.append(folderPath)
+            else:
+                if depth == 1:
+                    assetFolders.append(folderPath)
                 else:
-                    if depth == 1:
-                        assetFolders.append(folderPath)
+                    nextDepth = 0 if depth == 0 else (depth-1)
+                    childAssets, childFolders = self.getAssetPathsFromIndex(folderPath, depth=nextDepth)
+                    if childAssets or childFolders:
+                        assets += childAssets
+                        assetFolders += childFolders
                     else:
-                        nextDepth = 0 if depth == 0 else (depth-1)
-                        childAssets, childFolders = self.getAssetPaths(path=folderPath, returnFolders=True, depth=nextDepth)
-                        if childAssets or childFolders:
-                            assets += childAssets
-                            assetFolders += childFolders
-                        else:
-                            assetFolders.append(folderPath)
-            break
+                        assetFolders.append(folderPath)
 
-        if returnFolders:
-            return assets, assetFolders
-        else:
-            return assets
+        return assets, assetFolders
 
     @err_catcher(name=__name__)
     def getEmptyAssetFolders(self):
@@ -919,56 +917,34 @@ class ProjectEntities(object):
         return path.replace(self.core.assetPath, "").strip("\\").strip("/")
 
     @err_catcher(name=__name__)
-    def getScenefileData(self, fileName):
-        fname = os.path.basename(fileName).split(self.core.filenameSeparator)
-        data = {}
-        try:
-            data["basePath"] = os.path.dirname(fileName)
-        except:
-            pass
-
-        data["filename"] = fileName
-
-        if len(fname) == 6:
-            data.update({
-                "entity": "asset",
-                "entityName": fname[0],
-                "step": fname[1],
-                "category": "",
-                "version": fname[2],
-                "comment": fname[3],
-                "user": fname[4],
-                "extension": fname[5],
-            })
-
-        elif len(fname) == 7:
-            data.update({
-                "entity": "asset",
-                "entityName": fname[0],
-                "step": fname[1],
-                "category": fname[2],
-                "version": fname[3],
-                "comment": fname[4],
-                "user": fname[5],
-                "extension": fname[6],
-            })
-
-        elif len(fname) == 8:
-            data.update({
-                "entity": "shot",
-                "entityName": fname[1],
-                "step": fname[2],
-                "category": fname[3],
-                "version": fname[4],
-                "comment": fname[5],
-                "user": fname[6],
-                "extension": fname[7],
-            })
+    def getScenefileParser(self):
+        key = (
+            self.core.filenameSeparator,
+            getattr(self.core, "versionFormat", "v%04d"),
+            self.core.versionPadding,
+        )
+        if not self.scenefileParser or self.scenefileParser.key != key:
+            self.scenefileParser = ScenefileParser.ScenefileParser(*key)
 
-        else:
-            data.update({"entity": "invalid"})
+        return self.scenefileParser
+
+    @err_catcher(name=__name__)
+    def getScenefileData(self, fileName):
+        # called for every file of a refresh, so the parser is only looked
+        # up again when the naming settings changed
+        parser = self.scenefileParser
+        if not parser or parser.key != (
+            self.core.filenameSeparator,
+            getattr(self.core, "versionFormat", "v%04d"),
+            self.core.versionPadding,
+        ):
+            parser = self.getScenefileParser()
+
+        return parser.getData(fileName)
 
-        return data
+    @err_catcher(name=__name__)
+    def getScenefileRecords(self, basePath, fileNames):
+        return self.getScenefileParser().parseMany(fileNames, basePath=basePath)
 
     @err_catcher(name=__name__)
     def getHighestVersion(
@@ -979,6 +955,7 @@ class ProjectEntities(object):
         fileTypes="*",
         localVersions=True,
         getExistingVersion=False,
+        reserve=False,
     ):
         if not scenetype:
             glbDstname = dstname
@@ -995,93 +972,146 @@ class ProjectEntities(object):
             else:
                 return
 
-        files = []
         if self.core.useLocalFiles and localVersions:
             dstname = dstname.replace(self.core.localProjectPath, self.core.projectPath)
 
-        for i in os.walk(dstname):
-            files += [os.path.join(i[0], x) for x in i[2]]
-            break
-
+        sceneDirs = [dstname]
         if self.core.useLocalFiles and localVersions:
-            for i in os.walk(dstname.replace(self.core.projectPath, self.core.localProjectPath)):
-                files += [os.path.join(i[0], x) for x in i[2]]
-                break
+            sceneDirs.append(dstname.replace(self.core.projectPath, self.core.localProjectPath))
 
-        highversion = [0, ""]
-        for i in files:
-            if fileTypes != "*" and os.path.splitext(i)[1] not in fileTypes:
-                continue
+        if fileTypes == "*":
+            cacheKey = scenetype.lower()
+        else:
+            cacheKey = "%s|%s" % (scenetype.lower(), ",".join(sorted(fileTypes)))
 
-            fname = self.core.getScenefileData(i)
+        parser = self.getScenefileParser()
 
-            if fname["entity"] != scenetype.lower():
-                continue
+        def getExisting(recheck=False):
+            highversion = [0, ""]
+            entries = self.index.getEntries(sceneDirs, recheck=recheck)
+            for sceneDir, entry in zip(sceneDirs, entries):
+                if not entry:
+                    continue
 
-            try:
-                version = int(fname["version"][-self.core.versionPadding:])
-            except:
-                continue
+                # the result is stored in the index entry, which gets replaced
+                # when the content of the folder changes
+                dirVersion = entry.get("highestVersions", {}).get(cacheKey)
+                if dirVersion is None:
+                    dirVersion = [0, ""]
+                    for f in entry["files"]:
+                        if fileTypes != "*" and os.path.splitext(f)[1] not in fileTypes:
+                            continue
+
+                        record = parser.parseName(f)
+                        if record.entity != scenetype.lower():
+                            continue
+
+                        version = record.versionNumber
+                        if version is None:
+                            continue
+
+                        if version > dirVersion[0] or (
+                            version == dirVersion[0] and f < dirVersion[1]
+                        ):
+                            dirVersion = [version, f]
 
-            if version > highversion[0]:
-                highversion = [version, i]
+                    self.index.setEntryData(
+                        sceneDir, entry, "highestVersions", cacheKey, dirVersion
+                    )
+
+                if dirVersion[0] > highversion[0]:
+                    highversion = [dirVersion[0], os.path.join(sceneDir, dirVersion[1])]
 
-        if getExistingVersion:
             return highversion
+
+        if getExistingVersion:
+            return getExisting()
         elif getExistingPath:
-            return highversion[1]
+            return getExisting()[1]
+        elif reserve:
+            version = self.versions.reserveVersion(
+                dstname, "scene", lambda: getExisting(recheck=True)[0]
+            )
         else:
-            return self.core.versionFormat % (highversion[0] + 1)
+            version = max(
+                getExisting()[0], self.versions.getReservedVersion(dstname, "scene")
+            ) + 1
+
+        self.index.save()
+        return self.core.versionFormat % version
 
     @err_catcher(name=__name__)
-    def getHighestTaskVersion(self, dstname, getExisting=False, ignoreEmpty=False):
-        taskDirs = []
+    def getHighestTaskVersion(self, dstname, getExisting=False, ignoreEmpty=False, reserve=False):
+        if not getExisting and not self.core.separateOutputVersionStack:
+            fileName = self.core.getCurrentFileName()
+            fnameData = self.core.getScenefileData(fileName)
+            if fnameData["entity"] != "invalid":
+                hVersion = fnameData["version"]
+            else:
+                hVersion = self.core.versionFormat % 1
+
+            return hVersion
+
         outPaths = self.core.getExportPaths().values()
 
         for path in outPaths:
             dstname = dstname.replace(path, self.core.projectPath)
 
-        for path in outPaths:
-            opath = dstname.replace(self.core.projectPath, path)
-            for i in os.walk(opath):
+        taskPaths = [dstname.replace(self.core.projectPath, path) for path in outPaths]
+
+        def getExistingVersion(recheck=False):
+            taskDirs = []
+            entries = self.index.getEntries(taskPaths, recheck=recheck)
+            for taskPath, entry in zip(taskPaths, entries):
+                if not entry:
+                    continue
+
                 if ignoreEmpty:
-                    for k in i[1]:
-                        exFiles = os.listdir(os.path.join(i[0], k))
+                    for k in entry["dirs"]:
+                        exFiles = self.index.getContent(
+                            os.path.join(taskPath, k), recheck=recheck
+                        )
                         if len(exFiles) > 1 or (
                             len(exFiles) == 1 and not exFiles[0].startswith("versioninfo")
                         ):
                             taskDirs.append(k)
                 else:
-                    taskDirs += i[1]
-                break
+                    taskDirs += entry["dirs"]
 
-        highversion = 0
-        for i in taskDirs:
-            fname = i.split(self.core.filenameSeparator)
+            highversion = 0
+            for i in taskDirs:
+                fname = i.split(self.core.filenameSeparator)
 
-            if len(fname) in [1, 2, 3]:
-                try:
-                    version = int(fname[0][1:(1+self.core.versionPadding)])
-                except:
-                    continue
+                if len(fname) in [1, 2, 3]:
+                    try:
+                        version = int(fname[0][1:(1+self.core.versionPadding)])
+                    except:
+                        continue
 
-                if version > highversion:
-                    highversion = version
+                    if version > highversion:
+                        highversion = version
 
-        if not getExisting and not self.core.separateOutputVersionStack:
-            fileName = self.core.getCurrentFileName()
-            fnameData = self.core.getScenefileData(fileName)
-            if fnameData["entity"] != "invalid":
-                hVersion = fnameData["version"]
-            else:
-                hVersion = self.core.versionFormat % 1
+            return highversion
 
-            return hVersion
+        if getExisting:
+            highversion = getExistingVersion()
+            self.index.save()
+            if highversion != 0:
+                return self.core.versionFormat % (highversion)
+            else:
+                return self.core.versionFormat % 1
 
-        if getExisting and highversion != 0:
-            return self.core.versionFormat % (highversion)
+        if reserve:
+            version = self.versions.reserveVersion(
+                dstname, "task", lambda: getExistingVersion(recheck=True)
+            )
         else:
-            return self.core.versionFormat % (highversion + 1)
+            version = max(
+                getExistingVersion(), self.versions.getReservedVersion(dstname, "task")
+            ) + 1
+
+        self.index.save()
+        return self.core.versionFormat % version
 
     @err_catcher(name=__name__)
     def getLatestCompositingVersion(self, curPath):
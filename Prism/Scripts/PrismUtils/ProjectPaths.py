@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import re
+import time
+import logging
+import platform
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+# The roots of the current project, which are computed once when the project
+# gets loaded: the project folder, the local folder and the custom export
+# paths together with the scene, asset, shot and texture folders inside of
+# them. Converting and classifying paths uses a compiled prefix matcher
+# instead of reading the project config for every call. The object gets
+# recreated when pipeline.yml changes or when one of the project settings of
+# the core changes.
+class ProjectPaths(object):
+    # seconds in which the mtime of pipeline.yml isn't checked again
+    checkInterval = 1
+
+    def __init__(self, core):
+        self.core = core
+        self.configPath = core.prismIni
+        self.projectPath = core.projectPath
+        self.useLocalFiles = getattr(core, "useLocalFiles", False)
+        self.localProjectPath = getattr(core, "localProjectPath", "") if self.useLocalFiles else ""
+        self.configMtime = self.getConfigMtime()
+        self.lastCheck = time.time()
+
+        self.sceneName = core.getConfig("paths", "scenes", configPath=self.configPath)
+        self.exportPaths = self.loadExportPaths()
+        self.scenePaths = OrderedDict()
+        self.assetPaths = {}
+        self.shotPaths = {}
+        self.texturePaths = {}
+        for location, root in self.exportPaths.items():
+            if self.sceneName:
+                scenePath = os.path.normpath(os.path.join(root, self.sceneName))
+                self.scenePaths[location] = scenePath
+                self.assetPaths[location] = os.path.join(scenePath, "Assets")
+                self.shotPaths[location] = os.path.join(scenePath, "Shots")
+                self.texturePaths[location] = os.path.join(scenePath, "Textures")
+
+        self.rootMatcher, self.rootLocations = self.compileMatcher(self.exportPaths)
+        self.sceneMatcher, self.sceneLocations = self.compileMatcher(self.scenePaths)
+
+    def getConfigMtime(self):
+        try:
+            return os.path.getmtime(self.configPath)
+        except (OSError, TypeError):
+            return
+
+    def loadExportPaths(self):
+        exportPaths = OrderedDict([("global", self.projectPath)])
+        if self.useLocalFiles:
+            exportPaths["local"] = self.localProjectPath
+
+        customPaths = self.core.getConfig(
+            "export_paths", configPath=self.configPath, dft=[]
+        )
+        for cp in customPaths:
+            exportPaths[cp] = customPaths[cp]
+
+        for path in exportPaths:
+            exportPaths[path] = os.path.normpath(exportPaths[path])
+
+        return exportPaths
+
+    def compileMatcher(self, roots):
+        # longer roots are tested first, so that nested roots get matched
+        # correctly. Returns the regex and the location of every group
+        locations = []
+        patterns = []
+        for location, root in sorted(roots.items(), key=lambda x: -len(x[1])):
+            if not root:
+                continue
+
+            locations.append(location)
+            patterns.append("(%s)" % re.escape(root.rstrip("\\/")))
+
+        if not patterns:
+            return None, locations
+
+        flags = re.IGNORECASE if platform.system() == "Windows" else 0
+        regex = re.compile(r"^(?:%s)(?=[\\/]|$)" % "|".join(patterns), flags)
+        return regex, locations
+
+    def matchPath(self, matcher, locations, path):
+        if not matcher or not path:
+            return None, path
+
+        match = matcher.match(path)
+        if not match:
+            return None, path
+
+        return locations[match.lastindex - 1], path[match.end():]
+
+    def isValid(self):
+        core = self.core
+        if (
+            core.prismIni != self.configPath
+            or getattr(core, "projectPath", None) != self.projectPath
+            or getattr(core, "useLocalFiles", False) != self.useLocalFiles
+            or (
+                self.useLocalFiles
+                and getattr(core, "localProjectPath", "") != self.localProjectPath
+            )
+        ):
+            return False
+
+        now = time.time()
+        if now - self.lastCheck > self.checkInterval:
+            self.lastCheck = now
+            if self.getConfigMtime() != self.configMtime:
+                logger.debug("project config changed: %s" % self.configPath)
+                return False
+
+        return True
+
+    def getLocation(self, path):
+        # returns the export location ("global", "local", ...), which
+        # contains the path or None
+        return self.matchPath(self.rootMatcher, self.rootLocations, os.path.normpath(path))[0]
+
+    def getSceneLocation(self, path):
+        return self.matchPath(self.sceneMatcher, self.sceneLocations, os.path.normpath(path))[0]
+
+    def getScenePath(self, location="global"):
+        return self.scenePaths.get(location, "")
+
+    def getAssetPath(self, location="global"):
+        return self.assetPaths.get(location, "")
+
+    def getShotPath(self, location="global"):
+        return self.shotPaths.get(location, "")
+
+    def getTexturePath(self, location="global"):
+        return self.texturePaths.get(location, "")
+
+    def convertPath(self, path, target="global"):
+        path = os.path.normpath(path)
+        if not self.useLocalFiles or target not in ["global", "local"]:
+            return path
+
+        location, relPath = self.matchPath(self.sceneMatcher, self.sceneLocations, path)
+        if location not in ["global", "local"] or location == target:
+            return path
+
+        return self.scenePaths[target] + relPath
@@ -48,6 +48,7 @@ except:
     from PySide.QtGui import *
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import ProjectPaths
 
 
 logger = logging.getLogger(__name__)
@@ -217,6 +218,7 @@ class Projects(object):
 
         if unset:
             self.core.prismIni = ""
+            self.core.projectPaths = None
             self.core.setConfig("globals", "current project", "")
             if hasattr(self.core, "projectName"):
                 del self.core.projectName
@@ -265,10 +267,10 @@ class Projects(object):
         self.core.versionFormatVan = self.core.getConfig("globals", "versionFormat", dft=self.core.versionFormatVan, configPath=configPath)
         self.core.versionFormat = self.core.versionFormatVan.replace("#", "%0{}d".format(self.core.versionPadding))
 
-        self.core.getScenePath(cached=False)
-        self.core.getShotPath()
-        self.core.getAssetPath()
-        self.core.getTexturePath()
+        # the project roots are computed once and only get recomputed when
+        # the project config changes
+        self.core.projectPaths = ProjectPaths.ProjectPaths(self.core)
+        self.core.getScenePath()
 
         logger.debug("Loaded project " + self.core.projectPath)
 
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import time
+import logging
+import traceback
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+try:
+    from PySide2.QtCore import *
+    from PySide2.QtGui import *
+    from PySide2.QtWidgets import *
+
+    psVersion = 2
+except:
+    from PySide.QtCore import *
+    from PySide.QtGui import *
+
+    psVersion = 1
+
+from PrismUtils import ThreadUtils
+
+logger = logging.getLogger(__name__)
+
+
+# A single state of a publish. Folders don't create tasks, their children get
+# executed directly with the folder as their parent (like Folder.executeState
+# did). Dependency states are barriers: they collect the submissions of all
+# states before them and the following states of the same parent read the
+# dependencies from the parent, so they have to wait for the barrier.
+class PublishTask(object):
+    def __init__(self, state, parent, index, threadSafe=False, isBarrier=False):
+        self.state = state
+        self.ui = state.ui
+        self.parent = parent
+        self.index = index
+        self.threadSafe = threadSafe
+        self.isBarrier = isBarrier
+        self.dependencies = []
+        # the Folder states, which contain the state
+        self.folders = []
+        self.done = False
+        self.result = None
+
+    def __repr__(self):
+        return "<PublishTask %s>" % self.state.text(0)
+
+    def isReady(self):
+        return all(x.done for x in self.dependencies)
+
+
+# The out-of-process part of a state (like a media conversion), which doesn't
+# access the scene or the UI. A state returns it from executeState through
+# StateManager.runOutOfProcess. "func" runs in a worker thread while the main
+# thread continues with the next state. "finish" gets the result of "func" and
+# runs in the main thread afterwards. It returns the result of the state.
+class WorkerStep(object):
+    def __init__(self, func, finish=None):
+        self.func = func
+        self.finish = finish
+
+
+# Executes the states of a publish in dependency order. States, which the app
+# plugin declares as thread-safe, run on a worker pool, while all other states
+# run one by one in the main thread. The out-of-process parts of the main
+# thread states (like media conversions) run on the pool too (see WorkerStep),
+# renderfarm submissions get queued by the renderfarm plugins. The main thread
+# keeps processing events while it waits for the workers and every result gets
+# added to stateManager.publishResult as soon as it is available.
+class PublishScheduler(object):
+    def __init__(self, stateManager, threads=4):
+        self.stateManager = stateManager
+        self.core = stateManager.core
+        # the states mostly wait for files and subprocesses, so the number of
+        # threads doesn't depend on the number of cpu cores
+        self.numThreads = max(1, threads)
+        self.tasks = []
+        self.folders = []
+        self.startedFolders = set()
+        self.finished = Queue()
+        self.pool = None
+        self.paused = False
+        self.running = False
+
+    def isThreadSafe(self, stateUi):
+        func = getattr(self.core.appPlugin, "sm_isStateThreadSafe", None)
+        if func:
+            return bool(func(self.stateManager, stateUi))
+
+        return bool(getattr(stateUi, "threadSafe", False))
+
+    def isBarrier(self, stateUi):
+        return stateUi.className == "Dependency"
+
+    def collectTasks(self, items, parent, execStates, checkRoots=True, folders=None):
+        folders = folders or []
+        for item in items:
+            if checkRoots and (
+                item.checkState(0) != Qt.Checked or item not in execStates
+            ):
+                continue
+
+            if item.ui.className == "Folder":
+                self.folders.append(item.ui)
+                children = [item.child(i) for i in range(item.childCount())]
+                self.collectTasks(
+                    children, item.ui, execStates, folders=folders + [item.ui]
+                )
+                continue
+
+            task = PublishTask(
+                item,
+                parent,
+                len(self.tasks),
+                threadSafe=self.isThreadSafe(item.ui),
+                isBarrier=self.isBarrier(item.ui),
+            )
+            task.folders = folders
+            self.tasks.append(task)
+
+    def buildGraph(self, items, execStates, checkRoots=True):
+        self.tasks = []
+        self.folders = []
+        self.collectTasks(items, self.stateManager, set(execStates), checkRoots=checkRoots)
+
+        barriers = []
+        for task in self.tasks:
+            if task.isBarrier:
+                task.dependencies = self.tasks[:task.index]
+                barriers.append(task)
+            else:
+                task.dependencies = [x for x in barriers if x.parent is task.parent]
+
+        return self.tasks
+
+    def resetFolder(self, folder):
+        folder.osSubmittedJobs = {}
+        folder.osDependencies = []
+        folder.dependencies = []
+
+    def startTask(self, task):
+        # like Folder.executeState, a folder gets reset before its first
+        # state and after its last state
+        for folder in task.folders:
+            if folder not in self.startedFolders:
+                self.startedFolders.add(folder)
+                self.resetFolder(folder)
+
+    def getPool(self):
+        if self.pool is None:
+            self.pool = ThreadPool(self.numThreads)
+
+        return self.pool
+
+    def defer(self, func, finish=None):
+        # returns a WorkerStep during a publish. Otherwise the function gets
+        # executed directly
+        if self.running and ThreadUtils.isMainThread():
+            return WorkerStep(func, finish)
+
+        result = func()
+        if finish:
+            result = finish(result)
+
+        return result
+
+    def executeTask(self, task, useVersion):
+        if task.ui.className in ["ImageRender", "Export", "Playblast"]:
+            return task.ui.executeState(parent=task.parent, useVersion=useVersion)
+        else:
+            return task.ui.executeState(parent=task.parent)
+
+    def getErrorResult(self, task):
+        logger.warning(
+            "failed to execute state %s:\n%s"
+            % (task.state.text(0), traceback.format_exc())
+        )
+        return [
+            task.state.text(0)
+            + " - unknown error (view console for more information)"
+        ]
+
+    def executeInWorker(self, task, useVersion, step=None):
+        # errors of the state have to reach this thread to fail the task
+        ThreadUtils.setRaiseErrors(True)
+        try:
+            if step:
+                result = step.func()
+            else:
+                result = self.executeTask(task, useVersion)
+        except Exception:
+            result = self.getErrorResult(task)
+            step = None
+
+        self.finished.put([task, result, step])
+
+    def completeTask(self, task, result, step=None):
+        # called in the main thread with the result of a worker
+        if step and step.finish:
+            try:
+                result = step.finish(result)
+            except Exception:
+                result = self.getErrorResult(task)
+
+        self.finishTask(task, result)
+
+    def finishTask(self, task, result):
+        task.result = result
+        task.done = True
+        self.stateManager.publishResult.append({"state": task.ui, "result": result})
+        if result and "publish paused" in result[0]:
+            self.paused = True
+
+        for folder in task.folders:
+            tasks = [x for x in self.tasks if folder in x.folders]
+            if all(x.done for x in tasks):
+                self.resetFolder(folder)
+
+    def updateProgress(self, popup, tasks, running):
+        if not popup or not getattr(popup, "msg", None):
+            return
+
+        numDone = len([x for x in tasks if x.done])
+        names = ", ".join(x.state.text(0) for x in running)
+        text = 'Executing "%s" - please wait.. (%s/%s)' % (names, numDone + 1, len(tasks))
+        try:
+            popup.msg.setText(text)
+        except Exception:
+            pass
+
+    def processEvents(self):
+        if QCoreApplication.instance():
+            QCoreApplication.processEvents()
+
+    def run(self, useVersion="next", popup=None):
+        pending = list(self.tasks)
+        running = []
+        self.paused = False
+        self.running = True
+        startTime = time.time()
+
+        try:
+            while pending or running:
+                while True:
+                    try:
+                        task, result, step = self.finished.get_nowait()
+                    except Empty:
+                        break
+
+                    running.remove(task)
+                    self.completeTask(task, result, step)
+
+                if self.paused:
+                    pending = []
+
+                ready = [x for x in pending if x.isReady()]
+                for task in [x for x in ready if x.threadSafe]:
+                    pending.remove(task)
+                    running.append(task)
+                    self.startTask(task)
+                    self.getPool().apply_async(self.executeInWorker, (task, useVersion))
+
+                mainTasks = [x for x in ready if not x.threadSafe]
+                if mainTasks:
+                    # DCC operations are only possible in the main thread
+                    task = mainTasks[0]
+                    pending.remove(task)
+                    self.updateProgress(popup, self.tasks, running + [task])
+                    self.startTask(task)
+                    result = self.executeTask(task, useVersion)
+                    if isinstance(result, WorkerStep):
+                        running.append(task)
+                        self.getPool().apply_async(
+                            self.executeInWorker, (task, useVersion, result)
+                        )
+                    else:
+                        self.finishTask(task, result)
+
+                    continue
+
+                if running:
+                    self.updateProgress(popup, self.tasks, running)
+                    try:
+                        task, result, step = self.finished.get(timeout=0.05)
+                    except Empty:
+                        self.processEvents()
+                        continue
+
+                    running.remove(task)
+                    self.completeTask(task, result, step)
+                elif pending:
+                    logger.warning("unable to resolve the order of the remaining states: %s" % pending)
+                    break
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+
+            self.running = False
+
+        logger.debug(
+            "executed %s states in %.2fs (%s in worker threads)"
+            % (
+                len([x for x in self.tasks if x.done]),
+                time.time() - startTime,
+                len([x for x in self.tasks if x.threadSafe and x.done]),
+            )
+        )
+        return not self.paused
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import threading
+
+from collections import OrderedDict, namedtuple
+
+
+# Immutable result of parsing a scenefile name. versionNumber is the integer
+# of the padded version digits or None if they aren't a number.
+ScenefileRecord = namedtuple(
+    "ScenefileRecord",
+    [
+        "entity",
+        "entityName",
+        "step",
+        "category",
+        "version",
+        "comment",
+        "user",
+        "extension",
+        "versionNumber",
+    ],
+)
+
+invalidRecord = ScenefileRecord("invalid", None, None, None, None, None, None, None, None)
+
+dataKeys = ScenefileRecord._fields[:-1]
+
+
+# Parses scenefile names of the naming convention of a project:
+#   asset:              <asset>_<step>_<version>_<comment>_<user>_<ext>
+#   asset (category):   <asset>_<step>_<category>_<version>_<comment>_<user>_<ext>
+#   shot:               shot_<shot>_<step>_<category>_<version>_<comment>_<user>_<ext>
+# The parser is created for one separator and version format. Records are
+# cached by filename in a LRU cache, because the same files get parsed
+# many times during a single refresh of the Project Browser.
+class ScenefileParser(object):
+    def __init__(self, separator, versionFormat="v%04d", versionPadding=4, maxSize=20000):
+        self.separator = separator
+        self.versionFormat = versionFormat
+        self.versionPadding = versionPadding
+        self.key = (separator, versionFormat, versionPadding)
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # entity type and index of the entity name per number of name parts
+        self.layouts = {
+            6: ("asset", 0),
+            7: ("asset", 0),
+            8: ("shot", 1),
+        }
+        self.clear()
+
+    def isCompatible(self, separator, versionFormat, versionPadding):
+        return (separator, versionFormat, versionPadding) == self.key
+
+    def getVersionNumber(self, version):
+        # all trailing digits, so that versions, which exceed the padding
+        # (like v10000 with a padding of 4), keep their number
+        digits = version[len(version.rstrip("0123456789")):]
+        try:
+            return int(digits)
+        except ValueError:
+            return
+
+    def lookup(self, name):
+        # returns the cached (record, data) tuple of a name. "data" is the
+        # dict of the record, which gets copied by getData
+        cached = self.records.get(name)
+        if cached is not None:
+            # lookups don't lock, single dict operations are atomic
+            try:
+                self.touch(name)
+            except KeyError:
+                pass
+
+            self.hits += 1
+            return cached
+
+        parts = name.split(self.separator)
+        layout = self.layouts.get(len(parts))
+        if layout:
+            if len(parts) == 6:
+                # assets without category
+                parts.insert(2, "")
+
+            values = parts[layout[1]:]
+            values.append(self.getVersionNumber(values[3]))
+            record = ScenefileRecord(layout[0], *values)
+            data = dict(zip(dataKeys, record))
+        else:
+            record = invalidRecord
+            data = {"entity": "invalid"}
+
+        cached = (record, data)
+        with self.lock:
+            self.misses += 1
+            self.records[name] = cached
+            while len(self.records) > self.maxSize:
+                self.records.popitem(last=False)
+
+        return cached
+
+    def touch(self, name):
+        # marks a name as recently used
+        with self.lock:
+            self.records[name] = self.records.pop(name)
+
+    def parseName(self, name):
+        return self.lookup(name)[0]
+
+    def parse(self, path):
+        return self.lookup(os.path.basename(path))[0]
+
+    def parseMany(self, names, basePath=None):
+        # parses a whole directory listing. Returns a list of
+        # (path, record) tuples of all valid scenefiles
+        result = []
+        lookup = self.lookup
+        join = os.path.join
+        for name in names:
+            record = lookup(name)[0]
+            if record.entity == "invalid":
+                continue
+
+            result.append((join(basePath, name) if basePath else name, record))
+
+        return result
+
+    def getData(self, path):
+        # returns the data of a scenefile as a new dict, which the caller
+        # can modify
+        basePath, name = os.path.split(path)
+        data = dict(self.lookup(name)[1])
+        data["filename"] = path
+        data["basePath"] = basePath
+        return data
+
+    def clear(self):
+        with self.lock:
+            self.records = OrderedDict()
+            if hasattr(self.records, "move_to_end"):
+                self.touch = self.records.move_to_end
+
+            self.hits = 0
+            self.misses = 0
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "records": len(self.records),
+                "maxSize": self.maxSize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
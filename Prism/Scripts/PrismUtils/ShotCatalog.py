@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import logging
+
+from collections import namedtuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# "paths" contains the folders of the shot in all basepaths (global and
+# local), "path" is the first of them
+ShotRecord = namedtuple(
+    "ShotRecord", ["sequence", "shot", "name", "path", "paths"]
+)
+
+
+# A snapshot of all shots in the shot folders, which gets built once per
+# refresh. The shot folder names are split only once and grouped by
+# sequence in dicts, so lookups by name or sequence don't have to scan
+# the list of shots.
+class ShotCatalog(object):
+    def __init__(self, entities, folders, omitted=None):
+        self.entities = entities
+        self.omitted = set(omitted or [])
+        # names of all shot folders including omitted shots and folders
+        # without a shotname
+        self.names = set()
+        self.byName = {}
+        self.bySequence = {}
+        self.sequences = []
+        self.shots = []
+        self.build(folders)
+
+    def build(self, folders):
+        paths = {}
+        for basePath, folderName, path in folders:
+            if folderName.startswith("_"):
+                continue
+
+            self.names.add(folderName)
+            if folderName in self.omitted:
+                continue
+
+            paths.setdefault(folderName, []).append(path)
+
+        sequences = set()
+        for name, shotPaths in paths.items():
+            shotName, seqName = self.entities.splitShotname(name)
+            sequences.add(seqName)
+            if not shotName:
+                continue
+
+            shotPaths = sorted(shotPaths)
+            record = ShotRecord(seqName, shotName, name, shotPaths[0], shotPaths)
+            self.byName[name] = record
+            self.bySequence.setdefault(seqName, []).append(record)
+
+        self.sequences = sorted(sequences)
+        if "no sequence" in sequences:
+            self.sequences.remove("no sequence")
+            self.sequences.append("no sequence")
+
+        # the keys get computed once per shot and reused for all sorts
+        naturalKeys = self.entities.core.naturalKeys
+        keys = dict((x.name, naturalKeys(x.shot)) for x in self.byName.values())
+        for seqName in self.bySequence:
+            self.bySequence[seqName].sort(key=lambda x: keys[x.name])
+
+        self.shots = sorted(self.byName.values(), key=lambda x: keys[x.name])
+
+    def __len__(self):
+        return len(self.shots)
+
+    def __contains__(self, name):
+        return name in self.byName
+
+    def getShot(self, name):
+        return self.byName.get(name)
+
+    def getSequences(self, searchFilter=""):
+        if not searchFilter:
+            return list(self.sequences)
+
+        return [
+            seq
+            for seq in self.sequences
+            if searchFilter in seq
+            or any(searchFilter in x.shot for x in self.bySequence.get(seq, []))
+        ]
+
+    def getShots(self, sequence=None, searchFilter=""):
+        if sequence is None:
+            shots = self.shots
+        else:
+            shots = self.bySequence.get(sequence, [])
+
+        if searchFilter:
+            shots = [
+                x
+                for x in shots
+                if searchFilter in x.sequence or searchFilter in x.shot
+            ]
+
+        return list(shots)
+
+    def getNames(self, includeOmitted=False):
+        if includeOmitted:
+            return sorted(self.names)
+
+        return sorted(self.names - self.omitted)
+
+    def getShotList(self, searchFilter=""):
+        # the format of ProjectEntities.getShots
+        sequences = self.getSequences(searchFilter)
+        shots = [
+            [x.sequence, x.shot, x.name, x.path]
+            for x in self.getShots(searchFilter=searchFilter)
+        ]
+        return sequences, shots
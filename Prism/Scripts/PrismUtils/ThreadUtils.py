@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import threading
+
+
+threadData = threading.local()
+
+
+def isMainThread():
+    # threading.main_thread doesn't exist in Python 2
+    if hasattr(threading, "main_thread"):
+        return threading.current_thread() is threading.main_thread()
+
+    return isinstance(threading.current_thread(), threading._MainThread)
+
+
+def setRaiseErrors(enabled):
+    # worker threads, whose callers wait for their results, can let errors
+    # caught by err_catcher propagate to the caller instead of returning None
+    threadData.raiseErrors = enabled
+
+
+def raisesErrors():
+    return getattr(threadData, "raiseErrors", False)
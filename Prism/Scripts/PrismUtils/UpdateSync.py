@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import re
+import json
+import time
+import zlib
+import shutil
+import logging
+import zipfile
+import threading
+import posixpath
+import multiprocessing
+
+from multiprocessing.pool import ThreadPool
+
+
+logger = logging.getLogger(__name__)
+
+
+def getSafeRelPath(relPath):
+    # normalizes a relative path of the update. Returns None for absolute
+    # paths, drive letters and paths, which point outside of the root like
+    # "../../file" (zip members aren't sanitized by zipfile.open)
+    relPath = relPath.replace("\\", "/")
+    if relPath.startswith("/") or re.match(r"^[a-zA-Z]:", relPath):
+        return
+
+    relPath = posixpath.normpath(relPath)
+    if relPath in [".", ".."] or relPath.startswith("../"):
+        return
+
+    return relPath
+
+
+def getTargetPath(root, relPath):
+    # joins a relative path to a root and makes sure, that the result is
+    # inside of the root
+    safePath = getSafeRelPath(relPath)
+    if not safePath:
+        raise ValueError("invalid path in update: %s" % relPath)
+
+    root = os.path.realpath(root)
+    target = os.path.realpath(os.path.join(root, *safePath.split("/")))
+    if not target.startswith(os.path.join(root, "")):
+        raise ValueError("path outside of the target folder: %s" % relPath)
+
+    return target
+
+
+# Updates a Prism installation from a release zip or an extracted release
+# folder. Files are compared by their size and CRC32. Zip archives already
+# store the CRC32 of every member, so unchanged files in the archive are
+# never decompressed. The checksums of the installed files are cached in a
+# manifest together with their mtime, so only files which were modified
+# since the last update get read again.
+# Changed files are written to a staging folder inside the installation in
+# parallel first. The installation is only touched after every file was
+# staged successfully. Then the staged files are moved into place with
+# renames, which are atomic on the same volume, so an interrupted update
+# never leaves partially written files behind.
+class UpdateSync(object):
+    manifestVersion = 1
+    manifestName = "installManifest.json"
+    stagingName = ".PrismUpdateStaging"
+    chunkSize = 1024 * 1024
+
+    def __init__(self, installRoot, threads=None):
+        self.installRoot = os.path.normpath(installRoot)
+        if threads is None:
+            try:
+                threads = multiprocessing.cpu_count()
+            except NotImplementedError:
+                threads = 2
+
+        self.numThreads = max(1, threads)
+        self.manifestPath = os.path.join(self.installRoot, self.manifestName)
+        self.stagingPath = os.path.join(self.installRoot, self.stagingName)
+        self.excluded = [self.manifestName, self.stagingName]
+
+    def getChecksum(self, path):
+        crc = 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(self.chunkSize)
+                if not data:
+                    break
+
+                crc = zlib.crc32(data, crc)
+
+        return crc & 0xFFFFFFFF
+
+    def walkFiles(self, root):
+        # yields the paths of all files relative to the root with "/" as
+        # separator, which is also the separator of zip members
+        for folder, dirs, files in os.walk(root):
+            if folder == root:
+                dirs[:] = [x for x in dirs if x not in self.excluded]
+                files = [x for x in files if x not in self.excluded]
+
+            relFolder = os.path.relpath(folder, root).replace("\\", "/")
+            for filename in files:
+                if relFolder == ".":
+                    yield filename
+                else:
+                    yield relFolder + "/" + filename
+
+    def loadManifest(self):
+        try:
+            with open(self.manifestPath, "r") as f:
+                data = json.load(f)
+        except Exception:
+            return {}
+
+        if data.get("version") != self.manifestVersion:
+            return {}
+
+        return data.get("files", {})
+
+    def saveManifest(self, files):
+        data = {"version": self.manifestVersion, "files": files}
+        tmpPath = "%s.%s.tmp" % (self.manifestPath, os.getpid())
+        try:
+            with open(tmpPath, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+
+            self.replaceFile(tmpPath, self.manifestPath)
+        except Exception as e:
+            # the manifest is only a cache, it gets recreated with the next update
+            logger.debug("failed to save the install manifest: %s" % e)
+
+    def getInstallManifest(self):
+        # returns {relPath: [mtime, size, crc]} of all installed files.
+        # Checksums of files with the same mtime and size as in the last
+        # manifest get reused
+        cached = self.loadManifest()
+        files = {}
+        toHash = []
+        for relPath in self.walkFiles(self.installRoot):
+            path = os.path.join(self.installRoot, relPath)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            entry = cached.get(relPath)
+            if entry and entry[0] == st.st_mtime and entry[1] == st.st_size:
+                files[relPath] = entry
+            else:
+                toHash.append([relPath, st.st_mtime, st.st_size])
+
+        def hashFile(job):
+            relPath, mtime, size = job
+            try:
+                crc = self.getChecksum(os.path.join(self.installRoot, relPath))
+            except (IOError, OSError):
+                return relPath, None
+
+            return relPath, [mtime, size, crc]
+
+        for relPath, entry in self.mapJobs(hashFile, toHash):
+            if entry:
+                files[relPath] = entry
+
+        return files
+
+    def mapJobs(self, func, jobs):
+        if not jobs:
+            return []
+
+        if len(jobs) == 1 or self.numThreads == 1:
+            return [func(x) for x in jobs]
+
+        pool = ThreadPool(min(self.numThreads, len(jobs)))
+        try:
+            return pool.map(func, jobs)
+        finally:
+            pool.close()
+            pool.join()
+
+    def openSource(self, source):
+        if os.path.isdir(source):
+            return FolderSource(self, source)
+        elif zipfile.is_zipfile(source):
+            return ZipSource(source)
+
+        raise ValueError("invalid update source: %s" % source)
+
+    def getChanges(self, updateSource, installed):
+        # returns the relative paths of the files of the update, which are
+        # missing or different in the installation
+        changed = []
+        for relPath, (size, crc) in updateSource.getFiles().items():
+            entry = installed.get(relPath)
+            if not entry or entry[1] != size or entry[2] != crc:
+                changed.append(relPath)
+
+        return sorted(changed)
+
+    def stageFiles(self, updateSource, changed):
+        if os.path.exists(self.stagingPath):
+            shutil.rmtree(self.stagingPath, ignore_errors=True)
+
+        failed = []
+
+        def stage(relPath):
+            try:
+                target = getTargetPath(self.stagingPath, relPath)
+                targetDir = os.path.dirname(target)
+                if not os.path.exists(targetDir):
+                    try:
+                        os.makedirs(targetDir)
+                    except OSError:
+                        # created by another thread in the meantime
+                        if not os.path.isdir(targetDir):
+                            raise
+
+                updateSource.copyFile(relPath, target)
+            except Exception as e:
+                return relPath, str(e)
+
+            return relPath, None
+
+        for relPath, error in self.mapJobs(stage, changed):
+            if error:
+                logger.warning("failed to stage %s: %s" % (relPath, error))
+                failed.append(relPath)
+
+        return failed
+
+    def replaceFile(self, src, dst):
+        if hasattr(os, "replace"):
+            os.replace(src, dst)
+        else:
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.rename(src, dst)
+
+    def swapFile(self, relPath):
+        src = getTargetPath(self.stagingPath, relPath)
+        dst = getTargetPath(self.installRoot, relPath)
+        dstDir = os.path.dirname(dst)
+        if not os.path.exists(dstDir):
+            os.makedirs(dstDir)
+
+        try:
+            self.replaceFile(src, dst)
+        except OSError:
+            # files, which are loaded by a running process, can't be replaced
+            # on Windows, but they can be renamed
+            oldPath = "%s.%s.old" % (dst, int(time.time()))
+            os.rename(dst, oldPath)
+            self.replaceFile(src, dst)
+            try:
+                os.remove(oldPath)
+            except OSError:
+                pass
+
+        if os.path.splitext(dst)[1] in [".command", ".sh"]:
+            os.chmod(dst, 0o777)
+
+    def update(self, source, dryRun=False):
+        # returns a dict with the changed, unchanged and failed files and the
+        # duration of every phase. Nothing gets changed in the installation
+        # if "dryRun" is True or if a file couldn't be staged
+        result = {
+            "changed": [],
+            "unchanged": 0,
+            "failed": [],
+            "timings": {},
+        }
+        startTime = time.time()
+        updateSource = self.openSource(source)
+        try:
+            sourceFiles = updateSource.getFiles()
+            result["timings"]["source"] = time.time() - startTime
+
+            startTime = time.time()
+            installed = self.getInstallManifest()
+            result["timings"]["manifest"] = time.time() - startTime
+
+            changed = self.getChanges(updateSource, installed)
+            result["changed"] = changed
+            result["unchanged"] = len(sourceFiles) - len(changed)
+            if dryRun:
+                # the checksums stay valid for the actual update
+                self.saveManifest(installed)
+                return result
+
+            startTime = time.time()
+            result["failed"] = self.stageFiles(updateSource, changed)
+            result["timings"]["staging"] = time.time() - startTime
+        finally:
+            updateSource.close()
+
+        if result["failed"]:
+            shutil.rmtree(self.stagingPath, ignore_errors=True)
+            return result
+
+        startTime = time.time()
+        for relPath in changed:
+            try:
+                self.swapFile(relPath)
+            except (IOError, OSError) as e:
+                logger.warning("failed to replace %s: %s" % (relPath, e))
+                result["failed"].append(relPath)
+                continue
+
+            path = os.path.join(self.installRoot, relPath)
+            st = os.stat(path)
+            installed[relPath] = [st.st_mtime, st.st_size, sourceFiles[relPath][1]]
+
+        shutil.rmtree(self.stagingPath, ignore_errors=True)
+        self.saveManifest(installed)
+        result["timings"]["swap"] = time.time() - startTime
+        logger.debug(
+            "updated %s files (%s unchanged): %s"
+            % (len(changed), result["unchanged"], result["timings"])
+        )
+        return result
+
+
+class FolderSource(object):
+    # an extracted release. The folder can be the "Prism" folder itself or
+    # contain it, like an extracted archive from github
+    def __init__(self, sync, path):
+        self.sync = sync
+        self.root = self.getPrismFolder(path) or path
+        self.files = None
+
+    def getPrismFolder(self, path, depth=3):
+        # returns the folder of "Scripts/PrismCore.py" closest to the path
+        folders = [path]
+        for level in range(depth):
+            for folder in folders:
+                if os.path.exists(os.path.join(folder, "Scripts", "PrismCore.py")):
+                    return folder
+
+            subfolders = []
+            for folder in folders:
+                try:
+                    names = sorted(os.listdir(folder))
+                except OSError:
+                    continue
+
+                subfolders += [
+                    os.path.join(folder, x)
+                    for x in names
+                    if os.path.isdir(os.path.join(folder, x))
+                ]
+
+            folders = subfolders
+
+    def getFiles(self):
+        # {relPath: (size, crc)}
+        if self.files is None:
+            def hashFile(relPath):
+                path = os.path.join(self.root, relPath)
+                return relPath, (os.path.getsize(path), self.sync.getChecksum(path))
+
+            relPaths = list(self.sync.walkFiles(self.root))
+            self.files = dict(self.sync.mapJobs(hashFile, relPaths))
+
+        return self.files
+
+    def copyFile(self, relPath, target):
+        shutil.copy2(os.path.join(self.root, relPath), target)
+
+    def close(self):
+        pass
+
+
+class ZipSource(object):
+    # a release archive. Members are read directly from the archive. The
+    # "Prism" folder gets detected by the location of "Scripts/PrismCore.py",
+    # so archives from github with their "<user>-<repo>-<commit>" top level
+    # folder work as well
+    def __init__(self, path):
+        self.path = path
+        self.threadData = threading.local()
+        self.archives = []
+        self.lock = threading.Lock()
+        with zipfile.ZipFile(path, "r") as archive:
+            infos = archive.infolist()
+
+        self.prefix = ""
+        for info in infos:
+            if info.filename.endswith("Scripts/PrismCore.py"):
+                prefix = info.filename[:-len("Scripts/PrismCore.py")]
+                if not self.prefix or len(prefix) < len(self.prefix):
+                    self.prefix = prefix
+
+        self.members = {}
+        for info in infos:
+            if not info.filename.startswith(self.prefix) or info.filename.endswith("/"):
+                continue
+
+            relPath = info.filename[len(self.prefix):]
+            if not relPath:
+                continue
+
+            safePath = getSafeRelPath(relPath)
+            if not safePath:
+                # a release never contains such members, so the whole
+                # archive gets rejected instead of skipping the member
+                raise ValueError("invalid member in update archive: %s" % info.filename)
+
+            self.members[safePath] = info
+
+    def getFiles(self):
+        return dict(
+            (relPath, (info.file_size, info.CRC & 0xFFFFFFFF))
+            for relPath, info in self.members.items()
+        )
+
+    def getArchive(self):
+        # zipfile objects can't be shared between threads
+        archive = getattr(self.threadData, "archive", None)
+        if archive is None:
+            archive = zipfile.ZipFile(self.path, "r")
+            self.threadData.archive = archive
+            with self.lock:
+                self.archives.append(archive)
+
+        return archive
+
+    def copyFile(self, relPath, target):
+        info = self.members[relPath]
+        # the CRC gets verified by zipfile while the member is read
+        src = self.getArchive().open(info)
+        try:
+            with open(target, "wb") as f:
+                shutil.copyfileobj(src, f, UpdateSync.chunkSize)
+        finally:
+            src.close()
+
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        os.utime(target, (mtime, mtime))
+
+    def close(self):
+        with self.lock:
+            for archive in self.archives:
+                archive.close()
+
+            self.archives = []
@@ -57,6 +57,7 @@ except:
     psVersion = 1
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import UpdateSync
 
 
 logger = logging.getLogger(__name__)
@@ -246,6 +247,7 @@ except Exception as e:
 
     @err_catcher(name=__name__)
     def updatePrism(self, filepath="", source="", url=None, token=None):
+        # "filepath" can be a release zip or an extracted release folder
         if platform.system() == "Windows":
             targetdir = os.path.join(os.environ["temp"], "PrismUpdate")
         else:
@@ -268,38 +270,43 @@ except Exception as e:
         if not os.path.exists(filepath):
             return
 
-        self.extractZip(filepath, targetdir)
-
-        for i in os.walk(targetdir):
-            dirs = i[1]
-            break
-
-        if not dirs:
-            self.core.popup("Failed to extract Prism update archive")
+        sync = UpdateSync.UpdateSync(self.core.prismRoot)
+        try:
+            changes = sync.update(filepath, dryRun=True)
+        except Exception as e:
+            self.core.popup("Failed to read the Prism update:\n\n%s" % e)
             return
 
-        updateRoot = os.path.join(targetdir, dirs[0], "Prism")
+        if not changes["changed"]:
+            msg = "All files of the update are already installed."
+            self.core.popup(msg, severity="info")
+            self.removeUpdateDir(targetdir)
+            return
 
-        msgText = "Are you sure you want to continue?\n\nThis will overwrite existing files in your Prism installation folder."
+        msgText = "Are you sure you want to continue?\n\nThis will overwrite %s existing files in your Prism installation folder." % len(changes["changed"])
         result = self.core.popupQuestion(msgText)
 
         if result != "Yes":
             return
 
-        self.updatePrismFromFolder(updateRoot)
+        if not self.updatePrismFromFolder(filepath):
+            return
+
+        self.removeUpdateDir(targetdir)
+        self.restartPrism()
 
+    @err_catcher(name=__name__)
+    def removeUpdateDir(self, targetdir):
         if os.path.exists(targetdir):
             shutil.rmtree(
                 targetdir, ignore_errors=False, onerror=self.core.handleRemoveReadonly
             )
 
-        self.restartPrism()
-
     @err_catcher(name=__name__)
-    def getDataFromGithub(self, url, token=None):
+    def openGithubUrl(self, url, token=None):
         result = {
             "success": False,
-            "data": None,
+            "response": None,
             "msg": "",
         }
 
@@ -327,10 +334,21 @@ except Exception as e:
             result["msg"] = msg
             return result
 
+        result["success"] = True
+        result["response"] = u
+        return result
+
+    @err_catcher(name=__name__)
+    def getDataFromGithub(self, url, token=None):
+        result = self.openGithubUrl(url, token=token)
+        if not result["success"]:
+            result["data"] = None
+            return result
+
+        u = result.pop("response")
         data = u.read()
         u.close()
 
-        result["success"] = True
         result["data"] = data
         return result
 
@@ -351,7 +369,7 @@ except Exception as e:
         waitmsg = self.core.popupNoButton(text, title)
 
         url = url or "https://api.github.com/repos/RichardFrangenberg/Prism/zipball"
-        result = self.getDataFromGithub(url, token=token)
+        result = self.openGithubUrl(url, token=token)
 
         if not result["success"]:
             if waitmsg and waitmsg.isVisible():
@@ -362,45 +380,54 @@ except Exception as e:
         if not os.path.exists(os.path.dirname(filepath)):
             os.makedirs(os.path.dirname(filepath))
 
-        with open(filepath, "wb") as f:
-            f.write(result["data"])
+        # the archive is streamed to disk instead of being kept in memory.
+        # It only gets its final name when the download is complete
+        tmpPath = filepath + ".part"
+        u = result["response"]
+        try:
+            with open(tmpPath, "wb") as f:
+                shutil.copyfileobj(u, f, UpdateSync.UpdateSync.chunkSize)
+        except Exception as e:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            if waitmsg and waitmsg.isVisible():
+                waitmsg.close()
+            self.core.popup("Failed to download Prism:\n%s" % str(e))
+            return
+        finally:
+            u.close()
+
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        os.rename(tmpPath, filepath)
 
         if waitmsg and waitmsg.isVisible():
             waitmsg.close()
 
     @err_catcher(name=__name__)
-    def extractZip(self, zippath, targetdir):
-        import zipfile
-
+    def updatePrismFromFolder(self, path):
+        # only the files, which differ from the installation, get copied to
+        # a staging folder and are moved into place after all of them were
+        # staged successfully
         title = "Prism update"
-        text = "Extracting - please wait.."
+        text = "Updating Prism - please wait.."
         waitmsg = self.core.popupNoButton(text, title)
 
-        with zipfile.ZipFile(zippath, "r") as zip_ref:
-            zip_ref.extractall(targetdir)
-
-        if waitmsg and waitmsg.isVisible():
-            waitmsg.close()
+        sync = UpdateSync.UpdateSync(self.core.prismRoot)
+        try:
+            result = sync.update(path)
+        finally:
+            if waitmsg and waitmsg.isVisible():
+                waitmsg.close()
 
-    @err_catcher(name=__name__)
-    def updatePrismFromFolder(self, path):
-        updateRoot = path
-        for i in os.walk(updateRoot):
-            for k in i[2]:
-                filepath = os.path.join(i[0], k)
-                if not os.path.exists(i[0].replace(updateRoot, self.core.prismRoot)):
-                    os.makedirs(i[0].replace(updateRoot, self.core.prismRoot))
-
-                target = filepath.replace(updateRoot, self.core.prismRoot)
-                try:
-                    shutil.copy2(filepath, target)
-                except IOError:
-                    self.core.popup("Unable to copy file to:\n\n%s\n\nMake sure you have write access to this location. \
+        logger.debug("update timings: %s" % result["timings"])
+        if result["failed"]:
+            self.core.popup("Unable to update the following files:\n\n%s\n\nMake sure you have write access to your Prism installation. \
 If admin privileges are required for this location launch Prism as admin before you start the update process \
-or move Prism to a location where no admin privileges are required." % target)
-                    return
-                if os.path.splitext(filepath)[1] in [".command", ".sh"]:
-                    os.chmod(filepath.replace(updateRoot, self.core.prismRoot), 0o777)
+or move Prism to a location where no admin privileges are required." % "\n".join(result["failed"][:20]))
+            return False
+
+        return True
 
     @err_catcher(name=__name__)
     def restartPrism(self):
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import json
+import hashlib
+import logging
+import platform
+import threading
+
+from PrismUtils.Decorators import err_catcher
+from PrismUtils import Lockfile
+
+
+logger = logging.getLogger(__name__)
+
+
+# Reserves version numbers for scenefiles and task outputs. Every scenefile
+# folder and every task has a small counter file in "00_Pipeline/Cache/
+# versions", which stores the highest version, which was handed out. A
+# reservation increments the counter while holding an exclusive lock on it,
+# so two artists saving at the same time always get different versions.
+# The existing versions are still considered, because they can be created
+# without a reservation (older Prism versions, copied files). They come from
+# the EntityIndex, which only rescans folders when their mtime changed.
+class VersionAllocator(object):
+    def __init__(self, core):
+        self.core = core
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.lockTimeout = 30
+
+    @err_catcher(name=__name__)
+    def getCounterDir(self):
+        if not self.core.prismIni:
+            return
+
+        return os.path.join(os.path.dirname(self.core.prismIni), "Cache", "versions")
+
+    @err_catcher(name=__name__)
+    def getKey(self, path, kind):
+        # global and local versions share one counter
+        path = os.path.normpath(path)
+        prjPath = os.path.normpath(self.core.projectPath)
+        if self.core.useLocalFiles:
+            lPrjPath = os.path.normpath(self.core.localProjectPath)
+            if self.isInside(path, lPrjPath):
+                path = prjPath + path[len(lPrjPath):]
+
+        if self.isInside(path, prjPath):
+            path = path[len(prjPath):]
+
+        path = path.replace("\\", "/").strip("/")
+        if platform.system() == "Windows":
+            path = path.lower()
+
+        return "%s:%s" % (kind, path)
+
+    @err_catcher(name=__name__)
+    def isInside(self, path, folder):
+        # "/prj/shots" isn't inside of "/prj/sh"
+        return path == folder or path.startswith(folder.rstrip(os.sep) + os.sep)
+
+    @err_catcher(name=__name__)
+    def getCounterPath(self, path, kind):
+        counterDir = self.getCounterDir()
+        if not counterDir:
+            return
+
+        key = self.getKey(path, kind)
+        name = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(counterDir, name + ".json")
+
+    @err_catcher(name=__name__)
+    def readCounter(self, counterPath, useCache=True):
+        try:
+            mtime = os.path.getmtime(counterPath)
+        except OSError:
+            return
+
+        with self.lock:
+            cached = self.counters.get(counterPath)
+            if useCache and cached and cached[0] == mtime:
+                return cached[1]
+
+        try:
+            with open(counterPath, "r") as f:
+                version = int(json.load(f)["version"])
+        except Exception as e:
+            logger.debug("invalid version counter %s: %s" % (counterPath, e))
+            return
+
+        with self.lock:
+            self.counters[counterPath] = (mtime, version)
+
+        return version
+
+    @err_catcher(name=__name__)
+    def writeCounter(self, counterPath, key, version):
+        tmpPath = "%s.%s.tmp" % (counterPath, os.getpid())
+        with open(tmpPath, "w") as f:
+            json.dump({"path": key, "version": version}, f)
+
+        self.core.entities.index.replaceFile(tmpPath, counterPath)
+        with self.lock:
+            self.counters.pop(counterPath, None)
+
+    @err_catcher(name=__name__)
+    def getReservedVersion(self, path, kind):
+        # highest version, which was reserved so far. 0 if there is no counter
+        counterPath = self.getCounterPath(path, kind)
+        if not counterPath:
+            return 0
+
+        return self.readCounter(counterPath) or 0
+
+    @err_catcher(name=__name__)
+    def reserveVersion(self, path, kind, getExistingVersion):
+        # getExistingVersion returns the highest existing version. It's called
+        # while the counter is locked and has to check the folders on disk
+        # instead of trusting recently validated index entries, so that
+        # versions, which were created in the meantime, are considered too
+        counterPath = self.getCounterPath(path, kind)
+        if not counterPath:
+            return getExistingVersion() + 1
+
+        counterDir = os.path.dirname(counterPath)
+        if not os.path.exists(counterDir):
+            try:
+                os.makedirs(counterDir)
+            except OSError:
+                if not os.path.exists(counterDir):
+                    raise
+
+        lf = Lockfile.Lockfile(self.core, counterPath, timeout=self.lockTimeout)
+        try:
+            lf.acquire()
+        except Lockfile.LockfileException:
+            logger.warning("couldn't lock the version counter: %s" % counterPath)
+            return max(self.readCounter(counterPath) or 0, getExistingVersion()) + 1
+
+        try:
+            reserved = self.readCounter(counterPath, useCache=False) or 0
+            version = max(reserved, getExistingVersion()) + 1
+            self.writeCounter(counterPath, self.getKey(path, kind), version)
+        finally:
+            lf.release()
+
+        logger.debug("reserved version %s for %s" % (version, path))
+        return version
@@ -0,0 +1,509 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import time
+import bisect
+import struct
+import logging
+import platform
+import threading
+import subprocess
+import traceback
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+
+movExtensions = [".mp4", ".mov", ".m4v"]
+containerBoxes = [b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"]
+
+
+def iterBoxes(data, start=0, end=None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, boxType = struct.unpack(">I4s", data[pos:pos + 8])
+        headerSize = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            headerSize = 16
+        elif size == 0:
+            size = end - pos
+
+        if size < headerSize:
+            return
+
+        yield boxType, pos + headerSize, min(pos + size, end)
+        pos += size
+
+
+def findMoov(path):
+    # only reads the box headers of the file until the "moov" box is found,
+    # which can be at the start or at the end of the file
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        fileSize = f.tell()
+        pos = 0
+        while pos + 8 <= fileSize:
+            f.seek(pos)
+            header = f.read(16)
+            size, boxType = struct.unpack(">I4s", header[:8])
+            headerSize = 8
+            if size == 1:
+                size = struct.unpack(">Q", header[8:16])[0]
+                headerSize = 16
+            elif size == 0:
+                size = fileSize - pos
+
+            if size < headerSize:
+                return
+
+            if boxType == b"moov":
+                f.seek(pos + headerSize)
+                return f.read(size - headerSize)
+
+            pos += size
+
+
+def parseTrack(data, start, end):
+    track = {}
+    for boxType, bStart, bEnd in iterBoxes(data, start, end):
+        if boxType in containerBoxes:
+            track.update(parseTrack(data, bStart, bEnd))
+        elif boxType == b"mdhd":
+            version = struct.unpack(">B", data[bStart:bStart + 1])[0]
+            if version == 1:
+                track["timescale"], track["duration"] = struct.unpack(
+                    ">IQ", data[bStart + 20:bStart + 32]
+                )
+            else:
+                track["timescale"], track["duration"] = struct.unpack(
+                    ">II", data[bStart + 12:bStart + 20]
+                )
+        elif boxType == b"hdlr":
+            track["handler"] = data[bStart + 8:bStart + 12]
+        elif boxType == b"stsd":
+            # coded size of the first visual sample entry
+            entry = bStart + 8
+            if entry + 36 <= bEnd:
+                track["size"] = list(struct.unpack(">HH", data[entry + 32:entry + 36]))
+        elif boxType == b"stts":
+            count = struct.unpack(">I", data[bStart + 4:bStart + 8])[0]
+            deltas = struct.unpack(">%sI" % (count * 2), data[bStart + 8:bStart + 8 + count * 8])
+            track["stts"] = list(zip(deltas[0::2], deltas[1::2]))
+        elif boxType == b"stss":
+            count = struct.unpack(">I", data[bStart + 4:bStart + 8])[0]
+            samples = struct.unpack(">%sI" % count, data[bStart + 8:bStart + 8 + count * 4])
+            track["keyframes"] = [x - 1 for x in samples]
+        elif boxType == b"stsz":
+            track["nframes"] = struct.unpack(">I", data[bStart + 8:bStart + 12])[0]
+
+    return track
+
+
+# Reads the resolution, framerate, framecount and the keyframes of the first
+# video track from the header of a mp4/mov file without launching ffmpeg.
+# Returns None if the file can't be parsed (for example fragmented mp4s).
+def readMovHeader(path):
+    try:
+        moov = findMoov(path)
+        if not moov:
+            return
+
+        track = None
+        for boxType, start, end in iterBoxes(moov):
+            if boxType != b"trak":
+                continue
+
+            data = parseTrack(moov, start, end)
+            if data.get("handler") == b"vide":
+                track = data
+                break
+    except (IOError, OSError, struct.error):
+        logger.debug("failed to read header of %s: %s" % (path, traceback.format_exc()))
+        return
+
+    if not track or not track.get("size") or not track.get("nframes") or not track.get("timescale"):
+        return
+
+    deltas = track.get("stts") or []
+    if deltas:
+        delta = max(deltas, key=lambda x: x[0])[1]
+        fps = track["timescale"] / float(delta) if delta else 0
+    else:
+        fps = 0
+
+    duration = track.get("duration", 0) / float(track["timescale"])
+    if not fps and duration:
+        fps = track["nframes"] / duration
+
+    if not fps:
+        return
+
+    meta = {
+        "size": tuple(track["size"]),
+        "fps": round(fps, 3),
+        "nframes": track["nframes"],
+        "duration": duration,
+        # None means every frame is a keyframe
+        "keyframes": track.get("keyframes"),
+    }
+    return meta
+
+
+# Decodes frames of a video through a ffmpeg pipe. Sequential reads continue
+# the running process. Random access restarts ffmpeg with an input seek,
+# which starts decoding at the keyframe before the requested frame, unless
+# the requested frame is in the same GOP ahead of the current position.
+class FFmpegFrameReader(object):
+    # frames which get decoded and skipped instead of restarting ffmpeg if
+    # the keyframes are unknown
+    maxSkip = 12
+
+    def __init__(self, path, ffmpeg, meta):
+        self.path = path
+        self.ffmpeg = ffmpeg
+        self._meta = meta
+        self.proc = None
+        self.pos = None
+        self.restarts = 0
+        self.frameBytes = meta["size"][0] * meta["size"][1] * 3
+
+    @property
+    def closed(self):
+        return self.proc is None
+
+    def needsRestart(self, index):
+        if self.proc is None or self.pos is None or index < self.pos:
+            return True
+
+        if index == self.pos:
+            return False
+
+        keyframes = self._meta.get("keyframes")
+        if keyframes is None:
+            return index - self.pos > (1 if "keyframes" in self._meta else self.maxSkip)
+
+        # restart if there is a keyframe between the current position and
+        # the requested frame
+        idx = bisect.bisect_right(keyframes, index) - 1
+        return idx >= 0 and keyframes[idx] > self.pos
+
+    def start(self, index):
+        self.close()
+        args = [self.ffmpeg, "-v", "error", "-nostdin"]
+        if index > 0:
+            # half a frame earlier, so that rounding never skips the frame
+            args += ["-ss", "%.6f" % ((index - 0.5) / self._meta["fps"])]
+
+        args += [
+            "-i", self.path, "-map", "0:v:0", "-an", "-sn",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-",
+        ]
+        kwargs = {}
+        if platform.system() == "Windows":
+            kwargs["creationflags"] = 0x08000000
+
+        with open(os.devnull, "w") as devnull:
+            self.proc = subprocess.Popen(
+                args,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+                **kwargs
+            )
+        self.pos = index
+        self.restarts += 1
+
+    def readRaw(self):
+        data = self.proc.stdout.read(self.frameBytes)
+        if len(data) < self.frameBytes:
+            self.close()
+            raise IndexError("frame %s of %s isn't available" % (self.pos, self.path))
+
+        self.pos += 1
+        return data
+
+    def get_data(self, index):
+        if self.needsRestart(index):
+            self.start(index)
+
+        while self.pos < index:
+            self.readRaw()
+
+        return self.readRaw()
+
+    def close(self):
+        if self.proc is None:
+            return
+
+        proc = self.proc
+        self.proc = None
+        self.pos = None
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+        for pipe in [proc.stdin, proc.stdout]:
+            try:
+                pipe.close()
+            except Exception:
+                pass
+
+        proc.wait()
+
+
+# Shared pool of video readers. Readers are keyed by path and reopened when
+# the mtime or size of the file changes. Readers which weren't used for
+# "idleTimeout" seconds get closed, so that no ffmpeg processes keep the
+# files open. The metadata of videos gets cached separately, so listing
+# media versions doesn't need a reader at all.
+class VideoReaderPool(object):
+    def __init__(self, media, maxReaders=6, idleTimeout=60, maxMetadata=4096):
+        self.media = media
+        self.maxReaders = maxReaders
+        self.idleTimeout = idleTimeout
+        self.maxMetadata = maxMetadata
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.metadata = OrderedDict()
+        self.sweeper = None
+        self.stopEvent = threading.Event()
+        self.ffmpeg = None
+
+    def getFileKey(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+
+        return (stat.st_mtime, stat.st_size)
+
+    def getFFmpeg(self):
+        # the ffmpeg of the Prism libs or the first one in the PATH. Returns
+        # an empty string if there is none
+        if self.ffmpeg is None:
+            candidates = [self.media.getFFmpeg()]
+            if platform.system() == "Darwin":
+                candidates.append(os.path.join(self.media.core.prismLibs, "Tools", "ffmpeg"))
+
+            name = "ffmpeg.exe" if platform.system() == "Windows" else "ffmpeg"
+            for folder in os.getenv("PATH", "").split(os.pathsep):
+                candidates.append(os.path.join(folder, name))
+
+            self.ffmpeg = ""
+            for candidate in candidates:
+                if os.path.isfile(candidate):
+                    self.ffmpeg = candidate
+                    break
+
+        return self.ffmpeg
+
+    def getMetadata(self, path):
+        fileKey = self.getFileKey(path)
+        if not fileKey or not fileKey[1]:
+            return
+
+        with self.lock:
+            cached = self.metadata.pop(path, None)
+            if cached and cached[0] == fileKey:
+                self.metadata[path] = cached
+                return cached[1]
+
+        meta = None
+        if os.path.splitext(path)[1].lower() in movExtensions:
+            meta = readMovHeader(path)
+
+        if meta is None:
+            entry = self.getEntry(path, fileKey=fileKey)
+            if not entry:
+                return
+
+            meta = entry["meta"]
+
+        with self.lock:
+            self.metadata[path] = (fileKey, meta)
+            while len(self.metadata) > self.maxMetadata:
+                self.metadata.popitem(last=False)
+
+        return meta
+
+    def getEntry(self, path, fileKey=None):
+        fileKey = fileKey or self.getFileKey(path)
+        if not fileKey or not fileKey[1]:
+            return
+
+        with self.lock:
+            entry = self.entries.pop(path, None)
+            if entry and entry["fileKey"] != fileKey:
+                self.closeEntry(entry)
+                entry = None
+
+            if entry:
+                entry["lastUsed"] = time.time()
+                self.entries[path] = entry
+                return entry
+
+        entry = self.createEntry(path, fileKey)
+        if not entry:
+            return
+
+        with self.lock:
+            oldEntry = self.entries.pop(path, None)
+            if oldEntry:
+                self.closeEntry(oldEntry)
+
+            self.entries[path] = entry
+            self.evict()
+
+        self.startSweeper()
+        return entry
+
+    def createEntry(self, path, fileKey):
+        meta = None
+        with self.lock:
+            cached = self.metadata.get(path)
+            if cached and cached[0] == fileKey:
+                meta = cached[1]
+
+        if meta is None and os.path.splitext(path)[1].lower() in movExtensions:
+            meta = readMovHeader(path)
+
+        ffmpeg = self.getFFmpeg()
+        if meta and ffmpeg:
+            reader = FFmpegFrameReader(path, ffmpeg, meta)
+        else:
+            # containers which can't be parsed get opened with imageio
+            reader = self.media.getVideoReader(path)
+            if reader is None:
+                return
+
+            rmeta = reader._meta
+            meta = {
+                "size": tuple(rmeta["size"]),
+                "fps": rmeta.get("fps"),
+                "nframes": rmeta.get("nframes"),
+                "duration": rmeta.get("duration"),
+            }
+
+        entry = {
+            "path": path,
+            "fileKey": fileKey,
+            "reader": reader,
+            "meta": meta,
+            "lock": threading.Lock(),
+            "lastUsed": time.time(),
+        }
+        return entry
+
+    def readFrame(self, path, frame):
+        # returns the rgb data of a frame and its size
+        entry = self.getEntry(path)
+        if not entry:
+            return
+
+        with entry["lock"]:
+            entry["lastUsed"] = time.time()
+            data = entry["reader"].get_data(frame)
+
+        if not isinstance(data, bytes):
+            data = data.tobytes() if hasattr(data, "tobytes") else data.tostring()
+
+        return data, entry["meta"]["size"]
+
+    def closeEntry(self, entry):
+        try:
+            entry["reader"].close()
+        except Exception:
+            pass
+
+    def evict(self):
+        # called with self.lock held. Readers which are in use are skipped
+        now = time.time()
+        for path in list(self.entries):
+            if len(self.entries) <= self.maxReaders and now - self.entries[path]["lastUsed"] < self.idleTimeout:
+                continue
+
+            entry = self.entries[path]
+            if not entry["lock"].acquire(False):
+                continue
+
+            try:
+                del self.entries[path]
+                self.closeEntry(entry)
+            finally:
+                entry["lock"].release()
+
+    def startSweeper(self):
+        if self.sweeper and self.sweeper.is_alive():
+            return
+
+        self.stopEvent.clear()
+        self.sweeper = threading.Thread(target=self.sweep, name="PrismVideoReaderSweep")
+        self.sweeper.daemon = True
+        self.sweeper.start()
+
+    def sweep(self):
+        while not self.stopEvent.wait(max(1, self.idleTimeout / 2.0)):
+            with self.lock:
+                self.evict()
+                if not self.entries:
+                    return
+
+    def close(self, path=None):
+        with self.lock:
+            for rpath in list(self.entries):
+                if path is not None and rpath != path:
+                    continue
+
+                entry = self.entries.pop(rpath)
+                with entry["lock"]:
+                    self.closeEntry(entry)
+
+        if path is None:
+            self.stopEvent.set()
+
+    def getStats(self):
+        with self.lock:
+            return {
+                "readers": len(self.entries),
+                "metadata": len(self.metadata),
+                "restarts": sum(
+                    getattr(x["reader"], "restarts", 0) for x in self.entries.values()
+                ),
+            }
@@ -33,8 +33,9 @@
 
 import os
 import time
-import platform
-import subprocess
+import shutil
+import tempfile
+import functools
 
 try:
     from PySide2.QtCore import *
@@ -54,6 +55,8 @@ else:
     import CombineMedia_ui_ps2 as CombineMedia_ui
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import MediaJobs
+from PrismUtils import FrameSequences
 
 
 class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
@@ -135,30 +138,13 @@ class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
                 )
                 return
 
-        ffmpegIsInstalled = False
-        if platform.system() == "Windows":
-            ffmpegPath = os.path.join(
-                self.core.prismLibs, "Tools", "FFmpeg", "bin", "ffmpeg.exe"
-            )
-            if os.path.exists(ffmpegPath):
-                ffmpegIsInstalled = True
-        elif platform.system() == "Linux":
-            ffmpegPath = "ffmpeg"
-            try:
-                subprocess.Popen([ffmpegPath])
-                ffmpegIsInstalled = True
-            except:
-                pass
-        elif platform.system() == "Darwin":
-            ffmpegPath = os.path.join(self.core.prismLibs, "Tools", "ffmpeg")
-            if os.path.exists(ffmpegPath):
-                ffmpegIsInstalled = True
-
-        if not ffmpegIsInstalled:
+        engine = self.core.media.mediaJobs
+        ffmpegPath = engine.getFFmpegPath()
+        if not ffmpegPath:
             QMessageBox.critical(
                 self.core.messageParent,
                 "Video combine",
-                "Could not find %s" % ffmpegPath,
+                "Could not find ffmpeg",
             )
             return
 
@@ -170,12 +156,8 @@ class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
         if self.ctype in ["layout", "sequence"]:
             cStates = reversed(cStates)
 
-        tmpFiles = []
         sources = []
-        combineInputs = []
         tw = th = 0
-        stdout = ""
-        stderr = ""
 
         for i in cStates:
             if os.path.isfile(i):
@@ -196,132 +178,54 @@ class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
             if ih > th:
                 th = ih
 
-            inputExt = os.path.splitext(inputpath)[1]
-
-            isSequence = not inputExt in [".mp4", ".mov"]
-
-            if isSequence:
-                outputpath = os.path.splitext(inputpath)[0][:-(self.core.framePadding+1)] + ".mp4"
-                if not os.path.exists(os.path.dirname(outputpath)):
-                    os.makedirs(os.path.dirname(outputpath))
-
-                startNum = os.path.splitext(inputpath)[0][-self.core.framePadding:]
-                inputpath = os.path.splitext(inputpath)[0][:-self.core.framePadding] + "%04d".replace("4", str(self.core.framePadding)) + inputExt
-                nProc = subprocess.Popen(
-                    [
-                        ffmpegPath,
-                        "-start_number",
-                        startNum,
-                        "-framerate",
-                        "24",
-                        "-apply_trc",
-                        "iec61966_2_1",
-                        "-i",
-                        inputpath,
-                        "-pix_fmt",
-                        "yuva420p",
-                        "-start_number",
-                        startNum,
-                        outputpath,
-                        "-y",
-                    ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                result = nProc.communicate()
-                stdout += str(result[0])
-                stderr += str(result[1])
-                if not os.path.exists(outputpath) or os.stat(outputpath).st_size == 0:
-                    continue
-
-                tmpFiles.append(outputpath)
-                inputpath = outputpath
-
             sources.append([inputpath, iw, ih])
 
-        for i in sources:
-            inputpath = i[0]
-
-            outputpath = os.path.splitext(inputpath)[0] + "_converted.mp4"
-            outputpathts = os.path.splitext(inputpath)[0] + "_converted.ts"
-
-            iw = i[1]
-            ih = i[2]
-
-            newW = iw * min(tw / iw, th / ih)
-            newH = ih * min(tw / iw, th / ih)
-
-            pad = "%s:%s:%s:%s" % (
-                tw,
-                th,
-                (tw - iw * min(tw / iw, th / ih)) / 2,
-                (th - ih * min(tw / iw, th / ih)) / 2,
-            )
-
-            nProc = subprocess.Popen(
-                [
-                    ffmpegPath,
-                    "-i",
-                    inputpath,
-                    "-pix_fmt",
-                    "yuv420p",
-                    "-vf",
-                    "scale=%s:%s, pad=%s" % (newW, newH, pad),
-                    outputpath,
-                    "-y",
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+        # yuv420p requires an even resolution
+        tw += tw % 2
+        th += th % 2
+
+        # every source gets scaled and padded to the same format directly
+        # from the image sequence or video. The segments are converted in
+        # parallel and cached by the content of their source, so combining
+        # unchanged versions again only concatenates the cached segments
+        tmpDir = tempfile.mkdtemp(prefix="PrismCombine_")
+        jobs = []
+        for idx, source in enumerate(sources):
+            job = self.getSegmentJob(engine, source, tw, th, tmpDir, idx)
+            if job:
+                jobs.append(job)
+
+        self.core.media.runMediaJobs(jobs, text="Combining media - please wait..")
+        stdout = "".join(x.stdout for x in jobs)
+        stderr = "".join(x.stderr for x in jobs)
+        combineInputs = [x.outputpath for x in jobs if x.success]
+
+        if self.ctype == "sequence" and combineInputs:
+            # all segments have the same format, so they can be concatenated
+            # without encoding them again
+            listPath = os.path.join(tmpDir, "segments.txt")
+            with open(listPath, "w") as listFile:
+                for i in combineInputs:
+                    listFile.write("file '%s'\n" % i.replace("\\", "/").replace("'", "'\\''"))
+
+            args = ["-y", "-f", "concat", "-safe", "0", "-i", listPath, "-c", "copy", output]
+            concatJob = MediaJobs.MediaJob(
+                args, output, totalFrames=sum(x.totalFrames or 0 for x in jobs) or None
             )
-            result = nProc.communicate()
-            stdout += str(result[0])
-            stderr += str(result[1])
-            nProc = subprocess.Popen(
-                [
-                    ffmpegPath,
-                    "-i",
-                    outputpath,
-                    "-pix_fmt",
-                    "yuv420p",
-                    "-c",
-                    "copy",
-                    "-bsf:v",
-                    "h264_mp4toannexb",
-                    outputpathts,
-                    "-y",
-                ],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            )
-            result = nProc.communicate()
-            stdout += str(result[0])
-            stderr += str(result[1])
-
-            tmpFiles.append(outputpath)
-            tmpFiles.append(outputpathts)
-
-            if os.path.exists(outputpathts):
-                combineInputs.append(outputpathts)
-
-        if self.ctype == "sequence":
-            args = [ffmpegPath]
-            filterStr = ""
-            for idx, i in enumerate(combineInputs):
-                args += ["-i", i]
-                filterStr += "[%s:0]" % idx
-            args += ["-filter_complex"]
-            filterStr += "concat=n=%s:v=1:a=0 [v]" % len(combineInputs)
-            args += [filterStr, "-map", "[v]", "-pix_fmt", "yuv420p", output, "-y"]
-            nProc = subprocess.call(args)
+            self.core.media.runMediaJobs([concatJob], text="Combining media - please wait..")
+            stdout += concatJob.stdout
+            stderr += concatJob.stderr
         # 	elif self.ctype == "layout":
         # 	elif self.ctype == "stack":
         # 	elif self.ctype == "stackDif":
 
+        shutil.rmtree(tmpDir, ignore_errors=True)
+
         if self.chb_task.isChecked() and self.e_task.text() != "":
             versionBase = os.path.join(
                 self.core.pb.renderBasePath, "Rendering", "external", self.e_task.text()
             )
-            newVersion = self.core.getHighestTaskVersion(versionBase)
+            newVersion = self.core.getHighestTaskVersion(versionBase, reserve=True)
             self.core.pb.createExternalTask(
                 data={
                     "taskName": self.e_task.text(),
@@ -330,12 +234,6 @@ class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
                 }
             )
 
-        for k in tmpFiles:
-            try:
-                os.remove(k)
-            except:
-                pass
-
         if os.path.exists(output):
             self.core.copyToClipboard(output)
             QMessageBox.information(
@@ -348,6 +246,70 @@ class CombineMedia(QDialog, CombineMedia_ui.Ui_dlg_CombineMedia):
                 "Media combine", "The video could not be created.", [stdout, stderr]
             )
 
+    @err_catcher(name=__name__)
+    def getSegmentJob(self, engine, source, width, height, tmpDir, idx):
+        inputpath, iw, ih = source
+        inputExt = os.path.splitext(inputpath)[1]
+        isSequence = inputExt not in [".mp4", ".mov"]
+
+        if isSequence:
+            sequence = FrameSequences.parsePattern(inputpath, padding=self.core.framePadding)
+            if not sequence:
+                return
+
+            startNum = FrameSequences.splitFrame(
+                os.path.basename(inputpath), padding=self.core.framePadding
+            )[1]
+            inputpath = os.path.join(sequence.directory, sequence.getPattern("%d"))
+            args = [
+                "-start_number",
+                startNum,
+                "-framerate",
+                "24",
+                "-apply_trc",
+                "iec61966_2_1",
+                "-i",
+                inputpath,
+            ]
+            totalFrames = None
+        else:
+            args = ["-i", inputpath]
+            meta = self.core.media.getVideoMetadata(inputpath) or {}
+            totalFrames = meta.get("nframes")
+
+        sourceFiles = engine.getSourceFiles(inputpath)
+        if not sourceFiles:
+            return
+
+        if isSequence:
+            totalFrames = len(sourceFiles)
+
+        factor = min(width / float(iw), height / float(ih))
+        newW = int(iw * factor) // 2 * 2
+        newH = int(ih * factor) // 2 * 2
+        pad = "%s:%s:%s:%s" % (width, height, (width - newW) // 2, (height - newH) // 2)
+
+        args += [
+            "-vf",
+            "scale=%s:%s,pad=%s" % (newW, newH, pad),
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-video_track_timescale",
+            "24000",
+        ]
+        cacheKey = functools.partial(engine.getCacheKey, sourceFiles, args)
+        outputpath = os.path.join(tmpDir, "segment_%04d.mp4" % idx)
+        job = MediaJobs.MediaJob(
+            ["-y"] + args + [outputpath],
+            outputpath,
+            totalFrames=totalFrames,
+            cacheKey=cacheKey,
+            label=os.path.basename(inputpath),
+        )
+        return job
+
     @err_catcher(name=__name__)
     def browseCombineOutputFile(self):
         path = QFileDialog.getSaveFileName(
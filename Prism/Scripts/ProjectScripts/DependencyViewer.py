@@ -167,9 +167,9 @@ class DependencyViewer(QDialog, DependencyViewer_ui.Ui_dlg_DependencyViewer):
         source = self.core.getConfig(
             cat="information", param="source scene", configPath=versionInfo
         )
-        deps = self.core.getConfig(
+        deps = list(self.core.getConfig(
             cat="information", param="Dependencies", configPath=versionInfo
-        ) or []
+        ) or [])
         extFiles = self.core.getConfig(
             cat="information", param="External files", configPath=versionInfo
         ) or []
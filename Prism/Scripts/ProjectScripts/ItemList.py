@@ -134,7 +134,7 @@ class ItemList(QDialog, ItemList_ui.Ui_dlg_ItemList):
     def saveStep(self, abrev, name):
         psteps = self.core.getConfig(
                 "globals", "pipeline_steps", configPath=self.core.prismIni, dft={}
-            )
+            ).copy()
 
         if abrev not in psteps:
             psteps[str(abrev)] = str(name)
@@ -110,6 +110,7 @@ except:
     import EnterText
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import FrameSequences
 
 logger = logging.getLogger(__name__)
 
@@ -755,7 +756,7 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
             if "timeline" in pb and pb["timeline"].state() != QTimeLine.NotRunning:
                 pb["timeline"].setPaused(True)
 
-        QPixmapCache.clear()
+            self.core.media.framePrefetcher.cancel(pb["name"])
 
         self.core.callback(
             name="onProjectBrowserClose", types=["curApp", "custom", "prjManagers"], args=[self]
@@ -2557,32 +2558,33 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
         if self.e_shotSearch.isVisible():
             searchFilter = self.e_shotSearch.text()
 
-        sequences, shots = self.core.entities.getShots(searchFilter=searchFilter)
+        catalog = self.core.entities.getShotCatalog()
+        sequences = catalog.getSequences(searchFilter)
 
         if "" in sequences and "no sequence" not in sequences:
             sequences.append("no sequence")
 
+        seqItems = {}
         for seqName in sequences:
             if not seqName:
                 continue
 
             seqItem = QTreeWidgetItem([seqName, seqName + self.core.sequenceSeparator])
             self.tw_sShot.addTopLevelItem(seqItem)
+            seqItems[seqName] = seqItem
             if seqName in self.sExpanded or self.e_shotSearch.isVisible():
                 seqItem.setExpanded(True)
 
-        for i in shots:
-            for k in range(self.tw_sShot.topLevelItemCount()):
-                tlItem = self.tw_sShot.topLevelItem(k)
-                seqName = i[0]
-                if not seqName:
-                    seqName = "no sequence"
+        for seqName in sequences:
+            shots = catalog.getShots(sequence=seqName, searchFilter=searchFilter)
+            if not seqName:
+                seqName = "no sequence"
 
-                if tlItem.text(0) == seqName:
-                    seqItem = tlItem
+            seqItem = seqItems.get(seqName)
+            if not seqItem:
+                continue
 
-            sItem = QTreeWidgetItem([i[1], i[2]])
-            seqItem.addChild(sItem)
+            seqItem.addChildren([QTreeWidgetItem([x.shot, x.name]) for x in shots])
 
         self.tw_sShot.resizeColumnToContents(0)
 
@@ -2944,7 +2946,8 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
             assetFile = os.path.join(
                 os.path.dirname(self.core.prismIni), "Assetinfo", "assetInfo.yml"
             )
-            assetInfos = self.core.getConfig(configPath=assetFile)
+            # the config data is shared with the config cache
+            assetInfos = copy.deepcopy(self.core.getConfig(configPath=assetFile))
             if not assetInfos:
                 assetInfos = {}
 
@@ -2957,12 +2960,6 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
     @err_catcher(name=__name__)
     def editShot(self, shotName=None):
-        sequs = []
-        for i in range(self.tw_sShot.topLevelItemCount()):
-            sName = self.tw_sShot.topLevelItem(i).text(0)
-            if sName != "no sequence":
-                sequs.append(sName)
-
         if not shotName:
             shotName, seqName = self.core.entities.splitShotname(self.cursShots)
             shotName = seqName + self.core.sequenceSeparator
@@ -2974,7 +2971,7 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
         import EditShot
 
-        self.es = EditShot.EditShot(core=self.core, shotName=shotName, sequences=sequs)
+        self.es = EditShot.EditShot(core=self.core, shotName=shotName)
 
         result = self.core.callback(
             name="onShotDlgOpen", types=["custom"], args=[self, self.es, shotName]
@@ -3398,12 +3395,7 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
             shutil.copytree(localPath, dstPath)
 
-            if "vidPrw" in mediaPlayback and not mediaPlayback["vidPrw"].closed:
-                for i in range(6):
-                    mediaPlayback["vidPrw"].close()
-                    time.sleep(0.5)
-                    if mediaPlayback["vidPrw"].closed:
-                        break
+            self.core.media.framePrefetcher.closeReaders()
 
             try:
                 shutil.rmtree(localPath)
@@ -3797,76 +3789,34 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
         mediaPlayback["curImg"] = 0
         mediaPlayback["seq"] = []
         mediaPlayback["prvIsSequence"] = False
+        mediaPlayback["frameShown"] = False
 
-        QPixmapCache.clear()
+        self.core.media.framePrefetcher.cancel(mediaPlayback["name"])
 
         mediaBase, mediaFolders, mediaFiles = mediaPlayback["getMediaBase"]()
 
         if mediaBase != "multiple":
             if mediaBase is not None:
                 mediaPlayback["basePath"] = mediaBase
-                base = None
-                for i in sorted(mediaFiles):
-                    if os.path.splitext(i)[1] in [
-                        ".jpg",
-                        ".jpeg",
-                        ".JPG",
-                        ".png",
-                        ".tif",
-                        ".tiff",
-                        ".exr",
-                        ".dpx",
-                        ".mp4",
-                        ".mov",
-                        ".avi",
-                    ]:
-                        base = i
-                        break
+                sequences = FrameSequences.groupFiles(
+                    mediaFiles,
+                    padding=self.core.framePadding,
+                    extensions=FrameSequences.mediaExtensions,
+                )
+                base = min(x.getFirstFile() for x in sequences) if sequences else None
 
                 if base is not None:
-                    baseName, extension = os.path.splitext(base)
-                    for i in sorted(mediaFiles):
-                        if i.startswith(baseName[:-4]) and (i.endswith(extension)):
-                            mediaPlayback["seq"].append(i)
-
-                    if len(mediaPlayback["seq"]) > 1 and extension not in [
-                        ".mp4",
-                        ".mov",
-                        ".avi",
-                    ]:
+                    baseSeq = [x for x in sequences if x.getFirstFile() == base][0]
+                    if baseSeq.isSequence and not baseSeq.isVideo:
                         mediaPlayback["prvIsSequence"] = True
-                        try:
-                            mediaPlayback["pstart"] = int(baseName[-4:])
-                        except:
-                            mediaPlayback["pstart"] = "?"
-
-                        try:
-                            mediaPlayback["pend"] = int(
-                                os.path.splitext(
-                                    mediaPlayback["seq"][len(mediaPlayback["seq"]) - 1]
-                                )[0][-4:]
-                            )
-                        except:
-                            mediaPlayback["pend"] = "?"
-
+                        mediaPlayback["seq"] = baseSeq.getFiles()
+                        mediaPlayback["pstart"] = baseSeq.first
+                        mediaPlayback["pend"] = baseSeq.last
                     else:
                         mediaPlayback["prvIsSequence"] = False
-                        mediaPlayback["seq"] = []
-                        for i in mediaFiles:
-                            if os.path.splitext(i)[1] in [
-                                ".jpg",
-                                ".jpeg",
-                                ".JPG",
-                                ".png",
-                                ".tif",
-                                ".tiff",
-                                ".exr",
-                                ".dpx",
-                                ".mp4",
-                                ".mov",
-                                ".avi",
-                            ]:
-                                mediaPlayback["seq"].append(i)
+                        mediaPlayback["seq"] = [
+                            x for seq in sequences for x in seq.getFiles()
+                        ]
 
                     if not (
                         self.curRTask == ""
@@ -3877,29 +3827,9 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
                     mediaPlayback["pduration"] = len(mediaPlayback["seq"])
                     imgPath = str(os.path.join(mediaBase, base))
-                    if (
-                        os.path.exists(imgPath)
-                        and mediaPlayback["pduration"] == 1
-                        and os.path.splitext(imgPath)[1] in [".mp4", ".mov", ".avi"]
-                    ):
-                        if os.stat(imgPath).st_size == 0:
-                            mediaPlayback["vidPrw"] = "Error"
-                        else:
-                            try:
-                                mediaPlayback["vidPrw"] = imageio.get_reader(
-                                    imgPath, "ffmpeg"
-                                )
-                            except:
-                                mediaPlayback["vidPrw"] = "Error"
-                                logger.debug("failed to read videofile: %s" % traceback.format_exc())
-
-                        self.updatePrvInfo(
-                            imgPath,
-                            vidReader=mediaPlayback["vidPrw"],
-                            mediaPlayback=mediaPlayback,
-                        )
-                    else:
-                        self.updatePrvInfo(imgPath, mediaPlayback=mediaPlayback)
+                    # videos are read through the shared reader pool of the
+                    # MediaManager
+                    self.updatePrvInfo(imgPath, mediaPlayback=mediaPlayback)
 
                     if os.path.exists(imgPath):
                         mediaPlayback["timeline"] = QTimeLine(
@@ -3913,7 +3843,6 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
                         mediaPlayback["timeline"].frameChanged.connect(
                             lambda x: self.changeImg(x, mediaPlayback=mediaPlayback)
                         )
-                        QPixmapCache.setCacheLimit(2097151)
                         mediaPlayback["curImg"] = 0
                         mediaPlayback["timeline"].start()
 
@@ -4025,37 +3954,31 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
             ".png",
             ".tif",
             ".tiff",
+            ".exr",
+            ".dpx",
         ]:
-            size = self.core.media.getPixmapFromPath(prvFile).size()
-            pwidth = size.width()
-            pheight = size.height()
-        elif os.path.splitext(prvFile)[1] in [".exr", ".dpx"]:
-            pwidth = pheight = "?"
-            if self.oiio:
-                imgSpecs = self.oiio.ImageBuf(str(prvFile)).spec()
-                pwidth = imgSpecs.full_width
-                pheight = imgSpecs.full_height
+            # reads only the header of the file and caches the result
+            resolution = self.core.media.getMediaResolution(prvFile)
+            pwidth = resolution["width"] or "?"
+            pheight = resolution["height"] or "?"
 
         elif os.path.splitext(prvFile)[1] in [".mp4", ".mov", ".avi"]:
             if vidReader is None:
-                if os.stat(prvFile).st_size == 0:
-                    vidReader = "Error"
-                else:
-                    try:
-                        vidReader = imageio.get_reader(prvFile, "ffmpeg")
-                    except:
-                        vidReader = "Error"
-                        logger.debug("failed to read videofile: %s" % traceback.format_exc())
+                meta = self.core.media.getVideoMetadata(prvFile)
+            elif vidReader == "Error":
+                meta = None
+            else:
+                meta = vidReader._meta
 
-            if vidReader == "Error":
+            if not meta:
                 pwidth = pheight = "?"
                 if setDuration:
                     mediaPlayback["pduration"] = 1
             else:
-                pwidth = vidReader._meta["size"][0]
-                pheight = vidReader._meta["size"][1]
+                pwidth = meta["size"][0]
+                pheight = meta["size"][1]
                 if len(mediaPlayback["seq"]) == 1 and setDuration:
-                    mediaPlayback["pduration"] = vidReader._meta["nframes"]
+                    mediaPlayback["pduration"] = meta["nframes"]
 
         if pwidth == 0 and pheight == 0:
             pwidth = pheight = "?"
@@ -4075,144 +3998,108 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
         return self.core.media.getPixmapFromPath(imgFile)
 
+    @err_catcher(name=__name__)
+    def getPlaybackFrameJob(self, mediaPlayback, imgNum):
+        if len(mediaPlayback["seq"]) == 1 and os.path.splitext(
+            mediaPlayback["seq"][0]
+        )[1] in [".mp4", ".mov", ".avi"]:
+            curFile = mediaPlayback["seq"][0]
+            frame = imgNum
+        else:
+            curFile = mediaPlayback["seq"][imgNum]
+            frame = 0
+
+        fileName = os.path.join(mediaPlayback["basePath"], curFile)
+        job = {
+            "key": (fileName, frame, self.renderResX, self.renderResY),
+            "path": fileName,
+            "frame": frame,
+            "width": self.renderResX,
+            "height": self.renderResY,
+        }
+        return job
+
+    @err_catcher(name=__name__)
+    def prefetchFrames(self, mediaPlayback, count=24):
+        duration = mediaPlayback["pduration"]
+        count = min(count, duration - 1)
+        jobs = [
+            self.getPlaybackFrameJob(
+                mediaPlayback, (mediaPlayback["curImg"] + idx) % duration
+            )
+            for idx in range(1, count + 1)
+        ]
+        self.core.media.framePrefetcher.request(mediaPlayback["name"], jobs)
+
     @err_catcher(name=__name__)
     def changeImg(self, frame=0, mediaPlayback=None):
         if mediaPlayback is None:
             mediaPlayback = self.mediaPlaybacks["shots"]
 
-        pmsmall = QPixmap()
-        if not QPixmapCache.find(("Frame" + str(mediaPlayback["curImg"])), pmsmall):
-            if len(mediaPlayback["seq"]) == 1 and os.path.splitext(
-                mediaPlayback["seq"][0]
-            )[1] in [".mp4", ".mov", ".avi"]:
-                curFile = mediaPlayback["seq"][0]
-            else:
-                curFile = mediaPlayback["seq"][mediaPlayback["curImg"]]
-            fileName = os.path.join(mediaPlayback["basePath"], curFile)
+        job = self.getPlaybackFrameJob(mediaPlayback, mediaPlayback["curImg"])
+        fileName = job["path"]
+        ext = os.path.splitext(fileName)[1]
+        if ext not in [
+            ".jpg",
+            ".jpeg",
+            ".JPG",
+            ".png",
+            ".tif",
+            ".tiff",
+            ".exr",
+            ".dpx",
+            ".mp4",
+            ".mov",
+            ".avi",
+        ]:
+            return False
 
-            if os.path.splitext(curFile)[1] in [
-                ".jpg",
-                ".jpeg",
-                ".JPG",
-                ".png",
-                ".tif",
-                ".tiff",
-            ]:
-                pm = self.core.media.getPixmapFromPath(fileName)
-
-                if pm.width() == 0 or pm.height() == 0:
-                    pmsmall = self.core.media.getPixmapFromPath(
-                        os.path.join(
-                            self.core.projectPath,
-                            "00_Pipeline",
-                            "Fallbacks",
-                            "%s.jpg" % os.path.splitext(curFile)[1][1:].lower(),
-                        )
-                    )
-                elif (pm.width() / float(pm.height())) > 1.7778:
-                    pmsmall = pm.scaledToWidth(self.renderResX)
-                else:
-                    pmsmall = pm.scaledToHeight(self.renderResY)
-            elif os.path.splitext(curFile)[1] in [".exr", ".dpx"]:
-                try:
-                    qimg = QImage(self.renderResX, self.renderResY, QImage.Format_RGB16)
-
-                    if self.oiio:
-                        imgSrc = self.oiio.ImageBuf(str(fileName))
-                        rgbImgSrc = self.oiio.ImageBuf()
-                        self.oiio.ImageBufAlgo.channels(rgbImgSrc, imgSrc, (0, 1, 2))
-                        imgWidth = rgbImgSrc.spec().full_width
-                        imgHeight = rgbImgSrc.spec().full_height
-                        xOffset = 0
-                        yOffset = 0
-                        if (imgWidth / float(imgHeight)) > 1.7778:
-                            newImgWidth = self.renderResX
-                            newImgHeight = self.renderResX / float(imgWidth) * imgHeight
-                        else:
-                            newImgHeight = self.renderResY
-                            newImgWidth = self.renderResY / float(imgHeight) * imgWidth
-                        imgDst = self.oiio.ImageBuf(
-                            self.oiio.ImageSpec(
-                                int(newImgWidth), int(newImgHeight), 3, self.oiio.UINT8
-                            )
-                        )
-                        self.oiio.ImageBufAlgo.resample(imgDst, rgbImgSrc)
-                        sRGBimg = self.oiio.ImageBuf()
-                        self.oiio.ImageBufAlgo.pow(
-                            sRGBimg, imgDst, (1.0 / 2.2, 1.0 / 2.2, 1.0 / 2.2)
-                        )
-                        bckImg = self.oiio.ImageBuf(
-                            self.oiio.ImageSpec(
-                                int(newImgWidth), int(newImgHeight), 3, self.oiio.UINT8
-                            )
-                        )
-                        self.oiio.ImageBufAlgo.fill(bckImg, (0.5, 0.5, 0.5))
-                        self.oiio.ImageBufAlgo.paste(bckImg, xOffset, yOffset, 0, 0, sRGBimg)
-                        qimg = QImage(
-                            int(newImgWidth), int(newImgHeight), QImage.Format_RGB16
-                        )
-                        for i in range(int(newImgWidth)):
-                            for k in range(int(newImgHeight)):
-                                rgb = qRgb(
-                                    bckImg.getpixel(i, k)[0] * 255,
-                                    bckImg.getpixel(i, k)[1] * 255,
-                                    bckImg.getpixel(i, k)[2] * 255,
-                                )
-                                qimg.setPixel(i, k, rgb)
-                        pmsmall = QPixmap.fromImage(qimg)
+        try:
+            mtime = os.path.getmtime(fileName)
+        except OSError:
+            mtime = None
+
+        cache = self.core.media.frameCache
+        prefetcher = self.core.media.framePrefetcher
+        image = cache.get(job["key"], mtime=mtime)
+        isPlaying = mediaPlayback["timeline"].state() == QTimeLine.Running
+
+        pmsmall = None
+        if image is None and isPlaying and mediaPlayback.get("frameShown"):
+            # drop the frame instead of blocking the UI. The prefetcher
+            # decodes it in the background
+            pass
+        else:
+            if image is None:
+                image = prefetcher.decodeFrame(
+                    fileName, job["frame"], job["width"], job["height"]
+                )
+                if image is not None and not image.isNull() and mtime is not None:
+                    cache.insert(job["key"], image, mtime=mtime)
 
-                    else:
-                        raise RuntimeError("no image loader available")
-                except:
-                    pmsmall = self.core.media.getPixmapFromPath(
-                        os.path.join(
-                            self.core.projectPath,
-                            "00_Pipeline",
-                            "Fallbacks",
-                            "%s.jpg" % os.path.splitext(curFile)[1][1:].lower(),
-                        )
-                    )
-            elif os.path.splitext(curFile)[1] in [".mp4", ".mov", ".avi"]:
-                try:
-                    if len(mediaPlayback["seq"]) > 1:
-                        imgNum = 0
-                        vidFile = imageio.get_reader(fileName, "ffmpeg")
-                    else:
-                        imgNum = mediaPlayback["curImg"]
-                        vidFile = mediaPlayback["vidPrw"]
-
-                    image = vidFile.get_data(imgNum)
-                    qimg = QImage(
-                        image,
-                        vidFile._meta["size"][0],
-                        vidFile._meta["size"][1],
-                        QImage.Format_RGB888,
-                    )
-                    pm = QPixmap.fromImage(qimg)
-                    if (pm.width() / float(pm.height())) > 1.7778:
-                        pmsmall = pm.scaledToWidth(self.renderResX)
-                    else:
-                        pmsmall = pm.scaledToHeight(self.renderResY)
-                except:
-                    pmsmall = self.core.media.getPixmapFromPath(
-                        os.path.join(
-                            self.core.projectPath,
-                            "00_Pipeline",
-                            "Fallbacks",
-                            "%s.jpg" % os.path.splitext(curFile)[1][1:].lower(),
-                        )
-                    )
+            if image is not None and not image.isNull():
+                pmsmall = QPixmap.fromImage(image)
             else:
-                return False
+                pmsmall = self.core.media.getPixmapFromPath(
+                    os.path.join(
+                        self.core.projectPath,
+                        "00_Pipeline",
+                        "Fallbacks",
+                        "%s.jpg" % ext[1:].lower(),
+                    )
+                )
 
-            QPixmapCache.insert(("Frame" + str(mediaPlayback["curImg"])), pmsmall)
+        self.prefetchFrames(mediaPlayback)
 
         if not mediaPlayback["prvIsSequence"] and len(mediaPlayback["seq"]) > 1:
             curFile = mediaPlayback["seq"][mediaPlayback["curImg"]]
             fileName = os.path.join(mediaPlayback["basePath"], curFile)
             self.updatePrvInfo(fileName, mediaPlayback=mediaPlayback)
 
-        mediaPlayback["l_preview"].setPixmap(pmsmall)
+        if pmsmall is not None:
+            mediaPlayback["l_preview"].setPixmap(pmsmall)
+            mediaPlayback["frameShown"] = True
+
         if mediaPlayback["timeline"].state() == QTimeLine.Running:
             mediaPlayback["sl_preview"].setValue(
                 int(100 * (mediaPlayback["curImg"] / float(mediaPlayback["pduration"])))
@@ -5223,74 +5110,27 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
 
     @err_catcher(name=__name__)
     def getImgSources(self, path, getFirstFile=False):
-        foundSrc = []
-        for k in os.walk(path):
-            sources = []
-            psources = []
-            for m in k[2]:
-                baseName, extension = os.path.splitext(m)
-                if extension in [
-                    ".jpg",
-                    ".jpeg",
-                    ".JPG",
-                    ".png",
-                    ".tif",
-                    ".tiff",
-                    ".exr",
-                    ".mp4",
-                    ".mov",
-                    ".avi",
-                    ".dpx",
-                ]:
-                    src = [baseName, extension]
-                    if len(baseName) > 3:
-                        endStr = baseName[-4:]
-                        if pVersion == 2:
-                            endStr = unicode(endStr)
-                        if endStr.isnumeric():
-                            src = [baseName[:-4], extension]
-
-                    psources.append(src)
-
-            for m in sorted(k[2]):
-                baseName, extension = os.path.splitext(m)
-                if extension in [
-                    ".jpg",
-                    ".jpeg",
-                    ".JPG",
-                    ".png",
-                    ".tif",
-                    ".tiff",
-                    ".exr",
-                    ".mp4",
-                    ".mov",
-                    ".avi",
-                    ".dpx",
-                ]:
-                    fname = m
-                    if getFirstFile:
-                        return [os.path.join(path, m)]
-
-                    if len(baseName) > 3:
-                        endStr = baseName[-4:]
-                        if pVersion == 2:
-                            endStr = unicode(endStr)
-                        if (
-                            endStr.isnumeric()
-                            and len(psources) == psources.count(psources[0])
-                            and extension not in [".mp4", ".mov", ".avi"]
-                        ):
-                            fname = "%s@@@@%s" % (baseName[:-4], extension)
+        # returns the media files in a folder. If all of them belong to one
+        # image sequence, the sequence gets returned as "name.@@@@.exr"
+        content = self.core.media.metadata.getEntry(path)
+        files = sorted(content["files"]) if content else []
+        sequences = FrameSequences.groupFiles(
+            files,
+            padding=self.core.framePadding,
+            extensions=FrameSequences.mediaExtensions,
+        )
+        if not sequences:
+            return []
 
-                    if fname in sources:
-                        if len(sources) == 1:
-                            break  # sequence detected
-                    else:
-                        foundSrc.append(os.path.join(path, fname))
-                        sources.append(fname)
-            break
+        if getFirstFile:
+            return [os.path.join(path, min(x.getFirstFile() for x in sequences))]
 
-        return foundSrc
+        if len(sequences) == 1 and sequences[0].frames and not sequences[0].isVideo:
+            return [os.path.join(path, sequences[0].getPattern("@"))]
+
+        return [
+            os.path.join(path, x) for seq in sequences for x in seq.getFiles()
+        ]
 
     @err_catcher(name=__name__)
     def getRVpath(self):
@@ -5450,7 +5290,8 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
             conversionSettings["-pix_fmt"] = "yuv422p10le"
 
         if mediaPlayback["prvIsSequence"]:
-            inputpath = os.path.splitext(inputpath)[0][:-self.core.framePadding] + "%04d".replace("4", str(self.core.framePadding)) + inputExt
+            sequence = FrameSequences.parsePattern(inputpath, padding=self.core.framePadding)
+            inputpath = os.path.join(sequence.directory, sequence.getPattern("%d")).replace("\\", "/")
 
         outputpath = self.core.paths.getMediaConversionOutputPath(self.curRTask, inputpath, extension)
 
@@ -5481,7 +5322,14 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
                 conversionSettings["-start_number"] = None
                 conversionSettings["-start_number_out"] = None
 
-        result = self.core.media.convertMedia(inputpath, startNum, outputpath, settings=conversionSettings)
+        result = self.core.media.convertMedia(
+            inputpath,
+            startNum,
+            outputpath,
+            settings=conversionSettings,
+            useCache=True,
+            progressText="Converting images - please wait..",
+        )
 
         if extension not in self.core.products.videoFormats and mediaPlayback["prvIsSequence"]:
             outputpath = outputpath % int(startNum)
@@ -5517,8 +5365,9 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
         sourceData = []
 
         for curSourcePath in sources:
-
-            if "@@@@" in curSourcePath:
+            # getImgSources returns sequences as "name.@@@@.exr"
+            sequence = FrameSequences.parsePattern(curSourcePath)
+            if sequence is not None and "@" in os.path.basename(curSourcePath):
                 if (
                     not "pstart" in mediaPlayback
                     or not "pend" in mediaPlayback
@@ -5531,7 +5380,10 @@ class ProjectBrowser(QMainWindow, ProjectBrowser_ui.Ui_mw_ProjectBrowser):
                     firstFrame = mediaPlayback["pstart"]
                     lastFrame = mediaPlayback["pend"]
 
-                filePath = curSourcePath.replace("@@@@", "####").replace("\\", "/")
+                # only the placeholder gets replaced, folders can contain "@"
+                filePath = os.path.join(
+                    sequence.directory, sequence.getPattern("#")
+                ).replace("\\", "/")
             else:
                 filePath = curSourcePath.replace("\\", "/")
                 firstFrame = 0
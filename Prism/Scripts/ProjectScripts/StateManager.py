@@ -87,6 +87,8 @@ except:
     import CreateItem
 
 from PrismUtils.Decorators import err_catcher
+from PrismUtils import PublishScheduler
+from PrismUtils import ThreadUtils
 
 
 logger = logging.getLogger(__name__)
@@ -148,8 +150,19 @@ class StateManager(QMainWindow, StateManager_ui.Ui_mw_StateManager):
 
         self.saveEnabled = True
         self.loading = False
+        # edits only mark their state as dirty. The states get written to the
+        # scene after a short delay, so that multiple edits result in one save
+        self.dirtyStates = set()
+        self.allStatesDirty = True
+        self.stateBlocks = {}
+        self.savedStateStr = None
+        self.saveTimer = QTimer(self)
+        self.saveTimer.setSingleShot(True)
+        self.saveTimer.setInterval(300)
+        self.saveTimer.timeout.connect(self.flushStates)
         self.shotcamFileType = ".abc"
         self.publishPaused = False
+        self.publishScheduler = None
 
         files = []
         pluginUiPath = os.path.join(
@@ -562,7 +575,7 @@ class %s(QWidget, %s.%s, %s.%sClass):
         self.tw_export.itemClicked.connect(
             lambda x, y: self.updateForeground(x, y, self.tw_export)
         )
-        self.tw_export.itemChanged.connect(lambda x, y: self.saveStatesToScene())
+        self.tw_export.itemChanged.connect(lambda x, y: self.saveStatesToScene(x))
         self.tw_export.itemDoubleClicked.connect(self.focusRename)
         self.tw_export.focusOutEvent = self.checkFocusOut
         self.tw_export.keyPressEvent = self.checkKeyPressed
@@ -614,6 +627,7 @@ class %s(QWidget, %s.%s, %s.%sClass):
 
     @err_catcher(name=__name__)
     def closeEvent(self, event):
+        self.flushStates()
         self.core.callback(name="onStateManagerClose", types=["custom"], args=[self])
         event.accept()
 
@@ -1135,6 +1149,11 @@ class %s(QWidget, %s.%s, %s.%sClass):
     def loadStates(self, stateText=None):
         self.saveEnabled = False
         self.loading = True
+        self.saveTimer.stop()
+        self.stateBlocks = {}
+        self.dirtyStates = set()
+        self.allStatesDirty = True
+        self.savedStateStr = None
         if stateText is None:
             stateText = self.core.appPlugin.sm_readStates(self)
 
@@ -1215,7 +1234,64 @@ class %s(QWidget, %s.%s, %s.%sClass):
         if self.standalone:
             return False
 
+        # "param" is either the state, which was edited, or the argument of
+        # the signal, which triggered the save
+        state = self.getEditedState(param)
+        if state:
+            self.dirtyStates.add(state)
+        else:
+            self.allStatesDirty = True
+
+        # the scene and the timer can only be accessed from the main thread,
+        # so edits from other threads get written by the timer of the main
+        # thread
+        if not ThreadUtils.isMainThread():
+            QMetaObject.invokeMethod(self.saveTimer, "start", Qt.QueuedConnection)
+            return
+
+        # without a pre-save callback of the app, a pending save could be
+        # missed when the scene gets saved, so the states are written directly
+        if not self.core.uiAvailable or not getattr(
+            self.core.appPlugin, "hasPreSaveCallback", False
+        ):
+            return self.flushStates()
+
+        self.saveTimer.start()
+
+    @err_catcher(name=__name__)
+    def getEditedState(self, param=None):
+        # returns None if the state can't be determined, which marks all
+        # states as dirty
+        if hasattr(param, "getStateProps"):
+            return param
+
+        # signals of the state trees pass the item of the state
+        if isinstance(param, QTreeWidgetItem):
+            return getattr(param, "ui", None)
+
+        widget = self.sender()
+        while widget is not None and widget is not self:
+            if hasattr(widget, "getStateProps"):
+                return widget
+
+            widget = widget.parent()
+
+    @err_catcher(name=__name__)
+    def flushStates(self, full=False):
+        # writes pending changes to the scene. This gets called synchronously
+        # before the scene gets saved or published. "full" reads the
+        # properties of all states again
+        self.saveTimer.stop()
+        if not self.saveEnabled or self.standalone:
+            self.dirtyStates = set()
+            return False
+
         getattr(self.core.appPlugin, "sm_preSaveToScene", lambda x: None)(self)
+        if not self.saveEnabled:
+            return False
+
+        if full:
+            self.allStatesDirty = True
 
         self.stateData = []
         for i in range(self.tw_import.topLevelItemCount()):
@@ -1230,19 +1306,49 @@ class %s(QWidget, %s.%s, %s.%sClass):
                 self.stateData[len(self.stateData) - 1][0], self.stateData
             )
 
-        stateData = {"states": []}
-        stateData["states"].append(self.getSettings())
+        blocks = [self.serializeStateBlock(self.getSettings())]
+        stateBlocks = {}
+        for i in self.stateData:
+            ui = i[0].ui
+            parent = str(i[1])
+            cached = self.stateBlocks.get(ui)
+            if self.allStatesDirty or ui in self.dirtyStates or not cached:
+                props = ui.getStateProps()
+                cached = None
+            else:
+                props = cached["props"]
+
+            if not cached or cached["parent"] != parent:
+                stateProps = {}
+                stateProps["stateparent"] = parent
+                stateProps["stateclass"] = ui.className
+                stateProps.update(props)
+                cached = {
+                    "props": props,
+                    "parent": parent,
+                    "block": self.serializeStateBlock(stateProps),
+                }
 
-        for idx, i in enumerate(self.stateData):
-            stateProps = {}
-            stateProps["stateparent"] = str(i[1])
-            stateProps["stateclass"] = i[0].ui.className
-            stateProps.update(i[0].ui.getStateProps())
-            stateData["states"].append(stateProps)
+            stateBlocks[ui] = cached
+            blocks.append(cached["block"])
 
-        stateStr = self.core.configs.writeJson(stateData)
+        self.stateBlocks = stateBlocks
+        self.dirtyStates = set()
+        self.allStatesDirty = False
+
+        stateStr = '{\n    "states": [\n' + ",\n".join(blocks) + "\n    ]\n}"
+        if stateStr == self.savedStateStr:
+            return
 
         self.core.appPlugin.sm_saveStates(self, stateStr)
+        self.savedStateStr = stateStr
+
+    @err_catcher(name=__name__)
+    def serializeStateBlock(self, stateProps):
+        # one state in the format of configs.writeJson, indented for the
+        # "states" list
+        blockStr = self.core.configs.writeJson(stateProps)
+        return "\n".join("        " + line for line in blockStr.splitlines())
 
     @err_catcher(name=__name__)
     def saveImports(self):
@@ -1456,6 +1562,19 @@ class %s(QWidget, %s.%s, %s.%sClass):
 
         return states
 
+    @err_catcher(name=__name__)
+    def runOutOfProcess(self, func, finish=None):
+        # lets the publish continue with the next state while "func" runs in
+        # a worker thread. "func" must not access the scene or the UI
+        if self.publishScheduler:
+            return self.publishScheduler.defer(func, finish=finish)
+
+        result = func()
+        if finish:
+            result = finish(result)
+
+        return result
+
     @err_catcher(name=__name__)
     def publish(
         self, executeState=False, continuePublish=False, useVersion="next", states=None
@@ -1463,6 +1582,9 @@ class %s(QWidget, %s.%s, %s.%sClass):
         if self.publishPaused and not continuePublish:
             return
 
+        if self.publishScheduler and self.publishScheduler.running:
+            return
+
         if continuePublish:
             executeState = self.publishType == "execute"
 
@@ -1483,6 +1605,8 @@ class %s(QWidget, %s.%s, %s.%sClass):
             self.core.popup("No states to publish.")
             return
 
+        self.flushStates(full=True)
+
         if continuePublish:
             skipStates = [
                 x["state"].state
@@ -1491,7 +1615,7 @@ class %s(QWidget, %s.%s, %s.%sClass):
             ]
             self.execStates = [x for x in self.execStates if x not in set(skipStates)]
             self.publishPaused = False
-            if self.pubMsg and self.pubMsg.msg.isVisible():
+            if self.pubMsg and self.pubMsg.msg and self.pubMsg.msg.isVisible():
                 self.pubMsg.msg.close()
         else:
             if useVersion != "next":
@@ -1736,61 +1860,31 @@ class %s(QWidget, %s.%s, %s.%sClass):
             getattr(self.core.appPlugin, "sm_preExecute", lambda x: None)(self)
             self.core.callback(name="onPublish", types=["custom"], args=[self])
 
+        # independent states run concurrently if the app plugin declares them
+        # as thread-safe. All other states run in the main thread in the same
+        # order as before
+        self.publishScheduler = PublishScheduler.PublishScheduler(self)
         if executeState:
-            text = "Executing \"%s\" - please wait.." % self.execStates[0].ui.state.text(0)
-            self.pubMsg = self.core.waitPopup(self.core, text)
-            with self.pubMsg:
-                if self.execStates[0].ui.className in [
-                    "ImageRender",
-                    "Export",
-                    "Playblast",
-                    "Folder",
-                ]:
-                    result = self.execStates[0].ui.executeState(
-                        parent=self, useVersion=useVersion
-                    )
-                else:
-                    result = self.execStates[0].ui.executeState(parent=self)
-
-                if self.execStates[0].ui.className == "Folder":
-                    self.publishResult += result
-
-                    for k in result:
-                        if "publish paused" in k["result"][0]:
-                            self.publishPaused = True
-                            return
-                else:
-                    self.publishResult.append(
-                        {"state": self.execStates[0].ui, "result": result}
-                    )
-
-                    if "publish paused" in result[0]:
-                        self.publishPaused = True
-                        return
-
+            self.publishScheduler.buildGraph(
+                [self.execStates[0]], self.execStates, checkRoots=False
+            )
         else:
-            for i in range(self.tw_export.topLevelItemCount()):
-                curUi = self.tw_export.topLevelItem(i).ui
-                if self.tw_export.topLevelItem(i).checkState(
-                    0
-                ) == Qt.Checked and curUi.state in set(self.execStates):
-                    text = "Executing \"%s\" - please wait.." % curUi.state.text(0)
-                    self.pubMsg = self.core.waitPopup(self.core, text)
-                    with self.pubMsg:
-                        exResult = curUi.executeState(parent=self)
-                        if curUi.className == "Folder":
-                            self.publishResult += exResult
-
-                            for k in exResult:
-                                if "publish paused" in k["result"][0]:
-                                    self.publishPaused = True
-                                    return
-                        else:
-                            self.publishResult.append({"state": curUi, "result": exResult})
+            items = [
+                self.tw_export.topLevelItem(i)
+                for i in range(self.tw_export.topLevelItemCount())
+            ]
+            self.publishScheduler.buildGraph(items, self.execStates)
 
-                            if exResult and "publish paused" in exResult[0]:
-                                self.publishPaused = True
-                                return
+        text = "Executing \"%s\" - please wait.." % self.execStates[0].ui.state.text(0)
+        self.pubMsg = self.core.waitPopup(self.core, text)
+        with self.pubMsg:
+            completed = self.publishScheduler.run(
+                useVersion=useVersion, popup=self.pubMsg
+            )
+
+        if not completed:
+            self.publishPaused = True
+            return
 
         getattr(self.core.appPlugin, "sm_postExecute", lambda x: None)(self)
         pubType = "stateExecution" if executeState else "publish"
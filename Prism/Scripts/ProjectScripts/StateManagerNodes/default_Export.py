@@ -234,13 +234,13 @@ class ExportClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def wholeSceneChanged(self, state):
         self.gb_objects.setEnabled(not state == Qt.Checked)
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -291,7 +291,7 @@ class ExportClass(object):
             )
             self.b_changeTask.setPalette(self.oldPalette)
             self.nameChanged(self.e_name.text())
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def rcObjects(self, pos):
@@ -330,7 +330,7 @@ class ExportClass(object):
             self.lw_objects.takeItem(rowNum)
 
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def clearItems(self):
@@ -340,7 +340,7 @@ class ExportClass(object):
             self.core.appPlugin.sm_export_clearSet(self)
 
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def updateUi(self):
@@ -359,7 +359,7 @@ class ExportClass(object):
                 self.curCam = self.camlist[0]
             else:
                 self.curCam = None
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         self.updateRange()
 
@@ -380,7 +380,7 @@ class ExportClass(object):
             self.cb_sCamShot.setCurrentIndex(shotNames.index(curShot))
         else:
             self.cb_sCamShot.setCurrentIndex(0)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         selObjects = [x.text() for x in self.lw_objects.selectedItems()]
         self.lw_objects.clear()
@@ -483,25 +483,25 @@ class ExportClass(object):
         self.gb_objects.setVisible(not isSCam)
 
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setCam(self, index):
         self.curCam = self.camlist[index]
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def startChanged(self):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def preExecuteState(self):
@@ -528,7 +528,7 @@ class ExportClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next", startFrame=0, endFrame=0):
+    def getOutputName(self, useVersion="next", startFrame=0, endFrame=0, reserve=False):
         prefUnit = self.core.appPlugin.preferredUnit
         fileName = self.core.getCurrentFileName()
 
@@ -548,7 +548,7 @@ class ExportClass(object):
                     useVersion == "next"
 
             if useVersion == "next":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
 
             outputPath = os.path.join(
                 outputPath,
@@ -602,7 +602,7 @@ class ExportClass(object):
                     self.l_taskName.text(),
                 )
                 if hVersion == "":
-                    hVersion = self.core.getHighestTaskVersion(outputPath)
+                    hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                     pComment = fnameData["comment"]
 
                 outputPath = os.path.join(
@@ -633,7 +633,7 @@ class ExportClass(object):
                     self.l_taskName.text(),
                 )
                 if hVersion == "":
-                    hVersion = self.core.getHighestTaskVersion(outputPath)
+                    hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                     pComment = fnameData["comment"]
 
                 outputPath = os.path.join(
@@ -691,7 +691,7 @@ class ExportClass(object):
 
             fileName = self.core.getCurrentFileName()
 
-            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
             outLength = len(outputName)
             if platform.system() == "Windows" and outLength > 255:
@@ -742,7 +742,7 @@ class ExportClass(object):
                 },
             )
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
             if os.path.exists(
                 outputName + ".abc"
@@ -772,7 +772,7 @@ class ExportClass(object):
 
             fileName = self.core.getCurrentFileName()
 
-            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
             outLength = len(outputName)
             if platform.system() == "Windows" and outLength > 255:
@@ -822,7 +822,7 @@ class ExportClass(object):
                 self.b_openLast.setEnabled(True)
                 self.b_copyLast.setEnabled(True)
 
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
 
             except Exception as e:
                 exc_type, exc_obj, exc_tb = sys.exc_info()
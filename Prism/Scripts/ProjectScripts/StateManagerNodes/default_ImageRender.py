@@ -115,7 +115,7 @@ class ImageRenderClass(object):
             "Get from rendersettings",
         ]
 
-        self.resolutionPresets = self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets)
+        self.resolutionPresets = list(self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets))
 
         if "Get from rendersettings" not in self.resolutionPresets:
             self.resolutionPresets.append("Get from rendersettings")
@@ -169,7 +169,7 @@ class ImageRenderClass(object):
             idx = self.cb_renderPreset.findText(data["currentrenderpreset"])
             if idx != -1:
                 self.cb_renderPreset.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "rangeType" in data:
             idx = self.cb_rangeType.findText(data["rangeType"])
             if idx != -1:
@@ -189,7 +189,7 @@ class ImageRenderClass(object):
             if idx != -1:
                 self.curCam = self.camlist[idx]
                 self.cb_cam.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "resoverride" in data:
             res = eval(data["resoverride"])
             self.chb_resOverride.setChecked(res[0])
@@ -201,7 +201,7 @@ class ImageRenderClass(object):
             idx = self.cb_renderLayer.findText(data["renderlayer"])
             if idx != -1:
                 self.cb_renderLayer.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "outputFormat" in data:
             idx = self.cb_format.findText(data["outputFormat"])
             if idx != -1:
@@ -337,21 +337,21 @@ class ImageRenderClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def startChanged(self):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def frameExpressionChanged(self, text=None):
@@ -420,7 +420,7 @@ class ImageRenderClass(object):
     @err_catcher(name=__name__)
     def setCam(self, index):
         self.curCam = self.camlist[index]
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -461,12 +461,12 @@ class ImageRenderClass(object):
             self.l_taskName.setText(self.nameWin.e_item.text())
             self.setTaskWarn(False)
             self.nameChanged(self.e_name.text())
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def presetOverrideChanged(self, checked):
         self.cb_renderPreset.setEnabled(checked)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def resOverrideChanged(self, checked):
@@ -474,7 +474,7 @@ class ImageRenderClass(object):
         self.sp_resHeight.setEnabled(checked)
         self.b_resPresets.setEnabled(checked)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def showResPresets(self):
@@ -494,7 +494,7 @@ class ImageRenderClass(object):
             pAct.triggered.connect(
                 lambda x=None, v=pheight: self.sp_resHeight.setValue(v)
             )
-            pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene())
+            pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene(self))
             pmenu.addAction(pAct)
 
         pmenu.exec_(QCursor.pos())
@@ -533,7 +533,7 @@ class ImageRenderClass(object):
             self.l_nThres.setEnabled(False)
             self.sp_nThres.setEnabled(False)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def updateUi(self):
@@ -557,7 +557,7 @@ class ImageRenderClass(object):
             else:
                 self.curCam = None
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         self.updateRange()
 
@@ -575,7 +575,7 @@ class ImageRenderClass(object):
             self.cb_renderLayer.setCurrentIndex(layerList.index(curLayer))
         else:
             self.cb_renderLayer.setCurrentIndex(0)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
         if self.l_taskName.text() != "":
             self.setTaskWarn(False)
@@ -679,17 +679,17 @@ class ImageRenderClass(object):
                     selSlaves = selSlaves[:-2]
 
             self.e_osSlaves.setText(selSlaves)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def gpuPtChanged(self):
         self.w_dlGPUdevices.setEnabled(self.sp_dlGPUpt.value() == 0)
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def gpuDevicesChanged(self):
         self.w_dlGPUpt.setEnabled(self.le_dlGPUdevices.text() == "")
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def showPasses(self):
@@ -740,7 +740,7 @@ class ImageRenderClass(object):
                 )
 
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def rclickPasses(self, pos):
@@ -775,7 +775,7 @@ class ImageRenderClass(object):
             )
         )
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def managerChanged(self, text=None):
@@ -793,7 +793,7 @@ class ImageRenderClass(object):
                 self.cb_manager.currentText()
             ].sm_render_managerChanged(self)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def preExecuteState(self):
@@ -830,7 +830,7 @@ class ImageRenderClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next"):
+    def getOutputName(self, useVersion="next", reserve=False):
         if self.l_taskName.text() == "":
             return
 
@@ -867,7 +867,7 @@ class ImageRenderClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -895,7 +895,7 @@ class ImageRenderClass(object):
             )
 
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -961,7 +961,7 @@ class ImageRenderClass(object):
             if self.chb_override.isChecked():
                 self.core.appPlugin.sm_render_setVraySettings(self)
 
-            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+            outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
             outLength = len(outputName)
             if platform.system() == "Windows" and outLength > 255:
@@ -983,7 +983,7 @@ class ImageRenderClass(object):
             self.b_openLast.setEnabled(True)
             self.b_copyLast.setEnabled(True)
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
             rSettings = {
                 "outputName": outputName,
@@ -227,7 +227,7 @@ class ImportFileClass(object):
     def pathChanged(self):
         self.stateManager.saveImports()
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def autoUpdateChanged(self, checked):
@@ -240,14 +240,14 @@ class ImportFileClass(object):
                 if curVersion and latestVersion and curVersion != latestVersion:
                     self.importLatest()
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def autoNameSpaceChanged(self, checked):
         self.b_nameSpaces.setEnabled(not checked)
         if not self.stateManager.standalone:
             self.core.appPlugin.sm_import_removeNameSpaces(self)
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def getImportPath(self):
@@ -388,7 +388,7 @@ class ImportFileClass(object):
 
         self.stateManager.saveImports()
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
         return result
 
@@ -604,7 +604,7 @@ class ImportFileClass(object):
             )(self)
 
         self.updateUi()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def preDelete(
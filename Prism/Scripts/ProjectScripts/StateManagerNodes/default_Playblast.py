@@ -88,7 +88,7 @@ class PlayblastClass(object):
             "Get from rendersettings",
         ]
 
-        self.resolutionPresets = self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets)
+        self.resolutionPresets = list(self.core.getConfig("globals", "resolutionPresets", configPath=self.core.prismIni, dft=dftResPresets))
 
         if "Get from rendersettings" not in self.resolutionPresets:
             self.resolutionPresets.append("Get from rendersettings")
@@ -142,7 +142,7 @@ class PlayblastClass(object):
             if idx > 0:
                 self.curCam = self.camlist[idx - 1]
                 self.cb_cams.setCurrentIndex(idx)
-                self.stateManager.saveStatesToScene()
+                self.stateManager.saveStatesToScene(self)
         if "resoverride" in data:
             res = eval(data["resoverride"])
             self.chb_resOverride.setChecked(res[0])
@@ -200,21 +200,21 @@ class PlayblastClass(object):
     @err_catcher(name=__name__)
     def rangeTypeChanged(self, state):
         self.updateRange()
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def startChanged(self):
         if self.sp_rangeStart.value() > self.sp_rangeEnd.value():
             self.sp_rangeEnd.setValue(self.sp_rangeStart.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def endChanged(self):
         if self.sp_rangeEnd.value() < self.sp_rangeStart.value():
             self.sp_rangeStart.setValue(self.sp_rangeEnd.value())
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def setCam(self, index):
@@ -223,7 +223,7 @@ class PlayblastClass(object):
         else:
             self.curCam = self.camlist[index - 1]
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def nameChanged(self, text):
@@ -265,7 +265,7 @@ class PlayblastClass(object):
 
             self.setTaskWarn(False)
 
-            self.stateManager.saveStatesToScene()
+            self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def resOverrideChanged(self, checked):
@@ -273,7 +273,7 @@ class PlayblastClass(object):
         self.sp_resHeight.setEnabled(checked)
         self.b_resPresets.setEnabled(checked)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
     @err_catcher(name=__name__)
     def showResPresets(self):
@@ -293,7 +293,7 @@ class PlayblastClass(object):
             pAct.triggered.connect(
                 lambda x=None, v=pheight: self.sp_resHeight.setValue(v)
             )
-            pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene())
+            pAct.triggered.connect(lambda: self.stateManager.saveStatesToScene(self))
             pmenu.addAction(pAct)
 
         self.core.appPlugin.setRCStyle(self.stateManager, pmenu)
@@ -406,7 +406,7 @@ class PlayblastClass(object):
         return [self.state.text(0), warnings]
 
     @err_catcher(name=__name__)
-    def getOutputName(self, useVersion="next"):
+    def getOutputName(self, useVersion="next", reserve=False):
         if self.l_taskName.text() == "":
             return
 
@@ -431,7 +431,7 @@ class PlayblastClass(object):
                 self.l_taskName.text(),
             )
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -456,7 +456,7 @@ class PlayblastClass(object):
             )
 
             if hVersion == "":
-                hVersion = self.core.getHighestTaskVersion(outputPath)
+                hVersion = self.core.getHighestTaskVersion(outputPath, reserve=reserve)
                 pComment = fnameData["comment"]
 
             outputPath = os.path.join(
@@ -491,7 +491,7 @@ class PlayblastClass(object):
 
         fileName = self.core.getCurrentFileName()
 
-        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion)
+        outputName, outputPath, hVersion = self.getOutputName(useVersion=useVersion, reserve=True)
 
         outLength = len(outputName)
         if platform.system() == "Windows" and outLength > 255:
@@ -548,7 +548,7 @@ class PlayblastClass(object):
         self.b_openLast.setEnabled(True)
         self.b_copyLast.setEnabled(True)
 
-        self.stateManager.saveStatesToScene()
+        self.stateManager.saveStatesToScene(self)
 
         self.core.saveScene(versionUp=False, prismReq=False)
 
@@ -561,7 +561,14 @@ class PlayblastClass(object):
                 self
             )
 
-            if self.cb_formats.currentText() == "mp4":
+            convertToMp4 = self.cb_formats.currentText() == "mp4"
+
+            # the conversion doesn't access the scene, so the publish can
+            # continue with the next state in the meantime
+            def convert():
+                if not convertToMp4:
+                    return True
+
                 mediaBaseName = os.path.splitext(outputName)[0]
                 videoOutput = mediaBaseName + "mp4"
                 inputpath = (
@@ -569,13 +576,10 @@ class PlayblastClass(object):
                     + "%04d".replace("4", str(self.core.framePadding))
                     + os.path.splitext(outputName)[1]
                 )
-                result = self.core.media.convertMedia(inputpath, jobFrames[0], videoOutput)
+                self.core.media.convertMedia(inputpath, jobFrames[0], videoOutput)
 
                 if not os.path.exists(videoOutput):
-                    return [
-                        self.state.text(0)
-                        + " - error occurred during conversion of jpg files to mp4"
-                    ]
+                    return False
 
                 delFiles = []
                 for i in os.listdir(outputPath):
@@ -590,21 +594,32 @@ class PlayblastClass(object):
                     except:
                         pass
 
-            self.core.callHook(
-                "postPlayblast",
-                args={
-                    "prismCore": self.core,
-                    "scenefile": fileName,
-                    "startFrame": jobFrames[0],
-                    "endFrame": jobFrames[1],
-                    "outputName": outputName,
-                },
-            )
+                return True
 
-            if len(os.listdir(outputPath)) > 1:
-                return [self.state.text(0) + " - success"]
-            else:
-                return [self.state.text(0) + " - unknown error (files do not exist)"]
+            def finish(converted):
+                if not converted:
+                    return [
+                        self.state.text(0)
+                        + " - error occurred during conversion of jpg files to mp4"
+                    ]
+
+                self.core.callHook(
+                    "postPlayblast",
+                    args={
+                        "prismCore": self.core,
+                        "scenefile": fileName,
+                        "startFrame": jobFrames[0],
+                        "endFrame": jobFrames[1],
+                        "outputName": outputName,
+                    },
+                )
+
+                if len(os.listdir(outputPath)) > 1:
+                    return [self.state.text(0) + " - success"]
+                else:
+                    return [self.state.text(0) + " - unknown error (files do not exist)"]
+
+            return self.stateManager.runOutOfProcess(convert, finish=finish)
         except Exception as e:
             exc_type, exc_obj, exc_tb = sys.exc_info()
             erStr = "%s ERROR - sm_default_playblast %s:\n%s" % (
@@ -560,31 +560,21 @@ class TaskSelection(QDialog, TaskSelection_ui.Ui_dlg_TaskSelection):
             fpath = self.core.shotPath.replace(ppath, fpath)
             fBasePaths.append(fpath)
 
-        sequences, shotData = self.core.entities.getShots(basepaths=fBasePaths)
+        catalog = self.core.entities.getShotCatalog(basepaths=fBasePaths)
+        index = self.core.entities.index
 
         shots = {}
-        for shot in shotData:
-            seqName = shot[0]
-            shotName = shot[1]
-            shotPath = shot[3]
-
-            taskPath = os.path.join(shot[3], "Export")
-            tasks = []
-            for k in os.walk(taskPath):
-                tasks = k[1]
-                break
-
-            if len(tasks) == 0:
+        for shot in catalog.getShots():
+            shotPaths = [
+                x for x in shot.paths if index.getDirs(os.path.join(x, "Export"))
+            ]
+            if not shotPaths:
                 continue
 
-            if seqName not in shots:
-                shots[seqName] = {}
-
-            if shotName not in shots[seqName]:
-                shots[seqName][shotName] = []
+            if shot.sequence not in shots:
+                shots[shot.sequence] = {}
 
-            if shotPath not in shots[seqName][shotName]:
-                shots[seqName][shotName].append(shotPath)
+            shots[shot.sequence][shot.shot] = shotPaths
 
         sequences = self.core.sortNatural(shots.keys())
         if "no sequence" in sequences:
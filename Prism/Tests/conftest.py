@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+
+import pytest
+
+
+scriptsPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Scripts")
+if scriptsPath not in sys.path:
+    sys.path.insert(0, scriptsPath)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture
+def qapp():
+    # modules with the err_catcher decorator import Qt
+    QtWidgets = pytest.importorskip("PySide2.QtWidgets")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+# minimal PrismCore for the tests. Errors in functions with the err_catcher
+# decorator are raised, so that they fail the test. The tests subclass it with
+# the attributes, which the tested modules use
+class FakeCore(object):
+    version = "test"
+
+    def __init__(self, projectPath="/project"):
+        self.projectPath = projectPath
+        self.prismIni = os.path.join(projectPath, "00_Pipeline", "pipeline.yml")
+
+    def getConfig(self, *args, **kwargs):
+        return kwargs.get("dft")
+
+    def writeErrorLog(self, text):
+        raise RuntimeError(text)
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import json
+import textwrap
+
+import pytest
+
+import conftest
+
+
+scriptsPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Scripts")
+
+# the fake interpreter puts the fake app modules and a fake PrismCore in
+# front of the Prism scripts and executes PrismBatchPublish.py like a
+# batch interpreter (hython, mayapy, ...) would
+fakeInterpreter = """
+import os
+import sys
+import runpy
+
+fakeModules = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules")
+sys.path[:0] = [fakeModules, %r]
+script = sys.argv.pop(1)
+sys.argv[0] = script
+runpy.run_path(script, run_name="__main__")
+"""
+
+fakePrismCore = """
+import os
+import json
+
+
+class FakeState(object):
+    def __init__(self, name):
+        self.name = name
+
+    def text(self, column):
+        return self.name
+
+    def parent(self):
+        return None
+
+
+class FakeStateItem(object):
+    def __init__(self, item):
+        self.state = item
+        self.className = "Export"
+
+
+class FakeStateManager(object):
+    def __init__(self, scenefile):
+        self.states = [FakeState(x) for x in json.load(open(scenefile))["states"]]
+        self.publishPaused = False
+
+    def loadStates(self):
+        pass
+
+    def getChildStates(self, state):
+        return [state]
+
+    def publish(self, states):
+        for state in states:
+            result = ["%s - success" % state.name]
+            if state.name == "broken":
+                result = ["%s - error" % state.name]
+
+            self.publishResult.append({"state": FakeStateItem(state), "result": result})
+
+
+class FakeAppPlugin(object):
+    def openScene(self, core, scenefile, force=False):
+        core.scenefile = scenefile
+        return os.path.exists(scenefile)
+
+
+class PrismCore(object):
+    def __init__(self, app=None, prismArgs=None):
+        import maya.standalone
+
+        assert app != "Maya" or maya.standalone.initialized
+        self.appPlugin = FakeAppPlugin()
+
+    def changeProject(self, configPath):
+        self.project = configPath
+
+    def stateManager(self, openUi=True):
+        return FakeStateManager(self.scenefile)
+
+    def getCurrentFileName(self):
+        return self.scenefile
+"""
+
+fakeMaya = """
+initialized = False
+
+
+def initialize(name=None):
+    global initialized
+    initialized = True
+"""
+
+
+class FakePlugin(object):
+    def __init__(self, name, sceneFormats, appType):
+        self.pluginName = name
+        self.sceneFormats = sceneFormats
+        self.appType = appType
+
+
+class FakeCore(conftest.FakeCore):
+    def __init__(self, interpreters, prismRoot):
+        super(FakeCore, self).__init__()
+        self.prismRoot = prismRoot
+        self.interpreters = interpreters
+        self.appPlugin = FakePlugin("Standalone", [], "standalone")
+        self.unloadedAppPlugins = {
+            "Maya": FakePlugin("Maya", [".ma"], "3d"),
+            "Houdini": FakePlugin("Houdini", [".hip"], "3d"),
+            "Nuke": FakePlugin("Nuke", [".nk"], "2d"),
+        }
+
+    def getConfig(self, cat=None, param=None, dft=None, **kwargs):
+        if (cat, param) == ("batchPublish", "interpreters"):
+            return self.interpreters
+
+        return dft
+
+    def getPlugin(self, pluginName):
+        return self.unloadedAppPlugins.get(pluginName)
+
+    def isStr(self, val):
+        return isinstance(val, str)
+
+
+def writeFile(path, data):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+
+    with open(path, "w") as f:
+        f.write(textwrap.dedent(data))
+
+
+@pytest.fixture
+def publisher(qapp, tmp_path):
+    from PrismUtils import BatchPublisher
+
+    interpreterPath = str(tmp_path / "fakeInterpreter" / "interpreter.py")
+    writeFile(interpreterPath, fakeInterpreter % scriptsPath)
+    modules = str(tmp_path / "fakeInterpreter" / "modules")
+    writeFile(os.path.join(modules, "PrismCore.py"), fakePrismCore)
+    writeFile(os.path.join(modules, "maya", "__init__.py"), "")
+    writeFile(os.path.join(modules, "maya", "standalone.py"), fakeMaya)
+
+    interpreter = [sys.executable, interpreterPath]
+    core = FakeCore({"Maya": interpreter, "Houdini": interpreter}, os.path.dirname(scriptsPath))
+    return BatchPublisher.BatchPublisher(core)
+
+
+def createScenefile(tmp_path, name, states):
+    path = str(tmp_path / name)
+    with open(path, "w") as f:
+        json.dump({"states": states}, f)
+
+    return path
+
+
+def test_publishRunsWorkersInInterpreters(publisher, tmp_path):
+    scenefiles = [
+        createScenefile(tmp_path, "shot010_anm_v0001.ma", ["abc", "playblast"]),
+        createScenefile(tmp_path, "shot020_fx_v0001.hip", ["broken"]),
+        createScenefile(tmp_path, "shot030_comp_v0001.nk", ["write"]),
+    ]
+    reportPath = str(tmp_path / "report.json")
+    report = publisher.publish(scenefiles, processes=2, reportPath=reportPath)
+
+    results = dict((os.path.basename(x["scenefile"]), x) for x in report["jobs"])
+    maya = results["shot010_anm_v0001.ma"]
+    assert maya["status"] == "success", open(maya["log"]).read()
+    assert [x["state"] for x in maya["states"]] == ["abc", "playblast"]
+    assert maya["publishedScenefile"] == scenefiles[0]
+
+    assert results["shot020_fx_v0001.hip"]["status"] == "failed"
+    assert results["shot030_comp_v0001.nk"]["status"] == "error"
+    assert "StateManager" in results["shot030_comp_v0001.nk"]["error"]
+
+    assert report["succeeded"] == 1
+    assert report["failed"] == 2
+    with open(reportPath) as f:
+        assert json.load(f)["succeeded"] == 1
+
+
+def test_workerExecutesOnlySelectedStates(publisher, tmp_path):
+    scenefile = createScenefile(tmp_path, "shot010_anm_v0001.ma", ["abc", "playblast"])
+    report = publisher.publish([scenefile], states=["playblast"], processes=1)
+    assert [x["state"] for x in report["jobs"][0]["states"]] == ["playblast"]
+
+
+def test_workerWithoutResultsFails(publisher, tmp_path):
+    scenefile = createScenefile(tmp_path, "shot010_anm_v0001.ma", ["abc"])
+    publisher.core.interpreters["Maya"] = [sys.executable, "-c", "import sys; sys.exit(3)"]
+    result = publisher.publish([scenefile], processes=1)["jobs"][0]
+    assert result["status"] == "error"
+    assert result["returncode"] == 3
+
+
+def test_latestScenefilesCompareVersionNumbers(publisher):
+    from PrismUtils import ScenefileParser
+
+    files = [
+        "/project/Shots/sh010/anm/shot_sh010_anm_main_v999_start_usr_.ma",
+        "/project/Shots/sh010/anm/shot_sh010_anm_main_v1000_fix_usr_.ma",
+        "/project/Shots/sh010/anm/shot_sh010_anm_main_v0998_old_usr_.ma",
+    ]
+
+    class FakeEntities(object):
+        parser = ScenefileParser.ScenefileParser("_")
+
+        def getShots(self):
+            return [[], [["", "", "sh010"], ["", "", "sh020"]]]
+
+        def getSteps(self, shot):
+            return ["anm"]
+
+        def getCategories(self, step, shot):
+            return ["main"]
+
+        def getScenefiles(self, shot, step, category, extensions):
+            return files if shot == "sh010" else []
+
+        def getScenefileParser(self):
+            return self.parser
+
+    core = publisher.core
+    core.entities = FakeEntities()
+    core.getPluginSceneFormats = lambda: [".ma"]
+    core.getScenefileData = core.entities.parser.getData
+
+    assert publisher.getLatestScenefiles() == [files[1]]
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import timeit
+import threading
+from collections import OrderedDict
+
+import pytest
+
+import conftest
+
+
+class FakeCore(conftest.FakeCore):
+    def __init__(self, root):
+        super(FakeCore, self).__init__(os.path.join(root, "project"))
+        self.userini = os.path.join(root, "Prism.yml")
+
+    def popup(self, text, *args, **kwargs):
+        raise RuntimeError(text)
+
+    def popupQuestion(self, text, *args, **kwargs):
+        raise RuntimeError(text)
+
+
+@pytest.fixture
+def configs(qapp, tmp_path):
+    from PrismUtils import ConfigManager
+
+    core = FakeCore(str(tmp_path))
+    manager = ConfigManager.ConfigManager(core)
+    manager.setConfig(
+        data={"globals": {"deps": ["a.abc"], "fps": 24}},
+        configPath=core.prismIni,
+    )
+    return manager
+
+
+def test_cachedReadsDontCopy(configs):
+    path = configs.core.prismIni
+    data = configs.getConfig(configPath=path)
+    assert configs.getConfig(configPath=path) is data
+    assert configs.getConfig("globals", "deps", configPath=path) is data["globals"]["deps"]
+
+
+def test_cachedReadsDontLoadTheFile(configs, monkeypatch):
+    path = configs.core.prismIni
+    configs.clearCache()
+    reads = []
+    readYaml = configs.readYaml
+
+    def countingRead(path=None, *args, **kwargs):
+        reads.append(path)
+        return readYaml(path, *args, **kwargs)
+
+    monkeypatch.setattr(configs, "readYaml", countingRead)
+    assert configs.getConfig("globals", "fps", configPath=path) == 24
+    assert configs.getConfig("globals", "deps", configPath=path) == ["a.abc"]
+    assert reads == [path]
+
+
+def test_setConfigDoesntModifyPreviousResults(configs):
+    path = configs.core.prismIni
+    data = configs.getConfig(configPath=path)
+    configs.setConfig("globals", "fps", val=25, configPath=path)
+    configs.setConfig("shots", "sh010", val=[1001, 1100], configPath=path)
+    configs.setConfig(data={"globals": {"deps": []}}, configPath=path)
+
+    assert data == {"globals": {"deps": ["a.abc"], "fps": 24}}
+    newData = configs.getConfig(configPath=path)
+    assert newData == {"globals": {"deps": [], "fps": 25}, "shots": {"sh010": [1001, 1100]}}
+
+    configs.setConfig("globals", "fps", configPath=path, delete=True)
+    assert newData["globals"]["fps"] == 25
+    assert configs.getConfig("globals", configPath=path) == {"deps": []}
+
+
+def test_setConfigDoesntKeepReferences(configs):
+    path = configs.core.prismIni
+    previous = configs.getConfig("globals", configPath=path)
+    val = ["c.abc"]
+    configs.setConfig("globals", "deps", val=val, configPath=path)
+    val.append("d.abc")
+
+    assert configs.getConfig("globals", "deps", configPath=path) == ["c.abc"]
+    assert previous["deps"] == ["a.abc"]
+
+    configs.clearCache()
+    assert configs.getConfig("globals", "deps", configPath=path) == ["c.abc"]
+
+
+def test_concurrentChangesArentLost(configs):
+    path = configs.core.prismIni
+
+    def setShots(thread):
+        for idx in range(20):
+            configs.setConfig("shots", "sh%s_%02d" % (thread, idx), val=idx, configPath=path)
+
+    with configs.batch(configPath=path):
+        threads = [threading.Thread(target=setShots, args=(x,)) for x in range(4)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    configs.clearCache()
+    assert len(configs.getConfig("shots", configPath=path)) == 80
+
+
+def test_batchWritesOnce(configs, monkeypatch):
+    path = configs.core.prismIni
+    writes = []
+    writeYaml = configs.writeYaml
+
+    def countingWrite(*args, **kwargs):
+        writes.append(kwargs.get("path"))
+        return writeYaml(*args, **kwargs)
+
+    monkeypatch.setattr(configs, "writeYaml", countingWrite)
+    with configs.batch(configPath=path):
+        for idx in range(20):
+            configs.setConfig("shots", "shot%02d" % idx, val=[1001, 1100 + idx], configPath=path)
+
+        assert configs.getConfig("shots", "shot05", configPath=path) == [1001, 1105]
+        assert writes == []
+
+    assert len(writes) == 1
+    configs.clearCache()
+    assert configs.getConfig("shots", "shot19", configPath=path) == [1001, 1119]
+    assert configs.getConfig("globals", "fps", configPath=path) == 24
+
+
+def getUserConfig():
+    return OrderedDict([
+        ("globals", OrderedDict([
+            ("current project", "/projects/test/00_Pipeline/pipeline.yml"),
+            ("username", "Test User"),
+            ("showonstartup", True),
+            ("autosave", True),
+        ])),
+        ("nuke", OrderedDict([("autosave", False), ("useRelativePaths", True)])),
+        ("recent_files", OrderedDict([
+            ("/projects/test", ["/projects/test/shot_%03d_Comp_v0001_.nk" % x for x in range(10)]),
+        ])),
+    ])
+
+
+def getProjectConfig():
+    return OrderedDict([
+        ("globals", OrderedDict([
+            ("project_name", "test"),
+            ("prism_version", "v1.3.0.0"),
+            ("pipeline_steps", OrderedDict((x[:3], x) for x in ["Modeling", "Shading", "Rigging", "Animation", "Lighting", "Compositing"])),
+            ("uselocalfiles", False),
+            ("forcefps", True),
+            ("fps", 24.0),
+        ])),
+        ("changeProject", OrderedDict([("app%s" % x, "Houdini") for x in range(20)])),
+    ])
+
+
+def getVersioninfo(idx):
+    return OrderedDict([
+        ("information", OrderedDict([
+            ("Version", "v%04d" % idx),
+            ("Created by", "Test User"),
+            ("Creation date", "01.01.20 12:00:00"),
+            ("Source scene", "/projects/test/03_Workflow/Shots/sh010/Scenefiles/Fx/shot_sh010_Fx_v%04d_.hip" % idx),
+            ("Dependencies", ["/projects/test/cache_%s.abc" % x for x in range(5)]),
+            ("External files", []),
+            ("fps", 24.0),
+            ("startframe", 1001),
+            ("endframe", 1100),
+        ])),
+    ])
+
+
+def getShotinfo():
+    return OrderedDict([
+        ("shotRanges", OrderedDict(("seq%02d-sh%04d" % (x // 100, x), [1001, 1100 + x]) for x in range(4000))),
+    ])
+
+
+def test_sidecars(configs, tmp_path, monkeypatch):
+    monkeypatch.setattr(configs, "getUserConfigDir", lambda: str(tmp_path / "user"))
+    path = str(tmp_path / "shotInfo.yml")
+    configs.writeYaml(path, getShotinfo())
+    assert os.path.getsize(path) >= configs.sidecarMinSize
+
+    data = configs.readYaml(path)
+    sidecarPath = configs.getSidecarPath(path)
+    assert os.path.exists(sidecarPath)
+    assert configs.readSidecar(path, configs.getFileStat(path)) == data
+
+    # the second read uses the sidecar instead of the yaml loader
+    loads = []
+    getYaml = configs.getYaml
+
+    def countingGetYaml(*args, **kwargs):
+        yaml = getYaml(*args, **kwargs)
+        load = yaml.load
+
+        def countingLoad(stream):
+            loads.append(stream)
+            return load(stream)
+
+        yaml.load = countingLoad
+        return yaml
+
+    monkeypatch.setattr(configs, "getYaml", countingGetYaml)
+    sidecarData = configs.readYaml(path)
+    assert loads == []
+    assert sidecarData == data
+    assert sidecarData["shotRanges"]["seq39-sh3999"] == [1001, 5099]
+
+    # a modified config doesn't use the outdated sidecar
+    data["shotRanges"]["seq39-sh3999"] = [1, 2]
+    configs.writeYaml(path, data)
+    os.utime(path, (1000, 1000))
+    assert configs.readSidecar(path, configs.getFileStat(path)) is None
+    assert configs.readYaml(path)["shotRanges"]["seq39-sh3999"] == [1, 2]
+    assert len(loads) == 1
+    assert configs.readSidecar(path, configs.getFileStat(path)) == data
+
+
+def test_benchmark(configs, tmp_path, monkeypatch):
+    # load times of typical configs with the roundtrip loader (the loader
+    # before libyaml was used), the libyaml loader and the sidecar. The
+    # timings are only reported, run with "-s" to see them
+    monkeypatch.setattr(configs, "getUserConfigDir", lambda: str(tmp_path / "user"))
+    configs.useSidecars = False
+    files = {
+        "user": [(str(tmp_path / "Prism.yml"), getUserConfig())],
+        "project": [(str(tmp_path / "pipeline.yml"), getProjectConfig())],
+        "100 versioninfos": [
+            (str(tmp_path / ("v%04dversioninfo.yml" % x)), getVersioninfo(x)) for x in range(100)
+        ],
+        "shotinfo": [(str(tmp_path / "shotInfo.yml"), getShotinfo())],
+    }
+    for name, paths in files.items():
+        for path, data in paths:
+            configs.writeYaml(path, data)
+
+    def loadRoundtrip(paths):
+        yaml = configs.getYaml(fast=False)
+        for path, data in paths:
+            with open(path, "r") as f:
+                yaml.load(f)
+
+    def loadConfigs(paths):
+        for path, data in paths:
+            configs.readYaml(path)
+
+    def measure(func, paths, number):
+        return min(timeit.repeat(lambda: func(paths), number=number, repeat=number)) / number * 1000
+
+    results = []
+    for name in ["user", "project", "100 versioninfos", "shotinfo"]:
+        paths = files[name]
+        number = 1 if name == "shotinfo" else 3
+        configs.useSidecars = False
+        roundtrip = measure(loadRoundtrip, paths, number)
+        fast = measure(loadConfigs, paths, number)
+        configs.useSidecars = True
+        loadConfigs(paths)
+        sidecar = measure(loadConfigs, paths, number)
+        results.append((name, roundtrip, fast, sidecar))
+
+        # all loaders return the same data
+        for path, data in paths:
+            assert configs.readYaml(path) == data
+
+    print("\nms per load: roundtrip / libyaml / with sidecars")
+    for result in results:
+        print("  %-17s %8.2f %8.2f %8.2f" % result)
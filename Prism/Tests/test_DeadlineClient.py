@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import json
+import platform
+
+import pytest
+
+
+deadlineScripts = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Plugins",
+    "RenderfarmManagers",
+    "Deadline",
+    "Scripts",
+)
+if deadlineScripts not in sys.path:
+    sys.path.insert(0, deadlineScripts)
+
+import DeadlineClient
+
+
+# logs its arguments and prints the output from the FAKE_DEADLINE_OUTPUT
+# environment variable like deadlinecommand would
+fakeDeadlineCommand = """#!%s
+import os
+import sys
+import json
+
+with open(os.environ["FAKE_DEADLINE_LOG"], "a") as f:
+    f.write(json.dumps(sys.argv[1:]) + "\\n")
+
+sys.stdout.write(os.environ.get("FAKE_DEADLINE_OUTPUT", ""))
+"""
+
+
+pytestmark = pytest.mark.skipif(
+    platform.system() == "Windows", reason="the fake deadlinecommand is a script"
+)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    executable = str(tmp_path / "deadlinecommand")
+    with open(executable, "w") as f:
+        f.write(fakeDeadlineCommand % sys.executable)
+
+    os.chmod(executable, 0o755)
+    monkeypatch.setenv("FAKE_DEADLINE_LOG", str(tmp_path / "calls.log"))
+    client = DeadlineClient.DeadlineClient(executable=executable, batchDelay=0.1, retryDelay=0)
+    client.submitDir = str(tmp_path / "submissions")
+    yield client
+    client.stop(timeout=5)
+
+
+def getCalls(tmp_path):
+    with open(str(tmp_path / "calls.log")) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_waitReturnsForEmptyResults(client, tmp_path):
+    tickets = [
+        client.submitJob({"Name": "job%s" % idx}, {}, [], wait=False)
+        for idx in range(2)
+    ]
+    assert client.waitForSubmissions(tickets, timeout=10)
+    assert all(x.done and x.result == "" for x in tickets)
+    assert client.getPendingCount() == 0
+
+
+def test_waitWithTimeoutAndCallback(client, tmp_path):
+    ticket = client.submitJob({"Name": "job"}, {}, [], wait=False)
+    calls = []
+    assert client.waitForSubmissions([ticket], timeout=10, onWait=lambda: calls.append(1))
+    assert ticket.done
+
+
+def test_queuedJobsAreSubmittedInOneBatch(client, tmp_path, monkeypatch):
+    monkeypatch.setenv(
+        "FAKE_DEADLINE_OUTPUT",
+        "Result=Success\nJobID=a\nResult=Success\nJobID=b\nResult=Success\nJobID=c\n",
+    )
+    tickets = [
+        client.submitJob({"Name": "job%s" % idx}, {}, [], wait=False)
+        for idx in range(3)
+    ]
+    assert client.waitForSubmissions(tickets, timeout=10)
+    assert [x.success for x in tickets] == [True, True, True]
+    assert "JobID=b" in tickets[1].result
+    assert not os.path.exists(tickets[0].jobDir)
+
+    calls = getCalls(tmp_path)
+    assert len(calls) == 1
+    assert calls[0][0] == "-SubmitMultipleJobs"
+    assert calls[0].count("-job") == 3
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import threading
+
+import pytest
+
+from PrismUtils import ThreadUtils
+from PrismUtils.Decorators import err_catcher
+
+import conftest
+
+
+@pytest.fixture
+def coreClass(qapp, tmp_path, monkeypatch):
+    # PrismCore only checks that the libraries folder exists
+    (tmp_path / "PythonLibs").mkdir()
+    monkeypatch.setenv("PRISM_LIBS", str(tmp_path))
+    import PrismCore
+
+    # uses the error handling of PrismCore without a UI
+    class FakeCore(conftest.FakeCore):
+        uiAvailable = False
+
+        def __init__(self):
+            super(FakeCore, self).__init__()
+            self.errors = []
+
+        def writeErrorLog(self, text):
+            self.errors.append(text)
+            return PrismCore.PrismCore.writeErrorLog(self, text)
+
+    return FakeCore
+
+
+@pytest.fixture
+def failing(coreClass):
+    class Failing(object):
+        def __init__(self):
+            self.core = coreClass()
+
+        @err_catcher(name=__name__)
+        def fail(self):
+            raise ValueError("failed")
+
+    return Failing()
+
+
+def runInThread(func):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    return result
+
+
+def test_isMainThread():
+    assert ThreadUtils.isMainThread()
+    assert runInThread(ThreadUtils.isMainThread) == {"value": False}
+
+
+def test_mainThreadErrorsAreRaisedWithoutUi(failing):
+    with pytest.raises(RuntimeError):
+        failing.fail()
+
+    assert len(failing.core.errors) == 1
+
+
+def test_workerErrorsAreLogged(failing):
+    obj = failing
+    assert runInThread(obj.fail) == {"value": None}
+    assert len(obj.core.errors) == 1
+
+
+def test_workerErrorsAreRaisedWhenRequested(failing):
+    obj = failing
+
+    def fail():
+        ThreadUtils.setRaiseErrors(True)
+        return obj.fail()
+
+    result = runInThread(fail)
+    assert isinstance(result["error"], ValueError)
+    assert len(obj.core.errors) == 1
+    assert not ThreadUtils.raisesErrors()
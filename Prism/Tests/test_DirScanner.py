@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import time
+
+from PrismUtils import DirScanner
+
+from conftest import FakeCore
+
+
+def touchDir(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def test_dirCacheRescansChangedDirectories(tmp_path):
+    cache = DirScanner.DirCache()
+    root = str(tmp_path)
+    open(os.path.join(root, "a.exr"), "w").close()
+    os.mkdir(os.path.join(root, "sub"))
+    touchDir(root, 1000)
+
+    entry = cache.getEntry(root)
+    assert entry["dirs"] == ["sub"]
+    assert sorted(entry["files"]) == ["a.exr"]
+    assert entry["files"]["a.exr"][1] == 0
+    assert not entry["volatile"]
+    assert cache.getEntry(root) is entry
+
+    open(os.path.join(root, "b.exr"), "w").close()
+    touchDir(root, 1001)
+    entry = cache.getEntry(root)
+    assert sorted(entry["files"]) == ["a.exr", "b.exr"]
+
+    os.remove(os.path.join(root, "a.exr"))
+    os.remove(os.path.join(root, "b.exr"))
+    os.rmdir(os.path.join(root, "sub"))
+    os.rmdir(root)
+    assert cache.getEntry(root) is None
+
+
+def test_dirCacheRescansRecentlyModifiedDirectories(tmp_path):
+    cache = DirScanner.DirCache(statFiles=False)
+    root = str(tmp_path)
+    entry = cache.getEntry(root)
+    assert entry["volatile"]
+
+    # the mtime doesn't change within the resolution of some filesystems
+    mtime = os.stat(root).st_mtime
+    open(os.path.join(root, "a.exr"), "w").close()
+    touchDir(root, mtime)
+    entry = cache.getEntry(root)
+    assert entry["files"] == {"a.exr": None}
+
+
+def test_dirCacheValidationIntervalAndRecheck(tmp_path):
+    cache = DirScanner.DirCache(validationInterval=60)
+    root = str(tmp_path)
+    touchDir(root, 1000)
+    entry = cache.getEntry(root)
+
+    open(os.path.join(root, "a.exr"), "w").close()
+    touchDir(root, 1001)
+    assert cache.getEntry(root) is entry
+    assert sorted(cache.getEntry(root, recheck=True)["files"]) == ["a.exr"]
+
+
+def test_dirCacheTrimsLeastRecentlyUsed(tmp_path):
+    cache = DirScanner.DirCache(maxDirs=2)
+    paths = []
+    for idx in range(3):
+        path = str(tmp_path / ("dir%s" % idx))
+        os.mkdir(path)
+        touchDir(path, 1000)
+        paths.append(path)
+
+    for path in paths:
+        cache.getEntry(path)
+
+    assert sorted(cache.entries) == paths[1:]
+
+
+def test_dirCacheValidatesModifiedFiles(tmp_path):
+    cache = DirScanner.DirCache()
+    root = str(tmp_path)
+    path = os.path.join(root, "a.exr")
+    open(path, "w").close()
+    os.utime(path, (1000, 1000))
+    touchDir(root, 1000)
+
+    entry = cache.getEntry(root)
+    assert entry["files"]["a.exr"] == [1000, 0]
+
+    # modifying a file in place doesn't change the mtime of its directory
+    with open(path, "w") as f:
+        f.write("data")
+    os.utime(path, (1002, 1002))
+    touchDir(root, 1000)
+
+    assert cache.getEntry(root)["files"]["a.exr"] == [1000, 0]
+    assert cache.validateFile(path) == [1002, 4]
+    assert cache.getEntry(root)["files"]["a.exr"] == [1002, 4]
+    assert cache.validateFile(os.path.join(root, "b.exr")) is None
+
+
+def createTree(root, assets, steps, categories, files):
+    # Assets/<asset>/Scenefiles/<step>/<category>/<scenefiles>
+    for asset in range(assets):
+        for step in range(steps):
+            for category in range(categories):
+                path = os.path.join(
+                    root,
+                    "Assets",
+                    "asset%03d" % asset,
+                    "Scenefiles",
+                    "step%s" % step,
+                    "category%s" % category,
+                )
+                os.makedirs(path)
+                for idx in range(files):
+                    open(os.path.join(path, "v%04d.ma" % (idx + 1)), "w").close()
+
+    # recently modified directories are always rescanned
+    for path, dirs, files in os.walk(root):
+        touchDir(path, 1000)
+
+
+def legacyWalk(roots):
+    # the listdir/isdir walk the entity functions used before the index
+    result = {}
+    paths = [""]
+    while paths:
+        relPath = paths.pop()
+        dirs = set()
+        files = set()
+        for root in roots:
+            path = os.path.join(root, relPath)
+            if not os.path.exists(path):
+                continue
+
+            for name in os.listdir(path):
+                if os.path.isdir(os.path.join(path, name)):
+                    dirs.add(name)
+                else:
+                    files.add(name)
+
+        result[relPath] = [sorted(dirs), sorted(files)]
+        paths += [os.path.join(relPath, x) for x in dirs]
+
+    return result
+
+
+def indexWalk(index, roots):
+    result = {}
+    paths = [""]
+    while paths:
+        relPath = paths.pop()
+        dirs = set()
+        files = set()
+        for entry in index.getEntries([os.path.join(x, relPath) for x in roots]):
+            if entry:
+                dirs.update(entry["dirs"])
+                files.update(entry["files"])
+
+        result[relPath] = [sorted(dirs), sorted(files)]
+        paths += [os.path.join(relPath, x) for x in dirs]
+
+    return result
+
+
+def addLatency(monkeypatch, latency):
+    # emulates a file share, where every filesystem call is a roundtrip
+    def slow(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(latency)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(os, "stat", slow(os.stat))
+    monkeypatch.setattr(os, "listdir", slow(os.listdir))
+    if DirScanner.scandir:
+        monkeypatch.setattr(DirScanner, "scandir", slow(DirScanner.scandir))
+
+
+def test_benchmark(qapp, tmp_path, monkeypatch):
+    # synthetic deep tree in a global and a local root. Run with "-s" to see
+    # the timings
+    from PrismUtils import EntityIndex
+
+    projectPath = str(tmp_path / "project")
+    localPath = str(tmp_path / "local")
+    createTree(projectPath, assets=40, steps=2, categories=2, files=5)
+    createTree(localPath, assets=20, steps=2, categories=1, files=2)
+    roots = [os.path.join(projectPath, "Assets"), os.path.join(localPath, "Assets")]
+    core = FakeCore(projectPath)
+    timings = []
+
+    for latency in [0, 0.0005]:
+        if latency:
+            addLatency(monkeypatch, latency)
+
+        start = time.time()
+        legacy = legacyWalk(roots)
+        legacyTime = time.time() - start
+
+        index = EntityIndex.EntityIndex(core)
+        index.validationInterval = 0
+        start = time.time()
+        cold = indexWalk(index, roots)
+        coldTime = time.time() - start
+
+        start = time.time()
+        warm = indexWalk(index, roots)
+        warmTime = time.time() - start
+
+        # a new session starts with the persisted index
+        index.save()
+        index = EntityIndex.EntityIndex(core)
+        index.validationInterval = 0
+        start = time.time()
+        persisted = indexWalk(index, roots)
+        persistedTime = time.time() - start
+
+        assert cold == legacy
+        assert warm == legacy
+        assert persisted == legacy
+        timings.append([latency, legacyTime, coldTime, warmTime, persistedTime])
+
+    print("\n%s directories, seconds:" % len(legacy))
+    for latency, legacyTime, coldTime, warmTime, persistedTime in timings:
+        print(
+            "  %.1fms latency: legacy walk %.3f, index cold %.3f, index warm %.3f,"
+            " persisted index %.3f"
+            % (latency * 1000, legacyTime, coldTime, warmTime, persistedTime)
+        )
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import time
+
+import pytest
+
+from PrismUtils import FrameSequences
+
+from conftest import FakeCore
+
+
+@pytest.mark.parametrize(
+    "pattern, token",
+    [
+        ("shot.####.exr", "#"),
+        ("shot_@@@@.exr", "@"),
+        ("shot.%04d.exr", "%d"),
+        ("fx.###.bgeo.sc", "#"),
+    ],
+)
+def test_patternRoundTrip(pattern, token):
+    path = os.path.join("renders", pattern)
+    seq = FrameSequences.parsePattern(path)
+    assert seq.directory == "renders"
+    assert seq.getPattern(token=token) == pattern
+    assert seq.getPath(12) == os.path.join("renders", seq.getFilename(12))
+
+    files = [seq.getFilename(x) for x in range(95, 105)]
+    groups = FrameSequences.groupFiles(files, directory="renders")
+    assert len(groups) == 1
+    assert groups[0].getPattern(token=token) == pattern
+    assert groups[0].getFiles() == files
+
+
+def test_parseFramePath():
+    seq = FrameSequences.parsePattern("/out/shot_v001.1001.exr")
+    assert (seq.prefix, seq.padding, seq.suffix) == ("shot_v001.", 4, ".exr")
+    assert FrameSequences.parsePattern("/out/shot%d.exr").padding == 1
+    assert FrameSequences.parsePattern("/out/shot.exr") is None
+
+
+def test_splitFrame():
+    assert FrameSequences.splitFrame("shot.1001.exr") == ("shot.", "1001", ".exr")
+    assert FrameSequences.splitFrame("shot.exr") is None
+    assert FrameSequences.splitFrame("fx.0010.bgeo.sc") == ("fx.", "0010", ".bgeo.sc")
+    # digits in front of the padding belong to the name, if they follow a letter
+    assert FrameSequences.splitFrame("shot10001.exr", padding=4) == ("shot1", "0001", ".exr")
+    assert FrameSequences.splitFrame("shot.10001.exr", padding=4) == ("shot.", "10001", ".exr")
+    assert FrameSequences.splitFrame("shot.01.exr", padding=4) is None
+
+
+def test_gaps():
+    files = ["shot.%04d.exr" % x for x in [1001, 1002, 1003, 1005, 1010]]
+    seq = FrameSequences.groupFiles(files)[0]
+    assert seq.first == 1001
+    assert seq.last == 1010
+    assert seq.gaps == [1004, 1006, 1007, 1008, 1009]
+    assert seq.getFrameRange() == "1001-1003,1005,1010"
+    assert 1005 in seq
+    assert 1004 not in seq
+    assert seq.getMissingFiles([1003, 1004], set(files)) == ["shot.1004.exr"]
+    assert FrameSequences.groupFiles(files[:3])[0].gaps == []
+
+
+def test_padding():
+    # unpadded frame numbers have the width of the smallest number
+    files = ["shot.%s.exr" % x for x in [8, 9, 10, 11, 100]]
+    seq = FrameSequences.groupFiles(files)[0]
+    assert seq.padding == 1
+    assert seq.getFiles() == files
+    assert seq.getPattern() == "shot.#.exr"
+
+    files = ["shot.%04d.exr" % x for x in [998, 999, 1000, 10000]]
+    seq = FrameSequences.groupFiles(files)[0]
+    assert seq.padding == 4
+    assert seq.getFiles() == files
+
+
+def test_groupFiles():
+    files = [
+        "b.0002.exr",
+        "notes.txt",
+        "a.0001.exr",
+        "b.0001.exr",
+        "a.0001.jpg",
+        "preview.mov",
+    ]
+    groups = FrameSequences.groupFiles(files, directory="/out")
+    assert [x.getPattern() for x in groups] == [
+        "a.####.exr",
+        "a.####.jpg",
+        "b.####.exr",
+        "notes.txt",
+        "preview.mov",
+    ]
+    assert groups[2].isSequence
+    assert not groups[0].isSequence
+    assert groups[4].isVideo
+    assert len(groups[3]) == 1
+
+    groups = FrameSequences.groupFiles(files, extensions=[".exr"])
+    assert [x.getPattern() for x in groups] == ["a.####.exr", "b.####.exr"]
+
+
+def test_getSequence():
+    files = ["shot.%04d.exr" % x for x in range(1, 6)] + ["shot_v2.0001.exr", "notes.txt"]
+    seq = FrameSequences.getSequence("/out/shot.0003.exr", files)
+    assert seq.frames == [1, 2, 3, 4, 5]
+    assert seq.getPaths()[0] == os.path.join("/out", "shot.0001.exr")
+    assert FrameSequences.getSequence("/out/notes.txt", files).getFiles() == ["notes.txt"]
+    assert FrameSequences.getSequence("/out/missing.txt", files) is None
+
+
+def test_frameRange():
+    assert FrameSequences.getFrameRange([]) == ""
+    assert FrameSequences.getFrameRange([5]) == "5"
+    assert FrameSequences.getFrameRange([1, 2, 4, 6, 7], separator=" ") == "1-2 4 6-7"
+
+
+def test_largeSequence():
+    frames = [x for x in range(1, 100001) if x % 1000]
+    files = ["shot.%06d.exr" % x for x in frames]
+    files.reverse()
+    start = time.time()
+    groups = FrameSequences.groupFiles(files, directory="/out")
+    duration = time.time() - start
+
+    assert len(groups) == 1
+    seq = groups[0]
+    assert len(seq) == len(frames)
+    assert seq.padding == 6
+    assert seq.gaps == list(range(1000, 100000, 1000))
+    assert seq.getFrameRange().count(",") == 99
+    assert seq.getFiles() == sorted(files)
+    # a single pass over the listing, it shouldn't take long
+    assert duration < 5
+
+
+def test_compImportSourceKeepsAtInFolders(qapp):
+    from ProjectScripts import ProjectBrowser
+
+    class FakeBrowser(object):
+        compGetImportSource = ProjectBrowser.ProjectBrowser.compGetImportSource
+
+        def __init__(self, sources):
+            self.core = FakeCore()
+            self.sources = sources
+
+        def getImgSources(self, path):
+            return self.sources
+
+    mediaPlayback = {
+        "basePath": "/renders/user@studio/beauty",
+        "seq": ["shot.@@@@.exr"],
+        "pstart": 1001,
+        "pend": 1010,
+    }
+    browser = FakeBrowser(["/renders/user@studio/beauty/shot.@@@@.exr"])
+    assert browser.compGetImportSource(mediaPlayback) == [
+        ["/renders/user@studio/beauty/shot.####.exr", 1001, 1010]
+    ]
+
+    browser = FakeBrowser(["/renders/user@studio/beauty/shot.mov"])
+    assert browser.compGetImportSource(mediaPlayback) == [
+        ["/renders/user@studio/beauty/shot.mov", 0, 0]
+    ]
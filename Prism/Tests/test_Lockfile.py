@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import json
+import time
+import threading
+
+import pytest
+
+from PrismUtils import Lockfile
+
+import conftest
+
+
+class FakeCore(conftest.FakeCore):
+    def popup(self, text, *args, **kwargs):
+        raise RuntimeError(text)
+
+    def popupQuestion(self, text, *args, **kwargs):
+        return "No"
+
+
+@pytest.fixture
+def configPath(tmp_path):
+    path = str(tmp_path / "pipeline.yml")
+    with open(path, "w") as f:
+        f.write("globals: {}\n")
+
+    return path
+
+
+def writeLock(path, info):
+    with open(path + ".lock", "w") as f:
+        f.write(json.dumps(info))
+
+
+def test_sharedLockDoesntCreateFiles(configPath):
+    before = sorted(os.listdir(os.path.dirname(configPath)))
+    lf = Lockfile.Lockfile(FakeCore(), configPath, mode="shared")
+    with lf:
+        assert lf.isLocked
+        assert sorted(os.listdir(os.path.dirname(configPath))) == before
+
+
+def test_exclusiveLockContainsOwner(configPath):
+    lf = Lockfile.Lockfile(FakeCore(), configPath)
+    with lf:
+        with open(configPath + ".lock") as f:
+            info = json.load(f)
+
+        assert info["pid"] == os.getpid()
+        assert info["host"] == lf.hostname
+        assert info["token"] == lf.token
+
+    assert not os.path.exists(configPath + ".lock")
+
+
+def test_readersWaitForWriter(configPath):
+    writer = Lockfile.Lockfile(FakeCore(), configPath)
+    writer.acquire()
+    reader = Lockfile.Lockfile(FakeCore(), configPath, mode="shared", timeout=5)
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(reader.acquire() or time.time()))
+    thread.start()
+    time.sleep(0.2)
+    assert not acquired
+    releaseTime = time.time()
+    writer.release()
+    thread.join()
+    assert acquired[0] >= releaseTime
+
+
+def test_writersExcludeEachOther(configPath):
+    counterPath = configPath + ".counter"
+    with open(counterPath, "w") as f:
+        f.write("0")
+
+    def increment():
+        for idx in range(20):
+            with Lockfile.Lockfile(FakeCore(), configPath, timeout=30):
+                with open(counterPath) as f:
+                    value = int(f.read())
+
+                with open(counterPath, "w") as f:
+                    f.write(str(value + 1))
+
+    threads = [threading.Thread(target=increment) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(counterPath) as f:
+        assert f.read() == "80"
+
+
+def test_crashedProcessLockIsBroken(configPath):
+    # pids are never this high, so the owner isn't running
+    lf = Lockfile.Lockfile(FakeCore(), configPath, timeout=2)
+    writeLock(configPath, {"host": lf.hostname, "pid": 2 ** 30, "token": "crashed", "time": time.time()})
+    with lf:
+        with open(configPath + ".lock") as f:
+            assert json.load(f)["token"] == lf.token
+
+
+def test_remoteLockStalenessIgnoresClockSkew(configPath):
+    # the clock of the other host is a day ahead. The lock is only
+    # considered stale after it was held for "staleTimeout" seconds
+    # measured by the local clock
+    info = {"host": "otherhost", "pid": 1234, "token": "remote", "time": time.time() + 86400}
+    writeLock(configPath, info)
+    lf = Lockfile.Lockfile(FakeCore(), configPath, timeout=0.3, staleTimeout=1)
+    startTime = time.time()
+    with pytest.raises(Lockfile.LockfileException):
+        lf.acquire()
+
+    lf = Lockfile.Lockfile(FakeCore(), configPath, timeout=5, staleTimeout=1)
+    with lf:
+        assert time.time() - startTime >= 1
+
+    # a lock of another host, whose clock is behind, isn't broken right away
+    info = {"host": "otherhost", "pid": 1234, "token": "remote2", "time": time.time() - 86400}
+    writeLock(configPath, info)
+    lf = Lockfile.Lockfile(FakeCore(), configPath, timeout=0.3, staleTimeout=1)
+    with pytest.raises(Lockfile.LockfileException):
+        lf.acquire()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import platform
+
+import pytest
+
+from PrismUtils import MediaJobs
+
+import conftest
+
+
+# writes the content of the input file to the output file and logs the call
+fakeFFmpeg = """#!%s
+import os
+import sys
+
+with open(os.environ["FAKE_FFMPEG_LOG"], "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+
+args = sys.argv[1:]
+with open(args[args.index("-i") + 1], "rb") as f:
+    data = f.read()
+
+with open(args[-1], "wb") as f:
+    f.write(data * 4)
+
+sys.stdout.write("frame=1\\nprogress=end\\n")
+"""
+
+
+pytestmark = pytest.mark.skipif(
+    platform.system() == "Windows", reason="the fake ffmpeg is a script"
+)
+
+
+class FakeConfigs(object):
+    def __init__(self, userDir):
+        self.userDir = userDir
+
+    def getUserConfigDir(self):
+        return self.userDir
+
+
+class FakeCore(conftest.FakeCore):
+    def __init__(self, root):
+        super(FakeCore, self).__init__(os.path.join(root, "project"))
+        self.configs = FakeConfigs(os.path.join(root, "user"))
+
+
+class FakeVideoReaders(object):
+    def __init__(self, ffmpeg):
+        self.ffmpeg = ffmpeg
+
+    def getFFmpeg(self):
+        return self.ffmpeg
+
+
+class FakeMedia(object):
+    def __init__(self, root, ffmpeg):
+        self.core = FakeCore(root)
+        self.videoReaders = FakeVideoReaders(ffmpeg)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    ffmpeg = str(tmp_path / "ffmpeg")
+    with open(ffmpeg, "w") as f:
+        f.write(fakeFFmpeg % sys.executable)
+
+    os.chmod(ffmpeg, 0o755)
+    monkeypatch.setenv("FAKE_FFMPEG_LOG", str(tmp_path / "calls.log"))
+    return MediaJobs.MediaJobEngine(FakeMedia(str(tmp_path), ffmpeg), threads=2)
+
+
+def getCalls(tmp_path):
+    path = str(tmp_path / "calls.log")
+    if not os.path.exists(path):
+        return []
+
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def createJob(engine, inputpath, outputpath):
+    args = ["-i", inputpath, "-c:v", "libx264"]
+    return MediaJobs.MediaJob(
+        ["-y"] + args + [outputpath],
+        outputpath,
+        cacheKey=lambda: engine.getCacheKey([inputpath], args[2:]),
+    )
+
+
+def writeFile(path, data, mtime):
+    with open(path, "wb") as f:
+        f.write(data)
+
+    os.utime(path, (mtime, mtime))
+
+
+def test_cacheIsLocalToTheUser(engine, tmp_path):
+    cacheDir = engine.getCacheDir()
+    assert cacheDir.startswith(str(tmp_path / "user"))
+    assert "project" not in cacheDir
+
+
+def test_cacheIsKeyedByContent(engine, tmp_path):
+    first = str(tmp_path / "a.mov")
+    copy = str(tmp_path / "copy" / "a.mov")
+    os.mkdir(os.path.dirname(copy))
+    writeFile(first, b"frames", 1000)
+    writeFile(copy, b"frames", 2000)
+
+    jobs = engine.run([createJob(engine, first, str(tmp_path / "out1.mp4"))])
+    assert jobs[0].success and not jobs[0].cached
+    jobs = engine.run([createJob(engine, copy, str(tmp_path / "out2.mp4"))])
+    assert jobs[0].success and jobs[0].cached
+    assert len(getCalls(tmp_path)) == 1
+
+    # same mtime and size, but a different content
+    writeFile(copy, b"FRAMES", 2000)
+    engine.fileHashes = {}
+    jobs = engine.run([createJob(engine, copy, str(tmp_path / "out3.mp4"))])
+    assert not jobs[0].cached
+    assert len(getCalls(tmp_path)) == 2
+
+
+def test_cacheIsScannedOnlyWhenItCouldBeTooBig(engine, tmp_path, monkeypatch):
+    scans = []
+    trimCache = engine.trimCache
+
+    def countingTrim():
+        scans.append(1)
+        return trimCache()
+
+    monkeypatch.setattr(engine, "trimCache", countingTrim)
+    for idx in range(5):
+        path = str(tmp_path / ("in%s.mov" % idx))
+        writeFile(path, b"x" * 100, 1000)
+        engine.run([createJob(engine, path, str(tmp_path / ("out%s.mp4" % idx)))])
+
+    assert len(scans) == 1
+    assert engine.cacheSize == 5 * 400
+
+    engine.cacheMaxBytes = 1000
+    path = str(tmp_path / "in5.mov")
+    writeFile(path, b"x" * 100, 1000)
+    engine.run([createJob(engine, path, str(tmp_path / "out5.mp4"))])
+    assert len(scans) == 2
+    assert engine.cacheSize <= 900
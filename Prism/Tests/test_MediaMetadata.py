@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import struct
+
+import pytest
+
+from PrismUtils import MediaMetadata
+
+
+def writeTif(path, endian, width, height, bits):
+    # minimal TIFF with a single IFD. BitsPerSample values, which don't fit
+    # into the entry, are stored after the IFD
+    prefix = b"II" if endian == "<" else b"MM"
+    entries = 4
+    ifdOffset = 8
+    extraOffset = ifdOffset + 2 + entries * 12 + 4
+    if len(bits) * 2 > 4:
+        bitsValue = struct.pack(endian + "I", extraOffset)
+        extra = struct.pack(endian + "%sH" % len(bits), *bits)
+    else:
+        bitsValue = struct.pack(endian + "%sH" % len(bits), *bits).ljust(4, b"\0")
+        extra = b""
+
+    data = prefix + struct.pack(endian + "HI", 42, ifdOffset)
+    data += struct.pack(endian + "H", entries)
+    data += struct.pack(endian + "HHII", 256, 4, 1, width)
+    data += struct.pack(endian + "HHII", 257, 4, 1, height)
+    data += struct.pack(endian + "HHI", 258, 3, len(bits)) + bitsValue
+    data += struct.pack(endian + "HHIH", 277, 3, 1, len(bits)) + b"\0\0"
+    data += struct.pack(endian + "I", 0) + extra
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+@pytest.mark.parametrize(
+    "bits, pixelType",
+    [
+        ([8], "uint8"),
+        ([16], "uint16"),
+        ([16, 16], "uint16"),
+        ([8, 8, 8], "uint8"),
+        ([16, 16, 16], "uint16"),
+        ([16, 16, 16, 16], "uint16"),
+        ([32, 32, 32], "uint32"),
+    ],
+)
+def test_readTifHeader(tmp_path, endian, bits, pixelType):
+    path = str(tmp_path / "image.tif")
+    writeTif(path, endian, 1920, 1080, bits)
+    info = MediaMetadata.readHeader(path)
+    assert info == {
+        "width": 1920,
+        "height": 1080,
+        "channels": len(bits),
+        "pixelType": pixelType,
+    }
+
+
+class FakeMedia(object):
+    def getVideoMetadata(self, path):
+        return
+
+
+def test_headersAreKeptUntilTheFileChanges(tmp_path, monkeypatch):
+    metadata = MediaMetadata.MediaMetadata(FakeMedia())
+    metadata.mtimeResolution = 0
+    path = str(tmp_path / "image.tif")
+    writeTif(path, "<", 64, 32, [8, 8, 8])
+    reads = []
+    readHeader = MediaMetadata.readHeader
+
+    def countingRead(path):
+        reads.append(path)
+        return readHeader(path)
+
+    monkeypatch.setattr(MediaMetadata, "readHeader", countingRead)
+    assert metadata.getFileInfo(path)["width"] == 64
+
+    # a new file rescans the directory, but keeps the unchanged headers
+    open(str(tmp_path / "other.txt"), "w").close()
+    os.utime(str(tmp_path), (1, 1))
+    assert metadata.getFileInfo(path)["width"] == 64
+    assert len(reads) == 1
+
+    writeTif(path, "<", 128, 32, [8, 8, 8])
+    os.utime(path, (2, 2))
+    os.utime(str(tmp_path), (3, 3))
+    assert metadata.getFileInfo(path)["width"] == 128
+    assert len(reads) == 2
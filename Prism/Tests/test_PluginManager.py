@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import textwrap
+
+import pytest
+
+import conftest
+
+
+PLUGIN = '''
+class Prism_%(name)s(object):
+    def __init__(self, core):
+        self.core = core
+        self.pluginName = "%(name)s"
+        self.pluginType = "RenderfarmManager"
+        self.platforms = ["Windows", "Linux", "Darwin"]
+        self.version = "v1.0.0"
+
+    def isActive(self):
+        return os.getenv("PRISM_TEST_FARM_ACTIVE") == "1"
+
+    def getGroups(self):
+        return ["gpu"]
+
+
+import os
+'''
+
+
+class FakeCallbacks(object):
+    callbackNum = 0
+
+    def __init__(self):
+        self.registeredCallbacks = {}
+        self.invalidated = 0
+
+    def invalidateDispatchTable(self):
+        self.invalidated += 1
+
+
+class FakeConfigs(object):
+    def __init__(self, root):
+        self.root = root
+
+    def getUserConfigDir(self):
+        return self.root
+
+
+class FakeAppPlugin(object):
+    pluginName = "Standalone"
+
+
+class FakeCore(conftest.FakeCore):
+    def __init__(self, root):
+        super(FakeCore, self).__init__(os.path.join(root, "project"))
+        self.prismRoot = os.path.join(root, "Prism")
+        self.configs = FakeConfigs(root)
+        self.callbacks = FakeCallbacks()
+        self.appPlugin = FakeAppPlugin()
+        self.unloadedAppPlugins = {}
+        self.customPlugins = {}
+        self.rfManagers = {}
+        self.prjManagers = {}
+        self.inactivePlugins = {}
+        self.plugins = None
+
+    def getPlugin(self, pluginName):
+        return self.plugins.getPlugin(pluginName)
+
+
+@pytest.fixture
+def pluginDir(tmp_path):
+    name = "TestFarm"
+    path = tmp_path / "Plugins" / name
+    scripts = path / "Scripts"
+    scripts.mkdir(parents=True)
+    (scripts / ("Prism_%s_init.py" % name)).write_text(
+        textwrap.dedent(PLUGIN % {"name": name})
+    )
+    yield str(path)
+    sys.modules.pop("Prism_%s_init" % name, None)
+    if str(scripts) in sys.path:
+        sys.path.remove(str(scripts))
+
+
+def createManager(root):
+    from PrismUtils import PluginManager
+
+    core = FakeCore(root)
+    core.plugins = PluginManager.PluginManager(core)
+    return core
+
+
+def test_manifestPluginChecksIsActiveWhenLoaded(qapp, tmp_path, pluginDir, monkeypatch):
+    monkeypatch.setenv("PRISM_TEST_FARM_ACTIVE", "1")
+    core = createManager(str(tmp_path))
+    core.plugins.loadPlugin(pluginDir)
+    core.plugins.saveManifest()
+    assert "TestFarm" in core.rfManagers
+
+    # the farm became unavailable since the manifest was written
+    monkeypatch.setenv("PRISM_TEST_FARM_ACTIVE", "0")
+    sys.modules.pop("Prism_TestFarm_init", None)
+    core = createManager(str(tmp_path))
+    plugin = core.plugins.loadPlugin(pluginDir)
+    assert not plugin.isLoaded()
+    assert core.rfManagers["TestFarm"] is plugin
+
+    # the current caller still gets a result
+    assert plugin.getGroups() == ["gpu"]
+    assert "TestFarm" not in core.rfManagers
+    assert core.plugins.getManifestEntries() == {}
+
+    # the next startup imports the plugin and keeps it inactive
+    core = createManager(str(tmp_path))
+    plugin = core.plugins.loadPlugin(pluginDir)
+    assert "TestFarm" not in core.rfManagers
+
+
+def test_manifestPluginStaysActive(qapp, tmp_path, pluginDir, monkeypatch):
+    monkeypatch.setenv("PRISM_TEST_FARM_ACTIVE", "1")
+    core = createManager(str(tmp_path))
+    core.plugins.loadPlugin(pluginDir)
+    core.plugins.saveManifest()
+
+    sys.modules.pop("Prism_TestFarm_init", None)
+    core = createManager(str(tmp_path))
+    plugin = core.plugins.loadPlugin(pluginDir)
+    assert not plugin.isLoaded()
+    assert plugin.getGroups() == ["gpu"]
+    assert core.rfManagers["TestFarm"] is plugin._plugin
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import threading
+import time
+
+import pytest
+
+import conftest
+
+
+class FakeCore(conftest.FakeCore):
+    appPlugin = object()
+
+
+class FakeStateManager(object):
+    def __init__(self):
+        self.core = FakeCore()
+        self.publishResult = []
+
+
+class FakeStateUi(object):
+    def __init__(self, className, func, threadSafe):
+        self.className = className
+        self.func = func
+        self.threadSafe = threadSafe
+
+    def executeState(self, parent, useVersion="next"):
+        return self.func(parent)
+
+
+class FakeItem(object):
+    def __init__(
+        self, name, className="Export", func=None, threadSafe=False, children=None
+    ):
+        self.name = name
+        self.children = children or []
+        func = func or (lambda parent: [name + " - success"])
+        self.ui = FakeStateUi(className, func, threadSafe)
+
+    def text(self, column):
+        return self.name
+
+    def checkState(self, column):
+        from PySide2.QtCore import Qt
+
+        return Qt.Checked
+
+    def childCount(self):
+        return len(self.children)
+
+    def child(self, idx):
+        return self.children[idx]
+
+
+def getAllItems(items):
+    allItems = []
+    for item in items:
+        allItems.append(item)
+        allItems += getAllItems(item.children)
+
+    return allItems
+
+
+@pytest.fixture
+def publish(qapp):
+    from PrismUtils import PublishScheduler
+
+    def publish(items, sm=None):
+        sm = sm or FakeStateManager()
+        scheduler = PublishScheduler.PublishScheduler(sm)
+        sm.publishScheduler = scheduler
+        scheduler.buildGraph(items, getAllItems(items))
+        completed = scheduler.run()
+        return completed, [x["result"][0] for x in sm.publishResult]
+
+    return publish
+
+
+def test_dependencyWaitsForEarlierStates(publish):
+    log = []
+
+    def slowExport(parent):
+        time.sleep(0.1)
+        log.append("export")
+        return ["export - success"]
+
+    def logState(name):
+        def execute(parent):
+            log.append(name)
+            return [name + " - success"]
+
+        return execute
+
+    items = [
+        FakeItem("export", func=slowExport, threadSafe=True),
+        FakeItem("dependency", className="Dependency", func=logState("dependency")),
+        FakeItem("render", func=logState("render"), threadSafe=True),
+    ]
+    completed, results = publish(items)
+    assert completed
+    assert log == ["export", "dependency", "render"]
+    assert results == ["export - success", "dependency - success", "render - success"]
+
+
+def test_pauseStopsPendingStates(publish):
+    items = [
+        FakeItem("render", func=lambda p: ["render - publish paused"]),
+        FakeItem("export"),
+    ]
+    completed, results = publish(items)
+    assert not completed
+    assert results == ["render - publish paused"]
+
+    # continuing the publish executes the remaining states
+    completed, results = publish(items[1:])
+    assert completed
+    assert results == ["export - success"]
+
+
+def test_threadSafeStatesRunConcurrently(publish):
+    # both states have to be at the barrier at the same time
+    barrier = threading.Barrier(2, timeout=10)
+
+    def export(parent):
+        barrier.wait()
+        return ["export - success"]
+
+    items = [
+        FakeItem("export1", func=export, threadSafe=True),
+        FakeItem("export2", func=export, threadSafe=True),
+    ]
+    completed, results = publish(items)
+    assert completed
+    assert sorted(results) == ["export - success", "export - success"]
+
+
+def test_workerStepsOverlapWithMainThreadStates(publish):
+    from PrismUtils import ThreadUtils
+
+    sm = FakeStateManager()
+    started = threading.Event()
+    finishThreads = []
+
+    def convert():
+        # only returns True if the next state ran in the meantime
+        return started.wait(10)
+
+    def finish(converted):
+        finishThreads.append(ThreadUtils.isMainThread())
+        return ["playblast - success" if converted else "playblast - timeout"]
+
+    def playblast(parent):
+        return sm.publishScheduler.defer(convert, finish=finish)
+
+    def export(parent):
+        started.set()
+        return ["export - success"]
+
+    items = [
+        FakeItem("playblast", className="Playblast", func=playblast),
+        FakeItem("export", func=export),
+    ]
+    completed, results = publish(items, sm=sm)
+    assert completed
+    assert results == ["export - success", "playblast - success"]
+    assert finishThreads == [True]
+
+
+def test_deferRunsDirectlyOutsideOfPublish(qapp):
+    from PrismUtils import PublishScheduler
+
+    scheduler = PublishScheduler.PublishScheduler(FakeStateManager())
+    assert scheduler.defer(lambda: 1, finish=lambda x: x + 1) == 2
+
+
+def test_foldersGetResetPerFolder(publish):
+    seen = []
+
+    def submit(parent):
+        seen.append(list(parent.dependencies))
+        parent.dependencies.append("job")
+        return ["submit - success"]
+
+    folder1 = FakeItem(
+        "folder1",
+        className="Folder",
+        children=[FakeItem("a", func=submit), FakeItem("b", func=submit)],
+    )
+    folder2 = FakeItem("folder2", className="Folder", children=[FakeItem("c", func=submit)])
+    for folder in [folder1, folder2]:
+        folder.ui.dependencies = ["stale"]
+
+    completed, results = publish([folder1, folder2])
+    assert completed
+    # the states of a folder share its dependencies until the folder is done
+    assert seen == [[], ["job"], []]
+    assert folder1.ui.dependencies == []
+    assert folder2.ui.dependencies == []
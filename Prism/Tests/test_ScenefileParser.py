@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import timeit
+
+import pytest
+
+import conftest
+
+
+class FakeCore(conftest.FakeCore):
+    filenameSeparator = "_"
+    versionPadding = 4
+    versionFormat = "v%04d"
+    useLocalFiles = False
+
+
+def legacyScenefileData(fileName, separator="_"):
+    # ProjectEntities.getScenefileData before the ScenefileParser
+    fname = os.path.basename(fileName).split(separator)
+    data = {}
+    try:
+        data["basePath"] = os.path.dirname(fileName)
+    except:
+        pass
+
+    data["filename"] = fileName
+
+    if len(fname) == 6:
+        data.update({
+            "entity": "asset",
+            "entityName": fname[0],
+            "step": fname[1],
+            "category": "",
+            "version": fname[2],
+            "comment": fname[3],
+            "user": fname[4],
+            "extension": fname[5],
+        })
+
+    elif len(fname) == 7:
+        data.update({
+            "entity": "asset",
+            "entityName": fname[0],
+            "step": fname[1],
+            "category": fname[2],
+            "version": fname[3],
+            "comment": fname[4],
+            "user": fname[5],
+            "extension": fname[6],
+        })
+
+    elif len(fname) == 8:
+        data.update({
+            "entity": "shot",
+            "entityName": fname[1],
+            "step": fname[2],
+            "category": fname[3],
+            "version": fname[4],
+            "comment": fname[5],
+            "user": fname[6],
+            "extension": fname[7],
+        })
+
+    else:
+        data.update({"entity": "invalid"})
+
+    return data
+
+
+@pytest.fixture
+def entities(qapp):
+    from PrismUtils import ProjectEntities
+
+    return ProjectEntities.ProjectEntities(FakeCore())
+
+
+def getPaths(count):
+    paths = []
+    for idx in range(count):
+        shot = "sh%03d" % (idx // 50)
+        paths.append(
+            "/project/03_Workflow/Shots/%s/Scenefiles/Lighting/main/shot_%s_Lighting_main_v%04d_comment_user_.ma"
+            % (shot, shot, idx)
+        )
+        if idx % 5 == 0:
+            paths.append(
+                "/project/03_Workflow/Assets/char/Scenefiles/Rigging/char_Rigging_v%04d_comment_user_.ma"
+                % idx
+            )
+
+        if idx % 50 == 0:
+            paths.append("/project/03_Workflow/Shots/%s/Scenefiles/notes.txt" % shot)
+
+    return paths
+
+
+def test_dataMatchesLegacyParsing(entities):
+    for path in getPaths(200):
+        assert entities.getScenefileData(path) == legacyScenefileData(path)
+
+
+def test_dataIsACopy(entities):
+    path = getPaths(1)[0]
+    data = entities.getScenefileData(path)
+    data["entity"] = "changed"
+    assert entities.getScenefileData(path)["entity"] == "shot"
+
+
+def test_records(entities):
+    parser = entities.getScenefileParser()
+    record = parser.parseName("char_Rigging_v0012_comment_user_.ma")
+    assert record.entity == "asset"
+    assert record.entityName == "char"
+    assert record.category == ""
+    assert record.versionNumber == 12
+    assert parser.parseName("shot_sh010_Fx_main_vXXXX_c_u_.hip").versionNumber is None
+    assert parser.parseName("notes.txt").entity == "invalid"
+
+    records = parser.parseMany(["a.txt", "char_Rigging_v0001_c_u_.ma"], basePath="/x")
+    assert [x[0] for x in records] == [os.path.join("/x", "char_Rigging_v0001_c_u_.ma")]
+
+
+def test_parserFollowsNamingSettings(entities):
+    parser = entities.getScenefileParser()
+    assert entities.getScenefileParser() is parser
+    entities.core.filenameSeparator = "-"
+    assert entities.getScenefileData("/x/char-Rigging-v0001-c-u-.ma")["entity"] == "asset"
+    assert entities.getScenefileParser() is not parser
+
+
+def test_cacheIsBounded(qapp):
+    from PrismUtils import ScenefileParser
+
+    parser = ScenefileParser.ScenefileParser("_", maxSize=10)
+    names = ["char_Rigging_v%04d_c_u_.ma" % idx for idx in range(20)]
+    for name in names:
+        parser.parseName(name)
+
+    # recently used names are kept
+    parser.parseName(names[10])
+    parser.parseName(names[0])
+    assert list(parser.records)[-2:] == [names[10], names[0]]
+    assert parser.getStats()["records"] == 10
+
+
+def test_benchmark(entities):
+    # micro-benchmark of the warm path. The timings are only reported, run
+    # with "-s" to see them
+    from PrismUtils import ScenefileParser
+
+    paths = getPaths(2500)
+    parser = entities.getScenefileParser()
+    coldParser = ScenefileParser.ScenefileParser("_")
+    passes = 10
+
+    def parseCold():
+        coldParser.clear()
+        return [coldParser.parse(x) for x in paths]
+
+    names = [os.path.basename(x) for x in paths]
+    funcs = [
+        lambda: [legacyScenefileData(x) for x in paths],
+        parseCold,
+        lambda: [entities.getScenefileData(x) for x in paths],
+        lambda: [parser.parse(x) for x in paths],
+        lambda: parser.parseMany(names),
+    ]
+    # the measurements are interleaved, so that load of the machine affects
+    # all of them
+    timings = [[] for x in funcs]
+    for idx in range(5):
+        for func, results in zip(funcs, timings):
+            results.append(timeit.timeit(func, number=passes) / passes * 1000)
+
+    legacy, cold, warmData, warmRecord, listing = [min(x) for x in timings]
+    print(
+        "\n%s paths, ms per pass:\n  legacy getScenefileData %.2f\n  parser cold %.2f"
+        "\n  getScenefileData warm %.2f\n  parser warm record %.2f\n  parseMany listing %.2f"
+        % (len(paths), legacy, cold, warmData, warmRecord, listing)
+    )
+    assert funcs[2]() == funcs[0]()
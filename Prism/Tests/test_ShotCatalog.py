@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import re
+import time
+
+import conftest
+
+
+class FakeCore(conftest.FakeCore):
+    sequenceSeparator = "-"
+    useLocalFiles = False
+
+    def __init__(self, projectPath):
+        super(FakeCore, self).__init__(projectPath)
+        self.shotPath = os.path.join(projectPath, "03_Workflow", "Shots")
+        self.omits = {}
+
+    def getConfig(self, *args, **kwargs):
+        if kwargs.get("config") == "omit":
+            return self.omits
+
+        return super(FakeCore, self).getConfig(*args, **kwargs)
+
+    # same as in PrismCore, which can't be imported without the Prism libs
+    def atoi(self, text):
+        return int(text) if text.isdigit() else text
+
+    def naturalKeys(self, text):
+        return [self.atoi(c) for c in re.split(r"(\d+)", text)]
+
+
+def legacyGetShots(entities, searchFilter="", basepaths=None):
+    # ProjectEntities.getShots before the ShotCatalog
+    seqDirs = basepaths or [entities.core.shotPath]
+    sequences = []
+    shots = []
+
+    dirs = []
+    for seqDir, entry in zip(seqDirs, entities.index.getEntries(seqDirs)):
+        if not entry:
+            continue
+
+        for f in entry["dirs"]:
+            if f.startswith("_"):
+                continue
+
+            sPath = os.path.join(seqDir, f)
+            if sPath not in dirs:
+                dirs.append(sPath)
+
+    for path in sorted(dirs):
+        val = os.path.basename(path)
+
+        if val in entities.omittedEntities["shot"]:
+            continue
+
+        shotName, seqName = entities.splitShotname(val)
+        if searchFilter not in seqName and searchFilter not in shotName:
+            continue
+
+        if shotName:
+            for shot in shots:
+                if seqName == shot[0] and shotName == shot[1]:
+                    break
+            else:
+                shotData = [seqName, shotName, val, path]
+                shots.append(shotData)
+
+        if seqName not in sequences:
+            sequences.append(seqName)
+
+    sequences = sorted(sequences)
+    shots = sorted(shots, key=lambda x: entities.core.naturalKeys(x[1]))
+
+    if "no sequence" in sequences:
+        sequences.insert(
+            len(sequences), sequences.pop(sequences.index("no sequence"))
+        )
+
+    return sequences, shots
+
+
+def createEntities(projectPath, shotNames):
+    from PrismUtils import ProjectEntities
+
+    core = FakeCore(projectPath)
+    os.makedirs(os.path.join(projectPath, "00_Pipeline"))
+    for name in shotNames:
+        os.makedirs(os.path.join(core.shotPath, name))
+
+    return ProjectEntities.ProjectEntities(core)
+
+
+def test_catalog(qapp, tmp_path):
+    names = ["seq02-sh10", "seq02-sh9", "seq01-sh100", "seq01-sh20", "sh5", "_hidden", "seq03-sh1"]
+    entities = createEntities(str(tmp_path), names)
+    entities.core.omits = {"shot": ["seq03-sh1"]}
+    entities.refreshOmittedEntities()
+
+    catalog = entities.getShotCatalog()
+    assert catalog.getSequences() == ["seq01", "seq02", "no sequence"]
+    assert [x.shot for x in catalog.getShots("seq02")] == ["sh9", "sh10"]
+    assert [x.shot for x in catalog.getShots()] == ["sh5", "sh9", "sh10", "sh20", "sh100"]
+    assert "seq03-sh1" not in catalog
+    assert catalog.getNames(includeOmitted=True) == sorted(x for x in names if x != "_hidden")
+    assert catalog.getShot("seq01-sh20").path == os.path.join(entities.core.shotPath, "seq01-sh20")
+    assert catalog.getSequences("sh9") == ["seq02"]
+
+    assert entities.getShotCatalog() is catalog
+    for searchFilter in ["", "seq01", "sh1", "missing"]:
+        assert entities.getShots(searchFilter) == legacyGetShots(entities, searchFilter)
+
+
+def test_catalogMergesBasepaths(qapp, tmp_path):
+    entities = createEntities(str(tmp_path), ["seq01-sh010"])
+    localPath = str(tmp_path / "local" / "Shots")
+    os.makedirs(os.path.join(localPath, "seq01-sh010"))
+    os.makedirs(os.path.join(localPath, "seq01-sh020"))
+
+    catalog = entities.getShotCatalog(basepaths=[entities.core.shotPath, localPath])
+    assert catalog.getShot("seq01-sh010").paths == sorted([
+        os.path.join(entities.core.shotPath, "seq01-sh010"),
+        os.path.join(localPath, "seq01-sh010"),
+    ])
+    assert [x.name for x in catalog.getShots("seq01")] == ["seq01-sh010", "seq01-sh020"]
+
+
+def test_benchmark(qapp, tmp_path):
+    # 10k shots in 200 sequences. The timings are only reported, run with
+    # "-s" to see them
+    names = ["seq%03d-sh%04d" % (x % 200, x * 10) for x in range(10000)]
+    entities = createEntities(str(tmp_path), names)
+    entities.getShotCatalog()
+
+    start = time.time()
+    legacy = legacyGetShots(entities)
+    legacyTime = time.time() - start
+
+    entities.shotCatalogs = {}
+    start = time.time()
+    catalog = entities.getShotCatalog()
+    buildTime = time.time() - start
+
+    start = time.time()
+    shots = entities.getShots()
+    reuseTime = time.time() - start
+
+    start = time.time()
+    filtered = catalog.getShots(sequence="seq010", searchFilter="sh1")
+    filterTime = time.time() - start
+
+    print(
+        "\n10k shots, seconds:\n  legacy getShots %.3f\n  catalog build %.3f"
+        "\n  getShots with catalog %.3f\n  filtered sequence %.4f"
+        % (legacyTime, buildTime, reuseTime, filterTime)
+    )
+    assert shots == legacy
+    assert len(catalog) == 10000
+    assert len(catalog.getSequences()) == 200
+    assert filtered and all(x.sequence == "seq010" for x in filtered)
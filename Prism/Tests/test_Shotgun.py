@@ -0,0 +1,539 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+import sys
+import pickle
+import threading
+
+import pytest
+
+import conftest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+shotgunScripts = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Plugins",
+    "ProjectManagers",
+    "Shotgun",
+    "Scripts",
+)
+if shotgunScripts not in sys.path:
+    sys.path.insert(0, shotgunScripts)
+
+
+# serves fake thumbnails over keep-alive connections. "/redirect/<name>"
+# redirects to "/thumbs/<name>", "/missing/<name>" returns a 404
+class ThumbnailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+
+        if self.path.startswith("/redirect/"):
+            self.send_response(302)
+            self.send_header("Location", self.path.replace("/redirect/", "/thumbs/"))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path.startswith("/thumbs/"):
+            data = ("image of %s" % self.path).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ThumbnailServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), ThumbnailHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%s" % self.server_address[1]
+
+
+@pytest.fixture
+def server():
+    server = ThumbnailServer()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def getField(dataType, validTypes=None):
+    field = {
+        "data_type": {"value": dataType},
+        "properties": {"default_value": {"value": None}},
+    }
+    if validTypes:
+        field["properties"]["valid_types"] = {"value": validTypes}
+
+    return field
+
+
+def writeSchema(directory):
+    # minimal schema of the entities, which are used by the shot and asset
+    # sync
+    schema = {
+        "EventLogEntry": {
+            "event_type": getField("text"),
+            "description": getField("text"),
+        },
+        "Project": {"name": getField("text")},
+        "Sequence": {
+            "code": getField("text"),
+            "sg_status_list": getField("status_list"),
+            "project": getField("entity", ["Project"]),
+        },
+        "Task": {"content": getField("text")},
+        "Asset": {
+            "code": getField("text"),
+            "sg_status_list": getField("status_list"),
+            "sg_localhierarchy": getField("text"),
+            "project": getField("entity", ["Project"]),
+        },
+        "Shot": {
+            "code": getField("text"),
+            "sg_status_list": getField("status_list"),
+            "image": getField("text"),
+            "sg_cut_in": getField("number"),
+            "sg_cut_out": getField("number"),
+            "tasks": getField("multi_entity", ["Task"]),
+            "sg_sequence": getField("entity", ["Sequence"]),
+            "project": getField("entity", ["Project"]),
+        },
+    }
+    schemaEntity = dict((x, {"name": {"value": x}}) for x in schema)
+    paths = []
+    for name, data in [("schema.pickle", schema), ("schema_entity.pickle", schemaEntity)]:
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            pickle.dump(data, f, protocol=2)
+
+        paths.append(path)
+
+    return paths
+
+
+class FakeCatalog(object):
+    def __init__(self, names):
+        self.names = names
+
+
+class FakeEntities(object):
+    def __init__(self, core):
+        self.core = core
+        self.created = []
+
+    def getShotCatalog(self, basepaths=None):
+        return FakeCatalog(set(self.core.localShots))
+
+    def splitShotname(self, shotName):
+        if self.core.sequenceSeparator in shotName:
+            seqName, shotName = shotName.split(self.core.sequenceSeparator, 1)
+            return shotName, seqName
+
+        return shotName, "no sequence"
+
+    def createEntity(self, entityType, name):
+        self.created.append(name)
+        self.core.localShots.append(name)
+
+
+class FakePlugin(object):
+    pluginName = "Shotgun"
+    version = "test"
+
+
+class FakeCore(conftest.FakeCore):
+    filenameSeparator = "_"
+    sequenceSeparator = "-"
+    uiAvailable = False
+
+    def __init__(self, projectPath):
+        from PrismUtils import ConfigManager
+
+        super(FakeCore, self).__init__(projectPath)
+        self.userini = os.path.join(projectPath, "Prism.yml")
+        self.configs = ConfigManager.ConfigManager(self)
+        self.entities = FakeEntities(self)
+        self.localShots = []
+
+    def getAssetPath(self):
+        return os.path.join(self.projectPath, "Assets")
+
+    def getConfig(self, *args, **kwargs):
+        return self.configs.getConfig(*args, **kwargs)
+
+    def setConfig(self, *args, **kwargs):
+        return self.configs.setConfig(*args, **kwargs)
+
+    def registerCallback(self, *args, **kwargs):
+        return {"id": 1}
+
+    def unregisterCallback(self, *args, **kwargs):
+        pass
+
+    def popup(self, text, *args, **kwargs):
+        raise RuntimeError(text)
+
+
+def getMockgun():
+    from shotgun_api3 import ShotgunError
+    from shotgun_api3.lib import mockgun
+
+    class Mockgun(mockgun.Shotgun):
+        def __init__(self, *args, **kwargs):
+            mockgun.Shotgun.__init__(self, *args, **kwargs)
+            # number of requests of every batch call
+            self.batches = []
+            # number of batch calls, which fail before the next one succeeds
+            self.failingBatches = 0
+            self.uploads = []
+
+        def batch(self, requests):
+            self.batches.append(len(requests))
+            if self.failingBatches:
+                self.failingBatches -= 1
+                raise ShotgunError("batch failed")
+
+            return mockgun.Shotgun.batch(self, requests)
+
+        def upload_thumbnail(self, entity_type, entity_id, path, **kwargs):
+            # the server sets the url of the uploaded image
+            self.uploads.append([entity_type, entity_id, os.path.basename(path)])
+            self._db[entity_type][entity_id]["image"] = "thumbnail/%s" % entity_id
+
+        # the Shotgun server returns entity links with the name of the
+        # linked entity, mockgun only returns their type and id
+        def find(self, *args, **kwargs):
+            results = mockgun.Shotgun.find(self, *args, **kwargs)
+            for result in results:
+                for value in result.values():
+                    if isinstance(value, dict) and "id" in value and "name" not in value:
+                        row = self._db[value["type"]][value["id"]]
+                        value["name"] = row.get("name") or row.get("code")
+
+            return results
+
+    return Mockgun
+
+
+@pytest.fixture
+def shotgun(qapp, tmp_path, server):
+    import Prism_Shotgun_Functions
+
+    Mockgun = getMockgun()
+    Mockgun.set_schema_paths(*writeSchema(str(tmp_path)))
+    sg = Mockgun("https://mockgun.shotgunstudio.com", script_name="test", api_key="test")
+    project = sg.create("Project", {"name": "test"})
+    sequence = sg.create("Sequence", {"code": "seq01", "project": project})
+    for idx in range(40):
+        if idx % 10 == 0:
+            image = None
+        elif idx % 10 == 1:
+            image = "%s/redirect/%s.jpg" % (server.url, idx)
+        elif idx == 2:
+            image = "%s/missing/%s.jpg" % (server.url, idx)
+        else:
+            image = "%s/thumbs/%s.jpg" % (server.url, idx)
+
+        sg.create(
+            "Shot",
+            {
+                "code": "sh%03d" % idx,
+                "image": image,
+                "sg_cut_in": 1001,
+                "sg_cut_out": 1010 + idx,
+                "tasks": [],
+                "sg_sequence": sequence if idx < 20 else None,
+                "project": project,
+            },
+        )
+
+    # ignored by Prism, because of the filename separator
+    sg.create("Shot", {"code": "sh_ignored", "project": project, "tasks": []})
+
+    core = FakeCore(str(tmp_path / "project"))
+    plugin = Prism_Shotgun_Functions.Prism_Shotgun_Functions(core, FakePlugin())
+    plugin.sg = sg
+    plugin.sgPrjId = project["id"]
+    return plugin
+
+
+def countWrites(monkeypatch, configs):
+    writes = []
+    writeConfig = configs.writeConfig
+
+    def countingWrite(configPath, *args, **kwargs):
+        writes.append(os.path.basename(configPath))
+        return writeConfig(configPath, *args, **kwargs)
+
+    monkeypatch.setattr(configs, "writeConfig", countingWrite)
+    return writes
+
+
+def test_importShots(shotgun, server, monkeypatch):
+    core = shotgun.core
+    core.localShots = ["seq01-sh000", "sh039"]
+    core.setConfig("shotRanges", "sh039", [1001, 1049], config="shotinfo")
+    writes = countWrites(monkeypatch, core.configs)
+
+    result = shotgun.createLocalShots("/project/Shots")
+
+    names = ["seq01-sh%03d" % x for x in range(20)] + ["sh%03d" % x for x in range(20, 40)]
+    assert sorted(core.entities.created) == sorted(names[1:39])
+    assert result["created"] == sorted(names[1:39])
+    assert writes == ["shotInfo.yml", "shotgunThumbnails.yml"]
+
+    shotRanges = core.getConfig("shotRanges", config="shotinfo")
+    assert sorted(shotRanges) == sorted(names)
+    assert shotRanges["sh025"] == [1001, 1035]
+    # the range of sh039 didn't change, but it got a new thumbnail
+    assert result["updated"] == ["seq01-sh000", "sh039"]
+    assert set(result["timings"]) == set(["query", "shots", "ranges", "thumbnails"])
+
+    shotInfoDir = os.path.join(os.path.dirname(core.prismIni), "Shotinfo")
+    thumbs = sorted(x for x in os.listdir(shotInfoDir) if x.endswith("_preview.jpg"))
+    assert len(thumbs) == 40 - 4 - 1
+    assert "seq01-sh002_preview.jpg" not in thumbs
+    assert not [x for x in os.listdir(shotInfoDir) if x.endswith(".tmp")]
+    with open(os.path.join(shotInfoDir, "seq01-sh011_preview.jpg")) as f:
+        assert f.read() == "image of /thumbs/11.jpg"
+
+    assert result["failed"] == ["seq01-sh002"]
+    assert len(result["errors"]) == 1
+    # every download thread reuses its connection
+    assert len(server.requests) == 36 + 4
+    assert server.connections <= shotgun.sgThumbnailThreads + 1
+
+
+def test_importShotsTwiceDoesntWrite(shotgun, server, monkeypatch):
+    core = shotgun.core
+    shotgun.createLocalShots("/project/Shots")
+    writes = countWrites(monkeypatch, core.configs)
+    requests = len(server.requests)
+
+    result = shotgun.createLocalShots("/project/Shots")
+    assert writes == []
+    assert result["created"] == []
+    assert result["updated"] == []
+    # only the thumbnail, which failed before, gets downloaded again
+    assert server.requests[requests:] == ["/missing/2.jpg"]
+
+
+def test_importShotsDownloadsChangedThumbnails(shotgun, server):
+    core = shotgun.core
+    sg = shotgun.sg
+    shotgun.createLocalShots("/project/Shots")
+    shotInfoDir = os.path.join(os.path.dirname(core.prismIni), "Shotinfo")
+    # a new signature of the same image doesn't change the thumbnail
+    sh005 = getSgShot(sg, "sh005")
+    sg.update("Shot", sh005["id"], {"image": "%s/thumbs/5.jpg?Signature=new" % server.url})
+    sh006 = getSgShot(sg, "sh006")
+    sg.update("Shot", sh006["id"], {"image": "%s/thumbs/6_new.jpg" % server.url})
+    writePreview(core, "seq01-sh007", mtime=2000)
+    os.remove(os.path.join(shotInfoDir, "seq01-sh008_preview.jpg"))
+    requests = len(server.requests)
+
+    result = shotgun.createLocalShots("/project/Shots")
+    assert sorted(server.requests[requests:]) == [
+        "/missing/2.jpg", "/thumbs/6_new.jpg", "/thumbs/7.jpg", "/thumbs/8.jpg"
+    ]
+    assert result["updated"] == ["seq01-sh008"]
+    with open(os.path.join(shotInfoDir, "seq01-sh006_preview.jpg")) as f:
+        assert f.read() == "image of /thumbs/6_new.jpg"
+
+    # the downloaded thumbnails don't get uploaded again
+    state = shotgun.getSgThumbnailState("Shot")
+    path = os.path.join(shotInfoDir, "seq01-sh007_preview.jpg")
+    sh007 = sg.find_one("Shot", [["code", "is", "sh007"]], ["image"])
+    assert not shotgun.needsSgThumbnail(sh007, path, state)
+
+
+def test_downloaderCloseClosesAllConnections(server, tmp_path):
+    import Prism_Shotgun_Functions
+
+    downloader = Prism_Shotgun_Functions.SgThumbnailDownloader(threads=3)
+    jobs = [
+        ["sh%s" % idx, "%s/thumbs/%s.jpg" % (server.url, idx), str(tmp_path / ("%s.jpg" % idx))]
+        for idx in range(12)
+    ]
+    downloaded, failed = downloader.download(jobs)
+    assert len(downloaded) == 12
+    connections = list(downloader.connections)
+    assert connections
+
+    downloader.close()
+    assert downloader.connections == []
+    assert all(x.sock is None for x in connections)
+
+
+def getSgShot(sg, code):
+    fields = ["sg_cut_in", "sg_cut_out", "sg_sequence"]
+    return sg.find_one("Shot", [["code", "is", code]], fields)
+
+
+def writePreview(core, shot, mtime=1000):
+    shotInfoDir = os.path.join(os.path.dirname(core.prismIni), "Shotinfo")
+    if not os.path.exists(shotInfoDir):
+        os.makedirs(shotInfoDir)
+
+    path = os.path.join(shotInfoDir, "%s_preview.jpg" % shot)
+    with open(path, "w") as f:
+        f.write(shot)
+
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_exportShotsOnlySendsChanges(shotgun):
+    core = shotgun.core
+    sg = shotgun.sg
+    shots = ["seq01-sh005", "seq01-sh006", "seq02-sh100", "sh050"]
+    core.setConfig("shotRanges", "seq01-sh005", [1001, 1015], config="shotinfo")
+    core.setConfig("shotRanges", "seq01-sh006", [1001, 1100], config="shotinfo")
+    core.setConfig("shotRanges", "seq02-sh100", [1001, 1020], config="shotinfo")
+
+    result = shotgun.createSgShots(shots)
+    assert result["created"] == ["seq02-sh100", "sh050"]
+    assert result["updated"] == ["seq01-sh006"]
+    assert result["failed"] == []
+    assert result["errors"] == []
+    # one request for the new sequence, sh005 didn't change
+    assert sg.batches == [1, 3]
+    assert getSgShot(sg, "sh006")["sg_cut_out"] == 1100
+    sh100 = getSgShot(sg, "sh100")
+    assert sh100["sg_sequence"]["name"] == "seq02"
+    assert [sh100["sg_cut_in"], sh100["sg_cut_out"]] == [1001, 1020]
+
+    result = shotgun.createSgShots(shots)
+    assert result["created"] == []
+    assert result["updated"] == []
+    assert sg.batches == [1, 3]
+
+
+def test_exportAssetsOnlySendsChanges(shotgun):
+    sg = shotgun.sg
+    project = {"type": "Project", "id": shotgun.sgPrjId}
+    sg.create("Asset", {"code": "chair", "project": project})
+    assetPath = shotgun.core.getAssetPath()
+    assets = [
+        os.path.join(assetPath, "props", "chair"),
+        os.path.join(assetPath, "props", "table"),
+        os.path.join(assetPath, "chars", "hero"),
+    ]
+
+    result = shotgun.createSgAssets(assets)
+    assert result["created"] == ["table", "hero"]
+    assert result["failed"] == []
+    assert sg.batches == [2]
+    table = sg.find_one("Asset", [["code", "is", "table"]], ["sg_localhierarchy"])
+    assert table["sg_localhierarchy"] == os.path.join("props", "table")
+
+    result = shotgun.createSgAssets(assets)
+    assert result["created"] == []
+    assert sg.batches == [2]
+
+
+def test_exportRetriesFailedBatches(shotgun, monkeypatch):
+    import Prism_Shotgun_Functions
+
+    delays = []
+    monkeypatch.setattr(Prism_Shotgun_Functions.time, "sleep", delays.append)
+    sg = shotgun.sg
+    sg.failingBatches = 2
+
+    result = shotgun.createSgShots(["sh050", "sh051"])
+    assert result["created"] == ["sh050", "sh051"]
+    assert result["errors"] == []
+    assert sg.batches == [2, 2, 2]
+    assert delays == [1, 2]
+
+    # the batch fails more often than it gets retried
+    sg.failingBatches = shotgun.sgBatchRetries + 1
+    result = shotgun.createSgShots(["sh052"])
+    assert result["created"] == []
+    assert result["failed"] == ["sh052"]
+    assert result["errors"] == ["batch failed"]
+    assert getSgShot(sg, "sh052") is None
+
+
+def test_exportSkipsUnchangedThumbnails(shotgun):
+    core = shotgun.core
+    sg = shotgun.sg
+    # seq01-sh000 exists without an image, seq01-sh003 already has an image,
+    # which wasn't uploaded by Prism
+    shots = ["seq01-sh000", "seq01-sh003", "sh050"]
+    paths = [writePreview(core, shot) for shot in shots]
+
+    shotgun.createSgShots(shots)
+    assert sorted(x[2] for x in sg.uploads) == sorted(os.path.basename(x) for x in paths)
+
+    sg.uploads = []
+    result = shotgun.createSgShots(shots)
+    assert sg.uploads == []
+    assert result["updated"] == []
+
+    os.utime(paths[0], (2000, 2000))
+    shotgun.createSgShots(shots)
+    assert [x[2] for x in sg.uploads] == ["seq01-sh000_preview.jpg"]
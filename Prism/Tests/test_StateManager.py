@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import pytest
+
+from conftest import FakeCore
+
+
+@pytest.fixture
+def stateManager(qapp):
+    from PySide2.QtWidgets import QMainWindow, QWidget, QPushButton, QTreeWidget, QTreeWidgetItem
+    from ProjectScripts import StateManager
+
+    class FakeState(QWidget):
+        def getStateProps(self):
+            return {}
+
+    class FakeStateManager(QMainWindow):
+        getEditedState = StateManager.StateManager.getEditedState
+
+        def __init__(self):
+            super(FakeStateManager, self).__init__()
+            self.core = FakeCore()
+            self.edited = []
+            self.tree = QTreeWidget(self)
+            self.button = QPushButton(self)
+            self.state = FakeState(self)
+            self.stateButton = QPushButton(self.state)
+            self.item = QTreeWidgetItem(["Folder"])
+            self.item.ui = self.state
+            self.tree.addTopLevelItem(self.item)
+            self.item.addChild(QTreeWidgetItem(["Export"]))
+            self.tree.itemExpanded.connect(self.saveStatesToScene)
+            self.button.clicked.connect(self.saveStatesToScene)
+            self.stateButton.clicked.connect(self.saveStatesToScene)
+
+        def getStateProps(self):
+            return {}
+
+        def saveStatesToScene(self, param=None):
+            self.edited.append(self.getEditedState(param))
+
+    sm = FakeStateManager()
+    yield sm
+    sm.deleteLater()
+
+
+def test_treeSignalsMarkTheirState(stateManager):
+    stateManager.item.setExpanded(True)
+    assert stateManager.edited == [stateManager.state]
+
+
+def test_senderWalkFindsState(stateManager):
+    stateManager.stateButton.click()
+    assert stateManager.edited == [stateManager.state]
+
+
+def test_senderWalkStopsAtStateManager(stateManager):
+    stateManager.button.click()
+    assert stateManager.edited == [None]
+
+
+def test_savesFromWorkerThreadsAreFlushedInTheMainThread(qapp):
+    import threading
+    import time
+
+    from PySide2.QtCore import QCoreApplication, QObject, QTimer
+    from ProjectScripts import StateManager
+    from PrismUtils import ThreadUtils
+
+    class FakeAppPlugin(object):
+        hasPreSaveCallback = True
+
+    class UiCore(FakeCore):
+        uiAvailable = True
+        appPlugin = FakeAppPlugin()
+
+    class FakeStateManager(QObject):
+        getEditedState = StateManager.StateManager.getEditedState
+        saveStatesToScene = StateManager.StateManager.saveStatesToScene
+
+        def __init__(self):
+            super(FakeStateManager, self).__init__()
+            self.core = UiCore()
+            self.saveEnabled = True
+            self.standalone = False
+            self.dirtyStates = set()
+            self.allStatesDirty = False
+            self.flushes = []
+            self.saveTimer = QTimer()
+            self.saveTimer.setSingleShot(True)
+            self.saveTimer.setInterval(0)
+            self.saveTimer.timeout.connect(self.flushStates)
+
+        def flushStates(self):
+            self.flushes.append(ThreadUtils.isMainThread())
+
+    sm = FakeStateManager()
+    thread = threading.Thread(target=sm.saveStatesToScene)
+    thread.start()
+    thread.join()
+    assert sm.allStatesDirty
+    assert sm.flushes == []
+
+    timeout = time.time() + 5
+    while not sm.flushes and time.time() < timeout:
+        QCoreApplication.processEvents()
+
+    assert sm.flushes == [True]
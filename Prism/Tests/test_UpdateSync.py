@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import zipfile
+
+import pytest
+
+from PrismUtils import UpdateSync
+
+
+def writeFile(path, data):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def readFile(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def createRelease(root, changed=()):
+    files = {}
+    for idx in range(50):
+        relPath = "Scripts/PrismCore.py" if idx == 0 else "Plugins/p%02d/file%02d.py" % (idx % 5, idx)
+        data = b"content %d" % idx
+        if idx in changed:
+            data += b" changed"
+
+        writeFile(os.path.join(root, *relPath.split("/")), data)
+        files[relPath] = data
+
+    return files
+
+
+def createZip(zipPath, folder, prefix):
+    with zipfile.ZipFile(zipPath, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, dirs, files in os.walk(folder):
+            for filename in files:
+                path = os.path.join(root, filename)
+                relPath = os.path.relpath(path, folder).replace("\\", "/")
+                archive.write(path, prefix + relPath)
+
+
+@pytest.fixture
+def install(tmp_path):
+    installRoot = str(tmp_path / "install")
+    createRelease(installRoot)
+    return installRoot
+
+
+def test_zipUpdateCopiesOnlyChangedFiles(tmp_path, install):
+    releaseRoot = str(tmp_path / "release")
+    files = createRelease(releaseRoot, changed=[3, 7])
+    writeFile(os.path.join(releaseRoot, "new.sh"), b"echo")
+    files["new.sh"] = b"echo"
+    zipPath = str(tmp_path / "release.zip")
+    createZip(zipPath, releaseRoot, "user-Prism-1234/Prism/")
+
+    sync = UpdateSync.UpdateSync(install, threads=4)
+    result = sync.update(zipPath, dryRun=True)
+    assert result["changed"] == ["Plugins/p02/file07.py", "Plugins/p03/file03.py", "new.sh"]
+    assert readFile(os.path.join(install, "Plugins", "p03", "file03.py")) == b"content 3"
+
+    result = sync.update(zipPath)
+    assert result["changed"] == ["Plugins/p02/file07.py", "Plugins/p03/file03.py", "new.sh"]
+    assert result["failed"] == []
+    for relPath, data in files.items():
+        assert readFile(os.path.join(install, *relPath.split("/"))) == data
+
+    assert not os.path.exists(sync.stagingPath)
+    assert sync.update(zipPath)["changed"] == []
+
+
+def test_folderUpdate(tmp_path, install):
+    # an extracted github archive contains the Prism folder in a subfolder
+    releaseRoot = str(tmp_path / "extracted" / "user-Prism-1234" / "Prism")
+    files = createRelease(releaseRoot, changed=[10])
+
+    sync = UpdateSync.UpdateSync(install)
+    result = sync.update(str(tmp_path / "extracted"))
+    assert result["changed"] == ["Plugins/p00/file10.py"]
+    assert readFile(os.path.join(install, "Plugins", "p00", "file10.py")) == files["Plugins/p00/file10.py"]
+
+
+def test_modifiedInstallFileGetsRestored(tmp_path, install):
+    releaseRoot = str(tmp_path / "release")
+    createRelease(releaseRoot)
+    sync = UpdateSync.UpdateSync(install)
+    assert sync.update(releaseRoot)["changed"] == []
+
+    # same size, different content. The manifest must not hide the change
+    path = os.path.join(install, "Plugins", "p01", "file11.py")
+    writeFile(path, b"content 99")
+    os.utime(path, (1, 1))
+    assert sync.update(releaseRoot)["changed"] == ["Plugins/p01/file11.py"]
+    assert readFile(path) == b"content 11"
+
+
+@pytest.mark.parametrize(
+    "memberName",
+    [
+        "top/Prism/../../../evil.txt",
+        "top/Prism/Scripts/../../../../evil.txt",
+        "top/Prism//evil.txt",
+        "top/Prism/C:/evil.txt",
+    ],
+)
+def test_hostileZipMemberIsRejected(tmp_path, install, memberName):
+    zipPath = str(tmp_path / "hostile.zip")
+    with zipfile.ZipFile(zipPath, "w") as archive:
+        archive.writestr("top/Prism/Scripts/PrismCore.py", "core")
+        archive.writestr(memberName, "pwned")
+
+    sync = UpdateSync.UpdateSync(install)
+    with pytest.raises(ValueError):
+        sync.update(zipPath)
+
+    for root, dirs, files in os.walk(str(tmp_path)):
+        assert "evil.txt" not in files
+
+    assert readFile(os.path.join(install, "Scripts", "PrismCore.py")) == b"content 0"
+
+
+def test_getSafeRelPath():
+    assert UpdateSync.getSafeRelPath("Scripts/./PrismCore.py") == "Scripts/PrismCore.py"
+    assert UpdateSync.getSafeRelPath("Scripts\\PrismCore.py") == "Scripts/PrismCore.py"
+    assert UpdateSync.getSafeRelPath("a/../b.py") == "b.py"
+    assert UpdateSync.getSafeRelPath("../b.py") is None
+    assert UpdateSync.getSafeRelPath("..") is None
+    assert UpdateSync.getSafeRelPath("/b.py") is None
+    assert UpdateSync.getSafeRelPath("D:/b.py") is None
+
+
+def test_getTargetPathStaysInsideRoot(tmp_path):
+    root = str(tmp_path)
+    assert UpdateSync.getTargetPath(root, "a/b.py") == os.path.join(os.path.realpath(root), "a", "b.py")
+    with pytest.raises(ValueError):
+        UpdateSync.getTargetPath(root, "a/../../b.py")
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+####################################################
+#
+# PRISM - Pipeline for animation and VFX projects
+#
+# www.prism-pipeline.com
+#
+# contact: contact@prism-pipeline.com
+#
+####################################################
+#
+#
+# Copyright (C) 2016-2020 Richard Frangenberg
+#
+# Licensed under GNU GPL-3.0-or-later
+#
+# This file is part of Prism.
+#
+# Prism is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Prism is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Prism.  If not, see <https://www.gnu.org/licenses/>.
+
+
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import conftest
+
+
+WORKER = r'''
+import os
+import sys
+import json
+
+sys.path[:0] = [%(scripts)r, %(tests)r]
+
+from test_VersionAllocator import createCore
+
+
+core = createCore(sys.argv[1])
+taskPath = sys.argv[2]
+versions = []
+for idx in range(int(sys.argv[3])):
+    version = core.entities.getHighestTaskVersion(taskPath, reserve=True)
+    os.makedirs(os.path.join(taskPath, "%%s_worker_%%s" %% (version, os.getpid())))
+    versions.append(version)
+
+print(json.dumps(versions))
+'''
+
+
+class FakeCore(conftest.FakeCore):
+    separateOutputVersionStack = True
+    useLocalFiles = False
+    filenameSeparator = "_"
+    versionPadding = 4
+    versionFormat = "v%04d"
+
+    def getExportPaths(self):
+        return {"global": self.projectPath}
+
+    def popup(self, text, *args, **kwargs):
+        raise RuntimeError(text)
+
+    def popupQuestion(self, text, *args, **kwargs):
+        return "No"
+
+
+def createCore(projectPath):
+    from PrismUtils import ProjectEntities
+
+    core = FakeCore(projectPath)
+    core.entities = ProjectEntities.ProjectEntities(core)
+    return core
+
+
+@pytest.fixture
+def project(tmp_path):
+    projectPath = tmp_path / "project"
+    (projectPath / "00_Pipeline").mkdir(parents=True)
+    taskPath = projectPath / "03_Workflow" / "Shots" / "sh010" / "Export" / "fx"
+    taskPath.mkdir(parents=True)
+    return str(projectPath), str(taskPath)
+
+
+def test_concurrentReservationsAreUnique(qapp, tmp_path, project):
+    projectPath, taskPath = project
+    scriptsPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Scripts")
+    workerPath = str(tmp_path / "worker.py")
+    with open(workerPath, "w") as f:
+        f.write(WORKER % {"scripts": scriptsPath, "tests": os.path.dirname(os.path.abspath(__file__))})
+
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    workers = 6
+    count = 10
+    procs = [
+        subprocess.Popen(
+            [sys.executable, workerPath, projectPath, taskPath, str(count)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+        )
+        for idx in range(workers)
+    ]
+
+    versions = []
+    for proc in procs:
+        out, err = proc.communicate(timeout=120)
+        assert proc.returncode == 0, err.decode("utf-8", "replace")
+        versions += json.loads(out.decode("utf-8").strip().splitlines()[-1])
+
+    assert len(versions) == workers * count
+    assert len(set(versions)) == len(versions)
+    assert sorted(versions) == ["v%04d" % (idx + 1) for idx in range(workers * count)]
+
+
+def test_reservationRechecksRecentEntries(qapp, project):
+    projectPath, taskPath = project
+    core = createCore(projectPath)
+    assert core.entities.getHighestTaskVersion(taskPath, reserve=True) == "v0001"
+    os.makedirs(os.path.join(taskPath, "v0001_worker_a"))
+    assert core.entities.getHighestTaskVersion(taskPath) == "v0002"
+
+    # created by an older Prism version without a reservation, while the
+    # index entry of the task folder is still considered fresh
+    os.makedirs(os.path.join(taskPath, "v0007_worker_b"))
+    assert core.entities.getHighestTaskVersion(taskPath, reserve=True) == "v0008"
+
+
+def test_keysOfSiblingFolders(qapp, project):
+    projectPath, taskPath = project
+    core = createCore(projectPath)
+    index = core.entities.index
+    index.ensureLoaded()
+    assert index.getKey(taskPath) == "03_Workflow/Shots/sh010/Export/fx"
+    assert index.getKey(projectPath) == ""
+    sibling = projectPath + "_backup" + os.sep + "03_Workflow"
+    assert index.getKey(sibling) == os.path.normpath(sibling)
+
+    versions = core.entities.versions
+    assert versions.getKey(taskPath, "task") == "task:03_Workflow/Shots/sh010/Export/fx"
+    assert versions.getKey(sibling, "task") == "task:%s" % (
+        os.path.normpath(sibling).replace("\\", "/").strip("/")
+    )
+
+
+def test_highestVersionsGetPersisted(qapp, project):
+    projectPath, taskPath = project
+    core = createCore(projectPath)
+    sceneDir = os.path.dirname(os.path.dirname(taskPath))
+    open(os.path.join(sceneDir, "sh010_Export_v0003_.ma"), "w").close()
+    index = core.entities.index
+    index.ensureLoaded()
+    entry = index.getEntry(sceneDir)
+    index.dirty = False
+
+    index.setEntryData(sceneDir, entry, "highestVersions", "shot", [3, "a.ma"])
+    assert index.dirty
+    assert index.getEntry(sceneDir)["highestVersions"] == {"shot": [3, "a.ma"]}